@@ -16,12 +16,14 @@ logger = logging.getLogger(__name__)
 class EnhancedAnalysisEngine:
     """統合された分析エンジンクラス"""
     
-    def __init__(self):
+    def __init__(self, link_graph=None):
         self.content_analyzer = ContentAnalyzer()
         self.insight_generator = InsightGenerator()
         self.recommendation_system = RecommendationSystem()
         self.advanced_analyzer = AdvancedAnalyzer()
         self.ai_service = AIServiceIntegration()
+        # ノート間リンクのインデックス（LinkGraphIndex、任意）
+        self.link_graph = link_graph
         
         logger.info("Enhanced Analysis Engine initialized")
     
@@ -378,12 +380,65 @@ class EnhancedAnalysisEngine:
                     'estimated_time': '2時間'
                 })
             
+            # リンク構造の推奨事項（保管庫を再走査せずにリンクグラフから取得）
+            if self.link_graph is not None:
+                recommendations.extend(self._generate_link_graph_recommendations())
+            
             return recommendations
             
         except Exception as e:
             logger.error(f"Comprehensive recommendations generation failed: {e}")
             return []
     
+    def _generate_link_graph_recommendations(self) -> List[Dict[str, Any]]:
+        """リンクグラフからの推奨事項の生成"""
+        try:
+            recommendations = []
+            metrics = self.link_graph.get_metrics()
+            
+            # 孤立ノートの推奨事項
+            if metrics['orphan_count'] > 0:
+                recommendations.append({
+                    'type': 'connect_orphans',
+                    'priority': 'low',
+                    'title': '孤立ノートの接続',
+                    'description': f"{metrics['orphan_count']}件のノートがどのノートともリンクしていません。関連ノートへのリンクを追加することを推奨します",
+                    'action_items': [
+                        '孤立ノートの内容を確認',
+                        '関連するハブノートからリンクを追加',
+                        '不要なノートをアーカイブ'
+                    ],
+                    'target_notes': metrics['orphans'][:10],
+                    'expected_benefit': 'ノートの発見性の向上',
+                    'difficulty': 'low',
+                    'estimated_time': '15分'
+                })
+            
+            # 未解決リンクの推奨事項
+            if metrics['unresolved_links'] > 0:
+                unresolved = self.link_graph.get_unresolved_links()
+                recommendations.append({
+                    'type': 'resolve_links',
+                    'priority': 'medium',
+                    'title': '未解決リンクの解消',
+                    'description': f"{metrics['unresolved_links']}件のリンク先ノートが存在しません。ノートを作成するかリンクを修正することを推奨します",
+                    'action_items': [
+                        'リンク先ノートを作成',
+                        'リネームされたノートへのリンクを修正',
+                        '不要なリンクを削除'
+                    ],
+                    'target_links': sorted(unresolved, key=lambda target: -len(unresolved[target]))[:10],
+                    'expected_benefit': 'リンク切れの解消',
+                    'difficulty': 'low',
+                    'estimated_time': '15分'
+                })
+            
+            return recommendations
+            
+        except Exception as e:
+            logger.error(f"Link graph recommendations generation failed: {e}")
+            return []
+    
     async def _generate_executive_summary(self, integrated_results: Dict, insights: List[Dict], recommendations: List[Dict]) -> Dict[str, Any]:
         """エグゼクティブサマリーの生成"""
         try:
@@ -30,6 +30,31 @@ class Settings:
     # Obsidian設定
     OBSIDIAN_VAULT_PATH: str = os.getenv("OBSIDIAN_VAULT_PATH", "")
     
+    # ファイル変更イベントをまとめる静止期間（秒）
+    OBSIDIAN_EVENT_QUIET_PERIOD: float = float(os.getenv("OBSIDIAN_EVENT_QUIET_PERIOD", "0.5"))
+    
+    # ファイル変更イベントのキューの上限と、あふれたときの方針（coalesce・drop_oldest・block）
+    OBSIDIAN_EVENT_QUEUE_SIZE: int = int(os.getenv("OBSIDIAN_EVENT_QUEUE_SIZE", "10000"))
+    OBSIDIAN_EVENT_OVERFLOW_POLICY: str = os.getenv("OBSIDIAN_EVENT_OVERFLOW_POLICY", "coalesce")
+    
+    # スナップショットから起動した後の突き合わせの走査で、ディレクトリごとに待つ時間（秒）
+    OBSIDIAN_RECONCILE_THROTTLE: float = float(os.getenv("OBSIDIAN_RECONCILE_THROTTLE", "0.001"))
+    
+    # 走査・変更監視から除外するパス（gitignore形式、カンマ区切り。保管庫ルートの.syncignoreも併せて読む）
+    OBSIDIAN_IGNORE_PATTERNS: list = [
+        pattern.strip()
+        for pattern in os.getenv(
+            "OBSIDIAN_IGNORE_PATTERNS", ".obsidian/,.trash/,.git/,.sync_state/,attachments/,02_Analysis/"
+        ).split(",")
+        if pattern.strip()
+    ]
+    
+    # 同期状態（インデックス・キャッシュ等）の保存先
+    SYNC_STATE_DIR: str = os.getenv("SYNC_STATE_DIR", ".sync_state")
+    
+    # CIでの変更検出（git: 前回分析したコミットからの差分だけを分析、full: 毎回保管庫全体を走査）
+    CI_CHANGE_DETECTION: str = os.getenv("CI_CHANGE_DETECTION", "git")
+    
     # AIサービス設定
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
@@ -41,6 +41,14 @@ class AnalysisRequest(BaseModel):
 class SingleAnalysisRequest(BaseModel):
     content: ContentItem
 
+class NoteQueryRequest(BaseModel):
+    tags: Optional[List[str]] = []
+    properties: Optional[Dict[str, Any]] = {}
+    ranges: Optional[Dict[str, List[Any]]] = {}
+    sort: Optional[str] = "modified"
+    descending: bool = True
+    limit: Optional[int] = 50
+
 @app.get("/")
 async def read_root():
     return {
@@ -146,6 +154,41 @@ async def get_dashboard_status():
         logger.error(f"Status data generation failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/notes/query")
+async def query_notes(request: NoteQueryRequest):
+    """タグ・フロントマターのプロパティでノートを絞り込む"""
+    try:
+        result = dashboard_service.query_notes(
+            tags=request.tags,
+            properties=request.properties,
+            ranges=request.ranges,
+            sort=request.sort,
+            descending=request.descending,
+            limit=request.limit
+        )
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=result["error"])
+        return {"success": True, **result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Note query failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/search")
+async def search_notes(q: str, limit: int = 20, offset: int = 0):
+    """ノートのタイトル・見出し・タグ・本文を全文検索する（"..."でフレーズ、末尾の*で前方一致、先頭の-で除外）"""
+    try:
+        result = await dashboard_service.search_notes(q, limit=min(max(limit, 1), 100), offset=max(offset, 0))
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=result["error"])
+        return {"success": True, **result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Note search failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ===== 分析機能 =====
 
 @app.post("/analyze/comprehensive")
@@ -335,6 +378,10 @@ async def get_status():
                 "GET /dashboard/recommendations",
                 "GET /dashboard/status"
             ],
+            "search": [
+                "GET /search",
+                "POST /notes/query"
+            ],
             "analysis": [
                 "POST /analyze/comprehensive",
                 "POST /analyze/single",
@@ -0,0 +1,355 @@
+"""
+Markdown → Notionブロック変換エンジン
+プリコンパイル済みのパターンで1パス変換し、ブロックをジェネレーターとして返す
+"""
+import logging
+import re
+from typing import Dict, Any, List, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Notion APIの制限
+MAX_RICH_TEXT_LENGTH = 2000   # rich_text 1要素あたりの文字数（UTF-16単位）
+MAX_RICH_TEXT_ITEMS = 100     # 1ブロックあたりのrich_text要素数
+MAX_CHILDREN_PER_REQUEST = 100  # 1リクエストあたりの子ブロック数
+MAX_NESTING_DEPTH = 2         # 1リクエストでネストできる子ブロックの深さ
+
+TAB_WIDTH = 4
+
+# 行の種類を判定するパターン（1行につき1回だけ評価する）
+LINE_PATTERN = re.compile(r"""
+    (?P<fence>^[ ]{0,3}(?P<fence_marker>`{3,}|~{3,})[ \t]*(?P<language>[^`\s]*)[^`]*$)
+  | (?P<heading>^[ ]{0,3}(?P<hashes>\#{1,6})(?:[ \t]+(?P<heading_text>.*?))?[ \t]*$)
+  | (?P<divider>^[ ]{0,3}(?:(?:-[ \t]*){3,}|(?:\*[ \t]*){3,}|(?:_[ \t]*){3,})$)
+  | (?P<quote>^[ ]{0,3}>[ ]?(?P<quote_text>.*)$)
+  | (?P<list>^(?P<indent>[ \t]*)(?P<marker>[-*+]|\d{1,9}[.)])[ \t]+
+        (?:\[(?P<check>[ xX])\][ \t]+)?(?P<list_text>.*)$)
+""", re.VERBOSE)
+
+# Obsidianのコールアウト（> [!note] タイトル）
+CALLOUT_PATTERN = re.compile(r'^\[!(?P<kind>[\w-]+)\][+-]?[ \t]*(?P<title>.*)$')
+
+# インライン装飾（コード・太字・取り消し線・ハイライト・斜体・リンク）
+INLINE_PATTERN = re.compile(r"""
+    (?P<code_ticks>`+)(?P<code>.+?)(?P=code_ticks)
+  | \*\*(?P<bold>.+?)\*\*
+  | __(?P<bold_u>.+?)__
+  | ~~(?P<strike>.+?)~~
+  | ==(?P<highlight>.+?)==
+  | \*(?P<italic>[^\s*](?:.*?[^\s*])?)\*
+  | (?<![\w])_(?P<italic_u>[^\s_](?:.*?[^\s_])?)_(?![\w])
+  | (?<!!)\[(?P<link_text>[^\]]+)\]\((?P<link_url>[^)\s]+)\)
+""", re.VERBOSE)
+
+# インライン装飾の可能性がある文字（含まれない場合は装飾解析を省略）
+INLINE_TRIGGER = re.compile(r'[`*_~=\[]')
+
+CALLOUT_ICONS = {
+    'note': '📝',
+    'abstract': '📋',
+    'summary': '📋',
+    'info': 'ℹ️',
+    'todo': '☑️',
+    'tip': '💡',
+    'hint': '💡',
+    'success': '✅',
+    'question': '❓',
+    'warning': '⚠️',
+    'caution': '⚠️',
+    'failure': '❌',
+    'danger': '⚡',
+    'error': '❌',
+    'bug': '🐛',
+    'example': '📎',
+    'quote': '💬'
+}
+DEFAULT_CALLOUT_ICON = '💡'
+
+# Notionが受け付けるコード言語（よく使われるもの）とMarkdownでの別名
+CODE_LANGUAGES = {
+    'bash', 'c', 'c#', 'c++', 'css', 'dart', 'diff', 'docker', 'go', 'graphql', 'haskell',
+    'html', 'java', 'javascript', 'json', 'kotlin', 'latex', 'lua', 'makefile', 'markdown',
+    'mermaid', 'objective-c', 'perl', 'php', 'plain text', 'powershell', 'python', 'r',
+    'ruby', 'rust', 'scala', 'shell', 'sql', 'swift', 'toml', 'typescript', 'xml', 'yaml'
+}
+CODE_LANGUAGE_ALIASES = {
+    'py': 'python', 'js': 'javascript', 'ts': 'typescript', 'sh': 'shell', 'zsh': 'shell',
+    'yml': 'yaml', 'md': 'markdown', 'cpp': 'c++', 'cs': 'c#', 'csharp': 'c#', 'rb': 'ruby',
+    'rs': 'rust', 'kt': 'kotlin', 'dockerfile': 'docker', 'tex': 'latex', 'ps1': 'powershell',
+    'objc': 'objective-c', 'text': 'plain text', 'txt': 'plain text', 'plaintext': 'plain text'
+}
+DEFAULT_CODE_LANGUAGE = 'plain text'
+
+
+class MarkdownBlockConverter:
+    """Markdown → Notionブロック変換クラス
+
+    入力を1行ずつ1回だけ走査し、連続する行を段落・引用・コールアウト・
+    コードブロックにまとめる。リストはインデントに応じて子ブロックとしてネストする。
+    """
+
+    def convert(self, markdown_content: str) -> List[Dict[str, Any]]:
+        """MarkdownをNotionブロックのリストに変換"""
+        return list(self.iter_blocks(markdown_content))
+
+    def iter_chunks(self, markdown_content: str,
+                    chunk_size: int = MAX_CHILDREN_PER_REQUEST) -> Iterator[List[Dict[str, Any]]]:
+        """blocks.children.appendにそのまま渡せるサイズに分けてブロックを返す"""
+        chunk = []
+        for block in self.iter_blocks(markdown_content):
+            chunk.append(block)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def iter_blocks(self, markdown_content: str) -> Iterator[Dict[str, Any]]:
+        """MarkdownをNotionブロックに変換し、トップレベルのブロックを順に返す"""
+        if not markdown_content:
+            return
+
+        paragraph: List[str] = []
+        quote: List[str] = []
+        list_stack: List[tuple] = []  # (インデント幅, ブロック) 現在のリスト項目の祖先
+        list_root: Optional[Dict[str, Any]] = None
+        fence: Optional[str] = None
+        fence_language = ''
+        code_lines: List[str] = []
+
+        def flush_paragraph():
+            if paragraph:
+                blocks = self._text_blocks('paragraph', '\n'.join(paragraph))
+                paragraph.clear()
+                return blocks
+            return []
+
+        def flush_quote():
+            if quote:
+                blocks = self._quote_blocks(quote)
+                quote.clear()
+                return blocks
+            return []
+
+        def flush_list():
+            nonlocal list_root
+            root = list_root
+            list_root = None
+            list_stack.clear()
+            return [root] if root is not None else []
+
+        for line in markdown_content.splitlines():
+            # コードブロック内は終了フェンスまでそのまま取り込む
+            if fence is not None:
+                stripped = line.strip()
+                if stripped.startswith(fence) and not stripped.strip(fence[0]):
+                    yield from self._code_blocks('\n'.join(code_lines), fence_language)
+                    fence = None
+                    code_lines = []
+                else:
+                    code_lines.append(line)
+                continue
+
+            if not line.strip():
+                yield from flush_paragraph()
+                yield from flush_quote()
+                continue
+
+            match = LINE_PATTERN.match(line)
+            kind = match.lastgroup if match else None
+
+            if kind != 'quote':
+                yield from flush_quote()
+
+            if kind is None:
+                if list_stack and line[:1] in ' \t':
+                    # インデントされた行は直前のリスト項目の続き
+                    self._append_text(list_stack[-1][1], line.strip())
+                else:
+                    yield from flush_list()
+                    paragraph.append(line.rstrip())
+                continue
+
+            yield from flush_paragraph()
+
+            if kind == 'list':
+                indent = len(match.group('indent').expandtabs(TAB_WIDTH))
+                block = self._list_block(match)
+                while list_stack and list_stack[-1][0] >= indent:
+                    list_stack.pop()
+                if not list_stack:
+                    yield from flush_list()
+                    list_root = block
+                else:
+                    # Notionの1リクエストのネスト上限を超える項目は最深レベルに並べる
+                    del list_stack[MAX_NESTING_DEPTH:]
+                    parent = list_stack[-1][1]
+                    parent[parent['type']].setdefault('children', []).append(block)
+                list_stack.append((indent, block))
+                continue
+
+            yield from flush_list()
+
+            if kind == 'fence':
+                fence = match.group('fence_marker')
+                fence_language = match.group('language')
+            elif kind == 'heading':
+                level = min(len(match.group('hashes')), 3)
+                text = (match.group('heading_text') or '').rstrip('#').rstrip()
+                yield from self._text_blocks(f'heading_{level}', text)
+            elif kind == 'divider':
+                yield {'object': 'block', 'type': 'divider', 'divider': {}}
+            elif kind == 'quote':
+                quote.append(match.group('quote_text'))
+
+        if fence is not None:
+            # 閉じられていないコードブロックも内容を失わないように出力
+            yield from self._code_blocks('\n'.join(code_lines), fence_language)
+        yield from flush_paragraph()
+        yield from flush_quote()
+        yield from flush_list()
+
+    def _list_block(self, match) -> Dict[str, Any]:
+        """リスト行からリスト項目ブロックを作成"""
+        text = match.group('list_text')
+        check = match.group('check')
+        if check is not None:
+            block = self._text_block('to_do', self._rich_text(text))
+            block['to_do']['checked'] = check.lower() == 'x'
+            return block
+        block_type = 'bulleted_list_item' if match.group('marker') in '-*+' else 'numbered_list_item'
+        return self._text_block(block_type, self._rich_text(text))
+
+    def _append_text(self, block: Dict[str, Any], text: str):
+        """リスト項目に継続行を追加"""
+        body = block[block['type']]
+        rich_text = body['rich_text'] + self._rich_text('\n' + text)
+        body['rich_text'] = rich_text[:MAX_RICH_TEXT_ITEMS]
+
+    def _quote_blocks(self, lines: List[str]) -> List[Dict[str, Any]]:
+        """引用行をquoteまたはcalloutブロックに変換"""
+        callout = CALLOUT_PATTERN.match(lines[0])
+        if not callout:
+            return self._text_blocks('quote', '\n'.join(lines))
+
+        kind = callout.group('kind').lower()
+        title = callout.group('title') or kind.capitalize()
+        text = '\n'.join([title] + lines[1:])
+        blocks = self._text_blocks('callout', text)
+        for block in blocks:
+            block['callout']['icon'] = {'type': 'emoji', 'emoji': CALLOUT_ICONS.get(kind, DEFAULT_CALLOUT_ICON)}
+        return blocks
+
+    def _code_blocks(self, code: str, language: str) -> List[Dict[str, Any]]:
+        """コードブロックを作成（装飾は解析しない）"""
+        language = language.lower()
+        language = CODE_LANGUAGE_ALIASES.get(language, language)
+        if language not in CODE_LANGUAGES:
+            language = DEFAULT_CODE_LANGUAGE
+
+        rich_text = [self._text_item(part) for part in self._split_text(code)] or [self._text_item('')]
+        blocks = []
+        for start in range(0, len(rich_text), MAX_RICH_TEXT_ITEMS):
+            block = self._text_block('code', rich_text[start:start + MAX_RICH_TEXT_ITEMS])
+            block['code']['language'] = language
+            blocks.append(block)
+        return blocks
+
+    def _text_blocks(self, block_type: str, text: str) -> List[Dict[str, Any]]:
+        """テキストブロックを作成（rich_textの要素数上限を超える場合は複数ブロックに分割）"""
+        rich_text = self._rich_text(text)
+        if len(rich_text) <= MAX_RICH_TEXT_ITEMS:
+            return [self._text_block(block_type, rich_text)]
+        return [
+            self._text_block(block_type, rich_text[start:start + MAX_RICH_TEXT_ITEMS])
+            for start in range(0, len(rich_text), MAX_RICH_TEXT_ITEMS)
+        ]
+
+    def _text_block(self, block_type: str, rich_text: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """rich_textを持つブロックを作成"""
+        return {'object': 'block', 'type': block_type, block_type: {'rich_text': rich_text}}
+
+    def _rich_text(self, text: str, annotations: Dict[str, bool] = None,
+                   link: str = None) -> List[Dict[str, Any]]:
+        """インライン装飾を解析してrich_text配列を作成"""
+        if not text:
+            return []
+        if not INLINE_TRIGGER.search(text):
+            return [self._text_item(part, annotations, link) for part in self._split_text(text)]
+
+        items = []
+        position = 0
+        for match in INLINE_PATTERN.finditer(text):
+            if match.start() > position:
+                items.extend(self._text_item(part, annotations, link)
+                             for part in self._split_text(text[position:match.start()]))
+            items.extend(self._inline_items(match, annotations or {}, link))
+            position = match.end()
+        if position < len(text):
+            items.extend(self._text_item(part, annotations, link)
+                         for part in self._split_text(text[position:]))
+        return items
+
+    def _inline_items(self, match, annotations: Dict[str, bool], link: Optional[str]) -> List[Dict[str, Any]]:
+        """インライン装飾1つ分のrich_text要素を作成"""
+        kind = match.lastgroup
+        if kind == 'code':
+            return [self._text_item(part, {**annotations, 'code': True}, link)
+                    for part in self._split_text(match.group('code'))]
+        if kind == 'link_url':
+            return self._rich_text(match.group('link_text'), annotations, match.group('link_url'))
+
+        extra = {
+            'bold': {'bold': True},
+            'bold_u': {'bold': True},
+            'strike': {'strikethrough': True},
+            'highlight': {'color': 'yellow_background'},
+            'italic': {'italic': True},
+            'italic_u': {'italic': True}
+        }[kind]
+        return self._rich_text(match.group(kind), {**annotations, **extra}, link)
+
+    def _text_item(self, content: str, annotations: Dict[str, Any] = None,
+                   link: str = None) -> Dict[str, Any]:
+        """rich_textの1要素を作成"""
+        text = {'content': content}
+        if link:
+            text['link'] = {'url': link}
+        item = {'type': 'text', 'text': text}
+        if annotations:
+            item['annotations'] = dict(annotations)
+        return item
+
+    def _split_text(self, text: str) -> List[str]:
+        """テキストをNotionの文字数上限（UTF-16単位）ごとに分割"""
+        if not text:
+            return []
+        if len(text) <= MAX_RICH_TEXT_LENGTH // 2 or (
+                len(text) <= MAX_RICH_TEXT_LENGTH and text.isascii()):
+            return [text]
+
+        parts = []
+        start = 0
+        units = 0
+        for index, char in enumerate(text):
+            width = 2 if ord(char) > 0xFFFF else 1
+            if units + width > MAX_RICH_TEXT_LENGTH:
+                parts.append(text[start:index])
+                start = index
+                units = 0
+            units += width
+        parts.append(text[start:])
+        return parts
+
+
+# 変換器は状態を持たないため共有インスタンスを使う
+markdown_block_converter = MarkdownBlockConverter()
+
+
+def markdown_to_blocks(markdown_content: str) -> List[Dict[str, Any]]:
+    """MarkdownをNotionブロックのリストに変換"""
+    try:
+        return markdown_block_converter.convert(markdown_content)
+    except Exception as e:
+        logger.error(f"Markdown to blocks conversion failed: {e}")
+        return []
@@ -6,6 +6,7 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from notion_integration.notion_client import NotionClient
+from notion_integration.block_converter import markdown_block_converter, markdown_to_blocks
 from config import settings
 
 logger = logging.getLogger(__name__)
@@ -198,12 +199,12 @@ class NotionDashboardBuilder:
             result = self.notion_client.client.pages.create(**page_data)
             page_id = result['id']
             
-            # コンテンツの追加
-            blocks = self._convert_markdown_to_blocks(content)
-            self.notion_client.client.blocks.children.append(
-                block_id=page_id,
-                children=blocks
-            )
+            # コンテンツの追加（1リクエストあたりの子ブロック数の上限ごとに分割）
+            for blocks in markdown_block_converter.iter_chunks(content):
+                self.notion_client.client.blocks.children.append(
+                    block_id=page_id,
+                    children=blocks
+                )
             
             logger.info(f"Created template page: {title}")
             return page_id
@@ -214,46 +215,7 @@ class NotionDashboardBuilder:
     
     def _convert_markdown_to_blocks(self, markdown_content: str) -> List[Dict[str, Any]]:
         """MarkdownをNotionブロックに変換"""
-        try:
-            blocks = []
-            lines = markdown_content.split('\n')
-            
-            for line in lines:
-                if not line.strip():
-                    continue
-                
-                if line.startswith('# '):
-                    blocks.append({
-                        'type': 'heading_1',
-                        'heading_1': {'rich_text': [{'text': {'content': line[2:]}}]}
-                    })
-                elif line.startswith('## '):
-                    blocks.append({
-                        'type': 'heading_2',
-                        'heading_2': {'rich_text': [{'text': {'content': line[3:]}}]}
-                    })
-                elif line.startswith('### '):
-                    blocks.append({
-                        'type': 'heading_3',
-                        'heading_3': {'rich_text': [{'text': {'content': line[4:]}}]}
-                    })
-                elif line.startswith('- '):
-                    blocks.append({
-                        'type': 'bulleted_list_item',
-                        'bulleted_list_item': {'rich_text': [{'text': {'content': line[2:]}}]}
-                    })
-                else:
-                    # 通常の段落
-                    blocks.append({
-                        'type': 'paragraph',
-                        'paragraph': {'rich_text': [{'text': {'content': line}}]}
-                    })
-            
-            return blocks
-            
-        except Exception as e:
-            logger.error(f"Markdown to blocks conversion failed: {e}")
-            return []
+        return markdown_to_blocks(markdown_content)
     
     async def create_insight_page(self, insight_data: Dict[str, Any]) -> Optional[str]:
         """インサイトページの作成"""
@@ -1,56 +1,15 @@
 from typing import Dict, Any, List
 
+from .block_converter import markdown_to_blocks
+from .markdown_renderer import notion_markdown_renderer
+
 class NotionDataTransformer:
     def __init__(self):
         pass
 
     def notion_blocks_to_markdown(self, blocks: List[Dict[str, Any]]) -> str:
         """Converts a list of Notion blocks to a Markdown string."""
-        markdown_output = []
-        for block in blocks:
-            block_type = block.get("type")
-            if block_type == "paragraph":
-                text = self._get_rich_text_content(block["paragraph"]["rich_text"])
-                if text:
-                    markdown_output.append(text + "\n")
-            elif block_type == "heading_1":
-                text = self._get_rich_text_content(block["heading_1"]["rich_text"])
-                if text:
-                    markdown_output.append(f"# {text}\n")
-            elif block_type == "heading_2":
-                text = self._get_rich_text_content(block["heading_2"]["rich_text"])
-                if text:
-                    markdown_output.append(f"## {text}\n")
-            elif block_type == "heading_3":
-                text = self._get_rich_text_content(block["heading_3"]["rich_text"])
-                if text:
-                    markdown_output.append(f"### {text}\n")
-            elif block_type == "bulleted_list_item":
-                text = self._get_rich_text_content(block["bulleted_list_item"]["rich_text"])
-                if text:
-                    markdown_output.append(f"- {text}\n")
-            elif block_type == "numbered_list_item":
-                text = self._get_rich_text_content(block["numbered_list_item"]["rich_text"])
-                if text:
-                    # This needs proper numbering logic if multiple items
-                    markdown_output.append(f"1. {text}\n")
-            elif block_type == "to_do":
-                text = self._get_rich_text_content(block["to_do"]["rich_text"])
-                checked = "[x]" if block["to_do"]["checked"] else "[ ]"
-                if text:
-                    markdown_output.append(f"- {checked} {text}\n")
-            elif block_type == "code":
-                text = self._get_rich_text_content(block["code"]["rich_text"])
-                language = block["code"].get("language", "plaintext")
-                if text:
-                    markdown_output.append(f"``` {language}\n{text}\n```\n")
-            elif block_type == "quote":
-                text = self._get_rich_text_content(block["quote"]["rich_text"])
-                if text:
-                    markdown_output.append(f"> {text}\n")
-            # Add more block types as needed
-            markdown_output.append("\n") # Add a newline for separation
-        return "".join(markdown_output)
+        return notion_markdown_renderer.render(blocks)
 
     def _get_rich_text_content(self, rich_text_array: List[Dict[str, Any]]) -> str:
         """Extracts plain text from a Notion rich text array."""
@@ -58,20 +17,7 @@ class NotionDataTransformer:
 
     def markdown_to_notion_blocks(self, markdown_text: str) -> List[Dict[str, Any]]:
         """Converts a Markdown string to a list of Notion block objects."""
-        # This is a complex conversion and might require a more sophisticated parser
-        # For simplicity, this example will just convert paragraphs
-        blocks = []
-        lines = markdown_text.split('\n')
-        for line in lines:
-            if line.strip():
-                blocks.append({
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [{"type": "text", "text": {"content": line}}]
-                    }
-                })
-        return blocks
+        return markdown_to_blocks(markdown_text)
 
     def notion_properties_to_yaml_frontmatter(self, properties: Dict[str, Any]) -> str:
         """Converts Notion page properties to YAML front matter string."""
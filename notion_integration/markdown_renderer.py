@@ -0,0 +1,268 @@
+"""
+Notionブロック → Markdownレンダラー
+ブロックを1つずつMarkdown断片に変換し、ページ全体の文字列を組み立てずにストリーミングする
+"""
+import hashlib
+import json
+import logging
+from typing import Dict, Any, List, Iterable, Iterator, AsyncIterator, Callable, Optional
+
+from .block_converter import CALLOUT_ICONS, DEFAULT_CODE_LANGUAGE
+from .pagination import aclosing
+from .render_cache import BlockRenderCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+# 描画結果が変わる変更を加えたら上げる（描画キャッシュのキーに含まれる）
+RENDERER_VERSION = 1
+
+LIST_BLOCK_TYPES = {'bulleted_list_item', 'numbered_list_item', 'to_do'}
+
+# 子ブロックを取得しないブロック（子ページ・子データベースは別ページとして扱う）
+SKIPPED_CHILDREN_TYPES = {'child_page', 'child_database'}
+
+# 絵文字アイコン → Obsidianのコールアウト種別（最初に定義された種別を優先）
+CALLOUT_KINDS = {emoji: kind for kind, emoji in reversed(list(CALLOUT_ICONS.items()))}
+
+
+class NotionMarkdownRenderer:
+    """Notionブロック → Markdownレンダラークラス
+
+    連続するリスト項目は改行1つ、それ以外のブロックは空行で区切る。
+    保持するのは直前のブロックの種類と番号付きリストの番号だけなので、
+    ブロックの反復子をそのまま渡せばページの大きさによらず一定のメモリで動作する。
+    cacheを渡した場合、IDと最終編集日時を持つブロックは前回の描画結果を再利用する。
+    """
+
+    def __init__(self, cache: BlockRenderCache = None):
+        self.cache = cache
+
+    def render(self, blocks: Iterable[Dict[str, Any]]) -> str:
+        """ブロック列をMarkdown文字列に変換"""
+        return ''.join(self.iter_markdown(blocks))
+
+    def iter_markdown(self, blocks: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        """ブロック列を順にMarkdown断片に変換"""
+        state = {'previous': None, 'number': 0}
+        for block in blocks:
+            fragment = self._render_in_sequence(block, state)
+            if fragment:
+                yield fragment
+        if state['previous']:
+            yield '\n'
+
+    async def aiter_markdown(self, blocks: AsyncIterator[Dict[str, Any]],
+                             fetch_children: Callable[[str], AsyncIterator[Dict[str, Any]]] = None
+                             ) -> AsyncIterator[str]:
+        """非同期のブロック列を順にMarkdown断片に変換
+
+        fetch_childrenを渡した場合、has_childrenのブロックは子ブロックを取得してから描画する。
+        """
+        state = {'previous': None, 'number': 0}
+        async with aclosing(blocks):
+            async for block in blocks:
+                if fetch_children:
+                    await self._load_children(block, fetch_children)
+                fragment = self._render_in_sequence(block, state)
+                if fragment:
+                    yield fragment
+        if state['previous']:
+            yield '\n'
+
+    async def _load_children(self, block: Dict[str, Any], fetch_children: Callable):
+        """has_childrenのブロックに子ブロックを読み込む（再帰）"""
+        block_type = block.get('type')
+        if not block.get('has_children') or block_type in SKIPPED_CHILDREN_TYPES:
+            return
+        body = block.setdefault(block_type, {})
+        if body.get('children'):
+            return
+        children = []
+        async with aclosing(fetch_children(block['id'])) as child_blocks:
+            async for child in child_blocks:
+                await self._load_children(child, fetch_children)
+                children.append(child)
+        body['children'] = children
+
+    def _render_in_sequence(self, block: Dict[str, Any], state: Dict[str, Any]) -> str:
+        """前のブロックとの区切りを付けてブロックを描画"""
+        block_type = block.get('type')
+        if block_type == 'numbered_list_item':
+            state['number'] = state['number'] + 1 if state['previous'] == block_type else 1
+
+        try:
+            markdown = self.render_block(block, state['number'])
+        except Exception as e:
+            logger.error(f"Block to markdown rendering failed ({block_type}): {e}")
+            markdown = None
+        if markdown is None:
+            return ''
+
+        previous = state['previous']
+        state['previous'] = block_type
+        if previous is None:
+            return markdown
+        if previous in LIST_BLOCK_TYPES and block_type in LIST_BLOCK_TYPES:
+            return '\n' + markdown
+        return '\n\n' + markdown
+
+    def render_block(self, block: Dict[str, Any], number: int = 1) -> Optional[str]:
+        """ブロック1つをMarkdownに変換（対応しないブロックはNone）"""
+        if self.cache is None:
+            return self._render_block(block, number)
+
+        fingerprint = self._fingerprint(block, number)
+        if fingerprint is None:
+            self.cache.stats['uncacheable'] += 1
+            return self._render_block(block, number)
+
+        fragment = self.cache.get(block['id'], fingerprint)
+        if fragment is MISSING:
+            fragment = self._render_block(block, number)
+            self.cache.put(block['id'], fingerprint, fragment)
+        return fragment
+
+    def _fingerprint(self, block: Dict[str, Any], number: int = 1) -> Optional[tuple]:
+        """描画結果を決める要素（最終編集日時・本文ダイジェスト・レンダラーバージョン・番号・子ブロック）"""
+        edited = block.get('last_edited_time')
+        if not edited or not block.get('id'):
+            return None
+        block_type = block.get('type')
+        body = block.get(block_type) or {}
+        children = []
+        for child in body.get('children') or []:
+            # 子ブロックの編集は親の最終編集日時に反映されないため、子の状態もキーに含める
+            child_fingerprint = self._fingerprint(child)
+            if child_fingerprint is None:
+                return None
+            children.append((child['id'], child_fingerprint))
+        # last_edited_timeは分単位に丸められるため、同じ分の中の編集は本文のダイジェストで見分ける
+        payload = json.dumps({k: v for k, v in body.items() if k != 'children'}, sort_keys=True, ensure_ascii=False, default=str)
+        return (
+            edited,
+            hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest(),
+            RENDERER_VERSION,
+            number if block_type == 'numbered_list_item' else None,
+            tuple(children)
+        )
+
+    def _render_block(self, block: Dict[str, Any], number: int = 1) -> Optional[str]:
+        """ブロック1つを描画"""
+        block_type = block.get('type')
+        body = block.get(block_type) or {}
+        text = self.render_rich_text(body.get('rich_text', []))
+
+        if block_type == 'paragraph':
+            markdown = text
+        elif block_type in ('heading_1', 'heading_2', 'heading_3'):
+            markdown = '#' * int(block_type[-1]) + ' ' + text
+        elif block_type in LIST_BLOCK_TYPES:
+            if block_type == 'bulleted_list_item':
+                marker = '- '
+            elif block_type == 'numbered_list_item':
+                marker = f"{number}. "
+            else:
+                marker = '- [x] ' if body.get('checked') else '- [ ] '
+            return self._with_children(marker, text, body)
+        elif block_type == 'quote':
+            markdown = self._prefix_lines(text, '> ')
+        elif block_type == 'callout':
+            icon = (body.get('icon') or {}).get('emoji')
+            kind = CALLOUT_KINDS.get(icon, 'note')
+            markdown = self._prefix_lines(f"[!{kind}] {text}", '> ')
+        elif block_type == 'code':
+            code = ''.join(item.get('plain_text', (item.get('text') or {}).get('content', ''))
+                           for item in body.get('rich_text', []))
+            language = body.get('language', '')
+            if language == DEFAULT_CODE_LANGUAGE:
+                language = ''
+            fence = '```'
+            while fence in code:
+                fence += '`'
+            markdown = f"{fence}{language}\n{code}\n{fence}"
+        elif block_type == 'toggle':
+            children = self._render_children(body)
+            inner = f"{children}\n\n" if children else ''
+            return f"<details>\n<summary>{text}</summary>\n\n{inner}</details>"
+        elif block_type == 'divider':
+            return '---'
+        elif block_type == 'equation':
+            return f"$$\n{body.get('expression', '')}\n$$"
+        elif block_type in ('image', 'file', 'pdf', 'video'):
+            source = body.get(body.get('type', 'external')) or {}
+            caption = self.render_rich_text(body.get('caption', []))
+            prefix = '!' if block_type == 'image' else ''
+            return f"{prefix}[{caption}]({source.get('url', '')})"
+        elif block_type in ('bookmark', 'embed', 'link_preview'):
+            return f"<{body.get('url', '')}>"
+        elif block_type == 'child_page':
+            return f"[[{body.get('title', '')}]]"
+        else:
+            return None
+
+        children = self._render_children(body)
+        return f"{markdown}\n\n{children}" if children else markdown
+
+    def _with_children(self, marker: str, text: str, body: Dict[str, Any]) -> str:
+        """リスト項目を描画し、継続行と子ブロックをマーカー幅でインデント"""
+        indent = ' ' * len(marker) if not marker.startswith('- [') else '  '
+        markdown = marker + text.replace('\n', '\n' + indent)
+        children = self._render_children(body)
+        if children:
+            markdown += '\n' + self._prefix_lines(children, indent)
+        return markdown
+
+    def _render_children(self, body: Dict[str, Any]) -> str:
+        """子ブロックをMarkdownに変換"""
+        children = body.get('children')
+        if not children:
+            return ''
+        return self.render(children).rstrip('\n')
+
+    def _prefix_lines(self, text: str, prefix: str) -> str:
+        """各行に接頭辞を付ける（空行は接頭辞の末尾の空白を除く）"""
+        return '\n'.join(prefix + line if line else prefix.rstrip() for line in text.split('\n'))
+
+    def render_rich_text(self, rich_text: List[Dict[str, Any]]) -> str:
+        """rich_text配列をインライン装飾付きのMarkdownに変換"""
+        parts = []
+        for item in rich_text:
+            text = item.get('plain_text')
+            if text is None:
+                text = (item.get('text') or {}).get('content', '')
+            if not text:
+                continue
+
+            annotations = item.get('annotations') or {}
+            link = item.get('href') or ((item.get('text') or {}).get('link') or {}).get('url')
+            if not link and not any(annotations.get(key) for key in ('bold', 'italic', 'strikethrough', 'code')) \
+                    and annotations.get('color', 'default') != 'yellow_background':
+                parts.append(text)
+                continue
+
+            # 前後の空白は装飾記号の外に出す（"** a **"はMarkdownで太字にならないため）
+            core = text.strip()
+            if not core:
+                parts.append(text)
+                continue
+            leading = text[:len(text) - len(text.lstrip())]
+            trailing = text[len(text.rstrip()):]
+
+            if annotations.get('code'):
+                core = f"`{core}`"
+            if annotations.get('bold'):
+                core = f"**{core}**"
+            if annotations.get('italic'):
+                core = f"*{core}*"
+            if annotations.get('strikethrough'):
+                core = f"~~{core}~~"
+            if annotations.get('color') == 'yellow_background':
+                core = f"=={core}=="
+            if link:
+                core = f"[{core}]({link})"
+            parts.append(leading + core + trailing)
+        return ''.join(parts)
+
+
+# レンダラーは状態を持たないため共有インスタンスを使う
+notion_markdown_renderer = NotionMarkdownRenderer()
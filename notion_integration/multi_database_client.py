@@ -3,17 +3,30 @@
 """
 
 from notion_client import Client
-from notion_client.helpers import collect_paginated_api
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
+from datetime import datetime
 from config import settings
+from .pagination import aclosing, iterate_paginated_api
+from .rate_limiter import notion_rate_limiter
+from .write_behind import WriteBehindQueue
+import asyncio
+import json
 import logging
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
+# ページ数キャッシュを全件数え直す間隔（秒）。削除・アーカイブはこの周期で反映される
+PAGE_COUNT_FULL_REFRESH_SECONDS = 3600
+
+PAGE_COUNT_CACHE_VERSION = 1
+
 class MultiDatabaseNotionClient:
     """複数データベースに対応したNotionクライアント"""
     
-    def __init__(self, auth_token: str = None):
+    def __init__(self, auth_token: str = None, write_behind: bool = True, journal_path: str = None,
+                 page_count_path: str = None):
         self.client = Client(auth=auth_token or settings.NOTION_API_KEY)
         
         # データベース設定のマッピング
@@ -40,9 +53,28 @@ class MultiDatabaseNotionClient:
             }
         }
         
+        # ページ数キャッシュ（バックグラウンドで増分更新し、次回の起動でも使えるよう保存する）
+        self.page_count_path = page_count_path or os.path.join(settings.SYNC_STATE_DIR, 'page_counts.json')
+        self._page_count_cache: Dict[str, Dict[str, Any]] = self._load_page_counts()
+        self._page_count_tasks: Dict[str, asyncio.Task] = {}
+        
+        # 分析結果・推奨事項・同期ログの書き込みはライトビハインドで非同期に反映
+        self.write_queue = None
+        if write_behind:
+            self.write_queue = WriteBehindQueue(
+                journal_path or os.path.join(settings.SYNC_STATE_DIR, 'notion_write_journal.jsonl'),
+                self._write_record,
+                rate_limiter=notion_rate_limiter
+            )
+        
         logger.info("MultiDatabaseNotionClient initialized")
         self._log_database_status()
     
+    async def _request(self, function, **kwargs):
+        """共有のレートリミッターで枠を取得してから、同期クライアントの呼び出しをスレッドで実行"""
+        await notion_rate_limiter.acquire()
+        return await asyncio.to_thread(function, **kwargs)
+    
     def _log_database_status(self):
         """データベース設定の状況をログ出力"""
         for db_type, config in self.database_configs.items():
@@ -59,19 +91,34 @@ class MultiDatabaseNotionClient:
     async def get_database_pages(self, database_type: str = 'main') -> List[Dict[str, Any]]:
         """指定されたデータベースタイプのページを取得"""
         config = self.get_database_config(database_type)
+        if not config['database_id']:
+            logger.error(f"Database ID not set for {database_type}")
+            return []
+        
+        pages = [page async for page in self.iter_database_pages(database_type)]
+        logger.info(f"Fetched {len(pages)} pages from {config['name']}")
+        return pages
+    
+    async def iter_database_pages(self, database_type: str = 'main', page_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """指定されたデータベースタイプのページをストリーミング取得（次カーソルを先読み）
+
+        途中で打ち切られた結果を全件と取り違えないよう、取得エラーはログ出力後に再送出する。
+        """
+        config = self.get_database_config(database_type)
         db_id = config['database_id']
         
         if not db_id:
             logger.error(f"Database ID not set for {database_type}")
-            return []
+            return
         
         try:
-            pages = collect_paginated_api(self.client.databases.query, database_id=db_id)
-            logger.info(f"Fetched {len(pages)} pages from {config['name']}")
-            return pages
+            async with aclosing(iterate_paginated_api(self.client.databases.query, page_size=page_size,
+                                                      rate_limiter=notion_rate_limiter, database_id=db_id)) as pages:
+                async for page in pages:
+                    yield page
         except Exception as e:
             logger.error(f"Error fetching pages from {config['name']}: {e}")
-            return []
+            raise
     
     async def create_page(self, database_type: str, properties: Dict[str, Any], children: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         """指定されたデータベースタイプにページを作成"""
@@ -83,7 +130,8 @@ class MultiDatabaseNotionClient:
         
         try:
             parent = {"type": "data_source_id", "data_source_id": config['data_source_id']}
-            new_page = self.client.pages.create(
+            new_page = await self._request(
+                self.client.pages.create,
                 parent=parent,
                 properties=properties,
                 children=children
@@ -94,6 +142,64 @@ class MultiDatabaseNotionClient:
             logger.error(f"Error creating page in {config['name']}: {e}")
             return {}
     
+    async def _write_record(self, record: Dict[str, Any]) -> str:
+        """ライトビハインドキューのレコードをNotionに書き込み、ページIDを返す（失敗時は例外）"""
+        if record.get('page_id'):
+            await asyncio.to_thread(
+                self.client.pages.update,
+                page_id=record['page_id'],
+                properties=record['properties']
+            )
+            return record['page_id']
+        
+        config = self.get_database_config(record['database_type'])
+        if not config['data_source_id']:
+            raise ValueError(f"Data source ID not set for {record['database_type']}")
+        
+        new_page = await asyncio.to_thread(
+            self.client.pages.create,
+            parent={"type": "data_source_id", "data_source_id": config['data_source_id']},
+            properties=record['properties'],
+            children=record.get('children') or []
+        )
+        return new_page['id']
+    
+    async def _create_log_page(self, database_type: str, properties: Dict[str, Any],
+                               children: List[Dict[str, Any]], record_key: str = None) -> Dict[str, Any]:
+        """記録用ページを作成（ライトビハインド有効時はキューに積んで即座に返す）"""
+        if self.write_queue is None:
+            return await self.create_page(database_type, properties, children)
+        
+        try:
+            key = self.write_queue.enqueue(database_type, properties, children, key=record_key)
+            return {'queued': True, 'record_key': key, 'backlog_depth': self.write_queue.backlog_depth}
+        except Exception as e:
+            logger.error(f"Failed to queue write for {database_type}, writing inline: {e}")
+            return await self.create_page(database_type, properties, children)
+    
+    async def flush_pending_writes(self) -> int:
+        """キューに溜まった書き込みを即座に反映"""
+        if self.write_queue is None:
+            return 0
+        return await self.write_queue.flush()
+    
+    def get_write_backlog(self) -> Dict[str, Any]:
+        """ライトビハインドキューの状況を取得"""
+        if self.write_queue is None:
+            return {'enabled': False, 'backlog_depth': 0}
+        return {'enabled': True, **self.write_queue.get_stats()}
+    
+    async def close(self):
+        """残りの書き込みを反映し、実行中のページ数の更新を止めて終了"""
+        tasks = [task for task in self._page_count_tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._page_count_tasks.clear()
+        if self.write_queue is not None:
+            await self.write_queue.stop()
+    
     async def create_main_dashboard_page(self, title: str, content: str, tags: List[str] = None) -> Dict[str, Any]:
         """メインダッシュボードにページを作成"""
         properties = {
@@ -119,7 +225,7 @@ class MultiDatabaseNotionClient:
         
         return await self.create_page('main', properties, children)
     
-    async def create_analysis_result(self, analysis_type: str, source_content_id: str, score: float, summary: str) -> Dict[str, Any]:
+    async def create_analysis_result(self, analysis_type: str, source_content_id: str, score: float, summary: str, record_key: str = None) -> Dict[str, Any]:
         """分析結果ページを作成"""
         properties = {
             "Title": {"title": [{"type": "text", "text": {"content": f"{analysis_type} Analysis"}}]},
@@ -139,9 +245,9 @@ class MultiDatabaseNotionClient:
             }
         ]
         
-        return await self.create_page('analysis', properties, children)
+        return await self._create_log_page('analysis', properties, children, record_key)
     
-    async def create_recommendation(self, rec_type: str, priority: str, description: str, target_content_id: str = None) -> Dict[str, Any]:
+    async def create_recommendation(self, rec_type: str, priority: str, description: str, target_content_id: str = None, record_key: str = None) -> Dict[str, Any]:
         """推奨事項ページを作成"""
         properties = {
             "Title": {"title": [{"type": "text", "text": {"content": f"{rec_type} Recommendation"}}]},
@@ -161,9 +267,9 @@ class MultiDatabaseNotionClient:
             }
         ]
         
-        return await self.create_page('recommendations', properties, children)
+        return await self._create_log_page('recommendations', properties, children, record_key)
     
-    async def create_sync_log(self, sync_type: str, status: str, items_processed: int, errors: int = 0, details: str = "") -> Dict[str, Any]:
+    async def create_sync_log(self, sync_type: str, status: str, items_processed: int, errors: int = 0, details: str = "", record_key: str = None) -> Dict[str, Any]:
         """同期ログページを作成"""
         properties = {
             "Title": {"title": [{"type": "text", "text": {"content": f"{sync_type} Sync Log"}}]},
@@ -183,30 +289,156 @@ class MultiDatabaseNotionClient:
                 }
             })
         
-        return await self.create_page('sync_log', properties, children)
+        return await self._create_log_page('sync_log', properties, children, record_key)
     
     async def get_all_database_status(self) -> Dict[str, Any]:
-        """すべてのデータベースの状況を取得"""
-        status = {}
+        """すべてのデータベースの状況を取得（並列のpage_size=1プローブ＋キャッシュ済みページ数）"""
+        db_types = list(self.database_configs.keys())
+        results = await asyncio.gather(*(self._get_database_status(db_type) for db_type in db_types))
+        return dict(zip(db_types, results))
+    
+    async def _get_database_status(self, db_type: str) -> Dict[str, Any]:
+        """1データベースの状況を1リクエストで取得"""
+        config = self.database_configs[db_type]
+        status = {
+            'name': config['name'],
+            'database_id_set': bool(config['database_id']),
+            'data_source_id_set': bool(config['data_source_id']),
+            'page_count': 0,
+            'page_count_source': 'none',
+            'status': 'active' if config['database_id'] and config['data_source_id'] else 'inactive'
+        }
+        if not config['database_id']:
+            return status
         
-        for db_type, config in self.database_configs.items():
-            try:
-                pages = await self.get_database_pages(db_type)
-                status[db_type] = {
-                    'name': config['name'],
-                    'database_id_set': bool(config['database_id']),
-                    'data_source_id_set': bool(config['data_source_id']),
-                    'page_count': len(pages),
-                    'status': 'active' if config['database_id'] and config['data_source_id'] else 'inactive'
-                }
-            except Exception as e:
-                status[db_type] = {
-                    'name': config['name'],
-                    'database_id_set': bool(config['database_id']),
-                    'data_source_id_set': bool(config['data_source_id']),
-                    'page_count': 0,
-                    'status': 'error',
-                    'error': str(e)
-                }
+        try:
+            probe = await self._request(
+                self.client.databases.query,
+                database_id=config['database_id'],
+                page_size=1
+            )
+            if not probe.get('has_more'):
+                # 1件以下なら正確な件数が分かる
+                pages = probe.get('results', [])
+                since = pages[0].get('created_time', '') if pages else ''
+                self._store_page_count(db_type, len(pages), since, [p['id'] for p in pages], full=True)
+                count = len(pages)
+                status['page_count'] = count
+                status['page_count_source'] = 'probe'
+            else:
+                cached = self._cached_page_count(db_type)
+                if cached:
+                    # キャッシュ済みの件数を返し、更新はバックグラウンドで行う
+                    status['page_count'] = cached['count']
+                    status['page_count_source'] = 'cache'
+                    self._schedule_page_count_refresh(db_type)
+                else:
+                    # キャッシュがない場合は数え終わるまで待つ（1回だけ呼ぶ呼び出し側でも件数が分かるようにする）
+                    await self._refresh_page_count(db_type)
+                    cached = self._cached_page_count(db_type)
+                    status['page_count'] = cached['count'] if cached else None
+                    status['page_count_source'] = 'count' if cached else 'error'
+                if cached:
+                    status['page_count_updated_at'] = cached['updated_at']
+        except Exception as e:
+            status['status'] = 'error'
+            status['error'] = str(e)
         
         return status
+    
+    def _store_page_count(self, db_type: str, count: int, since: str, boundary_ids: List[str], full: bool):
+        """ページ数キャッシュを更新（増分取得の境界となる作成日時とそのページIDも保持）"""
+        previous = self._cached_page_count(db_type)
+        self._page_count_cache[db_type] = {
+            'database_id': self.database_configs[db_type]['database_id'],
+            'count': count,
+            'since': since,
+            'boundary_ids': list(boundary_ids),
+            'updated_at': datetime.now().isoformat(),
+            'full_counted_at': time.time() if full or not previous else previous['full_counted_at']
+        }
+        self._save_page_counts()
+    
+    def _cached_page_count(self, db_type: str) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みのページ数（設定のデータベースIDが変わった場合は使わない）"""
+        cached = self._page_count_cache.get(db_type)
+        if cached and cached.get('database_id') == self.database_configs[db_type]['database_id']:
+            return cached
+        return None
+    
+    def _load_page_counts(self) -> Dict[str, Dict[str, Any]]:
+        """保存したページ数キャッシュを読み込む"""
+        try:
+            if not os.path.exists(self.page_count_path):
+                return {}
+            with open(self.page_count_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != PAGE_COUNT_CACHE_VERSION:
+                return {}
+            return dict(data.get('databases', {}))
+        except Exception as e:
+            logger.warning(f"Failed to load page counts from {self.page_count_path}: {e}")
+            return {}
+    
+    def _save_page_counts(self):
+        """ページ数キャッシュをアトミックに保存"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.page_count_path)), exist_ok=True)
+            temp_path = self.page_count_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': PAGE_COUNT_CACHE_VERSION, 'databases': self._page_count_cache},
+                          f, ensure_ascii=False)
+            os.replace(temp_path, self.page_count_path)
+        except Exception as e:
+            logger.warning(f"Failed to save page counts to {self.page_count_path}: {e}")
+    
+    def _schedule_page_count_refresh(self, db_type: str):
+        """ページ数の更新をバックグラウンドで開始（実行中なら何もしない）"""
+        task = self._page_count_tasks.get(db_type)
+        if task and not task.done():
+            return
+        self._page_count_tasks[db_type] = asyncio.get_running_loop().create_task(self._refresh_page_count(db_type))
+    
+    async def refresh_page_counts(self) -> Dict[str, Optional[int]]:
+        """すべてのデータベースのページ数キャッシュを更新して返す"""
+        db_types = [t for t, c in self.database_configs.items() if c['database_id']]
+        await asyncio.gather(*(self._refresh_page_count(db_type) for db_type in db_types))
+        return {db_type: (self._cached_page_count(db_type) or {}).get('count') for db_type in db_types}
+    
+    async def _refresh_page_count(self, db_type: str):
+        """ページ数キャッシュを更新（通常は前回以降に作成されたページのみ取得）"""
+        config = self.database_configs[db_type]
+        cached = self._cached_page_count(db_type)
+        
+        try:
+            incremental = (
+                cached is not None and cached['since']
+                and time.time() - cached['full_counted_at'] < PAGE_COUNT_FULL_REFRESH_SECONDS
+            )
+            query_kwargs = {'database_id': config['database_id']}
+            if incremental:
+                query_kwargs['filter'] = {
+                    'timestamp': 'created_time',
+                    'created_time': {'on_or_after': cached['since']}
+                }
+            
+            since = cached['since'] if incremental else ''
+            boundary = set(cached['boundary_ids']) if incremental else set()
+            seen = set(boundary)
+            count = cached['count'] if incremental else 0
+            async for page in iterate_paginated_api(self.client.databases.query,
+                                                    rate_limiter=notion_rate_limiter, **query_kwargs):
+                if page['id'] in seen:
+                    continue
+                count += 1
+                created_time = page.get('created_time', '')
+                if created_time > since:
+                    since = created_time
+                    boundary = {page['id']}
+                elif created_time == since:
+                    boundary.add(page['id'])
+            
+            self._store_page_count(db_type, count, since, boundary, full=not incremental)
+            logger.info(f"Page count refreshed for {config['name']}: {count} ({'incremental' if incremental else 'full'})")
+        except Exception as e:
+            logger.error(f"Page count refresh failed for {config['name']}: {e}")
@@ -1,7 +1,7 @@
 from notion_client import Client
-from notion_client.helpers import collect_paginated_api
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator
 from config import settings
+from .pagination import aclosing, iterate_paginated_api
 import logging
 
 logger = logging.getLogger(__name__)
@@ -54,25 +54,73 @@ class NotionClient:
         if not db_id:
             logger.error("Notion database ID is not set.")
             return []
+        pages = [page async for page in self.iter_database_pages(db_id)]
+        logger.info(f"Fetched {len(pages)} pages from database {db_id}.")
+        return pages
+
+    async def iter_database_pages(self, database_id: str = None, page_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """Streams pages from a Notion database, prefetching the next cursor while the caller consumes the current batch.
+
+        Errors are re-raised so that a stream cut short (e.g. by a 429 or a network error) is never mistaken for the full database.
+        """
+        db_id = database_id or settings.NOTION_DATABASE_ID
+        if not db_id:
+            logger.error("Notion database ID is not set.")
+            return
         try:
-            # Using collect_paginated_api to handle pagination
-            pages = collect_paginated_api(self.client.databases.query, database_id=db_id)
-            logger.info(f"Fetched {len(pages)} pages from database {db_id}.")
-            return pages
+            async with aclosing(iterate_paginated_api(self.client.databases.query, page_size=page_size, database_id=db_id)) as pages:
+                async for page in pages:
+                    yield page
         except Exception as e:
             logger.error(f"Error fetching database pages from {db_id}: {e}")
+            raise
+
+    async def query_database(self, filter: Dict[str, Any] = None, database_id: str = None, page_size: int = 100) -> List[Dict[str, Any]]:
+        """Runs a single filtered query against a Notion database and returns the first page of results."""
+        db_id = database_id or settings.NOTION_DATABASE_ID
+        if not db_id:
+            logger.error("Notion database ID is not set.")
             return []
+        try:
+            params = {'database_id': db_id, 'page_size': page_size}
+            if filter:
+                params['filter'] = filter
+            response = self.client.databases.query(**params)
+            return response.get('results', [])
+        except Exception as e:
+            logger.error(f"Error querying database {db_id}: {e}")
+            return []
+
+    async def get_page(self, page_id: str) -> Dict[str, Any]:
+        """Retrieves a Notion page object (properties and metadata)."""
+        try:
+            return self.client.pages.retrieve(page_id=page_id)
+        except Exception as e:
+            logger.error(f"Error retrieving page {page_id}: {e}")
+            return {}
 
     async def get_page_content(self, page_id: str) -> List[Dict[str, Any]]:
         """Fetches all blocks (content) for a given Notion page."""
         try:
-            blocks = collect_paginated_api(self.client.blocks.children.list, block_id=page_id)
+            blocks = [block async for block in self.iter_page_blocks(page_id)]
             logger.info(f"Fetched {len(blocks)} blocks for page {page_id}.")
             return blocks
-        except Exception as e:
-            logger.error(f"Error fetching page content for {page_id}: {e}")
+        except Exception:
             return []
 
+    async def iter_page_blocks(self, block_id: str, page_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """Streams the child blocks of a page or block, prefetching the next cursor while the caller consumes the current batch.
+
+        Errors are re-raised so that a stream cut short (e.g. by a 429 or a network error) is never mistaken for the full page.
+        """
+        try:
+            async with aclosing(iterate_paginated_api(self.client.blocks.children.list, page_size=page_size, block_id=block_id)) as blocks:
+                async for block in blocks:
+                    yield block
+        except Exception as e:
+            logger.error(f"Error fetching page content for {block_id}: {e}")
+            raise
+
     async def update_page_properties(self, page_id: str, properties: Dict[str, Any]) -> Dict[str, Any]:
         """Updates properties of a Notion page."""
         try:
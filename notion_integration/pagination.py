@@ -0,0 +1,72 @@
+"""
+Notion API ページネーションヘルパー
+ページ単位で結果をストリーミングし、次カーソルを先読みする
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Notion APIの1リクエストあたりの最大件数
+MAX_PAGE_SIZE = 100
+
+
+@asynccontextmanager
+async def aclosing(iterator: AsyncIterator):
+    """抜けるときに非同期ジェネレーターを閉じる（Python 3.10以降のcontextlib.aclosingと同じ）
+
+    async forをbreakや例外で抜けた場合も、先読み中のリクエストをGCを待たずにその場で取り消す。
+    """
+    try:
+        yield iterator
+    finally:
+        aclose = getattr(iterator, 'aclose', None)
+        if aclose is not None:
+            await aclose()
+
+
+async def iterate_paginated_api(function: Callable[..., Dict[str, Any]],
+                                page_size: int = MAX_PAGE_SIZE,
+                                rate_limiter=None,
+                                **kwargs) -> AsyncIterator[Dict[str, Any]]:
+    """ページネーションAPIの結果を1件ずつ非同期に返す
+
+    同期クライアントの呼び出しはスレッドで実行し、呼び出し側が現在のバッチを
+    処理している間に次のカーソルのリクエストを先行して発行する。
+    メモリ上に保持するのは最大で2ページ分（処理中と先読み中）のみ。
+    rate_limiterを渡した場合は各リクエストの前に枠を取得する。
+    途中で打ち切る呼び出し側はaclosing()で囲み、先読みがその場で取り消されるようにする。
+    """
+    start_cursor = kwargs.pop('start_cursor', None)
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+
+    def fetch(cursor: Optional[str]) -> Dict[str, Any]:
+        params = dict(kwargs, page_size=page_size)
+        if cursor:
+            params['start_cursor'] = cursor
+        return function(**params)
+
+    async def request(cursor: Optional[str]):
+        if rate_limiter is not None:
+            await rate_limiter.acquire()
+        return await asyncio.to_thread(fetch, cursor)
+
+    pending = asyncio.ensure_future(request(start_cursor))
+    try:
+        while pending is not None:
+            response = await pending
+            pending = None
+
+            # 現在のバッチを返す前に次のページを先読み
+            next_cursor = response.get('next_cursor')
+            if response.get('has_more') and next_cursor:
+                pending = asyncio.ensure_future(request(next_cursor))
+
+            for result in response.get('results', []):
+                yield result
+    finally:
+        # 途中で打ち切られた場合は先読みを破棄
+        if pending is not None and not pending.done():
+            pending.cancel()
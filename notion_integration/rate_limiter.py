@@ -0,0 +1,41 @@
+"""
+Notion APIレートリミッター
+トークンバケット方式でリクエスト頻度を制限する（Notionの上限は平均3リクエスト/秒）
+"""
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """トークンバケット方式のレートリミッター
+
+    状態はスレッドロックで保護し、待機はasyncio.sleepで行うため、
+    複数のイベントループやスレッドから共有できる。
+    """
+
+    def __init__(self, rate: float = 3.0, burst: int = 3):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """トークンを1つ予約し、使用可能になるまでの待ち時間を返す"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self):
+        """リクエスト1回分の枠を取得"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# Notionクライアント間で共有するレートリミッター
+notion_rate_limiter = RateLimiter()
@@ -0,0 +1,66 @@
+"""
+ブロック描画キャッシュ
+ブロックID・最終編集日時・レンダラーバージョンをキーに、描画済みのMarkdown断片を保持する
+"""
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# キャッシュに存在しないことを表す値（未対応ブロックの描画結果Noneと区別するため）
+MISSING = object()
+
+
+class BlockRenderCache:
+    """ブロック描画キャッシュクラス
+
+    ブロックIDごとに最新の1件だけを保持するため、ブロックが編集されると
+    古い断片は次の書き込みで置き換えられる。上限を超えた分は最も古く
+    使われたブロックから破棄する。
+    """
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[str, Tuple[Any, Optional[str]]]' = OrderedDict()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'uncacheable': 0,
+            'evictions': 0
+        }
+
+    def get(self, block_id: str, fingerprint: Any):
+        """描画済みの断片を取得（存在しない場合はMISSING）"""
+        entry = self.entries.get(block_id)
+        if entry is None or entry[0] != fingerprint:
+            self.stats['misses'] += 1
+            return MISSING
+        self.entries.move_to_end(block_id)
+        self.stats['hits'] += 1
+        return entry[1]
+
+    def put(self, block_id: str, fingerprint: Any, fragment: Optional[str]):
+        """描画結果を保存"""
+        self.entries[block_id] = (fingerprint, fragment)
+        self.entries.move_to_end(block_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def invalidate(self, block_id: str):
+        """ブロックのキャッシュを破棄"""
+        self.entries.pop(block_id, None)
+
+    def clear(self):
+        """キャッシュを全て破棄"""
+        self.entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キャッシュ統計を取得"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'entries': len(self.entries),
+            'hit_rate': self.stats['hits'] / lookups if lookups else 0.0
+        }
@@ -0,0 +1,226 @@
+"""
+ライトビハインドキュー
+Notionへの記録用ページ書き込みを即座に受け付け、ジャーナルに永続化してからバックグラウンドで反映する
+"""
+import asyncio
+import json
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from .rate_limiter import RateLimiter, notion_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# 書き込み済み行のページIDを保持する上限（同じ行への後続更新をまとめるため）
+MAX_TRACKED_PAGE_IDS = 10000
+
+
+class WriteBehindQueue:
+    """ジャーナル付きライトビハインドキュークラス
+
+    レコードはキーごとにまとめられ、同じキーへの繰り返しの書き込みは
+    プロパティをマージした1回のAPI呼び出しになる。書き込み済みのキーへの
+    再書き込みはページの更新として扱う。
+    """
+
+    def __init__(self, journal_path: str,
+                 write_fn: Callable[[Dict[str, Any]], Awaitable[str]],
+                 rate_limiter: RateLimiter = None,
+                 flush_interval: float = 1.0,
+                 max_attempts: int = 5):
+        self.journal_path = Path(journal_path)
+        self.write_fn = write_fn
+        self.rate_limiter = rate_limiter or notion_rate_limiter
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.pending: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self.page_ids: 'OrderedDict[str, str]' = OrderedDict()
+        self.running = False
+        self._flush_task = None
+        self._flush_lock = None
+        self.stats = {
+            'enqueued': 0,
+            'coalesced': 0,
+            'written': 0,
+            'failed': 0,
+            'dropped': 0,
+            'last_flush': None
+        }
+        self._replay_journal()
+
+    def _replay_journal(self):
+        """ジャーナルから未反映のレコードを復元"""
+        try:
+            if not self.journal_path.exists():
+                return
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 書き込み途中で中断された最終行は無視
+                        continue
+                    if entry.get('op') == 'put':
+                        self._merge(entry['record'])
+                    elif entry.get('op') == 'ack':
+                        self.pending.pop(entry['key'], None)
+                        self._remember_page_id(entry['key'], entry['page_id'])
+            if self.pending:
+                logger.info(f"Recovered {len(self.pending)} pending writes from journal")
+        except Exception as e:
+            logger.error(f"Write journal replay failed: {e}")
+
+    def _append_journal(self, entry: Dict[str, Any]):
+        """ジャーナルに1行追記"""
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def _compact_journal(self):
+        """未反映のレコードと既知のページIDだけを残してジャーナルを書き直す"""
+        try:
+            temp_path = self.journal_path.with_name(self.journal_path.name + '.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for key, page_id in self.page_ids.items():
+                    f.write(json.dumps({'op': 'ack', 'key': key, 'page_id': page_id}, ensure_ascii=False) + '\n')
+                for record in self.pending.values():
+                    f.write(json.dumps({'op': 'put', 'record': record}, ensure_ascii=False) + '\n')
+            temp_path.replace(self.journal_path)
+        except Exception as e:
+            logger.error(f"Write journal compaction failed: {e}")
+
+    def _merge(self, record: Dict[str, Any]) -> bool:
+        """キューにレコードをマージし、既存レコードとまとめた場合はTrueを返す"""
+        key = record['key']
+        existing = self.pending.get(key)
+        if existing is None:
+            self.pending[key] = {
+                'key': key,
+                'database_type': record['database_type'],
+                'properties': dict(record.get('properties') or {}),
+                'children': record.get('children')
+            }
+            return False
+
+        existing['properties'].update(record.get('properties') or {})
+        if record.get('children') is not None:
+            existing['children'] = record['children']
+        return True
+
+    def _remember_page_id(self, key: str, page_id: str):
+        """書き込み済みのページIDを記録（古いものから破棄）"""
+        self.page_ids[key] = page_id
+        self.page_ids.move_to_end(key)
+        while len(self.page_ids) > MAX_TRACKED_PAGE_IDS:
+            self.page_ids.popitem(last=False)
+
+    def enqueue(self, database_type: str, properties: Dict[str, Any],
+                children: Optional[list] = None, key: str = None) -> str:
+        """レコードを受け付けてジャーナルに記録（APIは呼ばない）"""
+        record = {
+            'key': key or uuid.uuid4().hex,
+            'database_type': database_type,
+            'properties': properties,
+            'children': children
+        }
+        self._append_journal({'op': 'put', 'record': record})
+        if self._merge(record):
+            self.stats['coalesced'] += 1
+        self.stats['enqueued'] += 1
+        self._ensure_flusher()
+        return record['key']
+
+    def _ensure_flusher(self):
+        """実行中のイベントループがあればバックグラウンドのフラッシュを開始"""
+        if self._flush_task and not self._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.running = True
+        self._flush_task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """定期的にキューをフラッシュ"""
+        while self.running:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if not self.pending:
+                break
+
+    async def flush(self) -> int:
+        """保留中のレコードをNotionに書き込み、書き込んだ件数を返す"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        written = 0
+        async with self._flush_lock:
+            for key in list(self.pending.keys()):
+                record = self.pending.get(key)
+                if record is None:
+                    continue
+                payload = {
+                    'key': key,
+                    'database_type': record['database_type'],
+                    'properties': dict(record['properties']),
+                    'children': record.get('children'),
+                    'page_id': self.page_ids.get(key)
+                }
+                try:
+                    await self.rate_limiter.acquire()
+                    page_id = await self.write_fn(payload)
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    record['attempts'] = record.get('attempts', 0) + 1
+                    logger.error(f"Write-behind flush failed for {record['database_type']}: {e}")
+                    if record['attempts'] >= self.max_attempts:
+                        logger.error(f"Dropping write after {record['attempts']} attempts: {key}")
+                        del self.pending[key]
+                        self.stats['dropped'] += 1
+                        self._compact_journal()
+                    continue
+
+                # 書き込み中に同じキーへ追加された内容は次回に持ち越す
+                if (self.pending.get(key) is record
+                        and record['properties'] == payload['properties']
+                        and record.get('children') is payload['children']):
+                    del self.pending[key]
+                if page_id:
+                    self._remember_page_id(key, page_id)
+                    self._append_journal({'op': 'ack', 'key': key, 'page_id': page_id})
+                written += 1
+
+            self.stats['written'] += written
+            self.stats['last_flush'] = datetime.now().isoformat()
+            if written:
+                self._compact_journal()
+        return written
+
+    async def stop(self):
+        """バックグラウンド処理を止め、残りをフラッシュ"""
+        self.running = False
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    @property
+    def backlog_depth(self) -> int:
+        """未反映のレコード数"""
+        return len(self.pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キュー統計を取得"""
+        return {**self.stats, 'backlog_depth': self.backlog_depth}
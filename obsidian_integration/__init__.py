@@ -3,10 +3,38 @@ Obsidian統合パッケージ
 """
 from .file_monitor import ObsidianFileMonitor
 from .markdown_parser import ObsidianMarkdownParser
+from .parsed_note import ParsedNote
+from .frontmatter_reader import FrontmatterReader
+from .parse_cache import ParseCache
+from .vault_ingestion import VaultIngestionPipeline
+from .vault_scanner import VaultScanner
+from .vault_walker import VaultWalker
+from .event_coalescer import EventCoalescer
+from .event_bridge import EventBridge
+from .content_hash_store import ContentHashStore
+from .move_detector import MoveDetector
+from .vault_merkle import VaultMerkleTree
+from .search_index import FullTextIndex
+from .link_graph import LinkGraphIndex
+from .property_index import NotePropertyIndex
 from .dashboard_builder import ObsidianDashboardBuilder
 
 __all__ = [
     'ObsidianFileMonitor',
     'ObsidianMarkdownParser',
+    'ParsedNote',
+    'FrontmatterReader',
+    'ParseCache',
+    'VaultIngestionPipeline',
+    'VaultScanner',
+    'VaultWalker',
+    'EventCoalescer',
+    'EventBridge',
+    'ContentHashStore',
+    'MoveDetector',
+    'VaultMerkleTree',
+    'FullTextIndex',
+    'LinkGraphIndex',
+    'NotePropertyIndex',
     'ObsidianDashboardBuilder'
 ]
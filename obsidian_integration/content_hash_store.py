@@ -0,0 +1,379 @@
+"""
+内容ハッシュストア
+保管庫のファイルごとに正規化した内容のハッシュを永続化し、mtimeだけが変わった変更を見分ける
+"""
+import hashlib
+import heapq
+import json
+import logging
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+
+# ハッシュを計算するときに一度に読む量
+READ_CHUNK_SIZE = 256 * 1024
+
+# xxhashがない環境ではblake2bで代用する（保存したアルゴリズムと異なる場合は空から作り直す）
+HASH_ALGORITHM = 'xxh3_128' if xxhash is not None else 'blake2b_128'
+
+# 内容の類似度の推定に使うスケッチの大きさ（行ハッシュの個数）
+SKETCH_SIZE = 8
+
+_UTF8_BOM = b'\xef\xbb\xbf'
+_TRAILING_WHITESPACE = b' \t\r\n'
+
+
+def _new_hasher():
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+class LineSketch:
+    """行ハッシュのbottom-kスケッチ
+
+    空行を除いた各行のCRC32のうち、小さい方からSKETCH_SIZE個を保持する。
+    2つのスケッチから行の集合のJaccard係数を推定でき、移動と同時に編集されたノートの突き合わせに使う。
+    """
+
+    def __init__(self):
+        self._partial = b''
+        # 値を負にしたヒープ（先頭が保持している中で最大の値）
+        self._heap: List[int] = []
+        self._members: Set[int] = set()
+
+    def update(self, data: bytes):
+        """改行を正規化済みの内容を渡す（行が分割されていてもよい）"""
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._add(line)
+
+    def _add(self, line: bytes):
+        line = line.strip()
+        if not line:
+            return
+        value = zlib.crc32(line)
+        if value in self._members:
+            return
+        if len(self._heap) < SKETCH_SIZE:
+            heapq.heappush(self._heap, -value)
+            self._members.add(value)
+        elif value < -self._heap[0]:
+            self._members.discard(-heapq.heappushpop(self._heap, -value))
+            self._members.add(value)
+
+    def hexdigest(self) -> str:
+        """スケッチを16進文字列で返す（最後の行も含める）"""
+        if self._partial:
+            self._add(self._partial)
+            self._partial = b''
+        return ''.join(f'{value:08x}' for value in sorted(self._members))
+
+
+def sketch_similarity(sketch_a: Optional[str], sketch_b: Optional[str]) -> float:
+    """2つのスケッチから内容の類似度（行の集合のJaccard係数の推定値）を計算"""
+    if sketch_a is None or sketch_b is None:
+        return 0.0
+    values_a = {int(sketch_a[i:i + 8], 16) for i in range(0, len(sketch_a), 8)}
+    values_b = {int(sketch_b[i:i + 8], 16) for i in range(0, len(sketch_b), 8)}
+    if not values_a and not values_b:
+        # どちらも空のノート
+        return 1.0
+    union = sorted(values_a | values_b)[:SKETCH_SIZE]
+    return sum(1 for value in union if value in values_a and value in values_b) / len(union)
+
+
+def hash_file(file_path: str, chunk_size: int = READ_CHUNK_SIZE,
+              sketch: Optional[LineSketch] = None) -> Tuple[str, int]:
+    """ファイル内容を分割して読みながら正規化したハッシュを計算し、(ハッシュ, 読んだバイト数)を返す
+
+    先頭のBOM・改行コード（CRLF/CR）・末尾の空白と改行の違いは同じ内容として扱う。
+    sketchを渡すと、同じ正規化済みの内容でスケッチも計算する。
+    """
+    hasher = _new_hasher()
+    bytes_read = 0
+    # チャンクの境界をまたぐCRLFと、ファイル末尾かどうかが分からない空白を次のチャンクへ持ち越す
+    pending = b''
+    first = True
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            bytes_read += len(chunk)
+            if first:
+                first = False
+                if chunk.startswith(_UTF8_BOM):
+                    chunk = chunk[len(_UTF8_BOM):]
+            data = pending + chunk
+            body = data.rstrip(_TRAILING_WHITESPACE)
+            pending = data[len(body):]
+            if body:
+                body = body.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+                hasher.update(body)
+                if sketch is not None:
+                    sketch.update(body)
+    return hasher.hexdigest(), bytes_read
+
+
+class ContentHashStore:
+    """内容ハッシュストアクラス
+
+    保管庫からの相対パスごとに(mtime_ns, サイズ, ハッシュ, 行スケッチ)を保持する。
+    stat結果が記録と同じファイルは読まずに変更なしとし、異なる場合だけ内容を読んでハッシュを比較する。
+    変更イベントと走査の両方から呼ばれるため、記録の更新はロックで保護する。
+    保存は呼び出し側がsave()でまとめて行う。
+
+    同期の前に判定する場合はhas_changed(record=False)で記録を更新せず、同期が完了してからconfirm()で記録する
+    （同期に失敗した変更が、次の変更イベントで変更なしと判定されないようにするため）。
+    """
+
+    def __init__(self, store_path: str, vault_path: str):
+        self.store_path = Path(store_path)
+        self.vault_path = vault_path
+        self.entries: Dict[str, Tuple] = {}
+        # has_changed(record=False)で計算し、confirm()を待っている記録（相対パス → 記録）
+        self._unconfirmed: Dict[str, Tuple] = {}
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.stats = {
+            'checked': 0,
+            'suppressed': 0,
+            'hashed': 0,
+            'bytes_hashed': 0,
+            'errors': 0
+        }
+
+    def _key(self, file_path: str) -> str:
+        return Path(os.path.relpath(file_path, self.vault_path)).as_posix()
+
+    def _ensure_loaded(self):
+        """ストアファイルを必要になった時点で読み込む"""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            if not self.store_path.exists():
+                return
+            with open(self.store_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != STORE_VERSION or data.get('algorithm') != HASH_ALGORITHM:
+                logger.warning(f"Content hash store version mismatch, starting empty: {self.store_path}")
+                return
+            self.entries = {key: tuple(entry) for key, entry in data.get('entries', {}).items()}
+            logger.info(f"Loaded content hash store with {len(self.entries)} entries")
+        except Exception as e:
+            logger.error(f"Content hash store loading failed: {e}")
+            self.entries = {}
+
+    def save(self) -> bool:
+        """変更があればストアをアトミックに保存"""
+        with self._lock:
+            if not self._dirty:
+                return True
+            try:
+                self.store_path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = self.store_path.with_name(self.store_path.name + '.tmp')
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'version': STORE_VERSION,
+                        'algorithm': HASH_ALGORITHM,
+                        'entries': self.entries
+                    }, f, ensure_ascii=False)
+                os.replace(temp_path, self.store_path)
+                self._dirty = False
+                return True
+            except Exception as e:
+                logger.error(f"Content hash store saving failed: {e}")
+                return False
+
+    def has_changed(self, file_path: str, record: bool = True) -> bool:
+        """前回の記録から内容が変わったかを判定し、記録を更新する
+
+        記録がないファイルや読めないファイルは変更ありとする。
+        record=Falseの場合は記録を更新せず、計算した内容をconfirm()まで保留する。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self.stats['checked'] += 1
+            key = self._key(file_path)
+            entry = self.entries.get(key)
+            try:
+                stat = os.stat(file_path)
+                if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                    self.stats['suppressed'] += 1
+                    return False
+                sketch = LineSketch()
+                digest, bytes_read = hash_file(file_path, sketch=sketch)
+            except OSError as e:
+                logger.debug(f"Content hash failed for {file_path}: {e}")
+                self.stats['errors'] += 1
+                return True
+
+            self.stats['hashed'] += 1
+            self.stats['bytes_hashed'] += bytes_read
+            current = (stat.st_mtime_ns, stat.st_size, digest, sketch.hexdigest())
+            if entry is not None and entry[2] == digest:
+                # 内容が同じならmtimeだけを更新する（未確定の記録は不要になる）
+                self.entries[key] = current
+                self._unconfirmed.pop(key, None)
+                self._dirty = True
+                self.stats['suppressed'] += 1
+                return False
+            if record:
+                self.entries[key] = current
+                self._dirty = True
+            else:
+                self._unconfirmed[key] = current
+            return True
+
+    def confirm(self, file_path: str) -> bool:
+        """同期が完了したファイルの内容を記録する（記録した場合True）
+
+        has_changed(record=False)で保留した記録があれば、stat結果が変わっていない場合だけそれを記録する
+        （その後に変わった内容は、まだ同期されていないため記録しない）。保留がなければ現在の内容を記録する。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            key = self._key(file_path)
+            pending = self._unconfirmed.pop(key, None)
+            try:
+                stat = os.stat(file_path)
+                if pending is not None:
+                    if pending[0] != stat.st_mtime_ns or pending[1] != stat.st_size:
+                        return False
+                    current = pending
+                else:
+                    entry = self.entries.get(key)
+                    if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                        return False
+                    sketch = LineSketch()
+                    digest, bytes_read = hash_file(file_path, sketch=sketch)
+                    self.stats['hashed'] += 1
+                    self.stats['bytes_hashed'] += bytes_read
+                    current = (stat.st_mtime_ns, stat.st_size, digest, sketch.hexdigest())
+            except OSError as e:
+                logger.debug(f"Content hash failed for {file_path}: {e}")
+                self.stats['errors'] += 1
+                return False
+            self.entries[key] = current
+            self._dirty = True
+            return True
+
+    def record(self, file_path: str, mtime_ns: int, size: int) -> bool:
+        """記録のないファイルの内容を記録する（変更の判定はしない）
+
+        読んだ後のstat結果が渡したmtime_ns・サイズと異なる場合は、変更の途中とみなして記録しない
+        （記録すると、後から届く変更イベントが変更なしと判定されるため）。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            key = self._key(file_path)
+            if key in self.entries:
+                return False
+            try:
+                sketch = LineSketch()
+                digest, bytes_read = hash_file(file_path, sketch=sketch)
+                stat = os.stat(file_path)
+            except OSError as e:
+                logger.debug(f"Content hash failed for {file_path}: {e}")
+                self.stats['errors'] += 1
+                return False
+            self.stats['hashed'] += 1
+            self.stats['bytes_hashed'] += bytes_read
+            if stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+                return False
+            self.entries[key] = (stat.st_mtime_ns, stat.st_size, digest, sketch.hexdigest())
+            self._dirty = True
+            return True
+
+    def changed_paths(self, file_paths: Iterable[str]) -> List[str]:
+        """内容が変わったファイルだけを返す"""
+        return [file_path for file_path in file_paths if self.has_changed(file_path)]
+
+    def unchanged_paths(self, file_paths: Iterable[str]) -> Set[str]:
+        """内容が変わっていないファイルを返す"""
+        return {file_path for file_path in file_paths if not self.has_changed(file_path)}
+
+    def get_hash(self, file_path: str) -> Optional[str]:
+        """記録済みのハッシュを取得"""
+        with self._lock:
+            self._ensure_loaded()
+            entry = self.entries.get(self._key(file_path))
+            return entry[2] if entry else None
+
+    def get_sketch(self, file_path: str) -> Optional[str]:
+        """記録済みの行スケッチを取得（スケッチのない古い記録はNone）"""
+        with self._lock:
+            self._ensure_loaded()
+            entry = self.entries.get(self._key(file_path))
+            return entry[3] if entry and len(entry) > 3 else None
+
+    def fingerprint(self, file_path: str) -> Optional[Tuple[str, str]]:
+        """記録を更新せずに現在の内容の(ハッシュ, 行スケッチ)を計算（読めない場合はNone）"""
+        try:
+            sketch = LineSketch()
+            digest, bytes_read = hash_file(file_path, sketch=sketch)
+        except OSError as e:
+            logger.debug(f"Content fingerprint failed for {file_path}: {e}")
+            return None
+        with self._lock:
+            self.stats['hashed'] += 1
+            self.stats['bytes_hashed'] += bytes_read
+        return digest, sketch.hexdigest()
+
+    def remove(self, file_path: str):
+        """削除されたファイルの記録を削除"""
+        with self._lock:
+            self._ensure_loaded()
+            self._unconfirmed.pop(self._key(file_path), None)
+            if self.entries.pop(self._key(file_path), None) is not None:
+                self._dirty = True
+
+    def rename(self, old_path: str, new_path: str):
+        """移動・リネームに合わせて記録を付け替える"""
+        with self._lock:
+            self._ensure_loaded()
+            entry = self.entries.pop(self._key(old_path), None)
+            if entry is not None:
+                self.entries[self._key(new_path)] = entry
+                self._dirty = True
+            pending = self._unconfirmed.pop(self._key(old_path), None)
+            if pending is not None:
+                self._unconfirmed[self._key(new_path)] = pending
+
+    def prune(self, file_paths: Iterable[str]) -> int:
+        """渡したファイル以外の記録を削除し、削除した件数を返す"""
+        with self._lock:
+            self._ensure_loaded()
+            keep = {self._key(file_path) for file_path in file_paths}
+            removed = [key for key in self.entries if key not in keep]
+            for key in removed:
+                del self.entries[key]
+            if removed:
+                self._dirty = True
+            return len(removed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """ストア統計を取得"""
+        with self._lock:
+            checked = self.stats['checked']
+            return {
+                **self.stats,
+                'entries': len(self.entries),
+                'algorithm': HASH_ALGORITHM,
+                'suppression_rate': self.stats['suppressed'] / checked if checked else 0.0
+            }
@@ -7,14 +7,20 @@ import os
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 from datetime import datetime
+from .link_graph import LinkGraphIndex
+from .property_index import NotePropertyIndex
+from .vault_walker import iter_markdown_files
 
 logger = logging.getLogger(__name__)
 
 class ObsidianDashboardBuilder:
     """Obsidianダッシュボードビルダークラス"""
     
-    def __init__(self, vault_path: str):
+    def __init__(self, vault_path: str, link_graph: Optional[LinkGraphIndex] = None,
+                 property_index: Optional[NotePropertyIndex] = None):
         self.vault_path = vault_path
+        self.link_graph = link_graph
+        self.property_index = property_index
         self.templates_dir = Path(vault_path) / "Templates"
         self.dashboard_dir = Path(vault_path) / "Dashboard"
         self.insights_dir = Path(vault_path) / "Insights"
@@ -462,11 +468,16 @@ LIMIT 10
 {dashboard_data.get('duplicate_candidates', 'No duplicate candidates found')}
 
 ## 🏷️ 人気タグ
-{dashboard_data.get('popular_tags', 'No popular tags available')}
+{self._format_popular_tags(dashboard_data.get('popular_tags', []))}
+
+## 🕸️ ハブノート
+{self._format_hub_notes(dashboard_data.get('hub_notes', []))}
 
 ## 📈 統計情報
 - **総ノート数**: {dashboard_data.get('total_notes', 0)}
 - **総リンク数**: {dashboard_data.get('total_links', 0)}
+- **未解決リンク数**: {dashboard_data.get('unresolved_links', 0)}
+- **孤立ノート数**: {dashboard_data.get('orphan_count', 0)}
 - **総タグ数**: {dashboard_data.get('total_tags', 0)}
 - **最終更新**: {datetime.now().strftime('%Y-%m-%d %H:%M')}"""
             
@@ -476,6 +487,23 @@ LIMIT 10
             logger.error(f"Dashboard content generation failed: {e}")
             return ""
     
+    def _format_popular_tags(self, popular_tags: Any) -> str:
+        """人気タグの一覧をタグのリストにする"""
+        if isinstance(popular_tags, str):
+            return popular_tags
+        if not popular_tags:
+            return 'No popular tags available'
+        return '\n'.join(f"- #{tag['tag']} ({tag['count']} notes)" for tag in popular_tags)
+    
+    def _format_hub_notes(self, hub_notes: List[Dict[str, Any]]) -> str:
+        """ハブノートの一覧をウィキリンクのリストにする"""
+        if not hub_notes:
+            return 'No hub notes available'
+        return '\n'.join(
+            f"- [[{Path(hub['note_id']).with_suffix('').as_posix()}]] ({hub['backlinks']} backlinks)"
+            for hub in hub_notes
+        )
+    
     async def get_dashboard_stats(self) -> Dict[str, Any]:
         """ダッシュボードの統計情報を取得"""
         try:
@@ -487,15 +515,28 @@ LIMIT 10
                 'popular_tags': []
             }
             
-            # ノート数のカウント
+            # ノート数のカウント（.obsidianや分析結果などの除外ルールに一致するフォルダには降りない）
             vault_path = Path(self.vault_path)
-            md_files = list(vault_path.rglob("*.md"))
+            md_files = [Path(file_path) for file_path in iter_markdown_files(self.vault_path)]
             stats['total_notes'] = len(md_files)
             
             # 最近のノート
             recent_files = sorted(md_files, key=lambda x: x.stat().st_mtime, reverse=True)[:5]
             stats['recent_notes'] = [str(f.relative_to(vault_path)) for f in recent_files]
             
+            # リンク統計（保管庫を再走査せずにリンクグラフから取得）
+            if self.link_graph is not None:
+                graph_metrics = self.link_graph.get_metrics()
+                stats['total_links'] = graph_metrics['total_links']
+                stats['unresolved_links'] = graph_metrics['unresolved_links']
+                stats['orphan_count'] = graph_metrics['orphan_count']
+                stats['hub_notes'] = graph_metrics['hubs']
+            
+            # タグ統計（保管庫を再走査せずにプロパティインデックスから取得）
+            if self.property_index is not None:
+                stats['total_tags'] = self.property_index.get_stats()['tags']
+                stats['popular_tags'] = self.property_index.get_tag_counts(10)
+            
             return stats
             
         except Exception as e:
@@ -0,0 +1,226 @@
+"""
+変更イベントのブリッジ
+watchdogのスレッドから受け取った変更イベントを、上限付きのキューを通してasyncioのイベントループに渡す
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# キューがあふれたときの方針
+OVERFLOW_POLICIES = ('coalesce', 'drop_oldest', 'block')
+
+# 遅延の分位点を計算するために保持する直近のイベント数
+LAG_SAMPLE_SIZE = 1024
+
+
+class EventBridge:
+    """変更イベントブリッジクラス
+
+    put()は任意のスレッドから呼べ、イベントをロックで保護したキューに積む。
+    キューが空から非空になったときだけloop.call_soon_threadsafe()でループ側を起こすため、
+    git checkoutのような大量の変更でもループへのコールバックは1回で済む。
+    ループ側はget_batch()で積まれたイベントをまとめて取り出す。
+
+    キューがmaxsizeに達した場合の方針:
+    - coalesce: 以降のイベントは積まず、1件の再走査イベント（type='obsidian_rescan'）にまとめる
+    - drop_oldest: 最も古いイベントを捨てて積み、再走査イベントも渡す
+    - block: 空きができるまで呼び出し元のスレッドを待たせる（ループのスレッドからの呼び出しはcoalesceと同じ）
+
+    同じパスの作成・変更がキューに残っている間の変更は、キューの長さに関係なく既存のイベントにまとめる。
+    """
+
+    def __init__(self, maxsize: int = 10000, overflow_policy: str = 'coalesce'):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.maxsize = max(1, maxsize)
+        self.overflow_policy = overflow_policy
+        self.queue: deque = deque()
+        # パス → キューに残っている作成・変更イベント
+        self._queued_updates: Dict[str, Dict[str, Any]] = {}
+        self._rescan_requested = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._notified = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._lags: deque = deque(maxlen=LAG_SAMPLE_SIZE)
+        self.stats = {
+            'enqueued': 0,
+            'delivered': 0,
+            'merged': 0,
+            'dropped': 0,
+            'blocked': 0,
+            'blocked_time': 0.0,
+            'rescans': 0,
+            'max_depth': 0,
+            'lag_samples': 0,
+            'lag_total': 0.0,
+            'lag_max': 0.0
+        }
+
+    def bind(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """イベントを受け取るループを設定（ループのスレッドから呼ぶ）"""
+        with self._condition:
+            self._loop = loop or asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+            self._ready = asyncio.Event()
+            self._notified = False
+            self._closed = False
+            if self.queue or self._rescan_requested:
+                self._ready.set()
+                self._notified = True
+
+    def put(self, change_event: Dict[str, Any]) -> bool:
+        """変更イベントを積む（任意のスレッドから呼べる）
+
+        イベントが積まれたか既存のイベントにまとめられた場合はTrue、
+        あふれて再走査に回された場合はFalseを返す。
+        """
+        with self._condition:
+            if self._closed:
+                return False
+            if self._merge(change_event):
+                return True
+
+            if len(self.queue) >= self.maxsize:
+                if self.overflow_policy == 'block' and self._can_block():
+                    self._wait_for_space()
+                    if self._closed:
+                        return False
+                elif self.overflow_policy == 'drop_oldest':
+                    self._forget(self.queue.popleft())
+                    self.stats['dropped'] += 1
+                    self._request_rescan()
+                else:
+                    self.stats['dropped'] += 1
+                    self._request_rescan()
+                    self._wake()
+                    return False
+
+            self.queue.append(change_event)
+            if change_event.get('action') in ('created', 'modified'):
+                self._queued_updates[change_event['file_path']] = change_event
+            else:
+                # 削除・移動より後の変更を、それより前のイベントにまとめないようにする
+                self._queued_updates.pop(change_event.get('file_path'), None)
+                self._queued_updates.pop(change_event.get('dest_path'), None)
+            self.stats['enqueued'] += 1
+            self.stats['max_depth'] = max(self.stats['max_depth'], len(self.queue))
+            self._wake()
+            return True
+
+    def _merge(self, change_event: Dict[str, Any]) -> bool:
+        """キューに残っている同じパスの作成・変更に、変更をまとめる"""
+        if change_event.get('action') != 'modified':
+            return False
+        queued = self._queued_updates.get(change_event.get('file_path'))
+        if queued is None:
+            return False
+        queued['timestamp'] = change_event.get('timestamp', queued.get('timestamp'))
+        queued['coalesced_events'] = queued.get('coalesced_events', 1) + change_event.get('coalesced_events', 1)
+        self.stats['merged'] += 1
+        return True
+
+    def _forget(self, change_event: Dict[str, Any]):
+        if self._queued_updates.get(change_event.get('file_path')) is change_event:
+            del self._queued_updates[change_event['file_path']]
+
+    def _can_block(self) -> bool:
+        # ループのスレッドで待つと取り出す側も止まるため、待てるのは別スレッドからの呼び出しだけ
+        return (self._loop is not None and not self._loop.is_closed()
+                and self._loop_thread_id != threading.get_ident())
+
+    def _wait_for_space(self):
+        self.stats['blocked'] += 1
+        start_time = time.monotonic()
+        while len(self.queue) >= self.maxsize and not self._closed:
+            self._condition.wait(0.5)
+        self.stats['blocked_time'] += time.monotonic() - start_time
+
+    def _request_rescan(self):
+        if not self._rescan_requested:
+            self._rescan_requested = True
+            self.stats['rescans'] += 1
+            logger.warning(f"Change event queue overflowed ({self.maxsize} events); falling back to a vault rescan")
+
+    def _wake(self):
+        """ループ側を起こす（ロック内で呼ぶ）"""
+        if self._notified or self._ready is None or self._loop is None:
+            return
+        self._notified = True
+        if self._loop_thread_id == threading.get_ident():
+            self._ready.set()
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # ループが閉じられている
+            self._notified = False
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """積まれたイベントをすべて取り出す（あふれていた場合は最後に再走査イベントを付ける）"""
+        with self._condition:
+            batch = list(self.queue)
+            self.queue.clear()
+            self._queued_updates.clear()
+            if self._rescan_requested:
+                self._rescan_requested = False
+                batch.append({'type': 'obsidian_rescan', 'timestamp': datetime.now().isoformat()})
+            self._notified = False
+            if self._ready is not None:
+                self._ready.clear()
+            self._condition.notify_all()
+
+            now = time.time()
+            for change_event in batch:
+                observed_at = change_event.get('observed_at')
+                if observed_at is not None:
+                    lag = max(0.0, now - observed_at)
+                    self._lags.append(lag)
+                    self.stats['lag_samples'] += 1
+                    self.stats['lag_total'] += lag
+                    self.stats['lag_max'] = max(self.stats['lag_max'], lag)
+            self.stats['delivered'] += len(batch)
+            return batch
+
+    async def get_batch(self) -> List[Dict[str, Any]]:
+        """イベントが積まれるまで待ち、まとめて取り出す（ループ側から呼ぶ）"""
+        if self._ready is None:
+            self.bind()
+        while True:
+            batch = self.drain()
+            if batch or self._closed:
+                return batch
+            await self._ready.wait()
+
+    def close(self):
+        """待っているスレッドとループ側を解放する"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            self._notified = False
+            self._wake()
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self.queue)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キューと遅延の統計を取得"""
+        with self._condition:
+            lags = sorted(self._lags)
+            lagged = len(self._lags)
+            return {
+                **self.stats,
+                'depth': len(self.queue),
+                'overflow_policy': self.overflow_policy,
+                'lag_average': self.stats['lag_total'] / self.stats['lag_samples'] if self.stats['lag_samples'] else 0.0,
+                'lag_p95': lags[min(lagged - 1, int(lagged * 0.95))] if lagged else 0.0
+            }
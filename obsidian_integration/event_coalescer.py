@@ -0,0 +1,243 @@
+"""
+変更イベントの集約
+エディタの保存などで短時間に続く変更イベントを、静止期間の経過後にパスごとの正味の変更へまとめる
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 集約中に保持するパス数の上限の既定値
+DEFAULT_MAX_PENDING = 10000
+
+
+class _PendingChange:
+    """パスごとの集約中の変更"""
+
+    __slots__ = ('existed_before', 'exists_now', 'origin', 'content_changed', 'raw_events', 'timestamp', 'observed_at')
+
+    def __init__(self, existed_before: bool):
+        self.existed_before = existed_before
+        self.exists_now = existed_before
+        # 移動元のパス（このパスへ移動してきた場合）
+        self.origin: Optional[str] = None
+        # 作成・変更のイベントを受け取ったか（移動の場合は移動元で受け取ったものも含む）
+        self.content_changed = False
+        self.raw_events = 0
+        self.timestamp: Optional[str] = None
+        # 最初のイベントを受け取った時刻（遅延の計測用）
+        self.observed_at: Optional[float] = None
+
+
+class EventCoalescer:
+    """変更イベント集約クラス
+
+    add()で受け取ったイベントをパスごとに集約し、最後のイベントからquiet_period秒
+    新しいイベントがなければ、正味の変更をまとめてflush_callbackに渡す。
+    イベントが途切れない場合もmax_delay秒ごとには渡す。
+
+    - 作成 → 削除: 何も通知しない
+    - 作成 → 変更: 作成
+    - 削除 → 作成: 変更
+    - 移動 → 変更: 移動（content_changed=True）
+    - 移動先の削除: 移動元の削除
+
+    集約中のパスがmax_pendingに達した場合は、静止期間を待たずにadd()の呼び出し元のスレッドで渡す。
+    flush_callbackへの受け渡しは1バッチずつ順に行うため、受け渡し先が詰まっている間（EventBridgeのblockなど）は
+    add()の呼び出し元（watchdogのスレッド）も待たされ、集約中の変更が際限なく増えることはない。
+
+    add()とflush()はwatchdogのスレッドとタイマーのスレッドから呼ばれるため、ロックで保護する。
+    """
+
+    def __init__(self, flush_callback: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                 quiet_period: float = 0.5, max_delay: Optional[float] = None,
+                 max_pending: int = DEFAULT_MAX_PENDING):
+        self.flush_callback = flush_callback
+        self.quiet_period = max(0.0, quiet_period)
+        self.max_delay = max_delay if max_delay is not None else max(self.quiet_period * 10, 1.0)
+        self.max_pending = max(1, max_pending)
+        # パス → 集約中の変更（最初にイベントを受け取った順）
+        self.pending: Dict[str, _PendingChange] = {}
+        self._pending_raw_events = 0
+        self._first_event_time: Optional[float] = None
+        self._last_event_time = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+        # flush_callbackへの受け渡しを1バッチずつにする（バッチの順序を保ち、詰まったときに呼び出し元を待たせる）
+        self._deliver_lock = threading.Lock()
+        self.stats = {
+            'raw_events': 0,
+            'emitted_events': 0,
+            'collapsed_events': 0,
+            'batches': 0,
+            'forced_flushes': 0
+        }
+
+    def add(self, change_event: Dict[str, Any]):
+        """変更イベントを受け取る（集約中のパスが上限に達している場合は先に渡す）"""
+        with self._lock:
+            full = len(self.pending) >= self.max_pending
+            if full:
+                self.stats['forced_flushes'] += 1
+        if full:
+            self.flush()
+
+        with self._lock:
+            self.stats['raw_events'] += 1
+            self._pending_raw_events += 1
+            action = change_event['action']
+            file_path = change_event['file_path']
+            timestamp = change_event.get('timestamp') or datetime.now().isoformat()
+            observed_at = change_event.get('observed_at') or time.time()
+
+            if action == 'moved' and change_event.get('dest_path'):
+                source = self._entry(file_path, existed_before=True)
+                origin = source.origin or file_path
+                # 移動元が移動前から存在していた場合だけ、移動として扱える
+                origin_existed = source.existed_before if source.origin is None else True
+                source.exists_now = False
+                source.origin = None
+                self._touch(source, timestamp, observed_at)
+
+                dest = self._entry(change_event['dest_path'], existed_before=False)
+                dest.exists_now = True
+                dest.origin = origin if origin_existed else None
+                dest.content_changed = source.content_changed
+                self._touch(dest, timestamp, source.observed_at)
+            else:
+                entry = self._entry(file_path, existed_before=action != 'created')
+                entry.exists_now = action != 'deleted'
+                if action == 'deleted':
+                    entry.origin = None
+                else:
+                    entry.content_changed = True
+                self._touch(entry, timestamp, observed_at)
+
+            self._last_event_time = time.monotonic()
+            if self._first_event_time is None:
+                self._first_event_time = self._last_event_time
+            if self._timer is None:
+                self._start_timer(self.quiet_period)
+
+    def _entry(self, file_path: str, existed_before: bool) -> _PendingChange:
+        entry = self.pending.get(file_path)
+        if entry is None:
+            entry = _PendingChange(existed_before)
+            self.pending[file_path] = entry
+        return entry
+
+    @staticmethod
+    def _touch(entry: _PendingChange, timestamp: str, observed_at: float):
+        entry.raw_events += 1
+        entry.timestamp = timestamp
+        if entry.observed_at is None or observed_at < entry.observed_at:
+            entry.observed_at = observed_at
+
+    def _start_timer(self, delay: float):
+        # イベントごとにタイマーを作り直さず、満了時に残り時間を確認して延長する
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        """静止期間が経過したか、最初のイベントからmax_delayを超えていれば渡す"""
+        with self._lock:
+            if self._timer is not threading.current_thread():
+                # flush()で取り消された後に満了したタイマー
+                return
+            if self._first_event_time is None:
+                self._timer = None
+                return
+            now = time.monotonic()
+            quiet_remaining = self._last_event_time + self.quiet_period - now
+            delay_remaining = self._first_event_time + self.max_delay - now
+            if quiet_remaining > 0 and delay_remaining > 0:
+                self._start_timer(min(quiet_remaining, delay_remaining))
+                return
+            self._timer = None
+        self.flush()
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """集約中の変更を正味の変更に変換してflush_callbackに渡す
+
+        前のバッチの受け渡しが終わるまで待ってから取り出す。
+        """
+        with self._deliver_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                self._first_event_time = None
+                pending, self.pending = self.pending, {}
+                raw_events, self._pending_raw_events = self._pending_raw_events, 0
+                batch = self._resolve(pending)
+
+                if pending:
+                    self.stats['batches'] += 1
+                    self.stats['emitted_events'] += len(batch)
+                    self.stats['collapsed_events'] += max(0, raw_events - len(batch))
+
+            if batch:
+                logger.info(f"Coalesced {raw_events} file events into {len(batch)} changes")
+                if self.flush_callback:
+                    try:
+                        self.flush_callback(batch)
+                    except Exception as e:
+                        logger.error(f"Coalesced event delivery failed: {e}")
+        return batch
+
+    def _resolve(self, pending: Dict[str, _PendingChange]) -> List[Dict[str, Any]]:
+        """パスごとの集約結果を変更イベントに変換"""
+        moved_origins = {
+            entry.origin for file_path, entry in pending.items()
+            if entry.origin is not None and entry.exists_now
+            and not (pending.get(entry.origin) and pending[entry.origin].exists_now)
+        }
+
+        batch = []
+        for file_path, entry in pending.items():
+            if entry.exists_now and entry.origin in moved_origins:
+                action, source_path, dest_path = 'moved', entry.origin, file_path
+            elif entry.exists_now:
+                action = 'modified' if entry.existed_before else 'created'
+                source_path, dest_path = file_path, None
+            elif entry.existed_before and file_path not in moved_origins:
+                # 移動先が削除された場合も、移動元の削除として残る
+                action, source_path, dest_path = 'deleted', file_path, None
+            else:
+                continue
+
+            batch.append({
+                'type': 'obsidian_change',
+                'file_path': source_path,
+                'action': action,
+                'dest_path': dest_path,
+                'timestamp': entry.timestamp,
+                'observed_at': entry.observed_at,
+                'coalesced_events': entry.raw_events
+            })
+            if action == 'moved':
+                batch[-1]['content_changed'] = entry.content_changed
+        return batch
+
+    def pending_count(self) -> int:
+        """集約中のパス数"""
+        with self._lock:
+            return len(self.pending)
+
+    def close(self):
+        """タイマーを止め、集約中の変更を渡す"""
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """集約統計を取得"""
+        with self._lock:
+            raw_events = self.stats['raw_events']
+            return {
+                **self.stats,
+                'pending_paths': len(self.pending),
+                'collapse_rate': self.stats['collapsed_events'] / raw_events if raw_events else 0.0
+            }
@@ -4,11 +4,21 @@ Obsidianファイルシステムの監視を行う
 """
 import logging
 import os
+import stat
 import time
 import asyncio
+import tempfile
 from typing import Dict, Any, List, Optional, Callable
 from pathlib import Path
 from datetime import datetime
+from config import settings
+from .content_hash_store import ContentHashStore
+from .event_bridge import EventBridge
+from .event_coalescer import DEFAULT_MAX_PENDING, EventCoalescer
+from .move_detector import MoveDetector
+from .search_index import FullTextIndex
+from .vault_scanner import VaultScanner
+from .vault_walker import VaultWalker
 
 try:
     from watchdog.observers import Observer
@@ -18,20 +28,38 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# watchdogの稼働中でも、この回数に1回はファイルのstatまで行う完全な走査にする
+FULL_SCAN_INTERVAL = 10
+
+# ファイルキャッシュのスナップショットを保存する間隔（監視ループの回数）
+SNAPSHOT_INTERVAL = 5
+
 class ObsidianFileHandler(FileSystemEventHandler):
     """Obsidianファイル変更ハンドラー"""
     
-    def __init__(self, vault_path: str, change_callback: Optional[Callable] = None):
+    def __init__(self, vault_path: str, change_callback: Optional[Callable] = None,
+                 quiet_period: float = 0.5, walker: Optional[VaultWalker] = None,
+                 max_pending: int = DEFAULT_MAX_PENDING):
         self.vault_path = vault_path
         self.change_callback = change_callback
+        # 除外ルールに一致するパス（.obsidian・.trash・.gitなど）のイベントは扱わない
+        self.walker = walker or VaultWalker(vault_path)
+        # パスごとの最後の生イベント時刻
         self.last_modified = {}
+        # 保存時の一時ファイル作成・書き込み・リネームなどの連続したイベントを1件の変更にまとめる
+        # 集約中のパスが上限に達したら先に渡し、受け渡し先が詰まっている間はwatchdogのスレッドを待たせる
+        self.coalescer = EventCoalescer(self._deliver_changes, quiet_period, max_pending=max_pending)
+    
+    def _is_target(self, file_path: str) -> bool:
+        """監視対象のMarkdownファイルか"""
+        return file_path.endswith('.md') and not self.walker.is_ignored(file_path)
     
     def on_modified(self, event):
         """ファイル変更時の処理"""
         if event.is_directory:
             return
         
-        if event.src_path.endswith('.md'):
+        if self._is_target(event.src_path):
             self._handle_file_change(event.src_path, 'modified')
     
     def on_created(self, event):
@@ -39,7 +67,7 @@ class ObsidianFileHandler(FileSystemEventHandler):
         if event.is_directory:
             return
         
-        if event.src_path.endswith('.md'):
+        if self._is_target(event.src_path):
             self._handle_file_change(event.src_path, 'created')
     
     def on_deleted(self, event):
@@ -47,7 +75,7 @@ class ObsidianFileHandler(FileSystemEventHandler):
         if event.is_directory:
             return
         
-        if event.src_path.endswith('.md'):
+        if self._is_target(event.src_path):
             self._handle_file_change(event.src_path, 'deleted')
     
     def on_moved(self, event):
@@ -55,48 +83,88 @@ class ObsidianFileHandler(FileSystemEventHandler):
         if event.is_directory:
             return
         
-        if event.src_path.endswith('.md'):
+        src_target = self._is_target(event.src_path)
+        dest_target = self._is_target(event.dest_path)
+        if src_target and dest_target:
             self._handle_file_change(event.src_path, 'moved', event.dest_path)
+        elif src_target:
+            # 除外されたパス（.trashなど）への移動は削除として扱う
+            self._handle_file_change(event.src_path, 'deleted')
+        elif dest_target and event.src_path.endswith('.md'):
+            # 除外されたパスからの移動は作成として扱う
+            self._handle_file_change(event.dest_path, 'created')
+        elif dest_target:
+            # 一時ファイルからのアトミックな置き換えは変更として扱う
+            self._handle_file_change(event.dest_path, 'modified')
     
     def _handle_file_change(self, file_path: str, action: str, dest_path: str = None):
         """ファイル変更の処理"""
         try:
-            # 重複イベントを防ぐため、最後の変更時刻をチェック
-            current_time = time.time()
-            if file_path in self.last_modified:
-                if current_time - self.last_modified[file_path] < 1.0:  # 1秒以内の重複を無視
-                    return
+            self.last_modified[file_path] = time.time()
             
-            self.last_modified[file_path] = current_time
-            
-            # 変更イベントを作成
-            change_event = {
+            # 変更イベントを作成し、静止期間が経過するまで集約する
+            self.coalescer.add({
                 'type': 'obsidian_change',
                 'file_path': file_path,
                 'action': action,
                 'dest_path': dest_path,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            # コールバック関数を呼び出し
-            if self.change_callback:
-                self.change_callback(change_event)
-            
-            logger.info(f"Obsidian file {action}: {file_path}")
+                'timestamp': datetime.now().isoformat(),
+                'observed_at': self.last_modified[file_path]
+            })
             
         except Exception as e:
             logger.error(f"File change handling failed: {e}")
+    
+    def _deliver_changes(self, changes: List[Dict[str, Any]]):
+        """集約した正味の変更をコールバック関数に渡す"""
+        for change_event in changes:
+            try:
+                if self.change_callback:
+                    self.change_callback(change_event)
+                
+                logger.info(f"Obsidian file {change_event['action']}: {change_event['file_path']}")
+                
+            except Exception as e:
+                logger.error(f"File change handling failed: {e}")
 
 class ObsidianFileMonitor:
     """Obsidianファイルモニタークラス"""
     
-    def __init__(self, vault_path: str):
+    def __init__(self, vault_path: str, event_quiet_period: Optional[float] = None,
+                 content_hashes: Optional[ContentHashStore] = None,
+                 search_index: Optional[FullTextIndex] = None,
+                 snapshot_path: Optional[str] = None):
         self.vault_path = vault_path
+        self.event_quiet_period = (
+            settings.OBSIDIAN_EVENT_QUIET_PERIOD if event_quiet_period is None else event_quiet_period
+        )
         self.observer = None
         self.event_handler = None
         self.running = False
         self.change_callback = None
         self.file_cache = {}
+        # 走査と変更イベントで同じ除外ルールを使う
+        self.walker = VaultWalker(vault_path)
+        self.scanner = VaultScanner(vault_path, walker=self.walker)
+        self._scan_count = 0
+        # watchdogのスレッドからイベントループへ変更イベントを渡すキュー
+        self.bridge = EventBridge(settings.OBSIDIAN_EVENT_QUEUE_SIZE, settings.OBSIDIAN_EVENT_OVERFLOW_POLICY)
+        # 内容が変わっていない変更（git pullやObsidian Syncによるmtimeの更新など）を同期に渡さないためのハッシュ
+        self.content_hashes = content_hashes or ContentHashStore(
+            os.path.join(settings.SYNC_STATE_DIR, 'content_hashes.json'), vault_path
+        )
+        # 監視の外で行われた移動（削除と作成として届く）を1つの移動にまとめる
+        self.move_detector = MoveDetector(self.content_hashes, self.scanner)
+        # 全文検索インデックス（初期化時に保管庫と突き合わせ、以降は変更イベントごとに更新する）
+        self.search_index = search_index or FullTextIndex(
+            os.path.join(settings.SYNC_STATE_DIR, 'search_index.sqlite3'), vault_path
+        )
+        self.search_ready = False
+        # 次回の起動時に走査を待たずにキャッシュを復元するためのスナップショット
+        self.snapshot_path = snapshot_path or os.path.join(settings.SYNC_STATE_DIR, 'file_cache_snapshot.json.gz')
+        self.reconcile_throttle = settings.OBSIDIAN_RECONCILE_THROTTLE
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self.startup_stats: Dict[str, Any] = {}
     
     async def initialize(self):
         """ファイルモニターの初期化"""
@@ -107,13 +175,35 @@ class ObsidianFileMonitor:
             if not os.path.exists(self.vault_path):
                 raise ValueError(f"Obsidian vault path does not exist: {self.vault_path}")
             
-            # ファイルキャッシュの初期化
-            await self._initialize_file_cache()
+            # ファイルキャッシュの初期化（スナップショットがあれば走査を待たずに使い始める）
+            start_time = time.monotonic()
+            if await asyncio.to_thread(self.scanner.load_snapshot, self.snapshot_path):
+                source = 'snapshot'
+                self._build_file_cache()
+                # 停止中の変更は低優先度の走査で取り込み、その後に全文検索インデックスを突き合わせる
+                self._reconcile_task = asyncio.create_task(self._reconcile(scan=True))
+            else:
+                source = 'scan'
+                await self._initialize_file_cache()
+                await asyncio.to_thread(self.scanner.save_snapshot, self.snapshot_path)
+                # 全文検索インデックスを保管庫と突き合わせる（変更のないノートは読まない）
+                await asyncio.to_thread(self._sync_search_index)
+                self._reconcile_task = asyncio.create_task(self._reconcile(scan=False))
+            self.startup_stats = {
+                'source': source,
+                'files': len(self.file_cache),
+                'time_to_ready': time.monotonic() - start_time
+            }
+            logger.info(f"File cache ready in {self.startup_stats['time_to_ready']:.3f}s "
+                        f"from {source} ({len(self.file_cache)} files)")
             
             # イベントハンドラーの初期化
             self.event_handler = ObsidianFileHandler(
                 self.vault_path,
-                self._handle_file_change
+                self.bridge.put,
+                self.event_quiet_period,
+                self.walker,
+                max_pending=self.bridge.maxsize
             )
             
             # オブザーバーの初期化
@@ -135,15 +225,17 @@ class ObsidianFileMonitor:
         try:
             logger.info("Starting Obsidian file monitor...")
             self.running = True
+            self.bridge.bind(asyncio.get_running_loop())
             
             # オブザーバーの開始
             self.observer.start()
             
-            # 監視タスクの開始
+            # 監視タスクと変更イベントの処理タスクを開始
             monitor_task = asyncio.create_task(self._monitor_loop())
+            dispatch_task = asyncio.create_task(self._dispatch_loop())
             
             # タスクの実行
-            await monitor_task
+            await asyncio.gather(monitor_task, dispatch_task)
             
         except Exception as e:
             logger.error(f"File monitor start failed: {e}")
@@ -157,26 +249,88 @@ class ObsidianFileMonitor:
         if self.observer:
             self.observer.stop()
             self.observer.join()
+        
+        # キューの空きを待っているスレッドを先に解放してから、集約中のタイマーを止める
+        # （止めた後の変更は次回の起動時の走査で拾い直される）
+        self.bridge.close()
+        if self.event_handler:
+            self.event_handler.coalescer.close()
+        if self._reconcile_task and not self._reconcile_task.done():
+            self._reconcile_task.cancel()
+        self.content_hashes.save()
+        self.scanner.save_snapshot(self.snapshot_path)
     
     def set_change_callback(self, callback: Callable):
-        """変更コールバックの設定"""
+        """変更コールバックの設定
+
+        コールバックに渡した変更の内容は、同期が完了してconfirm_synced()が呼ばれるまで記録しない。
+        """
         self.change_callback = callback
     
+    def confirm_synced(self, file_path: str) -> bool:
+        """同期が完了したファイルの内容を記録し、以降の内容が同じ変更を抑制する"""
+        return self.content_hashes.confirm(file_path)
+    
     async def _initialize_file_cache(self):
         """ファイルキャッシュの初期化"""
         try:
-            vault_path = Path(self.vault_path)
-            
-            for md_file in vault_path.rglob("*.md"):
-                file_info = await self._get_file_info(md_file)
-                if file_info:
-                    self.file_cache[str(md_file)] = file_info
+            # 走査で得たstat情報からキャッシュを作る（ファイルごとにstatし直さない）
+            await asyncio.to_thread(self.scanner.scan)
+            self._build_file_cache()
             
             logger.info(f"Initialized file cache with {len(self.file_cache)} files")
             
         except Exception as e:
             logger.error(f"File cache initialization failed: {e}")
     
+    def _build_file_cache(self):
+        """スキャナーの記録からファイルキャッシュを作り直す"""
+        self.file_cache = {
+            file_path: self._file_info_from_scanner(file_path) for file_path in self.scanner.iter_paths()
+        }
+    
+    async def _reconcile(self, scan: bool):
+        """起動後のバックグラウンド処理
+
+        スナップショットから起動した場合（scan=True）は、保管庫を走査して停止中の変更を取り込む。
+        どちらの場合も、最後に内容ハッシュの記録がないファイルを記録し、移動の検出に備える。
+        """
+        try:
+            start_time = time.monotonic()
+            if scan:
+                changes = await self._update_file_cache(full=True, throttle=self.reconcile_throttle)
+                await asyncio.to_thread(self._sync_search_index)
+                await asyncio.to_thread(self.scanner.save_snapshot, self.snapshot_path)
+                self.startup_stats['reconcile_time'] = time.monotonic() - start_time
+                self.startup_stats['reconciled_changes'] = len(changes)
+                logger.info(f"Reconciled file cache with vault in {self.startup_stats['reconcile_time']:.3f}s "
+                            f"({len(changes)} changes since snapshot)")
+            recorded = await asyncio.to_thread(self._prime_content_hashes)
+            if recorded:
+                logger.info(f"Recorded content hashes for {recorded} files")
+        except Exception as e:
+            logger.error(f"File cache reconciliation failed: {e}")
+    
+    def _prime_content_hashes(self) -> int:
+        """内容ハッシュの記録がないファイルを記録（移動の検出で削除前の内容と突き合わせるため）"""
+        recorded = 0
+        for count, file_path in enumerate(self.scanner.iter_paths(), 1):
+            record = self.scanner.get(file_path)
+            if record is not None and self.content_hashes.record(file_path, record['mtime_ns'], record['size']):
+                recorded += 1
+            if self.reconcile_throttle and count % 100 == 0:
+                time.sleep(self.reconcile_throttle)
+        self.content_hashes.save()
+        return recorded
+    
+    def _sync_search_index(self):
+        """スキャナーの記録と全文検索インデックスを突き合わせる"""
+        try:
+            self.search_index.sync_files(self.scanner.iter_paths())
+            self.search_ready = True
+        except Exception as e:
+            logger.error(f"Search index sync failed: {e}")
+    
     async def _get_file_info(self, file_path: Path) -> Optional[Dict[str, Any]]:
         """ファイル情報の取得"""
         try:
@@ -198,12 +352,30 @@ class ObsidianFileMonitor:
             logger.error(f"File info retrieval failed: {e}")
             return None
     
+    def _file_info_from_scanner(self, file_path: str) -> Dict[str, Any]:
+        """スキャナーの記録からファイル情報を作成"""
+        record = self.scanner.get(file_path)
+        return {
+            'path': file_path,
+            'name': os.path.basename(file_path),
+            'size': record['size'],
+            'created_time': datetime.fromtimestamp(record['ctime_ns'] / 1e9).isoformat(),
+            'modified_time': datetime.fromtimestamp(record['mtime_ns'] / 1e9).isoformat(),
+            'relative_path': os.path.relpath(file_path, self.vault_path)
+        }
+    
     async def _monitor_loop(self):
         """監視ループ"""
+        iteration = 0
         while self.running:
             try:
-                # 定期的なファイルキャッシュの更新
-                await self._update_file_cache()
+                # 定期的なファイルキャッシュの更新（起動後の突き合わせ中は走査を重ねない）
+                if self._reconcile_task is None or self._reconcile_task.done():
+                    await self._update_file_cache()
+                await asyncio.to_thread(self.content_hashes.save)
+                iteration += 1
+                if iteration % SNAPSHOT_INTERVAL == 0:
+                    await asyncio.to_thread(self.scanner.save_snapshot, self.snapshot_path)
                 
                 # 1分間隔でチェック
                 await asyncio.sleep(60)
@@ -212,46 +384,103 @@ class ObsidianFileMonitor:
                 logger.error(f"Monitor loop failed: {e}")
                 await asyncio.sleep(60)
     
-    async def _update_file_cache(self):
-        """ファイルキャッシュの更新"""
-        try:
-            vault_path = Path(self.vault_path)
-            current_files = set()
-            
-            # 現在のファイルをスキャン
-            for md_file in vault_path.rglob("*.md"):
-                file_path = str(md_file)
-                current_files.add(file_path)
+    async def _dispatch_loop(self):
+        """watchdogのスレッドから積まれた変更イベントをイベントループ上で処理する"""
+        while self.running:
+            try:
+                batch = await self.bridge.get_batch()
+                batch = await asyncio.to_thread(self.move_detector.detect, batch)
+                await asyncio.to_thread(self._mark_unchanged_content, batch)
+                await asyncio.to_thread(self._update_search_index, batch)
+                for change_event in batch:
+                    if change_event['type'] == 'obsidian_rescan':
+                        # キューからあふれたイベントは走査で拾い直す
+                        await self._update_file_cache(full=True)
+                    else:
+                        self._handle_file_change(change_event)
                 
-                # 新しいファイルまたは変更されたファイルをチェック
-                if file_path not in self.file_cache:
-                    file_info = await self._get_file_info(md_file)
-                    if file_info:
-                        self.file_cache[file_path] = file_info
-                        logger.info(f"New file detected: {file_path}")
+            except Exception as e:
+                logger.error(f"Change event dispatch failed: {e}")
+    
+    def _mark_unchanged_content(self, changes: List[Dict[str, Any]]):
+        """作成・変更のうち内容のハッシュが前回と同じものにcontent_unchangedを付ける
+
+        変更ありと判定した内容は、コールバックがなければそのまま記録し、あれば同期の完了（confirm_synced()）まで記録しない。
+        """
+        record = self.change_callback is None
+        for change in changes:
+            if change.get('action') in ('created', 'modified') and not self.content_hashes.has_changed(change['file_path'], record=record):
+                change['content_unchanged'] = True
+    
+    def _update_search_index(self, changes: List[Dict[str, Any]]):
+        """変更を全文検索インデックスに反映（初期化前の変更は初期化時の突き合わせで反映される）"""
+        if not self.search_ready:
+            return
+        for change in changes:
+            action = change.get('action')
+            if action == 'moved':
+                self.search_index.rename_file(change['file_path'], change['dest_path'])
+            elif action == 'deleted':
+                self.search_index.remove_file(change['file_path'])
+            elif action in ('created', 'modified') and not change.get('content_unchanged'):
+                self.search_index.update_file(change['file_path'])
+    
+    async def _update_file_cache(self, full: bool = False, throttle: float = 0.0) -> List[Dict[str, Any]]:
+        """ファイルキャッシュの更新（前回の走査との差分を返す）
+        
+        watchdogの稼働中は変更イベントでキャッシュが更新されるため、一覧が変わっていない
+        ディレクトリのファイルはstatせず、取りこぼした作成・削除・移動だけを拾う。
+        """
+        try:
+            observer_alive = self.observer is not None and self.observer.is_alive()
+            check_files = full or not observer_alive or self._scan_count % FULL_SCAN_INTERVAL == 0
+            self._scan_count += 1
+            changes = await asyncio.to_thread(self.scanner.scan, check_files, throttle)
+            changes = await asyncio.to_thread(self.move_detector.detect, changes)
+            await asyncio.to_thread(self._mark_unchanged_content, changes)
+            await asyncio.to_thread(self._update_search_index, changes)
+            
+            for change in changes:
+                action = change['action']
+                file_path = change['file_path']
+                if action == 'moved':
+                    self.content_hashes.rename(file_path, change['dest_path'])
+                    self.file_cache.pop(file_path, None)
+                    self.file_cache[change['dest_path']] = self._file_info_from_scanner(change['dest_path'])
+                elif action == 'deleted':
+                    self.content_hashes.remove(file_path)
+                    self.file_cache.pop(file_path, None)
                 else:
-                    # 既存ファイルの変更をチェック
-                    current_info = await self._get_file_info(md_file)
-                    cached_info = self.file_cache[file_path]
-                    
-                    if current_info and current_info['modified_time'] != cached_info['modified_time']:
-                        self.file_cache[file_path] = current_info
-                        logger.info(f"File modified: {file_path}")
-            
-            # 削除されたファイルをチェック
-            deleted_files = set(self.file_cache.keys()) - current_files
-            for deleted_file in deleted_files:
-                del self.file_cache[deleted_file]
-                logger.info(f"File deleted: {deleted_file}")
+                    self.file_cache[file_path] = self._file_info_from_scanner(file_path)
+                
+                if change.pop('content_unchanged', False):
+                    continue
+                logger.info(f"File {action} detected by scan: {file_path}")
+                
+                # 取りこぼした変更を通常の変更イベントと同じ形式で通知
+                if self.change_callback:
+                    self.change_callback({
+                        'type': 'obsidian_change',
+                        'file_path': file_path,
+                        'action': action,
+                        'dest_path': change.get('dest_path'),
+                        'content_changed': change.get('content_changed', False),
+                        'timestamp': datetime.now().isoformat()
+                    })
+            
+            return changes
             
         except Exception as e:
             logger.error(f"File cache update failed: {e}")
+            return []
     
     def _handle_file_change(self, change_event: Dict[str, Any]):
         """ファイル変更の処理"""
         try:
-            # 変更コールバックを呼び出し
-            if self.change_callback:
+            # 変更コールバックを呼び出し（内容が変わっていない変更は同期に渡さない）
+            if change_event.get('content_unchanged'):
+                logger.debug(f"Suppressed unchanged content: {change_event['file_path']}")
+            elif self.change_callback:
                 self.change_callback(change_event)
             
             # ファイルキャッシュを更新
@@ -259,18 +488,21 @@ class ObsidianFileMonitor:
             action = change_event['action']
             
             if action == 'created' or action == 'modified':
-                # ファイル情報を更新
-                file_path_obj = Path(file_path)
-                if file_path_obj.exists():
-                    asyncio.create_task(self._update_file_info(file_path))
+                # ファイル情報を更新（スキャナーにも反映し、次回の走査で差分にしない）
+                if self.scanner.update_file(file_path):
+                    self.file_cache[file_path] = self._file_info_from_scanner(file_path)
             elif action == 'deleted':
                 # ファイルをキャッシュから削除
+                self.scanner.remove_file(file_path)
+                self.content_hashes.remove(file_path)
                 if file_path in self.file_cache:
                     del self.file_cache[file_path]
             elif action == 'moved':
                 # ファイルの移動を処理
                 old_path = file_path
                 new_path = change_event['dest_path']
+                self.scanner.move_file(old_path, new_path)
+                self.content_hashes.rename(old_path, new_path)
                 
                 if old_path in self.file_cache:
                     file_info = self.file_cache[old_path]
@@ -308,14 +540,37 @@ class ObsidianFileMonitor:
     
     async def write_file_content(self, file_path: str, content: str) -> bool:
         """ファイルに内容を書き込み"""
+        return await self.write_file_stream(file_path, [content])
+    
+    async def write_file_stream(self, file_path: str, chunks) -> bool:
+        """文字列の反復子（同期・非同期）を一時ファイルに逐次書き込み、完了後にアトミックに置き換え
+        
+        書き込み途中で失敗した場合（chunksが例外を送出した場合を含む）は既存のファイルに手を付けず、一時ファイルを削除する。
+        mkstempの一時ファイルは0600で作られるため、置き換える前に既存のファイル（新規の場合はumaskに従った既定）の権限に揃える。
+        """
+        file_path_obj = Path(file_path)
+        temp_path = None
         try:
-            file_path_obj = Path(file_path)
-            
             # ディレクトリが存在しない場合は作成
             file_path_obj.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(file_path_obj, 'w', encoding='utf-8') as f:
-                f.write(content)
+            # 同じディレクトリに作成し、renameが同一ファイルシステム内で完結するようにする
+            fd, temp_path = tempfile.mkstemp(
+                dir=file_path_obj.parent, prefix=f".{file_path_obj.name}.", suffix='.tmp'
+            )
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                if hasattr(chunks, '__aiter__'):
+                    async for chunk in chunks:
+                        f.write(chunk)
+                else:
+                    for chunk in chunks:
+                        f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            
+            os.chmod(temp_path, self._target_file_mode(file_path_obj))
+            os.replace(temp_path, file_path_obj)
+            temp_path = None
             
             # ファイルキャッシュを更新
             file_info = await self._get_file_info(file_path_obj)
@@ -328,15 +583,30 @@ class ObsidianFileMonitor:
         except Exception as e:
             logger.error(f"File content writing failed: {e}")
             return False
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+            if hasattr(chunks, 'aclose'):
+                # 書き込みを途中でやめた場合も、chunksの先の取得（先読み中のリクエストなど）をその場で止める
+                await chunks.aclose()
+    
+    @staticmethod
+    def _target_file_mode(file_path: Path) -> int:
+        """書き込むファイルの権限（既存のファイルはその権限、新規の場合は0666からumaskを除いたもの）"""
+        try:
+            return stat.S_IMODE(os.stat(file_path).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            return 0o666 & ~umask
     
     async def get_all_markdown_files(self) -> List[Dict[str, Any]]:
         """すべてのMarkdownファイルを取得"""
         try:
             files = []
-            vault_path = Path(self.vault_path)
             
-            for md_file in vault_path.rglob("*.md"):
-                file_info = await self._get_file_info(md_file)
+            for file_path in self.walker.iter_files():
+                file_info = await self._get_file_info(Path(file_path))
                 if file_info:
                     files.append(file_info)
             
@@ -346,15 +616,27 @@ class ObsidianFileMonitor:
             logger.error(f"Markdown files retrieval failed: {e}")
             return []
     
-    async def search_files(self, query: str) -> List[Dict[str, Any]]:
-        """ファイルの検索"""
+    async def search_files(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """ファイルの検索
+        
+        全文検索インデックスの準備ができていれば、タイトル・見出し・タグ・本文をBM25の順位で検索する。
+        準備前はファイル名に検索語を含むファイルを返す。
+        """
         try:
+            if self.search_ready:
+                results = await asyncio.to_thread(self.search_index.search, query, limit)
+                matching_files = []
+                for result in results:
+                    file_info = self.file_cache.get(result['path']) or await self._get_file_info(Path(result['path']))
+                    if file_info:
+                        matching_files.append({**file_info, 'title': result['title'], 'score': result['score']})
+                return matching_files
+            
             matching_files = []
-            vault_path = Path(self.vault_path)
             
-            for md_file in vault_path.rglob("*.md"):
-                if query.lower() in md_file.name.lower():
-                    file_info = await self._get_file_info(md_file)
+            for file_path in self.walker.iter_files():
+                if query.lower() in os.path.basename(file_path).lower():
+                    file_info = await self._get_file_info(Path(file_path))
                     if file_info:
                         matching_files.append(file_info)
             
@@ -368,6 +650,18 @@ class ObsidianFileMonitor:
         """ファイルキャッシュを取得"""
         return self.file_cache.copy()
     
+    def get_event_stats(self) -> Dict[str, Any]:
+        """変更イベントの集約統計を取得"""
+        stats = {
+            'queue': self.bridge.get_stats(),
+            'content_hashes': self.content_hashes.get_stats(),
+            'moves': self.move_detector.get_stats(),
+            'ignore': self.walker.get_stats()
+        }
+        if self.event_handler is not None:
+            stats['coalescer'] = self.event_handler.coalescer.get_stats()
+        return stats
+    
     def get_cache_stats(self) -> Dict[str, Any]:
         """キャッシュ統計を取得"""
         try:
@@ -377,7 +671,8 @@ class ObsidianFileMonitor:
             return {
                 'total_files': total_files,
                 'total_size': total_size,
-                'average_size': total_size / total_files if total_files > 0 else 0
+                'average_size': total_size / total_files if total_files > 0 else 0,
+                'startup': dict(self.startup_stats)
             }
             
         except Exception as e:
@@ -0,0 +1,211 @@
+"""
+フロントマター読み込み
+ファイルの先頭から閉じの---までだけを読み、本文を読まずにフロントマターを取得する
+"""
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# Cで実装されたローダーがあれば使う（libyamlがない環境ではPure Python版）
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+FRONTMATTER_DELIMITER = b'---'
+FRONTMATTER_END_DELIMITERS = (b'---', b'...')
+
+# 最初に読む大きさ（足りない場合は倍にしながら読み足す）と、フロントマターとして読む上限
+CHUNK_SIZE = 1024
+MAX_FRONTMATTER_BYTES = 64 * 1024
+
+# 単純な「キー: 値」の行（値がない場合も含む）
+SIMPLE_LINE_PATTERN = re.compile(r'^([A-Za-z_][\w-]*):(?:[ \t]+(.*?))?[ \t]*$')
+COMMENT_OR_MAPPING_PATTERN = re.compile(r'[ \t]#|:[ \t]')
+INT_PATTERN = re.compile(r'^(?:0|-?[1-9][0-9]*)$')
+DATE_PATTERN = re.compile(r'^([0-9]{4})-([0-9]{2})-([0-9]{2})$')
+# YAMLが文字列以外として解釈する単語（真偽値・null）
+RESERVED_WORDS = frozenset({
+    'yes', 'no', 'true', 'false', 'on', 'off', 'null', 'y', 'n'
+})
+
+
+class _Fallback(Exception):
+    """高速パスで扱えない行があることを示す"""
+
+
+def _parse_simple_value(value: Optional[str]) -> Any:
+    """単純な値をYAMLと同じ型に変換（判断できない場合は_Fallback）"""
+    if not value:
+        return None
+    first = value[0]
+    if first.isalpha():
+        if value.lower() in RESERVED_WORDS or value.endswith(':') or COMMENT_OR_MAPPING_PATTERN.search(value):
+            raise _Fallback
+        return value
+    if first == '"' and len(value) > 1 and value.endswith('"') and not any(c in value[1:-1] for c in '"\\'):
+        return value[1:-1]
+    if first == "'" and len(value) > 1 and value.endswith("'") and "'" not in value[1:-1]:
+        return value[1:-1]
+    if INT_PATTERN.match(value):
+        return int(value)
+    match = DATE_PATTERN.match(value)
+    if match:
+        try:
+            return date(*map(int, match.groups()))
+        except ValueError:
+            raise _Fallback
+    raise _Fallback
+
+
+def load_frontmatter(frontmatter_text: Optional[str]) -> Dict[str, Any]:
+    """フロントマターの文字列を辞書に変換
+
+    全ての行が「キー: 単純な値」であれば正規表現だけで変換し、
+    リスト・入れ子・数値以外の記号で始まる値などを含む場合はYAMLローダーで解析する。
+    どちらの場合もyaml.safe_loadと同じ結果になる。
+    """
+    if not frontmatter_text:
+        return {}
+    try:
+        result = {}
+        for line in frontmatter_text.split('\n'):
+            if not line.strip():
+                continue
+            match = SIMPLE_LINE_PATTERN.match(line)
+            if not match or match.group(1).lower() in RESERVED_WORDS:
+                raise _Fallback
+            result[match.group(1)] = _parse_simple_value(match.group(2))
+        return result
+    except _Fallback:
+        pass
+    frontmatter = yaml.load(frontmatter_text, Loader=YAML_LOADER)
+    return frontmatter if isinstance(frontmatter, dict) else {}
+
+
+def find_frontmatter_end(data: bytes) -> Tuple[Optional[int], Optional[int], bool]:
+    """先頭からのバイト列でフロントマターの範囲を探す
+
+    (本文の開始位置, 閉じ区切りの行の開始位置, フロントマターがないことが確定したか)を返す。
+    閉じ区切りが見つからない場合は位置がNoneになる。
+    """
+    if not data.startswith(FRONTMATTER_DELIMITER[:len(data)]):
+        return None, None, True
+    first_end = data.find(b'\n')
+    if first_end == -1:
+        return None, None, False
+    if data[:first_end].rstrip() != FRONTMATTER_DELIMITER:
+        return None, None, True
+
+    position = first_end + 1
+    while True:
+        end = data.find(b'\n', position)
+        if end == -1:
+            return None, None, False
+        if data[position:end].rstrip() in FRONTMATTER_END_DELIMITERS:
+            return end + 1, position, False
+        position = end + 1
+
+
+def read_frontmatter_text(file_path: str, max_bytes: int = MAX_FRONTMATTER_BYTES) -> Tuple[Optional[str], int]:
+    """ファイル先頭のフロントマターの文字列と、読み込んだバイト数を返す
+
+    CHUNK_SIZEから読み始め、閉じの---が見つかった時点で読み込みをやめる。
+    max_bytesまでに見つからない場合は、ファイル全体を読んで判断する。
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read(CHUNK_SIZE)
+        while True:
+            body_start, closing_start, absent = find_frontmatter_end(data)
+            if absent:
+                return None, len(data)
+            if body_start is not None:
+                break
+            if len(data) >= max_bytes:
+                data += f.read()
+                break
+            chunk = f.read(min(len(data), max_bytes - len(data)))
+            if not chunk:
+                break
+            data += chunk
+
+    # ファイル末尾まで閉じの区切りがない場合は、最終行（改行なし）を区切りとして扱えるか確認する
+    if body_start is None:
+        body_start, closing_start, absent = find_frontmatter_end(data + b'\n')
+        if body_start is None or absent:
+            return None, len(data)
+
+    first_end = data.find(b'\n')
+    text = data[first_end + 1:max(first_end + 1, closing_start - 1)].decode('utf-8')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text, len(data)
+
+
+class FrontmatterReader:
+    """フロントマター読み込みクラス
+
+    タイトル・タグ・notion_idなど、メタデータだけが必要な処理で本文を読まずに済ませる。
+    read_manyは複数のファイルをスレッドプールで並行して読む。
+    """
+
+    def __init__(self, max_bytes: int = MAX_FRONTMATTER_BYTES, workers: Optional[int] = None):
+        self.max_bytes = max_bytes
+        # 読み込み量が小さく解析もPythonで行うため、CPU数より多いスレッドは切り替えの負担になる
+        self.workers = max(1, workers if workers is not None else min(8, os.cpu_count() or 1))
+        self.stats = {
+            'files': 0,
+            'bytes_read': 0,
+            'errors': 0
+        }
+        self._stats_lock = threading.Lock()
+
+    def read(self, file_path: str) -> Dict[str, Any]:
+        """ファイルのフロントマターを取得（ない場合や読み込めない場合は空の辞書）"""
+        try:
+            text, bytes_read = read_frontmatter_text(file_path, self.max_bytes)
+            with self._stats_lock:
+                self.stats['files'] += 1
+                self.stats['bytes_read'] += bytes_read
+            return load_frontmatter(text)
+
+        except Exception as e:
+            with self._stats_lock:
+                self.stats['errors'] += 1
+            logger.warning(f"Failed to read frontmatter {file_path}: {e}")
+            return {}
+
+    def read_many(self, file_paths: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """複数ファイルのフロントマターを取得（ファイルパス → フロントマター）"""
+        file_paths = list(file_paths)
+        workers = min(self.workers, len(file_paths))
+        if workers <= 1:
+            return {file_path: self.read(file_path) for file_path in file_paths}
+
+        # ファイルごとにタスクを作らず、スレッドごとにまとめて読む
+        def read_batch(batch: List[str]) -> List[Dict[str, Any]]:
+            return [self.read(file_path) for file_path in batch]
+
+        batches = [file_paths[i::workers] for i in range(workers)]
+        results: Dict[str, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='frontmatter') as pool:
+            for batch, frontmatters in zip(batches, pool.map(read_batch, batches)):
+                results.update(zip(batch, frontmatters))
+        return {file_path: results[file_path] for file_path in file_paths}
+
+    def read_title(self, file_path: str) -> str:
+        """フロントマターのtitle（ない場合はファイル名）を取得"""
+        title = self.read(file_path).get('title')
+        return str(title) if title else os.path.splitext(os.path.basename(file_path))[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """読み込み統計を取得"""
+        return {
+            **self.stats,
+            'average_bytes': self.stats['bytes_read'] / self.stats['files'] if self.stats['files'] else 0.0
+        }
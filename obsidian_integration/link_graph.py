@@ -0,0 +1,372 @@
+"""
+リンクグラフインデックス
+ノート間の[[ウィキリンク]]を集約し、順方向リンク・バックリンク・未解決リンクを保持する
+"""
+import logging
+import json
+import os
+import re
+from collections import deque
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Set
+
+from .markdown_parser import ObsidianMarkdownParser
+from .vault_walker import VaultWalker
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+# ノート以外（画像・PDFなど）へのリンクとみなす拡張子
+ATTACHMENT_PATTERN = re.compile(r'\.(?!md$)[A-Za-z0-9]{1,5}$')
+
+
+def normalize_target(target: str) -> str:
+    """リンク先の表記を比較用に正規化（大文字小文字・拡張子・区切り文字の違いを無視）"""
+    target = target.strip().replace('\\', '/').strip('/').lower()
+    if target.endswith('.md'):
+        target = target[:-3]
+    return target
+
+
+def note_names(note_id: str) -> List[str]:
+    """ノートIDがリンクされうる名前（パスの末尾部分すべて）を取得"""
+    parts = normalize_target(note_id).split('/')
+    return ['/'.join(parts[i:]) for i in range(len(parts))]
+
+
+class LinkGraphIndex:
+    """ノート間リンクのインデックス
+
+    ノートIDはボルト相対パス（PageMappingIndexと同じ形式）。永続化するのは各ノートの
+    リンク先表記と別名だけで、名前索引・順方向リンク・バックリンクは読み込み時に組み立てる。
+    ノートを更新すると、そのノートのリンクと、そのノートの名前・別名を指すリンクだけを
+    再解決する。
+    """
+
+    def __init__(self, index_path: str, parser: Optional[ObsidianMarkdownParser] = None):
+        self.index_path = Path(index_path)
+        self.parser = parser or ObsidianMarkdownParser()
+        # ノートID → {'targets': [正規化したリンク先], 'aliases': [別名]}
+        self.notes: Dict[str, Dict[str, List[str]]] = {}
+        # 名前（パス末尾・別名） → ノートID
+        self.names: Dict[str, Set[str]] = {}
+        self.aliases: Dict[str, Set[str]] = {}
+        # リンク先表記 → そのリンクを含むノートID
+        self.target_sources: Dict[str, Set[str]] = {}
+        self.forward: Dict[str, Set[str]] = {}
+        self.backlinks: Dict[str, Set[str]] = {}
+        self._loaded = False
+        self._dirty = False
+
+    def _ensure_loaded(self):
+        """インデックスファイルを必要になった時点で読み込む"""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            if not self.index_path.exists():
+                return
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION:
+                logger.warning(f"Link graph version mismatch, starting empty: {self.index_path}")
+                return
+            for note_id, note in data.get('notes', {}).items():
+                self._register(note_id, note.get('targets', []), note.get('aliases', []))
+            for note_id in self.notes:
+                self._resolve_forward(note_id)
+            logger.info(f"Loaded link graph with {len(self.notes)} notes")
+        except Exception as e:
+            logger.error(f"Link graph loading failed: {e}")
+            self._reset()
+
+    def _reset(self):
+        """メモリ上のインデックスを空にする"""
+        self.notes = {}
+        self.names = {}
+        self.aliases = {}
+        self.target_sources = {}
+        self.forward = {}
+        self.backlinks = {}
+
+    def save(self) -> bool:
+        """インデックスをアトミックに保存（変更がなければ何もしない）"""
+        if not self._dirty:
+            return True
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'notes': self.notes}, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_path)
+            self._dirty = False
+            return True
+        except Exception as e:
+            logger.error(f"Link graph saving failed: {e}")
+            return False
+
+    # 更新
+
+    def update_note(self, note_id: str, link_targets: Iterable[str], aliases: Iterable[str] = ()):
+        """ノートのリンクと別名を登録（既存の内容は置き換える）"""
+        self._ensure_loaded()
+        targets = sorted({
+            normalized for normalized in (normalize_target(target) for target in link_targets)
+            if normalized and not ATTACHMENT_PATTERN.search(normalized)
+        })
+        alias_list = sorted({alias.strip() for alias in aliases if alias and alias.strip()})
+
+        old = self.notes.get(note_id)
+        if old is not None and old['targets'] == targets and old['aliases'] == alias_list:
+            return
+        old_names = self._names_of(note_id) if old is not None else set()
+        if old is not None:
+            self._unregister(note_id)
+        self._register(note_id, targets, alias_list)
+
+        # 名前・別名が変わった場合は、それを指すリンクを持つノートも再解決する
+        changed_names = self._names_of(note_id).symmetric_difference(old_names)
+        self._resolve_forward(note_id)
+        self._resolve_sources_of(changed_names, skip=note_id)
+        self._dirty = True
+
+    def update_from_content(self, note_id: str, content: str):
+        """ノートの内容を解析してリンクと別名を登録"""
+        try:
+            parsed_data = self.parser.parse_file(note_id, content)
+            if not parsed_data:
+                return
+            targets = [link['target'] for link in parsed_data['links'] if link['type'] == 'obsidian_link']
+            self.update_note(note_id, targets, self._extract_aliases(parsed_data['frontmatter']))
+        except Exception as e:
+            logger.error(f"Link graph update failed for {note_id}: {e}")
+
+    def remove_note(self, note_id: str):
+        """ノートを削除（このノートへのリンクは未解決または別の同名ノートへのリンクになる）"""
+        self._ensure_loaded()
+        if note_id not in self.notes:
+            return
+        names = self._names_of(note_id)
+        self._unregister(note_id)
+        self._resolve_sources_of(names)
+        self._dirty = True
+
+    def rename_note(self, old_note_id: str, new_note_id: str):
+        """ノートの移動・リネームを反映"""
+        self._ensure_loaded()
+        note = self.notes.get(old_note_id)
+        if note is None:
+            return
+        self.remove_note(old_note_id)
+        self.update_note(new_note_id, note['targets'], note['aliases'])
+
+    def rebuild(self, vault_path: str) -> int:
+        """保管庫全体を走査してインデックスを作り直す"""
+        try:
+            self._loaded = True
+            self._reset()
+            vault = Path(vault_path).resolve()
+            count = 0
+            for root, dirs, files in VaultWalker(str(vault)).walk():
+                for file in files:
+                    if not file.endswith('.md'):
+                        continue
+                    file_path = Path(root) / file
+                    try:
+                        with open(file_path, 'r', encoding='utf-8') as f:
+                            content = f.read()
+                        self.update_from_content(file_path.relative_to(vault).as_posix(), content)
+                    except Exception as e:
+                        # 読めないノートだけを除き、残りのノートで作り直す
+                        logger.warning(f"Skipped {file_path} in link graph rebuild: {e}")
+                        continue
+                    count += 1
+            self._dirty = True
+            self.save()
+            logger.info(f"Link graph rebuilt with {count} notes")
+            return count
+        except Exception as e:
+            logger.error(f"Link graph rebuild failed: {e}")
+            return 0
+
+    def _extract_aliases(self, frontmatter: Dict[str, Any]) -> List[str]:
+        """フロントマターのaliases/aliasを取得"""
+        aliases = frontmatter.get('aliases', frontmatter.get('alias', [])) if frontmatter else []
+        if isinstance(aliases, str):
+            aliases = [alias.strip() for alias in aliases.split(',')]
+        return [str(alias) for alias in aliases or [] if alias]
+
+    def _names_of(self, note_id: str) -> Set[str]:
+        """ノートを指しうるリンク先表記"""
+        names = set(note_names(note_id))
+        names.update(normalize_target(alias) for alias in self.notes.get(note_id, {}).get('aliases', []))
+        return names
+
+    def _register(self, note_id: str, targets: List[str], aliases: List[str]):
+        self.notes[note_id] = {'targets': targets, 'aliases': aliases}
+        for name in note_names(note_id):
+            self.names.setdefault(name, set()).add(note_id)
+        for alias in aliases:
+            self.aliases.setdefault(normalize_target(alias), set()).add(note_id)
+        for target in targets:
+            self.target_sources.setdefault(target, set()).add(note_id)
+
+    def _unregister(self, note_id: str):
+        note = self.notes.pop(note_id)
+        for name in note_names(note_id):
+            self._discard(self.names, name, note_id)
+        for alias in note['aliases']:
+            self._discard(self.aliases, normalize_target(alias), note_id)
+        for target in note['targets']:
+            self._discard(self.target_sources, target, note_id)
+        for linked_id in self.forward.pop(note_id, set()):
+            self._discard(self.backlinks, linked_id, note_id)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, value: str):
+        values = index.get(key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del index[key]
+
+    def _resolve_sources_of(self, names: Iterable[str], skip: Optional[str] = None):
+        """指定した表記へのリンクを持つノートのリンクを再解決"""
+        sources = set()
+        for name in names:
+            sources.update(self.target_sources.get(name, ()))
+        sources.discard(skip)
+        for source in sources:
+            self._resolve_forward(source)
+
+    def _resolve_forward(self, note_id: str):
+        """ノートの順方向リンクを解決し、バックリンクとの差分を反映"""
+        resolved = {self.resolve(target) for target in self.notes[note_id]['targets']}
+        resolved.discard(None)
+        resolved.discard(note_id)
+        old = self.forward.get(note_id, set())
+        for linked_id in old - resolved:
+            self._discard(self.backlinks, linked_id, note_id)
+        for linked_id in resolved - old:
+            self.backlinks.setdefault(linked_id, set()).add(note_id)
+        if resolved:
+            self.forward[note_id] = resolved
+        else:
+            self.forward.pop(note_id, None)
+
+    # 参照
+
+    def resolve(self, target: str) -> Optional[str]:
+        """リンク先表記をノートIDに解決（パスの末尾一致を優先し、次に別名。複数あれば最も浅いパス）"""
+        self._ensure_loaded()
+        normalized = normalize_target(target)
+        candidates = self.names.get(normalized) or self.aliases.get(normalized)
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return next(iter(candidates))
+        return min(candidates, key=lambda note_id: (note_id.count('/'), note_id))
+
+    def get_links(self, note_id: str) -> List[str]:
+        """ノートからのリンク先（解決済み）"""
+        self._ensure_loaded()
+        return sorted(self.forward.get(note_id, ()))
+
+    def get_backlinks(self, note_id: str) -> List[str]:
+        """ノートへのバックリンク"""
+        self._ensure_loaded()
+        return sorted(self.backlinks.get(note_id, ()))
+
+    def get_backlink_count(self, note_id: str) -> int:
+        """ノートへのバックリンク数"""
+        self._ensure_loaded()
+        return len(self.backlinks.get(note_id, ()))
+
+    def get_unresolved_links(self) -> Dict[str, List[str]]:
+        """未解決のリンク先表記と、それを含むノート"""
+        self._ensure_loaded()
+        return {
+            target: sorted(sources)
+            for target, sources in self.target_sources.items()
+            if self.resolve(target) is None
+        }
+
+    def get_related_notes(self, note_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """関連ノートを取得（直接のリンク・バックリンクと、共通のリンク先・リンク元の数で順位付け）"""
+        self._ensure_loaded()
+        scores: Dict[str, float] = {}
+        outgoing = self.forward.get(note_id, set())
+        incoming = self.backlinks.get(note_id, set())
+        # 直接のリンク・バックリンク（相互リンクは両方を加算）
+        for neighbour in outgoing:
+            scores[neighbour] = scores.get(neighbour, 0) + 1.0
+        for neighbour in incoming:
+            scores[neighbour] = scores.get(neighbour, 0) + 1.0
+        # 同じノートにリンクしているノート（共起）
+        for linked_id in outgoing:
+            for co_citing in self.backlinks.get(linked_id, ()):
+                scores[co_citing] = scores.get(co_citing, 0) + 0.5
+        # 同じノートからリンクされているノート
+        for source in incoming:
+            for co_cited in self.forward.get(source, ()):
+                scores[co_cited] = scores.get(co_cited, 0) + 0.5
+        scores.pop(note_id, None)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [{'note_id': related_id, 'score': score} for related_id, score in ranked]
+
+    def get_metrics(self, hub_count: int = 5) -> Dict[str, Any]:
+        """グラフの統計（リンク数・孤立ノート・ハブ・連結成分）"""
+        self._ensure_loaded()
+        orphans = sorted(
+            note_id for note_id in self.notes
+            if note_id not in self.forward and note_id not in self.backlinks
+        )
+        hubs = sorted(self.backlinks.items(), key=lambda item: (-len(item[1]), item[0]))[:hub_count]
+        components = self._connected_components()
+        unresolved = self.get_unresolved_links()
+        return {
+            'total_notes': len(self.notes),
+            'total_links': sum(len(linked) for linked in self.forward.values()),
+            'unresolved_links': len(unresolved),
+            'orphan_count': len(orphans),
+            'orphans': orphans,
+            'hubs': [{'note_id': note_id, 'backlinks': len(sources)} for note_id, sources in hubs],
+            'component_count': len(components),
+            'largest_component': max(components, default=0)
+        }
+
+    def _connected_components(self) -> List[int]:
+        """リンクの向きを無視した連結成分ごとのノート数"""
+        seen: Set[str] = set()
+        sizes = []
+        for start in self.notes:
+            if start in seen:
+                continue
+            seen.add(start)
+            queue = deque([start])
+            size = 0
+            while queue:
+                note_id = queue.popleft()
+                size += 1
+                for neighbour in self.forward.get(note_id, set()) | self.backlinks.get(note_id, set()):
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        queue.append(neighbour)
+            sizes.append(size)
+        return sizes
+
+    def is_empty(self) -> bool:
+        """インデックスが空かどうか"""
+        self._ensure_loaded()
+        return not self.notes
+
+    def get_stats(self) -> Dict[str, Any]:
+        """インデックス統計を取得"""
+        self._ensure_loaded()
+        return {
+            'notes': len(self.notes),
+            'links': sum(len(linked) for linked in self.forward.values()),
+            'index_path': str(self.index_path)
+        }
@@ -0,0 +1,278 @@
+"""
+Obsidian Markdown トークナイザー
+ノートを1行ずつ1回だけ走査し、見出し・段落・リスト・引用・コードブロック・
+リンク・タグ・画像・単語数をまとめて抽出する
+"""
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+# 行の種類を判定するパターン（1行につき1回だけ評価する）
+LINE_PATTERN = re.compile(r"""
+    (?P<fence>^[ \t]*(?P<fence_marker>`{3,}|~{3,})[ \t]*(?P<language>[^\s`]*).*$)
+  | (?P<heading>^(?P<hashes>\#{1,6})[ \t]+(?P<heading_text>.+?)[ \t]*$)
+  | (?P<quote>^[ ]{0,3}>[ ]?(?P<quote_text>.*)$)
+  | (?P<list>^(?P<indent>[ \t]*)(?:(?P<bullet>[-*+])|(?P<number>\d{1,9})\.)[ \t]+(?P<item_text>.*)$)
+""", re.VERBOSE)
+
+# インライン要素（インラインコード内のリンクやタグは無視する）
+INLINE_PATTERN = re.compile(r"""
+    (?P<code_span>`+)[^`]+?(?P=code_span)
+  | (?P<image>!\[(?P<alt_text>[^\]]*)\]\((?P<image_path>[^)]+)\))
+  | (?P<wikilink>(?P<embed>!)?\[\[(?P<wikilink_body>[^\]]+)\]\])
+  | (?P<markdown_link>\[(?P<link_text>[^\]]+)\]\((?P<link_url>[^)]+)\))
+  | (?<![\w/&\#])\#(?P<tag>[\w/-]+)
+""", re.VERBOSE)
+
+# インライン要素の可能性がある文字（含まれない行は解析を省略）
+INLINE_TRIGGER = re.compile(r'[\[#`]')
+
+WORD_PATTERN = re.compile(r'\b\w+\b')
+FENCE_PATTERN = re.compile(r'^[ \t]*(`{3,}|~{3,})')
+NUMERIC_TAG_PATTERN = re.compile(r'^[\d/-]+$')
+HEADING_ID_STRIP_PATTERN = re.compile(r'[^\w\s-]')
+HEADING_ID_SEPARATOR_PATTERN = re.compile(r'[-\s]+')
+
+FRONTMATTER_DELIMITER = '---'
+FRONTMATTER_END_DELIMITERS = ('---', '...')
+
+
+def generate_heading_id(text: str) -> str:
+    """見出しIDの生成（特殊文字を除去し、小文字に変換）"""
+    id_text = HEADING_ID_STRIP_PATTERN.sub('', text.lower())
+    id_text = HEADING_ID_SEPARATOR_PATTERN.sub('-', id_text)
+    return id_text.strip('-')
+
+
+class MarkdownTokenizer:
+    """1パスのObsidian Markdownトークナイザークラス
+
+    行番号・位置はすべて元のファイル（フロントマターを含む）を基準にした値を返す。
+    コードブロック内の行は見出し・リンク・タグ・単語数の対象外とする。
+    """
+
+    def tokenize(self, content: str) -> Dict[str, Any]:
+        """ノートを走査して構造を抽出"""
+        headings: List[Dict[str, Any]] = []
+        paragraphs: List[Dict[str, Any]] = []
+        lists: List[Dict[str, Any]] = []
+        quotes: List[Dict[str, Any]] = []
+        links: List[Dict[str, Any]] = []
+        tags: List[Dict[str, Any]] = []
+        images: List[Dict[str, Any]] = []
+        code_blocks: List[Dict[str, Any]] = []
+        word_count = 0
+
+        frontmatter_text, body_start = self.split_frontmatter(content)
+        lines = content[body_start:].split('\n') if body_start else content.split('\n')
+        first_line = content.count('\n', 0, body_start) + 1
+        offset = body_start
+
+        paragraph: List[str] = []
+        paragraph_line = 0
+        current_list: Optional[Dict[str, Any]] = None
+        current_quote: Optional[Dict[str, Any]] = None
+        fence: Optional[Dict[str, Any]] = None
+
+        def flush_paragraph():
+            if paragraph:
+                text = '\n'.join(paragraph)
+                paragraphs.append({'text': text, 'line_number': paragraph_line, 'length': len(text)})
+                paragraph.clear()
+
+        def scan_inline(text: str, line_number: int, base: int):
+            if not INLINE_TRIGGER.search(text):
+                return
+            for match in INLINE_PATTERN.finditer(text):
+                kind = match.lastgroup
+                position = base + match.start()
+                if kind == 'tag':
+                    tag = match.group('tag').rstrip('/-')
+                    if tag and not NUMERIC_TAG_PATTERN.match(tag):
+                        tags.append({'tag': tag, 'position': position, 'line_number': line_number})
+                elif kind == 'wikilink':
+                    body = match.group('wikilink_body')
+                    target, _, alias = body.partition('|')
+                    target, _, heading = target.partition('#')
+                    target = target.strip()
+                    links.append({
+                        'type': 'obsidian_link',
+                        'target': target,
+                        'text': body,
+                        'display_text': alias.strip() or target or body,
+                        'heading': heading.strip() or None,
+                        'embed': match.group('embed') is not None,
+                        'position': position,
+                        'line_number': line_number
+                    })
+                elif kind == 'image':
+                    images.append({
+                        'alt_text': match.group('alt_text'),
+                        'path': match.group('image_path'),
+                        'position': position,
+                        'line_number': line_number
+                    })
+                elif kind == 'markdown_link':
+                    links.append({
+                        'type': 'markdown_link',
+                        'target': match.group('link_url'),
+                        'text': match.group('link_text'),
+                        'display_text': match.group('link_text'),
+                        'position': position,
+                        'line_number': line_number
+                    })
+
+        for index, line in enumerate(lines):
+            line_number = first_line + index
+            line_offset = offset
+            offset += len(line) + 1
+
+            # コードブロック内は終了フェンスまでそのまま取り込む
+            if fence is not None:
+                stripped = line.strip()
+                if stripped.startswith(fence['marker']) and not stripped.strip(fence['marker'][0]):
+                    code = '\n'.join(fence['lines'])
+                    code_blocks.append({
+                        'language': fence['language'],
+                        'code': code,
+                        'position': fence['position'],
+                        'line_number': fence['line_number'],
+                        'length': len(code)
+                    })
+                    fence = None
+                else:
+                    fence['lines'].append(line)
+                continue
+
+            if not line.strip():
+                flush_paragraph()
+                current_list = None
+                current_quote = None
+                continue
+
+            match = LINE_PATTERN.match(line)
+            kind = match.lastgroup if match else None
+            if kind != 'fence':
+                word_count += len(WORD_PATTERN.findall(line))
+
+            if kind != 'list':
+                current_list = None
+            if kind != 'quote':
+                current_quote = None
+            if kind is not None:
+                flush_paragraph()
+
+            if kind is None:
+                if not paragraph:
+                    paragraph_line = line_number
+                paragraph.append(line)
+                scan_inline(line, line_number, line_offset)
+            elif kind == 'fence':
+                fence = {
+                    'marker': match.group('fence_marker'),
+                    'language': match.group('language') or 'text',
+                    'position': line_offset + line.index(match.group('fence_marker')),
+                    'line_number': line_number,
+                    'lines': []
+                }
+            elif kind == 'heading':
+                text = match.group('heading_text')
+                headings.append({
+                    'level': len(match.group('hashes')),
+                    'text': text,
+                    'line_number': line_number,
+                    'id': generate_heading_id(text)
+                })
+                scan_inline(text, line_number, line_offset + match.start('heading_text'))
+            elif kind == 'quote':
+                text = match.group('quote_text')
+                if current_quote is None:
+                    current_quote = {'items': [], 'line_number': line_number}
+                    quotes.append(current_quote)
+                current_quote['items'].append({'text': text, 'line_number': line_number})
+                scan_inline(text, line_number, line_offset + match.start('quote_text'))
+            else:
+                text = match.group('item_text')
+                list_type = 'unordered' if match.group('bullet') else 'ordered'
+                if current_list is None or current_list['type'] != list_type:
+                    current_list = {'type': list_type, 'items': [], 'line_number': line_number}
+                    lists.append(current_list)
+                current_list['items'].append({
+                    'text': text,
+                    'line_number': line_number,
+                    'indent': len(match.group('indent').expandtabs(4))
+                })
+                scan_inline(text, line_number, line_offset + match.start('item_text'))
+
+        if fence is not None:
+            # 閉じられていないコードブロックは末尾までを内容とする
+            code = '\n'.join(fence['lines'])
+            code_blocks.append({
+                'language': fence['language'],
+                'code': code,
+                'position': fence['position'],
+                'line_number': fence['line_number'],
+                'length': len(code)
+            })
+        flush_paragraph()
+
+        return {
+            'frontmatter_text': frontmatter_text,
+            'body_start': body_start,
+            'headings': headings,
+            'paragraphs': paragraphs,
+            'lists': lists,
+            'quotes': quotes,
+            'links': links,
+            'tags': tags,
+            'images': images,
+            'code_blocks': code_blocks,
+            'word_count': word_count,
+            'line_count': first_line - 1 + len(lines)
+        }
+
+    def split_frontmatter(self, content: str) -> Tuple[Optional[str], int]:
+        """フロントマター（先頭の---から次の---または...まで）を切り出し、本文の開始位置を返す
+
+        本文全体を分割せず、フロントマターの範囲だけを走査する。
+        """
+        if not content.startswith(FRONTMATTER_DELIMITER):
+            return None, 0
+        first_end = content.find('\n')
+        if first_end == -1 or content[:first_end].rstrip() != FRONTMATTER_DELIMITER:
+            return None, 0
+
+        position = first_end + 1
+        while position <= len(content):
+            end = content.find('\n', position)
+            line_end = len(content) if end == -1 else end
+            if content[position:line_end].rstrip() in FRONTMATTER_END_DELIMITERS:
+                frontmatter_text = content[first_end + 1:max(first_end + 1, position - 1)]
+                return frontmatter_text, min(line_end + 1, len(content))
+            if end == -1:
+                break
+            position = end + 1
+        return None, 0
+
+    def count_words(self, content: str, body_start: int = 0) -> int:
+        """フロントマターとコードブロックを除いた単語数を数える（tokenizeのword_countと同じ値）"""
+        if '```' not in content and '~~~' not in content:
+            return len(WORD_PATTERN.findall(content, body_start))
+
+        word_count = 0
+        fence: Optional[str] = None
+        for line in content[body_start:].split('\n'):
+            if fence is not None:
+                stripped = line.strip()
+                if stripped.startswith(fence) and not stripped.strip(fence[0]):
+                    fence = None
+                continue
+            match = FENCE_PATTERN.match(line)
+            if match:
+                fence = match.group(1)
+                continue
+            word_count += len(WORD_PATTERN.findall(line))
+        return word_count
+
+
+# トークナイザーは状態を持たないため共有インスタンスを使う
+markdown_tokenizer = MarkdownTokenizer()
@@ -0,0 +1,186 @@
+"""
+移動の検出
+同じ変更のまとまりに含まれる削除と作成を突き合わせ、監視の外で行われた移動・リネームを1つの移動にまとめる
+"""
+import logging
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+from .content_hash_store import ContentHashStore, sketch_similarity
+
+logger = logging.getLogger(__name__)
+
+# 内容の類似度だけで移動とみなす下限
+SIMILARITY_THRESHOLD = 0.6
+
+# inodeが一致する場合の類似度の下限（削除直後に同じinodeが再利用された別のファイルを除く）
+INODE_SIMILARITY_THRESHOLD = 0.25
+
+# 類似度で突き合わせる削除・作成の組み合わせの上限（大量の変更で二乗の計算にならないようにする）
+MAX_SIMILARITY_PAIRS = 250000
+
+
+class MoveDetector:
+    """移動検出クラス
+
+    git checkoutやサービス停止中のリネームは、走査やwatchdogからは削除と作成として届く。
+    削除されたファイルと作成されたファイルを次の順に突き合わせ、対応が取れたものを移動にする。
+
+    1. デバイスとinodeが同じ（内容の類似度がINODE_SIMILARITY_THRESHOLD以上の場合）
+    2. 正規化した内容のハッシュが同じ
+    3. 内容の類似度（行スケッチから推定）がSIMILARITY_THRESHOLD以上
+
+    削除前の内容はContentHashStoreの記録を使うため、ファイルを読み直すのは作成側だけ。
+    移動にまとめたイベントには、内容も変わったかをcontent_changedに付ける。
+    """
+
+    def __init__(self, content_hashes: ContentHashStore, scanner=None):
+        self.content_hashes = content_hashes
+        # 削除イベントにinodeが付いていない場合（watchdog経由）に記録を引く
+        self.scanner = scanner
+        self.stats = {
+            'batches': 0,
+            'moves_by_inode': 0,
+            'moves_by_content': 0,
+            'moves_by_similarity': 0
+        }
+
+    def detect(self, changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """削除と作成を突き合わせ、移動にまとめた変更のリストを返す"""
+        deleted = [change for change in changes if change.get('action') == 'deleted']
+        created = [change for change in changes if change.get('action') == 'created']
+        if not deleted or not created:
+            return changes
+        self.stats['batches'] += 1
+
+        try:
+            moves = self._match(deleted, created)
+        except Exception as e:
+            logger.error(f"Move detection failed: {e}")
+            return changes
+        if not moves:
+            return changes
+
+        result = []
+        matched_sources = {id(source) for source, _ in moves.values()}
+        for change in changes:
+            if id(change) in matched_sources:
+                continue
+            move = moves.get(id(change))
+            if move is None:
+                result.append(change)
+                continue
+            source, content_changed = move
+            self.content_hashes.rename(source['file_path'], change['file_path'])
+            if content_changed:
+                # 移動先の現在の内容は同期が完了するまで記録しない（confirm()で記録される）
+                self.content_hashes.has_changed(change['file_path'], record=False)
+            logger.info(f"Detected move: {source['file_path']} -> {change['file_path']}")
+            result.append({
+                **change,
+                'action': 'moved',
+                'file_path': source['file_path'],
+                'dest_path': change['file_path'],
+                'content_changed': content_changed
+            })
+        return result
+
+    def _match(self, deleted: List[Dict[str, Any]],
+               created: List[Dict[str, Any]]) -> Dict[int, Tuple[Dict[str, Any], bool]]:
+        """作成イベントのid → (対応する削除イベント, 内容が変わったか)"""
+        sources = {}
+        for change in deleted:
+            file_path = change['file_path']
+            sources[id(change)] = {
+                'change': change,
+                'identity': self._identity(change),
+                'hash': self.content_hashes.get_hash(file_path),
+                'sketch': self.content_hashes.get_sketch(file_path)
+            }
+        targets = {}
+        for change in created:
+            try:
+                stat = os.stat(change['file_path'])
+            except OSError:
+                continue
+            fingerprint = self.content_hashes.fingerprint(change['file_path'])
+            if fingerprint is None:
+                continue
+            targets[id(change)] = {
+                'change': change,
+                'identity': (stat.st_dev, stat.st_ino),
+                'hash': fingerprint[0],
+                'sketch': fingerprint[1]
+            }
+
+        moves: Dict[int, Tuple[Dict[str, Any], bool]] = {}
+
+        def pair(target_id: int, source_id: int, stat_key: str):
+            source = sources.pop(source_id)
+            target = targets.pop(target_id)
+            moves[target_id] = (source['change'], source['hash'] != target['hash'])
+            self.stats[stat_key] += 1
+
+        # 1. デバイスとinode
+        by_identity = {source['identity']: source_id for source_id, source in sources.items() if source['identity']}
+        for target_id, target in list(targets.items()):
+            source_id = by_identity.get(target['identity'])
+            if source_id is None or source_id not in sources:
+                continue
+            source = sources[source_id]
+            if (source['hash'] == target['hash']
+                    or sketch_similarity(source['sketch'], target['sketch']) >= INODE_SIMILARITY_THRESHOLD):
+                pair(target_id, source_id, 'moves_by_inode')
+
+        # 2. 内容のハッシュ（同じ内容の削除が複数ある場合はファイル名が同じものを選ぶ）
+        by_hash: Dict[str, List[int]] = {}
+        for source_id, source in sources.items():
+            if source['hash']:
+                by_hash.setdefault(source['hash'], []).append(source_id)
+        for target_id, target in list(targets.items()):
+            candidates = [source_id for source_id in by_hash.get(target['hash'], []) if source_id in sources]
+            source_id = self._choose(candidates, sources, target)
+            if source_id is not None:
+                pair(target_id, source_id, 'moves_by_content')
+
+        # 3. 内容の類似度（類似度の高い組から決める）
+        if not sources or not targets or len(sources) * len(targets) > MAX_SIMILARITY_PAIRS:
+            return moves
+        scored = []
+        for source_id, source in sources.items():
+            if not source['sketch']:
+                continue
+            for target_id, target in targets.items():
+                similarity = sketch_similarity(source['sketch'], target['sketch'])
+                if similarity >= SIMILARITY_THRESHOLD:
+                    same_name = (os.path.basename(source['change']['file_path'])
+                                 == os.path.basename(target['change']['file_path']))
+                    scored.append((similarity, same_name, source_id, target_id))
+        for _, _, source_id, target_id in sorted(scored, key=lambda item: (item[0], item[1]), reverse=True):
+            if source_id in sources and target_id in targets:
+                pair(target_id, source_id, 'moves_by_similarity')
+        return moves
+
+    def _identity(self, change: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+        """削除イベントのファイルのデバイスとinode"""
+        if change.get('inode') is not None:
+            return change.get('device'), change['inode']
+        if self.scanner is not None:
+            record = self.scanner.get(change['file_path'])
+            if record is not None:
+                return record['device'], record['inode']
+        return None
+
+    @staticmethod
+    def _choose(candidates: List[int], sources: Dict[int, Dict[str, Any]],
+                target: Dict[str, Any]) -> Optional[int]:
+        if len(candidates) == 1:
+            return candidates[0]
+        name = os.path.basename(target['change']['file_path'])
+        same_name = [source_id for source_id in candidates
+                     if os.path.basename(sources[source_id]['change']['file_path']) == name]
+        return same_name[0] if len(same_name) == 1 else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """検出統計を取得"""
+        return dict(self.stats)
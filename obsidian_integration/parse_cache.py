@@ -0,0 +1,242 @@
+"""
+永続解析キャッシュ
+(保管庫からの相対パス, mtime_ns, サイズ, パーサーバージョン)をキーに解析結果をSQLiteへ保存し、
+変更のないファイルは読み込まずに前回の結果を返す
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from .markdown_parser import ObsidianMarkdownParser, PARSER_VERSION
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    parser_version INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    raw_content TEXT NOT NULL,
+    word_count INTEGER NOT NULL
+)
+"""
+
+# まとめて書き込む件数
+FLUSH_THRESHOLD = 500
+
+
+def hash_content(data: bytes) -> str:
+    """ファイル内容のハッシュ"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def decode_note(data: bytes) -> str:
+    """ファイル内容をテキストモードで読んだ場合と同じ文字列に変換"""
+    content = data.decode('utf-8')
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
+
+
+def parse_note_source(parser: ObsidianMarkdownParser, file_path: str, data: bytes) -> Optional[Tuple[str, int]]:
+    """ファイル内容を解析して(本文, 単語数)を返す"""
+    parsed_data = parser.parse_file(file_path, decode_note(data))
+    if not parsed_data:
+        return None
+    return parsed_data['content']['raw_content'], parsed_data['metadata']['word_count']
+
+
+def build_note(file_path: str, stat: os.stat_result, raw_content: str, word_count: int) -> Dict[str, Any]:
+    """解析結果とstat結果からノート情報を組み立てる"""
+    return {
+        'raw_content': raw_content,
+        'word_count': word_count,
+        'name': os.path.basename(file_path),
+        'modified_time': datetime.fromtimestamp(stat.st_mtime).isoformat()
+    }
+
+
+def build_content_entry(file_path: str, note: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """ノート情報を分析エンジンに渡すコンテンツ形式に変換（本文が空の場合はNone）"""
+    if not note or not note['raw_content']:
+        return None
+    return {
+        "id": file_path,
+        "text": note['raw_content'],
+        "metadata": {
+            "title": note['name'],
+            "source": "obsidian",
+            "file_path": file_path,
+            "last_modified": note['modified_time'],
+            "word_count": note['word_count']
+        }
+    }
+
+
+class ParseCache:
+    """永続解析キャッシュクラス
+
+    mtime_nsとサイズが一致すればファイルを読まずに結果を返す。
+    git checkout直後のCIのようにmtimeだけが変わった場合は、サイズが一致すれば
+    内容のハッシュを比較し、同じなら再解析せずにmtimeだけを更新する。
+    """
+
+    def __init__(self, db_path: str, vault_path: Optional[str] = None,
+                 parser: Optional[ObsidianMarkdownParser] = None):
+        self.db_path = db_path
+        self.vault_path = os.path.abspath(vault_path) if vault_path else None
+        self.parser = parser or ObsidianMarkdownParser()
+        self._connection: Optional[sqlite3.Connection] = None
+        # 未保存の書き込み（キー → 行）。保存前の再参照にも使う
+        self._pending: Dict[str, Tuple[Any, ...]] = {}
+        self.stats = {
+            'hits': 0,
+            'hash_hits': 0,
+            'misses': 0,
+            'errors': 0
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        """データベースに接続（初回のみテーブルを作成）"""
+        if self._connection is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.db_path)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(SCHEMA)
+        return self._connection
+
+    def _cache_key(self, file_path: str) -> str:
+        """キャッシュのキー（保管庫からの相対パス）"""
+        absolute_path = os.path.abspath(file_path)
+        if self.vault_path:
+            prefix = self.vault_path + os.sep
+            if absolute_path.startswith(prefix):
+                absolute_path = absolute_path[len(prefix):]
+        return absolute_path.replace(os.sep, '/') if os.sep != '/' else absolute_path
+
+    def get_note(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """ノートの本文・単語数・ファイル情報を取得（変更がなければファイルを読まない）"""
+        try:
+            stat = os.stat(file_path)
+            note = self.lookup(file_path, stat)
+            if note is not None:
+                return note
+
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            content_hash = hash_content(data)
+            note = self.lookup(file_path, stat, content_hash)
+            if note is not None:
+                return note
+
+            parsed = parse_note_source(self.parser, file_path, data)
+            if parsed is None:
+                return None
+            return self.store(file_path, stat, content_hash, *parsed)
+
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"Failed to parse file {file_path}: {e}")
+            return None
+
+    def get_content_entry(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """分析エンジンに渡すコンテンツ形式で取得（本文が空の場合はNone）"""
+        return build_content_entry(file_path, self.get_note(file_path))
+
+    def lookup(self, file_path: str, stat: os.stat_result,
+               content_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みのノート情報を取得（見つからない場合はNone）
+
+        content_hashを渡した場合は、mtimeが異なってもサイズと内容のハッシュが一致すれば
+        キャッシュ済みとみなし、mtimeを更新する。
+        """
+        key = self._cache_key(file_path)
+        pending = self._pending.get(key)
+        if pending is not None:
+            row = pending[1:]
+        else:
+            row = self._connect().execute(
+                'SELECT mtime_ns, size, parser_version, content_hash, raw_content, word_count '
+                'FROM notes WHERE path = ?', (key,)
+            ).fetchone()
+
+        if not row or row[1] != stat.st_size or row[2] != PARSER_VERSION:
+            return None
+        if row[0] == stat.st_mtime_ns:
+            self.stats['hits'] += 1
+            return build_note(file_path, stat, row[4], row[5])
+        if content_hash is not None and content_hash == row[3]:
+            self.stats['hash_hits'] += 1
+            self._queue((key, stat.st_mtime_ns, stat.st_size, PARSER_VERSION, content_hash, row[4], row[5]))
+            return build_note(file_path, stat, row[4], row[5])
+        return None
+
+    def store(self, file_path: str, stat: os.stat_result, content_hash: str,
+              raw_content: str, word_count: int) -> Dict[str, Any]:
+        """解析結果を保存してノート情報を返す"""
+        self.stats['misses'] += 1
+        key = self._cache_key(file_path)
+        self._queue((key, stat.st_mtime_ns, stat.st_size, PARSER_VERSION, content_hash, raw_content, word_count))
+        return build_note(file_path, stat, raw_content, word_count)
+
+    def _queue(self, row: Tuple[Any, ...]):
+        """書き込みを保留し、一定件数ごとにまとめて保存"""
+        self._pending[row[0]] = row
+        if len(self._pending) >= FLUSH_THRESHOLD:
+            self.flush()
+
+    def flush(self) -> bool:
+        """保留中の書き込みを1トランザクションで保存"""
+        if not self._pending:
+            return True
+        try:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO notes '
+                    '(path, mtime_ns, size, parser_version, content_hash, raw_content, word_count) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)', list(self._pending.values())
+                )
+            self._pending.clear()
+            return True
+        except Exception as e:
+            logger.error(f"Parse cache saving failed: {e}")
+            return False
+
+    def prune(self, existing_paths: List[str]) -> int:
+        """存在しなくなったファイルのエントリを削除"""
+        try:
+            self.flush()
+            keep = {self._cache_key(path) for path in existing_paths}
+            connection = self._connect()
+            stale = [(path,) for (path,) in connection.execute('SELECT path FROM notes') if path not in keep]
+            with connection:
+                connection.executemany('DELETE FROM notes WHERE path = ?', stale)
+            return len(stale)
+        except Exception as e:
+            logger.error(f"Parse cache pruning failed: {e}")
+            return 0
+
+    def close(self):
+        """保留中の書き込みを保存して接続を閉じる"""
+        self.flush()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キャッシュ統計を取得"""
+        lookups = self.stats['hits'] + self.stats['hash_hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'pending_writes': len(self._pending),
+            'hit_rate': (self.stats['hits'] + self.stats['hash_hits']) / lookups if lookups else 0.0
+        }
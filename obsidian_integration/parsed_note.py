@@ -0,0 +1,145 @@
+"""
+解析済みノート
+parse_fileの結果を、各項目が初回アクセス時に計算される読み取り専用のマッピングとして表す
+"""
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+
+class LazyFacets(Mapping):
+    """キーごとに初回アクセス時に値を計算してキャッシュする読み取り専用マッピング
+
+    辞書と同じように[]・get・in・items・keysで参照できる。
+    """
+
+    __slots__ = ('_values',)
+
+    FACETS: Tuple[str, ...] = ()
+
+    def __init__(self):
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        if key not in self.FACETS:
+            raise KeyError(key)
+        value = self._compute(key)
+        self._values[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self.FACETS)
+
+    def __len__(self) -> int:
+        return len(self.FACETS)
+
+    def _compute(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def is_computed(self, key: str) -> bool:
+        """項目が計算済みかどうか"""
+        return key in self._values
+
+    def to_dict(self) -> Dict[str, Any]:
+        """全項目を計算して通常の辞書に変換（JSONへの書き出し用）"""
+        return {
+            key: value.to_dict() if isinstance(value, LazyFacets) else value
+            for key, value in self.items()
+        }
+
+    def __repr__(self) -> str:
+        computed = ', '.join(key for key in self.FACETS if key in self._values)
+        return f"<{type(self).__name__} computed=[{computed}]>"
+
+
+class ParsedNote(LazyFacets):
+    """ObsidianMarkdownParser.parse_fileの結果
+
+    本文・フロントマター・単語数だけを読む呼び出し側は全体のトークナイズを行わない。
+    見出し・段落・リスト・引用・リンク・タグ・画像・コードブロックのいずれかに
+    アクセスした時点で1回だけトークナイズし、結果を共有する。
+    """
+
+    __slots__ = ('file_path', 'source', 'parsed_at', '_parser', '_tokens', '_frontmatter_split')
+
+    FACETS = ('file_info', 'frontmatter', 'content', 'links', 'tags', 'images', 'code_blocks', 'metadata')
+
+    def __init__(self, parser, file_path: str, source: str):
+        super().__init__()
+        self.file_path = file_path
+        self.source = source
+        self.parsed_at = datetime.now().isoformat()
+        self._parser = parser
+        self._tokens: Optional[Dict[str, Any]] = None
+        self._frontmatter_split: Optional[Tuple[Optional[str], int]] = None
+
+    @property
+    def tokens(self) -> Dict[str, Any]:
+        """トークナイズ結果（初回アクセス時に計算）"""
+        if self._tokens is None:
+            self._tokens = self._parser.tokenizer.tokenize(self.source)
+            self._frontmatter_split = (self._tokens['frontmatter_text'], self._tokens['body_start'])
+        return self._tokens
+
+    @property
+    def frontmatter_split(self) -> Tuple[Optional[str], int]:
+        """(フロントマターの文字列, 本文の開始位置)"""
+        if self._frontmatter_split is None:
+            self._frontmatter_split = self._parser.tokenizer.split_frontmatter(self.source)
+        return self._frontmatter_split
+
+    def _compute(self, key: str) -> Any:
+        if key == 'file_info':
+            return self._parser._get_file_info(self.file_path)
+        if key == 'frontmatter':
+            return self._parser._parse_frontmatter(self.frontmatter_split[0])
+        if key == 'content':
+            return NoteContent(self)
+        if key == 'metadata':
+            return NoteMetadata(self)
+        return self.tokens[key]
+
+
+class NoteContent(LazyFacets):
+    """ParsedNote['content']（raw_contentはトークナイズせずに返す）"""
+
+    __slots__ = ('_note',)
+
+    FACETS = ('headings', 'paragraphs', 'lists', 'quotes', 'raw_content')
+
+    def __init__(self, note: ParsedNote):
+        super().__init__()
+        self._note = note
+
+    def _compute(self, key: str) -> Any:
+        if key == 'raw_content':
+            return self._note.source[self._note.frontmatter_split[1]:].strip()
+        return self._note.tokens[key]
+
+
+class NoteMetadata(LazyFacets):
+    """ParsedNote['metadata']（単語数はトークナイズ済みならその値を使う）"""
+
+    __slots__ = ('_note',)
+
+    FACETS = ('word_count', 'character_count', 'line_count', 'parsed_at')
+
+    def __init__(self, note: ParsedNote):
+        super().__init__()
+        self._note = note
+
+    def _compute(self, key: str) -> Any:
+        note = self._note
+        if key == 'word_count':
+            if note._tokens is not None:
+                return note._tokens['word_count']
+            return note._parser.tokenizer.count_words(note.source, note.frontmatter_split[1])
+        if key == 'character_count':
+            return len(note.source)
+        if key == 'line_count':
+            return note.source.count('\n') + 1
+        return note.parsed_at
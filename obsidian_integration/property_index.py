@@ -0,0 +1,387 @@
+"""
+タグ・プロパティインデックス
+タグとフロントマターのキー・値からノートへの転置インデックスを保持し、
+ファイルを読まずにタグの絞り込み・プロパティの一致/範囲検索・更新日時順の並べ替えを行う
+"""
+import bisect
+import heapq
+import itertools
+import logging
+import json
+import os
+from collections import Counter
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+from .markdown_parser import ObsidianMarkdownParser
+from .vault_walker import VaultWalker
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+# タグとして扱うフロントマターのキー（プロパティには含めない）
+FRONTMATTER_TAG_KEYS = ('tags', 'tag')
+
+
+def normalize_tag(tag: str) -> str:
+    """タグを比較用に正規化（先頭の#と大文字小文字の違いを無視）"""
+    return str(tag).strip().lstrip('#').strip('/').lower()
+
+
+def expand_tag(tag: str) -> List[str]:
+    """入れ子のタグを親タグを含めて展開（project/alpha → project, project/alpha）"""
+    parts = tag.split('/')
+    return ['/'.join(parts[:i + 1]) for i in range(len(parts))]
+
+
+def normalize_value(value: Any) -> Optional[Any]:
+    """プロパティ値を索引用に正規化（数値はそのまま、日付はISO形式、文字列は小文字）"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, str):
+        value = value.strip().lower()
+        return value or None
+    return None
+
+
+def sort_key(value: Any) -> Tuple[int, Any]:
+    """数値と文字列が混在しても比較できる並び順（数値が先）"""
+    return (0, value) if isinstance(value, (int, float)) else (1, value)
+
+
+class NotePropertyIndex:
+    """タグ・プロパティの転置インデックス
+
+    ノートIDはボルト相対パス（LinkGraphIndexと同じ形式）。プロパティはキーごとに
+    値 → ノートIDの辞書（一致検索用）と、(値, ノートID)の整列済みリスト（範囲検索用）を持つ。
+    ノートの更新は、そのノートの旧エントリを取り除いて新しいエントリを追加するだけで行う。
+    """
+
+    def __init__(self, index_path: str, parser: Optional[ObsidianMarkdownParser] = None):
+        self.index_path = Path(index_path)
+        self.parser = parser or ObsidianMarkdownParser()
+        # ノートID → {'tags': [タグ], 'properties': {キー: [値]}, 'modified': 更新日時}
+        self.notes: Dict[str, Dict[str, Any]] = {}
+        self.tags: Dict[str, Set[str]] = {}
+        self.properties: Dict[str, Dict[Any, Set[str]]] = {}
+        self.sorted_properties: Dict[str, List[Tuple[Tuple[int, Any], str]]] = {}
+        # (更新日時, ノートID)の整列済みリスト（多数のノートに一致するクエリの並べ替え用）
+        self.by_modified: List[Tuple[float, str]] = []
+        self._loaded = False
+        self._loaded_mtime_ns: Optional[int] = None
+        self._dirty = False
+
+    def _ensure_loaded(self):
+        """インデックスファイルを必要になった時点で読み込む"""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            if not self.index_path.exists():
+                return
+            self._loaded_mtime_ns = self.index_path.stat().st_mtime_ns
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION:
+                logger.warning(f"Property index version mismatch, starting empty: {self.index_path}")
+                return
+            for note_id, note in data.get('notes', {}).items():
+                self._register(note_id, note.get('tags', []), note.get('properties', {}), note.get('modified', 0.0))
+            logger.info(f"Loaded property index with {len(self.notes)} notes")
+        except Exception as e:
+            logger.error(f"Property index loading failed: {e}")
+            self._reset()
+
+    def refresh(self) -> bool:
+        """別プロセスが保存したインデックスがあれば読み込み直す（読み直した場合True）"""
+        try:
+            if not self._loaded or self._dirty or not self.index_path.exists():
+                self._ensure_loaded()
+                return False
+            if self.index_path.stat().st_mtime_ns == self._loaded_mtime_ns:
+                return False
+            self._reset()
+            self._loaded = False
+            self._ensure_loaded()
+            return True
+        except Exception as e:
+            logger.error(f"Property index refresh failed: {e}")
+            return False
+
+    def _reset(self):
+        """メモリ上のインデックスを空にする"""
+        self.notes = {}
+        self.tags = {}
+        self.properties = {}
+        self.sorted_properties = {}
+        self.by_modified = []
+
+    def save(self) -> bool:
+        """インデックスをアトミックに保存（変更がなければ何もしない）"""
+        if not self._dirty:
+            return True
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'notes': self.notes}, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_path)
+            self._loaded_mtime_ns = self.index_path.stat().st_mtime_ns
+            self._dirty = False
+            return True
+        except Exception as e:
+            logger.error(f"Property index saving failed: {e}")
+            return False
+
+    # 更新
+
+    def update_note(self, note_id: str, tags: Iterable[str], properties: Dict[str, Any],
+                    modified_time: float = 0.0):
+        """ノートのタグ・プロパティ・更新日時を登録（既存の内容は置き換える）"""
+        self._ensure_loaded()
+        tag_list = sorted({normalize_tag(tag) for tag in tags if normalize_tag(tag)})
+        property_map: Dict[str, List[Any]] = {}
+        for key, value in (properties or {}).items():
+            key = str(key).strip().lower()
+            if key in FRONTMATTER_TAG_KEYS:
+                continue
+            values = value if isinstance(value, list) else [value]
+            normalized = sorted({v for v in map(normalize_value, values) if v is not None}, key=sort_key)
+            if normalized:
+                property_map[key] = normalized
+
+        if note_id in self.notes:
+            self._unregister(note_id)
+        self._register(note_id, tag_list, property_map, modified_time)
+        self._dirty = True
+
+    def update_from_parsed(self, note_id: str, parsed_data: Dict[str, Any], modified_time: float = 0.0):
+        """解析結果（parse_fileの戻り値）からタグ・プロパティを登録"""
+        frontmatter = parsed_data.get('frontmatter') or {}
+        tags = [tag['tag'] for tag in parsed_data.get('tags', [])]
+        for key in FRONTMATTER_TAG_KEYS:
+            value = frontmatter.get(key)
+            if isinstance(value, str):
+                tags.extend(part for part in value.replace(',', ' ').split())
+            elif isinstance(value, list):
+                tags.extend(str(part) for part in value if part)
+        self.update_note(note_id, tags, frontmatter, modified_time)
+
+    def update_from_content(self, note_id: str, content: str, modified_time: float = 0.0):
+        """ノートの内容を解析してタグ・プロパティを登録"""
+        try:
+            parsed_data = self.parser.parse_file(note_id, content)
+            if parsed_data:
+                self.update_from_parsed(note_id, parsed_data, modified_time)
+        except Exception as e:
+            logger.error(f"Property index update failed for {note_id}: {e}")
+
+    def remove_note(self, note_id: str):
+        """ノートを削除"""
+        self._ensure_loaded()
+        if note_id in self.notes:
+            self._unregister(note_id)
+            self._dirty = True
+
+    def rename_note(self, old_note_id: str, new_note_id: str):
+        """ノートの移動・リネームを反映"""
+        self._ensure_loaded()
+        note = self.notes.get(old_note_id)
+        if note is None:
+            return
+        self._unregister(old_note_id)
+        self._register(new_note_id, note['tags'], note['properties'], note['modified'])
+        self._dirty = True
+
+    def rebuild(self, vault_path: str) -> int:
+        """保管庫全体を走査してインデックスを作り直す"""
+        try:
+            self._loaded = True
+            self._reset()
+            vault = Path(vault_path).resolve()
+            count = 0
+            for root, dirs, files in VaultWalker(str(vault)).walk():
+                for file in files:
+                    if not file.endswith('.md'):
+                        continue
+                    file_path = Path(root) / file
+                    try:
+                        with open(file_path, 'r', encoding='utf-8') as f:
+                            content = f.read()
+                        self.update_from_content(
+                            file_path.relative_to(vault).as_posix(), content, file_path.stat().st_mtime
+                        )
+                    except Exception as e:
+                        # 読めないノートだけを除き、残りのノートで作り直す
+                        logger.warning(f"Skipped {file_path} in property index rebuild: {e}")
+                        continue
+                    count += 1
+            self._dirty = True
+            self.save()
+            logger.info(f"Property index rebuilt with {count} notes")
+            return count
+        except Exception as e:
+            logger.error(f"Property index rebuild failed: {e}")
+            return 0
+
+    def _register(self, note_id: str, tags: List[str], properties: Dict[str, List[Any]], modified_time: float):
+        self.notes[note_id] = {'tags': tags, 'properties': properties, 'modified': modified_time}
+        bisect.insort(self.by_modified, (modified_time, note_id))
+        for tag in tags:
+            for expanded in expand_tag(tag):
+                self.tags.setdefault(expanded, set()).add(note_id)
+        for key, values in properties.items():
+            by_value = self.properties.setdefault(key, {})
+            ordered = self.sorted_properties.setdefault(key, [])
+            for value in values:
+                by_value.setdefault(value, set()).add(note_id)
+                bisect.insort(ordered, (sort_key(value), note_id))
+
+    def _unregister(self, note_id: str):
+        note = self.notes.pop(note_id)
+        position = bisect.bisect_left(self.by_modified, (note['modified'], note_id))
+        if position < len(self.by_modified) and self.by_modified[position] == (note['modified'], note_id):
+            del self.by_modified[position]
+        for tag in note['tags']:
+            for expanded in expand_tag(tag):
+                self._discard(self.tags, expanded, note_id)
+        for key, values in note['properties'].items():
+            by_value = self.properties.get(key, {})
+            ordered = self.sorted_properties.get(key, [])
+            for value in values:
+                self._discard(by_value, value, note_id)
+                entry = (sort_key(value), note_id)
+                position = bisect.bisect_left(ordered, entry)
+                if position < len(ordered) and ordered[position] == entry:
+                    del ordered[position]
+            if not by_value:
+                self.properties.pop(key, None)
+                self.sorted_properties.pop(key, None)
+
+    @staticmethod
+    def _discard(index: Dict[Any, Set[str]], key: Any, value: str):
+        values = index.get(key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del index[key]
+
+    # 参照
+
+    def notes_with_tag(self, tag: str) -> Set[str]:
+        """タグ（子タグを含む）を持つノート"""
+        self._ensure_loaded()
+        return set(self.tags.get(normalize_tag(tag), ()))
+
+    def notes_with_property(self, key: str, value: Any = None) -> Set[str]:
+        """プロパティを持つノート（valueを指定した場合はその値を持つノート）"""
+        self._ensure_loaded()
+        by_value = self.properties.get(str(key).strip().lower(), {})
+        if value is None:
+            return {note_id for note_ids in by_value.values() for note_id in note_ids}
+        return set(by_value.get(normalize_value(value), ()))
+
+    def notes_in_range(self, key: str, minimum: Any = None, maximum: Any = None) -> Set[str]:
+        """プロパティ値が範囲内（両端を含む）のノート"""
+        self._ensure_loaded()
+        ordered = self.sorted_properties.get(str(key).strip().lower(), [])
+        start = 0
+        end = len(ordered)
+        if minimum is not None:
+            start = bisect.bisect_left(ordered, (sort_key(normalize_value(minimum)), ''))
+        if maximum is not None:
+            # 同じ値のエントリをすべて含めるため、ノートIDより大きい番兵で探す
+            end = bisect.bisect_right(ordered, (sort_key(normalize_value(maximum)), '\U0010ffff'))
+        return {note_id for _, note_id in ordered[start:end]}
+
+    def query(self, tags: Optional[Iterable[str]] = None, properties: Optional[Dict[str, Any]] = None,
+              ranges: Optional[Dict[str, Tuple[Any, Any]]] = None, sort: Optional[str] = 'modified',
+              descending: bool = True, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """条件に一致するノートを取得
+
+        tagsはすべてを持つノート（積集合）、propertiesはキーごとの一致（値のリストはいずれか）、
+        rangesはキーごとの(最小値, 最大値)の範囲。sortは'modified'・'name'・None。
+        """
+        self._ensure_loaded()
+        candidate_sets: List[Set[str]] = []
+        for tag in tags or []:
+            candidate_sets.append(self.tags.get(normalize_tag(tag), set()))
+        for key, value in (properties or {}).items():
+            values = value if isinstance(value, list) else [value]
+            matched: Set[str] = set()
+            for item in values:
+                matched |= self.notes_with_property(key, item)
+            candidate_sets.append(matched)
+        for key, (minimum, maximum) in (ranges or {}).items():
+            candidate_sets.append(self.notes_in_range(key, minimum, maximum))
+
+        if candidate_sets:
+            # 小さい集合から順に積集合を取る（インデックスの集合はコピーせずに参照する）
+            candidate_sets.sort(key=len)
+            result = candidate_sets[0]
+            if len(candidate_sets) > 1:
+                result = result.intersection(*candidate_sets[1:])
+        else:
+            result = self.notes.keys()
+
+        if sort == 'modified':
+            modified = lambda note_id: (self.notes[note_id]['modified'], note_id)
+            if limit is not None and limit * len(self.notes) < len(result) ** 2:
+                # 一致が多い場合は更新日時順のリストを先頭から辿り、limit件で打ち切る
+                ordered = reversed(self.by_modified) if descending else iter(self.by_modified)
+                note_ids = list(itertools.islice(
+                    (note_id for _, note_id in ordered if note_id in result), limit
+                ))
+            elif limit is not None:
+                select = heapq.nlargest if descending else heapq.nsmallest
+                note_ids = select(limit, result, key=modified)
+            else:
+                note_ids = sorted(result, key=modified, reverse=descending)
+        elif sort == 'name':
+            note_ids = sorted(result, reverse=descending)[:limit]
+        else:
+            note_ids = list(result)[:limit]
+
+        return [
+            {
+                'note_id': note_id,
+                'tags': self.notes[note_id]['tags'],
+                'modified': self.notes[note_id]['modified']
+            }
+            for note_id in note_ids
+        ]
+
+    def get_tag_counts(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """タグごとのノート数（多い順）"""
+        self._ensure_loaded()
+        counts = Counter({tag: len(note_ids) for tag, note_ids in self.tags.items()})
+        return [{'tag': tag, 'count': count} for tag, count in counts.most_common(limit)]
+
+    def get_property_keys(self) -> List[Dict[str, Any]]:
+        """プロパティのキーと、それを持つノート数"""
+        self._ensure_loaded()
+        return sorted(
+            ({'key': key, 'count': len(self.notes_with_property(key))} for key in self.properties),
+            key=lambda item: (-item['count'], item['key'])
+        )
+
+    def is_empty(self) -> bool:
+        """インデックスが空かどうか"""
+        self._ensure_loaded()
+        return not self.notes
+
+    def get_stats(self) -> Dict[str, Any]:
+        """インデックス統計を取得"""
+        self._ensure_loaded()
+        return {
+            'notes': len(self.notes),
+            'tags': len(self.tags),
+            'property_keys': len(self.properties),
+            'index_path': str(self.index_path)
+        }
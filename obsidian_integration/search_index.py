@@ -0,0 +1,397 @@
+"""
+全文検索インデックス
+ノートのタイトル・見出し・タグ・本文をSQLiteのFTS5に転置インデックスとして保存し、
+BM25で順位付けした検索・フレーズ検索・前方一致検索を行う
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+
+from .markdown_parser import ObsidianMarkdownParser
+from .vault_walker import iter_markdown_files
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS note_text USING fts5(
+    title, headings, tags, body,
+    tokenize = 'unicode61 remove_diacritics 0',
+    prefix = '1 2 3'
+);
+"""
+
+# BM25の列ごとの重み（title, headings, tags, body）
+COLUMN_WEIGHTS = (5.0, 3.0, 3.0, 1.0)
+
+# まとめて書き込む件数
+BATCH_SIZE = 500
+
+# 日本語・中国語・韓国語の文字（連続部分を2文字ずつのN-gramにする）
+_CJK_CHARS = (
+    '\u3040-\u30ff'  # ひらがな・カタカナ
+    '\u3400-\u4dbf'  # CJK統合漢字拡張A
+    '\u4e00-\u9fff'  # CJK統合漢字
+    '\uf900-\ufaff'  # CJK互換漢字
+    '\uac00-\ud7af'  # ハングル
+)
+_TOKEN_PATTERN = re.compile(f'([{_CJK_CHARS}]+)|([^\\W_{_CJK_CHARS}]+)')
+_CJK_PATTERN = re.compile(f'[{_CJK_CHARS}]')
+_QUERY_PATTERN = re.compile(r'(-?)"([^"]*)"(\*?)|(-?)(\S+)')
+
+
+def tokenize_text(text: str, for_query: bool = False) -> List[str]:
+    """テキストを索引用のトークンに分割
+
+    英数字などは単語単位で小文字にし、CJKの連続部分は重なりのある2文字のN-gramにする。
+    1文字の検索語でも見つかるように、索引では連続部分の最後の1文字も単独のトークンにする
+    （検索語では隣接を崩さないように付けない）。
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKC', text).lower()
+    tokens: List[str] = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        cjk, word = match.groups()
+        if word:
+            tokens.append(word)
+            continue
+        if len(cjk) == 1:
+            tokens.append(cjk)
+            continue
+        tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+        if not for_query:
+            tokens.append(cjk[-1])
+    return tokens
+
+
+def build_match_expression(query: str) -> Optional[str]:
+    """検索文字列をFTS5のMATCH式に変換（検索語がない場合はNone）
+
+    - 空白区切りの語はすべてを含むノート（AND）
+    - "..."はフレーズ、末尾の*は前方一致、先頭の-は除外
+    - CJKの語は2文字のN-gramのフレーズになり、1文字の語は前方一致になる
+    """
+    included: List[str] = []
+    excluded: List[str] = []
+    for match in _QUERY_PATTERN.finditer(query or ''):
+        if match.group(2) is not None:
+            negative, term, star = match.group(1), match.group(2), match.group(3)
+        else:
+            negative, term = match.group(4), match.group(5)
+            star = '*' if term.endswith('*') else ''
+            term = term.rstrip('*')
+        tokens = tokenize_text(term, for_query=True)
+        if not tokens:
+            continue
+        single_cjk = len(tokens) == 1 and len(tokens[0]) == 1 and _CJK_PATTERN.match(tokens[0]) is not None
+        prefix = bool(star) or single_cjk
+        phrase = '"' + ' '.join(tokens) + '"' + (' *' if prefix else '')
+        (excluded if negative else included).append(phrase)
+
+    if not included:
+        return None
+    expression = ' AND '.join(included)
+    if excluded:
+        expression = f"({expression}) NOT ({' OR '.join(excluded)})"
+    return expression
+
+
+class FullTextIndex:
+    """全文検索インデックスクラス
+
+    ノートIDはボルト相対パス。FTS5の表にはトークナイズ済みの文字列（空白区切り）を保存し、
+    FTS5自身はunicode61で空白を区切るだけにすることで、CJKのN-gramも同じ転置インデックスで扱う。
+    mtime_nsとサイズを記録し、変更のないファイルは更新時に読まない。
+    変更イベントの処理と検索が別スレッドから呼ばれるため、接続はロックで保護する。
+    """
+
+    def __init__(self, db_path: str, vault_path: Optional[str] = None,
+                 parser: Optional[ObsidianMarkdownParser] = None):
+        self.db_path = db_path
+        self.vault_path = vault_path
+        self.parser = parser or ObsidianMarkdownParser()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self.stats = {
+            'indexed': 0,
+            'skipped': 0,
+            'removed': 0,
+            'queries': 0,
+            'errors': 0,
+            'last_query_duration': 0.0
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        """データベースに接続（初回のみテーブルを作成し、バージョンが異なれば作り直す）"""
+        if self._connection is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            row = connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is not None and row[0] != str(INDEX_VERSION):
+                logger.warning(f"Search index version mismatch, rebuilding: {self.db_path}")
+                with connection:
+                    connection.execute('DELETE FROM notes')
+                    connection.execute('DELETE FROM note_text')
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(INDEX_VERSION),)
+                )
+            self._connection = connection
+        return self._connection
+
+    def _note_id(self, file_path: str) -> str:
+        if self.vault_path:
+            return Path(os.path.relpath(file_path, self.vault_path)).as_posix()
+        return Path(file_path).as_posix()
+
+    def _file_path(self, note_id: str) -> str:
+        return os.path.join(self.vault_path, *note_id.split('/')) if self.vault_path else note_id
+
+    # 更新
+
+    def update_notes(self, notes: Iterable[Dict[str, Any]]) -> int:
+        """ノートをまとめて登録（既存の内容は置き換える）
+
+        各ノートは{'note_id', 'title', 'headings', 'tags', 'body', 'mtime_ns', 'size'}。
+        """
+        count = 0
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                for note in notes:
+                    self._upsert(connection, note)
+                    count += 1
+        self.stats['indexed'] += count
+        return count
+
+    def update_note(self, note_id: str, title: str, headings: Iterable[str] = (), tags: Iterable[str] = (),
+                    body: str = '', mtime_ns: int = 0, size: int = 0):
+        """ノートを登録（既存の内容は置き換える）"""
+        self.update_notes([{
+            'note_id': note_id, 'title': title, 'headings': list(headings), 'tags': list(tags),
+            'body': body, 'mtime_ns': mtime_ns, 'size': size
+        }])
+
+    def _upsert(self, connection: sqlite3.Connection, note: Dict[str, Any]):
+        row = connection.execute('SELECT id FROM notes WHERE path = ?', (note['note_id'],)).fetchone()
+        if row is not None:
+            connection.execute('DELETE FROM note_text WHERE rowid = ?', (row[0],))
+            connection.execute(
+                'UPDATE notes SET title = ?, mtime_ns = ?, size = ? WHERE id = ?',
+                (note['title'], note.get('mtime_ns', 0), note.get('size', 0), row[0])
+            )
+            rowid = row[0]
+        else:
+            rowid = connection.execute(
+                'INSERT INTO notes (path, title, mtime_ns, size) VALUES (?, ?, ?, ?)',
+                (note['note_id'], note['title'], note.get('mtime_ns', 0), note.get('size', 0))
+            ).lastrowid
+        # ファイル名もタイトルの一部として検索できるようにする
+        title_text = f"{note['title']} {Path(note['note_id']).stem}"
+        connection.execute(
+            'INSERT INTO note_text (rowid, title, headings, tags, body) VALUES (?, ?, ?, ?, ?)',
+            (
+                rowid,
+                ' '.join(tokenize_text(title_text)),
+                ' '.join(tokenize_text('\n'.join(note.get('headings', ())))),
+                ' '.join(tokenize_text(' '.join(tag.replace('/', ' ') for tag in note.get('tags', ())))),
+                ' '.join(tokenize_text(note.get('body', '')))
+            )
+        )
+
+    def read_note(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """ファイルを解析して登録用のノート情報を作る"""
+        stat = os.stat(file_path)
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        parsed_data = self.parser.parse_file(file_path, content)
+        if not parsed_data:
+            return None
+        frontmatter = parsed_data['frontmatter'] or {}
+        tags = [tag['tag'] for tag in parsed_data['tags']]
+        frontmatter_tags = frontmatter.get('tags') or frontmatter.get('tag') or []
+        if isinstance(frontmatter_tags, str):
+            frontmatter_tags = frontmatter_tags.replace(',', ' ').split()
+        tags.extend(str(tag).lstrip('#') for tag in frontmatter_tags if tag)
+        return {
+            'note_id': self._note_id(file_path),
+            'title': str(frontmatter.get('title') or Path(file_path).stem),
+            'headings': [heading['text'] for heading in parsed_data['content']['headings']],
+            'tags': tags,
+            'body': parsed_data['content']['raw_content'],
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size
+        }
+
+    def update_file(self, file_path: str) -> bool:
+        """ファイルの内容を登録（読めない場合は削除し、Falseを返す）"""
+        try:
+            note = self.read_note(file_path)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.debug(f"Search index could not read {file_path}: {e}")
+            self.remove_file(file_path)
+            return False
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Search index update failed for {file_path}: {e}")
+            return False
+        if note is None:
+            return False
+        self.update_notes([note])
+        return True
+
+    def remove_file(self, file_path: str):
+        """ファイルを削除"""
+        self.remove_note(self._note_id(file_path))
+
+    def remove_note(self, note_id: str):
+        """ノートを削除"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                row = connection.execute('SELECT id FROM notes WHERE path = ?', (note_id,)).fetchone()
+                if row is None:
+                    return
+                connection.execute('DELETE FROM note_text WHERE rowid = ?', (row[0],))
+                connection.execute('DELETE FROM notes WHERE id = ?', (row[0],))
+        self.stats['removed'] += 1
+
+    def rename_file(self, old_path: str, new_path: str):
+        """移動・リネームを反映（タイトルにファイル名を含めているため、移動先の内容で登録し直す）"""
+        self.remove_file(old_path)
+        self.update_file(new_path)
+
+    def sync_files(self, file_paths: Iterable[str]) -> Dict[str, int]:
+        """渡したファイルと索引を突き合わせ、変更・追加されたファイルだけを読み直し、
+        存在しないノートを削除する"""
+        with self._lock:
+            known = {
+                path: (mtime_ns, size)
+                for path, mtime_ns, size in self._connect().execute('SELECT path, mtime_ns, size FROM notes')
+            }
+        updated = 0
+        skipped = 0
+        batch: List[Dict[str, Any]] = []
+        seen = set()
+        for file_path in file_paths:
+            note_id = self._note_id(file_path)
+            seen.add(note_id)
+            try:
+                stat = os.stat(file_path)
+                if known.get(note_id) == (stat.st_mtime_ns, stat.st_size):
+                    skipped += 1
+                    continue
+                note = self.read_note(file_path)
+            except (OSError, UnicodeDecodeError):
+                continue
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Search index update failed for {file_path}: {e}")
+                continue
+            if note is not None:
+                batch.append(note)
+            if len(batch) >= BATCH_SIZE:
+                updated += self.update_notes(batch)
+                batch = []
+        if batch:
+            updated += self.update_notes(batch)
+
+        removed = 0
+        for note_id in known:
+            if note_id not in seen:
+                self.remove_note(note_id)
+                removed += 1
+        self.stats['skipped'] += skipped
+        logger.info(f"Search index synced: {updated} updated, {skipped} unchanged, {removed} removed")
+        return {'updated': updated, 'unchanged': skipped, 'removed': removed}
+
+    def sync_with_vault(self) -> Dict[str, int]:
+        """保管庫全体を走査して索引を最新にする（除外ルールに一致するノートは索引から外す）"""
+        return self.sync_files(list(iter_markdown_files(self.vault_path)))
+
+    # 検索
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """BM25の順位で検索
+
+        戻り値は{'note_id', 'path', 'title', 'score', 'modified_time'}のリスト（scoreが大きいほど関連が高い）。
+        """
+        expression = build_match_expression(query)
+        if expression is None:
+            return []
+        start_time = datetime.now()
+        try:
+            with self._lock:
+                rows = self._connect().execute(
+                    'SELECT notes.path, notes.title, notes.mtime_ns, bm25(note_text, ?, ?, ?, ?) AS rank '
+                    'FROM note_text JOIN notes ON notes.id = note_text.rowid '
+                    'WHERE note_text MATCH ? ORDER BY rank LIMIT ? OFFSET ?',
+                    (*COLUMN_WEIGHTS, expression, limit, offset)
+                ).fetchall()
+        except sqlite3.OperationalError as e:
+            self.stats['errors'] += 1
+            logger.error(f"Search query failed for {query!r}: {e}")
+            return []
+        self.stats['queries'] += 1
+        self.stats['last_query_duration'] = (datetime.now() - start_time).total_seconds()
+        return [
+            {
+                'note_id': note_id,
+                'path': self._file_path(note_id),
+                'title': title,
+                'score': -rank,
+                'modified_time': datetime.fromtimestamp(mtime_ns / 1e9).isoformat()
+            }
+            for note_id, title, mtime_ns, rank in rows
+        ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM notes').fetchone()[0]
+
+    def is_empty(self) -> bool:
+        """索引が空かどうか"""
+        return len(self) == 0
+
+    def close(self):
+        """接続を閉じる"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """インデックス統計を取得"""
+        try:
+            notes = len(self)
+        except Exception:
+            notes = 0
+        return {
+            **self.stats,
+            'notes': notes,
+            'db_path': self.db_path
+        }
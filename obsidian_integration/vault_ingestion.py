@@ -0,0 +1,165 @@
+"""
+保管庫取り込みパイプライン
+ディレクトリ走査 → I/Oスレッドプールでの読み込み → プロセスプールでの解析を並行して行い、
+分析エンジンに渡すコンテンツを完了した順に返す
+"""
+import asyncio
+import itertools
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, Iterable, Iterator, List, Optional, Tuple
+
+from .markdown_parser import ObsidianMarkdownParser
+from .parse_cache import ParseCache, build_content_entry, build_note, hash_content, parse_note_source
+from .vault_walker import iter_markdown_files
+
+logger = logging.getLogger(__name__)
+
+# ワーカープロセスごとのパーサー（プロセス内で1回だけ作成する）
+_worker_parser: Optional[ObsidianMarkdownParser] = None
+
+
+def parse_in_worker(file_path: str, data: bytes) -> Optional[Tuple[str, int]]:
+    """ワーカープロセスでファイル内容を解析"""
+    global _worker_parser
+    if _worker_parser is None:
+        _worker_parser = ObsidianMarkdownParser()
+    return parse_note_source(_worker_parser, file_path, data)
+
+
+def read_note(file_path: str) -> Tuple[os.stat_result, bytes, str]:
+    """ファイルを読み込み、stat結果・内容・ハッシュを返す（I/Oスレッドで実行）"""
+    with open(file_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        data = f.read()
+    return stat, data, hash_content(data)
+
+
+class VaultIngestionPipeline:
+    """保管庫取り込みパイプラインクラス
+
+    処理中のファイル数をmax_in_flightまでに制限し、空きができた分だけ走査を進める。
+    呼び出し側が結果を受け取らない間は新しいファイルを読み込まない。
+    parse_workers=0の場合はプロセスを起動せず、I/Oスレッドで解析する（少数のファイル向け）。
+    """
+
+    def __init__(self, vault_path: Optional[str] = None, parse_cache: Optional[ParseCache] = None,
+                 io_workers: int = 8, parse_workers: Optional[int] = None,
+                 max_in_flight: Optional[int] = None):
+        self.vault_path = vault_path
+        self.parse_cache = parse_cache
+        self.io_workers = max(1, io_workers)
+        self.parse_workers = (os.cpu_count() or 1) if parse_workers is None else max(0, parse_workers)
+        self.max_in_flight = max_in_flight or (self.io_workers + self.parse_workers) * 4
+        self.parser = parse_cache.parser if parse_cache else ObsidianMarkdownParser()
+        self.stats = {
+            'files': 0,
+            'entries': 0,
+            'parsed': 0,
+            'cached': 0,
+            'errors': 0
+        }
+
+    def iter_markdown_files(self) -> Iterator[str]:
+        """保管庫内のMarkdownファイルを走査（取り込みと並行して少しずつ進める）"""
+        if not self.vault_path or not os.path.exists(self.vault_path):
+            return
+        yield from iter_markdown_files(self.vault_path)
+
+    async def aiter_entries(self, file_paths: Optional[Iterable[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """コンテンツを完了した順に返す（file_pathsを省略すると保管庫全体を走査）"""
+        loop = asyncio.get_running_loop()
+        self.stats = dict.fromkeys(self.stats, 0)
+        paths = iter(file_paths if file_paths is not None else self.iter_markdown_files())
+        io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix='vault-io')
+        parse_pool: Optional[Executor] = None
+        in_flight = set()
+
+        exhausted = False
+
+        def get_parse_pool() -> Executor:
+            # キャッシュで全件済む場合はワーカープロセスを起動しない
+            nonlocal parse_pool
+            if parse_pool is None:
+                parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+            return parse_pool
+
+        async def ingest(file_path: str) -> Optional[Dict[str, Any]]:
+            try:
+                if self.parse_cache is not None:
+                    stat = await loop.run_in_executor(io_pool, os.stat, file_path)
+                    note = self.parse_cache.lookup(file_path, stat)
+                    if note is not None:
+                        self.stats['cached'] += 1
+                        return build_content_entry(file_path, note)
+
+                stat, data, content_hash = await loop.run_in_executor(io_pool, read_note, file_path)
+                if self.parse_cache is not None:
+                    note = self.parse_cache.lookup(file_path, stat, content_hash)
+                    if note is not None:
+                        self.stats['cached'] += 1
+                        return build_content_entry(file_path, note)
+
+                if self.parse_workers:
+                    parsed = await loop.run_in_executor(get_parse_pool(), parse_in_worker, file_path, data)
+                else:
+                    parsed = await loop.run_in_executor(io_pool, parse_note_source, self.parser, file_path, data)
+                if parsed is None:
+                    return None
+                self.stats['parsed'] += 1
+                if self.parse_cache is not None:
+                    note = self.parse_cache.store(file_path, stat, content_hash, *parsed)
+                else:
+                    note = build_note(file_path, stat, *parsed)
+                return build_content_entry(file_path, note)
+
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.warning(f"Failed to parse file {file_path}: {e}")
+                return None
+
+        async def fill():
+            # 空きの分だけ走査を進める（ディレクトリ走査もI/Oスレッドで行う）
+            nonlocal exhausted
+            while not exhausted and len(in_flight) < self.max_in_flight:
+                batch = await loop.run_in_executor(
+                    io_pool, list, itertools.islice(paths, self.max_in_flight - len(in_flight))
+                )
+                if not batch:
+                    exhausted = True
+                    return
+                self.stats['files'] += len(batch)
+                for file_path in batch:
+                    in_flight.add(asyncio.ensure_future(ingest(file_path)))
+
+        try:
+            await fill()
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    in_flight.discard(task)
+                await fill()
+                for task in done:
+                    entry = task.result()
+                    if entry:
+                        self.stats['entries'] += 1
+                        yield entry
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+            if parse_pool is not None:
+                parse_pool.shutdown(wait=True, cancel_futures=True)
+            io_pool.shutdown(wait=True, cancel_futures=True)
+            if self.parse_cache is not None:
+                self.parse_cache.flush()
+
+    async def collect(self, file_paths: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """全てのコンテンツをリストで取得"""
+        return [entry async for entry in self.aiter_entries(file_paths)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取り込み統計を取得"""
+        return dict(self.stats)
@@ -0,0 +1,385 @@
+"""
+保管庫のMerkleツリー
+ファイルごとの内容ハッシュと、ディレクトリごとに子のハッシュをまとめたハッシュを持つツリーを永続化し、
+2つのスナップショットの差分を、ハッシュの異なる部分木だけをたどって求める
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .content_hash_store import HASH_ALGORITHM, hash_file
+from .vault_walker import VaultWalker
+
+logger = logging.getLogger(__name__)
+
+TREE_VERSION = 1
+
+
+class MerkleNode(NamedTuple):
+    """ツリーのノード
+
+    ノードは変更しない。ファイルを更新するときは、そのファイルから根までのノードだけを作り直し、
+    それ以外の部分木は前のツリーと共有する。そのため、ある時点の根を保持しておけばスナップショットになる。
+    """
+    hash: str
+    # ディレクトリの子（名前 → ノード）。ファイルはNone
+    children: Optional[Dict[str, 'MerkleNode']] = None
+    mtime_ns: int = 0
+    size: int = 0
+
+    @property
+    def is_dir(self) -> bool:
+        return self.children is not None
+
+
+class MerkleDiff(NamedTuple):
+    """2つのスナップショットの差分（保管庫からの相対パス、/区切り）"""
+    added: List[str]
+    removed: List[str]
+    modified: List[str]
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.modified)
+
+
+def directory_node(children: Dict[str, MerkleNode]) -> MerkleNode:
+    """子のノードからディレクトリのノードを作成（ハッシュは名前順に並べた子の種類・名前・ハッシュから計算）"""
+    hasher = hashlib.blake2b(digest_size=16)
+    for name in sorted(children):
+        child = children[name]
+        hasher.update(f"{'d' if child.is_dir else 'f'}\0{name}\0{child.hash}\n".encode('utf-8', 'surrogateescape'))
+    return MerkleNode(hasher.hexdigest(), children)
+
+
+EMPTY_TREE = directory_node({})
+
+
+def iter_leaves(node: MerkleNode, prefix: str = '') -> Iterator[Tuple[str, MerkleNode]]:
+    """部分木に含まれるファイルを(相対パス, ノード)で列挙"""
+    for name in sorted(node.children):
+        child = node.children[name]
+        if child.is_dir:
+            yield from iter_leaves(child, prefix + name + '/')
+        else:
+            yield prefix + name, child
+
+
+def diff_trees(old: Optional[MerkleNode], new: Optional[MerkleNode]) -> MerkleDiff:
+    """2つのスナップショットの差分を計算（ハッシュが同じ部分木には降りない）"""
+    added: List[str] = []
+    removed: List[str] = []
+    modified: List[str] = []
+
+    def collect(node: MerkleNode, path: str, paths: List[str]):
+        if node.is_dir:
+            paths.extend(leaf_path for leaf_path, _ in iter_leaves(node, path + '/'))
+        else:
+            paths.append(path)
+
+    def visit(a: MerkleNode, b: MerkleNode, prefix: str):
+        if a is b or a.hash == b.hash:
+            return
+        for name in sorted(a.children.keys() | b.children.keys()):
+            x = a.children.get(name)
+            y = b.children.get(name)
+            path = prefix + name
+            if x is None:
+                collect(y, path, added)
+            elif y is None:
+                collect(x, path, removed)
+            elif x.is_dir and y.is_dir:
+                visit(x, y, path + '/')
+            elif not x.is_dir and not y.is_dir:
+                if x.hash != y.hash:
+                    modified.append(path)
+            else:
+                # ファイルとディレクトリが入れ替わった
+                collect(x, path, removed)
+                collect(y, path, added)
+
+    visit(old or EMPTY_TREE, new or EMPTY_TREE, '')
+    return MerkleDiff(added, removed, modified)
+
+
+def _encode(node: MerkleNode) -> Any:
+    if node.is_dir:
+        return {name: _encode(child) for name, child in node.children.items()}
+    return [node.hash, node.mtime_ns, node.size]
+
+
+def _decode(data: Any) -> MerkleNode:
+    if isinstance(data, dict):
+        return directory_node({name: _decode(child) for name, child in data.items()})
+    digest, mtime_ns, size = data
+    return MerkleNode(digest, None, mtime_ns, size)
+
+
+def load_tree(tree_path: str, vault_path: Optional[str] = None) -> Optional[MerkleNode]:
+    """保存したスナップショットの根を読み込む
+
+    ファイルがない場合・形式やハッシュの方式が異なる場合・vault_pathを渡して別の保管庫のものだった場合はNone。
+    """
+    try:
+        path = Path(tree_path)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != TREE_VERSION or data.get('algorithm') != HASH_ALGORITHM:
+            logger.warning(f"Vault tree version mismatch, ignoring: {tree_path}")
+            return None
+        if vault_path is not None and data.get('vault_path') != os.path.abspath(vault_path):
+            logger.warning(f"Vault tree belongs to another vault, ignoring: {tree_path}")
+            return None
+        # ディレクトリのハッシュは保存せず、読み込み時に子から計算し直す
+        return _decode(data.get('tree', {}))
+    except Exception as e:
+        logger.error(f"Vault tree loading failed: {e}")
+        return None
+
+
+class VaultMerkleTree:
+    """保管庫のMerkleツリークラス
+
+    ファイルのハッシュはContentHashStoreと同じ正規化した内容のハッシュで、
+    ディレクトリのハッシュは子の名前とハッシュから計算する。除外ルールはVaultWalkerに従う。
+
+    - refresh(): 保管庫を走査し、stat結果が記録と同じファイルは読まずにツリーを作り直す
+    - update()/remove()/rename()/apply(): 変更の分かっているファイルだけを反映する
+    - root: 現在の根。保持しておけば後でdiff_trees()で差分を取れる
+    """
+
+    def __init__(self, vault_path: str, tree_path: Optional[str] = None,
+                 walker: Optional[VaultWalker] = None):
+        self.vault_path = os.path.abspath(vault_path)
+        self.tree_path = Path(tree_path) if tree_path else None
+        self.walker = walker or VaultWalker(self.vault_path)
+        self.root = EMPTY_TREE
+        # rootが保管庫の内容を表しているか（保存済みのツリーを読み込んだか、走査した場合True）
+        self.loaded = False
+        self._saved_hash: Optional[str] = None
+        self._lock = threading.Lock()
+        self.stats = {
+            'files_hashed': 0,
+            'files_reused': 0,
+            'bytes_hashed': 0,
+            'errors': 0
+        }
+        if self.tree_path is not None:
+            self.load()
+
+    def load(self) -> bool:
+        """保存したツリーを読み込む"""
+        root = load_tree(str(self.tree_path), self.vault_path) if self.tree_path is not None else None
+        if root is None:
+            return False
+        with self._lock:
+            self.root = root
+            self.loaded = True
+            self._saved_hash = root.hash
+        logger.info(f"Loaded vault tree {root.hash[:12]} from {self.tree_path}")
+        return True
+
+    def save(self) -> bool:
+        """前回の保存から変わっていればツリーをアトミックに保存"""
+        if self.tree_path is None:
+            return False
+        root = self.root
+        if root.hash == self._saved_hash:
+            return True
+        try:
+            self.tree_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.tree_path.with_name(self.tree_path.name + '.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': TREE_VERSION,
+                    'algorithm': HASH_ALGORITHM,
+                    'vault_path': self.vault_path,
+                    'root_hash': root.hash,
+                    'tree': _encode(root)
+                }, f, ensure_ascii=False)
+            os.replace(temp_path, self.tree_path)
+            self._saved_hash = root.hash
+            return True
+        except Exception as e:
+            logger.error(f"Vault tree saving failed: {e}")
+            return False
+
+    @property
+    def root_hash(self) -> str:
+        return self.root.hash
+
+    def _key(self, file_path: str) -> Optional[str]:
+        return self.walker.relative(os.path.abspath(file_path))
+
+    @staticmethod
+    def _find(node: Optional[MerkleNode], relative_path: str) -> Optional[MerkleNode]:
+        if not relative_path:
+            return node
+        for name in relative_path.split('/'):
+            if node is None or not node.is_dir:
+                return None
+            node = node.children.get(name)
+        return node
+
+    def _leaf(self, file_path: str, old: Optional[MerkleNode]) -> Optional[MerkleNode]:
+        """ファイルのノードを作成（stat結果が記録と同じ場合は読まずに記録を使う。読めない場合はNone）"""
+        try:
+            stat = os.stat(file_path)
+            if old is not None and not old.is_dir and old.mtime_ns == stat.st_mtime_ns and old.size == stat.st_size:
+                self.stats['files_reused'] += 1
+                return old
+            digest, bytes_read = hash_file(file_path)
+        except OSError as e:
+            logger.debug(f"Vault tree hash failed for {file_path}: {e}")
+            self.stats['errors'] += 1
+            return None
+        self.stats['files_hashed'] += 1
+        self.stats['bytes_hashed'] += bytes_read
+        return MerkleNode(digest, None, stat.st_mtime_ns, stat.st_size)
+
+    def build(self, base: Optional[MerkleNode] = None) -> MerkleNode:
+        """保管庫を走査してツリーを作成し、根を返す（現在のツリーは変更しない）
+
+        base（省略時は現在の根）とstat結果が同じファイルは読まず、ハッシュの変わらない部分木はbaseのノードを使う。
+        """
+        base = self.root if base is None else base
+        self.walker.refresh()
+        listing: Dict[str, Tuple[List[str], Dict[str, MerkleNode]]] = {}
+        for root, dirs, files in self.walker.walk():
+            relative_root = self.walker.relative(root)
+            old_directory = self._find(base, relative_root)
+            old_children = old_directory.children if old_directory is not None and old_directory.is_dir else {}
+            leaves = {}
+            for name in files:
+                if not name.endswith(self.walker.suffix):
+                    continue
+                leaf = self._leaf(os.path.join(root, name), old_children.get(name))
+                if leaf is not None:
+                    leaves[name] = leaf
+            listing[relative_root] = (list(dirs), leaves)
+
+        def assemble(relative_path: str, old: Optional[MerkleNode]) -> MerkleNode:
+            dirs, children = listing.get(relative_path, ([], {}))
+            old_children = old.children if old is not None and old.is_dir else {}
+            for name in dirs:
+                child = assemble(f'{relative_path}/{name}' if relative_path else name, old_children.get(name))
+                # Markdownファイルを含まないディレクトリはツリーに含めない
+                if child.children:
+                    children[name] = child
+            node = directory_node(children)
+            if old is not None and old.is_dir and old.hash == node.hash:
+                return old
+            return node
+
+        return assemble('', base)
+
+    def refresh(self) -> MerkleDiff:
+        """保管庫を走査してツリーを更新し、更新前からの差分を返す"""
+        new_root = self.build()
+        with self._lock:
+            old_root = self.root
+            self.root = new_root
+            self.loaded = True
+        return diff_trees(old_root, new_root)
+
+    def _replace(self, node: Optional[MerkleNode], parts: List[str],
+                 leaf: Optional[MerkleNode]) -> Optional[MerkleNode]:
+        """parts（相対パスの各部分）の位置をleafに置き換えた部分木を返す（leafがNoneなら削除。空になればNone）"""
+        children = dict(node.children) if node is not None and node.is_dir else {}
+        name = parts[0]
+        child = leaf if len(parts) == 1 else self._replace(children.get(name), parts[1:], leaf)
+        if child is None:
+            children.pop(name, None)
+        else:
+            children[name] = child
+        return directory_node(children) if children else None
+
+    def update(self, file_path: str) -> bool:
+        """ファイルの内容を反映（ツリーが変わった場合True）。除外・削除されたファイルは取り除く"""
+        key = self._key(file_path)
+        if not key or self.walker.is_ignored(file_path) or not key.endswith(self.walker.suffix):
+            return self.remove(file_path)
+        with self._lock:
+            old = self._find(self.root, key)
+            leaf = self._leaf(file_path, old)
+            if leaf is None:
+                return self._remove_key(key)
+            if leaf is old:
+                return False
+            self.root = self._replace(self.root, key.split('/'), leaf) or EMPTY_TREE
+            return True
+
+    def _remove_key(self, key: str) -> bool:
+        if self._find(self.root, key) is None:
+            return False
+        self.root = self._replace(self.root, key.split('/'), None) or EMPTY_TREE
+        return True
+
+    def remove(self, file_path: str) -> bool:
+        """削除されたファイルを取り除く（ツリーが変わった場合True）"""
+        key = self._key(file_path)
+        if not key:
+            return False
+        with self._lock:
+            return self._remove_key(key)
+
+    def rename(self, old_path: str, new_path: str) -> bool:
+        """移動・リネームに合わせてファイルのノードを付け替える（内容は読み直さない）"""
+        old_key = self._key(old_path)
+        new_key = self._key(new_path)
+        if not old_key or not new_key:
+            return False
+        with self._lock:
+            leaf = self._find(self.root, old_key)
+            if leaf is None or leaf.is_dir:
+                return False
+            self._remove_key(old_key)
+            self.root = self._replace(self.root, new_key.split('/'), leaf) or EMPTY_TREE
+            return True
+
+    def apply(self, changed: Iterable[str] = (), deleted: Iterable[str] = ()) -> MerkleDiff:
+        """変更・削除されたファイルだけを反映し、反映前からの差分を返す"""
+        old_root = self.root
+        for file_path in deleted:
+            self.remove(file_path)
+        for file_path in changed:
+            self.update(file_path)
+        return diff_trees(old_root, self.root)
+
+    def get_hash(self, path: str = '') -> Optional[str]:
+        """ファイルまたはディレクトリ（保管庫からの相対パスか絶対パス）のハッシュを取得"""
+        key = self._key(path) if os.path.isabs(path) else path.strip('/')
+        node = self._find(self.root, key) if key is not None else None
+        return node.hash if node is not None else None
+
+    def matches(self, file_path: str) -> bool:
+        """ファイルの現在の内容がツリーの記録と同じか（stat結果が同じなら読まない）"""
+        key = self._key(file_path)
+        leaf = self._find(self.root, key) if key else None
+        if leaf is None or leaf.is_dir:
+            return False
+        current = self._leaf(file_path, leaf)
+        return current is not None and current.hash == leaf.hash
+
+    def diff(self, other: Optional[MerkleNode]) -> MerkleDiff:
+        """otherのスナップショットから現在のツリーへの差分"""
+        return diff_trees(other, self.root)
+
+    def iter_files(self) -> Iterator[str]:
+        """ツリーに含まれるファイルの絶対パスを列挙"""
+        for relative_path, _ in iter_leaves(self.root):
+            yield os.path.join(self.vault_path, *relative_path.split('/'))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """ツリー統計を取得"""
+        return {
+            **self.stats,
+            'files': sum(1 for _ in iter_leaves(self.root)),
+            'root_hash': self.root.hash,
+            'loaded': self.loaded
+        }
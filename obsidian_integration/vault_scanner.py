@@ -0,0 +1,400 @@
+"""
+保管庫スキャナー
+os.scandirで保管庫を走査し、前回の走査との差分（作成・変更・削除・移動）を返す
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from .vault_walker import VaultWalker
+
+logger = logging.getLogger(__name__)
+
+# 走査時刻からこの時間内に更新されたディレクトリは、同じmtimeのまま変更される可能性があるため次回も一覧を取得する
+RACY_WINDOW_NS = 2_000_000_000
+
+SNAPSHOT_VERSION = 2
+
+
+class VaultScanner:
+    """保管庫スキャナークラス
+
+    ファイルごとのmtime_ns・ctime_ns・サイズ・inode・デバイスを配列にまとめて保持し、
+    ディレクトリごとに前回のmtimeとファイル名の一覧を覚えておく。
+    ディレクトリのmtimeが変わっていなければ一覧を取得し直さず（エントリの追加・削除・リネームがないため）、
+    check_files=Falseの場合はそのディレクトリのファイルのstatも省略する。
+    ファイル内容の変更はディレクトリのmtimeに現れないため、check_files=Falseは
+    watchdogなど別の手段で変更を受け取っている場合だけに使う。
+    除外ルール（VaultWalker）に一致するディレクトリには降りず、一致するファイルは記録しない。
+    """
+
+    def __init__(self, vault_path: str, suffix: str = '.md', walker: Optional[VaultWalker] = None):
+        self.vault_path = str(Path(vault_path))
+        self.suffix = suffix
+        self.walker = walker or VaultWalker(vault_path, suffix=suffix)
+        # スロット番号 → パス（削除済みはNone）と、パス → スロット番号
+        self.paths: List[Optional[str]] = []
+        self.slots: Dict[str, int] = {}
+        self.mtime_ns = array('q')
+        self.ctime_ns = array('q')
+        self.size = array('q')
+        self.inode = array('Q')
+        self.device = array('Q')
+        self._free_slots: List[int] = []
+        # 記録が変わるたびに増える（スナップショットの保存要否の判定用）
+        self.generation = 0
+        self._saved_generation: Optional[int] = None
+        # ディレクトリ → (mtime_ns, 一覧が確定しているか, 対象ファイル名, サブディレクトリ名)
+        self.directories: Dict[str, Tuple[int, bool, Tuple[str, ...], Tuple[str, ...]]] = {}
+        self._lock = threading.Lock()
+        # 走査は同時に1つだけ行う
+        self._scan_lock = threading.Lock()
+        self.stats = {
+            'scans': 0,
+            'directories_listed': 0,
+            'directories_reused': 0,
+            'files_checked': 0,
+            'last_duration': 0.0
+        }
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, file_path: str) -> bool:
+        return file_path in self.slots
+
+    def iter_paths(self) -> Iterator[str]:
+        """記録済みのファイルパス"""
+        return iter(list(self.slots))
+
+    def get(self, file_path: str) -> Optional[Dict[str, int]]:
+        """記録済みのstat情報を取得"""
+        slot = self.slots.get(file_path)
+        if slot is None:
+            return None
+        return {
+            'size': self.size[slot],
+            'mtime_ns': self.mtime_ns[slot],
+            'ctime_ns': self.ctime_ns[slot],
+            'inode': self.inode[slot],
+            'device': self.device[slot]
+        }
+
+    # 記録の更新
+
+    def _store(self, file_path: str, stat: os.stat_result) -> int:
+        slot = self.slots.get(file_path)
+        if slot is None:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self.paths[slot] = file_path
+            else:
+                slot = len(self.paths)
+                self.paths.append(file_path)
+                self.mtime_ns.append(0)
+                self.ctime_ns.append(0)
+                self.size.append(0)
+                self.inode.append(0)
+                self.device.append(0)
+            self.slots[file_path] = slot
+        self.generation += 1
+        self.mtime_ns[slot] = stat.st_mtime_ns
+        self.ctime_ns[slot] = stat.st_ctime_ns
+        self.size[slot] = stat.st_size
+        self.inode[slot] = stat.st_ino
+        self.device[slot] = stat.st_dev
+        return slot
+
+    def _discard(self, file_path: str) -> Optional[int]:
+        slot = self.slots.pop(file_path, None)
+        if slot is not None:
+            self.paths[slot] = None
+            self._free_slots.append(slot)
+            self.generation += 1
+        return slot
+
+    def _is_changed(self, slot: int, stat: os.stat_result) -> bool:
+        return (self.mtime_ns[slot] != stat.st_mtime_ns or self.size[slot] != stat.st_size
+                or self.inode[slot] != stat.st_ino)
+
+    def update_file(self, file_path: str) -> bool:
+        """別の手段で変更を受け取ったファイルの記録を更新（次回の走査で差分にしない）"""
+        with self._lock:
+            try:
+                self._store(file_path, os.stat(file_path))
+                return True
+            except OSError:
+                self._discard(file_path)
+                return False
+
+    def remove_file(self, file_path: str):
+        """削除を受け取ったファイルの記録を削除"""
+        with self._lock:
+            self._discard(file_path)
+
+    def move_file(self, src_path: str, dest_path: str):
+        """移動を受け取ったファイルの記録を付け替える"""
+        with self._lock:
+            self._discard(src_path)
+            try:
+                self._store(dest_path, os.stat(dest_path))
+            except OSError:
+                pass
+
+    # 走査
+
+    def scan(self, check_files: bool = True, throttle: float = 0.0) -> List[Dict[str, Any]]:
+        """保管庫を走査し、前回との差分を返す
+
+        差分は{'action': 'created'|'modified'|'deleted'|'moved', 'file_path': パス,
+        'dest_path': 移動先（movedのみ）}のリスト。初回の走査では全ファイルがcreatedになる。
+        deletedには削除前のinodeとdeviceも付け、移動の検出（MoveDetector）に使えるようにする。
+        ロックはディレクトリごとに取り直すため、走査中も変更イベントによる更新は待たされない。
+        throttleを指定すると、ディレクトリごとにその秒数だけ待ち、バックグラウンドでの走査の負荷を抑える。
+        """
+        with self._scan_lock:
+            if self.walker.refresh():
+                # 除外ルールが変わったため、すべてのディレクトリの一覧を取得し直す
+                self._unsettle_directories()
+            start_time = time.time()
+            scan_start_ns = time.time_ns()
+            created: List[Tuple[str, os.stat_result]] = []
+            modified: List[str] = []
+            deleted: List[str] = []
+            seen_directories = set()
+
+            stack: List[Tuple[str, Optional[os.stat_result]]] = [(self.vault_path, None)]
+            while stack:
+                directory, dir_stat = stack.pop()
+                try:
+                    if dir_stat is None:
+                        dir_stat = os.stat(directory)
+                except OSError:
+                    continue
+                seen_directories.add(directory)
+                with self._lock:
+                    self._scan_directory(directory, dir_stat, scan_start_ns, check_files,
+                                         stack, created, modified, deleted)
+                if throttle:
+                    time.sleep(throttle)
+
+            with self._lock:
+                # 消えたディレクトリのファイルは削除扱い
+                for directory in [directory for directory in self.directories if directory not in seen_directories]:
+                    _, _, file_names, _ = self.directories.pop(directory)
+                    deleted.extend(os.path.join(directory, name) for name in file_names)
+
+                changes = self._build_changes(created, modified, deleted)
+                self.stats['scans'] += 1
+                self.stats['last_duration'] = time.time() - start_time
+                return changes
+
+    def _scan_directory(self, directory: str, dir_stat: os.stat_result, scan_start_ns: int, check_files: bool,
+                        stack: List[Tuple[str, Optional[os.stat_result]]],
+                        created: List[Tuple[str, os.stat_result]], modified: List[str], deleted: List[str]):
+        """1つのディレクトリを走査し、サブディレクトリをstackに積む"""
+        cached = self.directories.get(directory)
+
+        if cached is not None and cached[0] == dir_stat.st_mtime_ns and cached[1]:
+            # 一覧は前回と同じ
+            self.stats['directories_reused'] += 1
+            _, _, file_names, subdirectories = cached
+            if check_files:
+                for name in file_names:
+                    file_path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(file_path)
+                    except OSError:
+                        # 一覧が変わっているため次回は取得し直す
+                        deleted.append(file_path)
+                        self.directories[directory] = (cached[0], False, cached[2], cached[3])
+                        continue
+                    self._check(file_path, stat, created, modified)
+            for name in subdirectories:
+                stack.append((os.path.join(directory, name), None))
+            return
+
+        self.stats['directories_listed'] += 1
+        file_names = []
+        subdirectories = []
+        relative_directory = self.walker.relative(directory)
+        prefix = relative_directory + '/' if relative_directory else ''
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.walker.is_ignored_dir(prefix + entry.name):
+                                continue
+                            subdirectories.append(entry.name)
+                            stack.append((entry.path, entry.stat(follow_symlinks=False)))
+                        elif entry.name.endswith(self.suffix) and entry.is_file():
+                            if self.walker.is_ignored_file(prefix + entry.name):
+                                continue
+                            file_names.append(entry.name)
+                            self._check(entry.path, entry.stat(), created, modified)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f"Failed to scan directory {directory}: {e}")
+            return
+
+        if cached is not None:
+            current = set(file_names)
+            deleted.extend(os.path.join(directory, name) for name in cached[2] if name not in current)
+        settled = dir_stat.st_mtime_ns < scan_start_ns - RACY_WINDOW_NS
+        self.directories[directory] = (dir_stat.st_mtime_ns, settled, tuple(file_names), tuple(subdirectories))
+
+    def _unsettle_directories(self):
+        with self._lock:
+            self.directories = {
+                directory: (mtime_ns, False, file_names, subdirectories)
+                for directory, (mtime_ns, _, file_names, subdirectories) in self.directories.items()
+            }
+
+    def _check(self, file_path: str, stat: os.stat_result,
+               created: List[Tuple[str, os.stat_result]], modified: List[str]):
+        self.stats['files_checked'] += 1
+        slot = self.slots.get(file_path)
+        if slot is None:
+            created.append((file_path, stat))
+        elif self._is_changed(slot, stat):
+            self._store(file_path, stat)
+            modified.append(file_path)
+
+    def _build_changes(self, created: List[Tuple[str, os.stat_result]], modified: List[str],
+                       deleted: List[str]) -> List[Dict[str, Any]]:
+        """削除と作成をデバイス・inode・サイズ・mtimeで突き合わせて移動にまとめる
+
+        内容も変わった移動はここでは削除と作成のまま返し、MoveDetectorで内容と突き合わせる。
+        """
+        changes: List[Dict[str, Any]] = []
+        removed: Dict[Tuple[int, int, int, int], str] = {}
+        identities: Dict[str, Tuple[int, int]] = {}
+        for file_path in deleted:
+            slot = self.slots.get(file_path)
+            if slot is None:
+                continue
+            removed[(self.device[slot], self.inode[slot], self.size[slot], self.mtime_ns[slot])] = file_path
+            identities[file_path] = (self.device[slot], self.inode[slot])
+
+        for file_path, stat in created:
+            src_path = removed.pop((stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns), None)
+            if src_path is not None:
+                self._discard(src_path)
+                changes.append({'action': 'moved', 'file_path': src_path, 'dest_path': file_path})
+            else:
+                changes.append({'action': 'created', 'file_path': file_path})
+            self._store(file_path, stat)
+
+        changes.extend({'action': 'modified', 'file_path': file_path} for file_path in modified)
+        for file_path in removed.values():
+            self._discard(file_path)
+            device, inode = identities[file_path]
+            changes.append({'action': 'deleted', 'file_path': file_path, 'device': device, 'inode': inode})
+        return changes
+
+    # スナップショット
+
+    def save_snapshot(self, snapshot_path: str) -> bool:
+        """記録とディレクトリの一覧をスナップショットとして保存（前回の保存から変更がなければ何もしない）
+
+        パスは保管庫からの相対パスにし、gzip圧縮したJSONにアトミックに書き込む。
+        """
+        with self._lock:
+            if self._saved_generation == self.generation and os.path.exists(snapshot_path):
+                return True
+            generation = self.generation
+            files = [
+                [os.path.relpath(file_path, self.vault_path), self.mtime_ns[slot], self.ctime_ns[slot],
+                 self.size[slot], self.inode[slot], self.device[slot]]
+                for file_path, slot in self.slots.items()
+            ]
+            directories = {
+                os.path.relpath(directory, self.vault_path): [mtime_ns, settled, list(file_names), list(subdirectories)]
+                for directory, (mtime_ns, settled, file_names, subdirectories) in self.directories.items()
+            }
+        try:
+            directory = os.path.dirname(snapshot_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = snapshot_path + '.tmp'
+            with gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=1) as f:
+                json.dump({
+                    'version': SNAPSHOT_VERSION,
+                    'vault_path': os.path.abspath(self.vault_path),
+                    'suffix': self.suffix,
+                    'ignore_rules': self.walker.signature(),
+                    'saved_at': time.time(),
+                    'files': files,
+                    'directories': directories
+                }, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, snapshot_path)
+            self._saved_generation = generation
+            return True
+        except Exception as e:
+            logger.error(f"Vault snapshot saving failed: {e}")
+            return False
+
+    def load_snapshot(self, snapshot_path: str) -> bool:
+        """スナップショットから記録を復元（読み込めない場合や別の保管庫のものはFalse）
+
+        復元した記録は前回の保存時点のものなので、呼び出し側は後で走査して差分を取り込む。
+        """
+        try:
+            if not os.path.exists(snapshot_path):
+                return False
+            with gzip.open(snapshot_path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            if (data.get('version') != SNAPSHOT_VERSION or data.get('suffix') != self.suffix
+                    or data.get('vault_path') != os.path.abspath(self.vault_path)):
+                logger.warning(f"Vault snapshot does not match this vault, ignoring: {snapshot_path}")
+                return False
+        except Exception as e:
+            logger.error(f"Vault snapshot loading failed: {e}")
+            return False
+
+        with self._lock:
+            self.paths = []
+            self.slots = {}
+            self._free_slots = []
+            self.mtime_ns = array('q')
+            self.ctime_ns = array('q')
+            self.size = array('q')
+            self.inode = array('Q')
+            self.device = array('Q')
+            for relative_path, mtime_ns, ctime_ns, size, inode, device in data['files']:
+                self.slots[os.path.join(self.vault_path, relative_path)] = len(self.paths)
+                self.paths.append(os.path.join(self.vault_path, relative_path))
+                self.mtime_ns.append(mtime_ns)
+                self.ctime_ns.append(ctime_ns)
+                self.size.append(size)
+                self.inode.append(inode)
+                self.device.append(device)
+            self.directories = {
+                os.path.normpath(os.path.join(self.vault_path, relative_directory)):
+                    (mtime_ns, settled, tuple(file_names), tuple(subdirectories))
+                for relative_directory, (mtime_ns, settled, file_names, subdirectories) in data['directories'].items()
+            }
+            self.generation += 1
+            self._saved_generation = self.generation
+        if data.get('ignore_rules') != self.walker.signature():
+            # 保存時と除外ルールが異なるため、次回の走査で一覧を取得し直す
+            self._unsettle_directories()
+        logger.info(f"Loaded vault snapshot with {len(self.slots)} files "
+                    f"(saved {time.time() - data.get('saved_at', 0):.0f}s ago)")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """走査統計を取得"""
+        return {
+            **self.stats,
+            'files': len(self.slots),
+            'directories': len(self.directories)
+        }
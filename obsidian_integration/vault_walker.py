@@ -0,0 +1,231 @@
+"""
+保管庫の走査
+gitignore形式の除外ルールを適用し、除外されたディレクトリには降りずに保管庫内のMarkdownファイルを列挙する
+"""
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 保管庫のルートに置く除外ルールのファイル（書式は.gitignoreと同じ）
+SYNCIGNORE_FILE = '.syncignore'
+
+
+class IgnoreRule(NamedTuple):
+    """除外ルール1行分"""
+    pattern: str
+    regex: 're.Pattern'
+    negate: bool
+    directory_only: bool
+
+
+def _translate(pattern: str) -> str:
+    """gitignore形式のパターン（先頭の!と末尾の/を除いたもの）を、保管庫からの相対パスに対する正規表現に変換"""
+    # 途中か先頭に/があるパターンはルートからの位置を固定し、ない場合は任意の深さの名前に一致させる
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 1:]:
+            end = pattern.index(']', i + 2) if pattern[i + 1:i + 2] == ']' else pattern.index(']', i + 1)
+            body = pattern[i + 1:end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            parts.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end + 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    body = ''.join(parts)
+    return ('' if anchored else '(?:.*/)?') + body + r'\Z'
+
+
+def parse_rule(line: str) -> Optional[IgnoreRule]:
+    """1行を除外ルールに変換（空行とコメントはNone）"""
+    stripped = line.rstrip()
+    if not stripped or stripped.startswith('#'):
+        return None
+    negate = stripped.startswith('!')
+    pattern = stripped[1:] if negate else stripped
+    if pattern.startswith('\\#') or pattern.startswith('\\!'):
+        pattern = pattern[1:]
+    directory_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    if not pattern:
+        return None
+    try:
+        return IgnoreRule(stripped, re.compile(_translate(pattern)), negate, directory_only)
+    except re.error as e:
+        logger.warning(f"Invalid ignore pattern {stripped!r}: {e}")
+        return None
+
+
+class IgnoreRules:
+    """除外ルールの集合
+
+    gitignoreと同じく後に書かれたルールが優先され、!で始まるルールは除外を取り消す。
+    親ディレクトリが除外されている場合の扱いは、走査で降りないことによって実現する。
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self.rules: List[IgnoreRule] = []
+        for line in patterns:
+            rule = parse_rule(line)
+            if rule is not None:
+                self.rules.append(rule)
+        # ファイルにも適用されるルールがなければ、ファイルごとの照合を省略できる
+        self.has_file_rules = any(not rule.directory_only for rule in self.rules)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def match(self, relative_path: str, is_dir: bool) -> bool:
+        """保管庫からの相対パス（/区切り）が除外されるか"""
+        for rule in reversed(self.rules):
+            if rule.directory_only and not is_dir:
+                continue
+            if rule.regex.match(relative_path):
+                return not rule.negate
+        return False
+
+
+class VaultWalker:
+    """保管庫ウォーカークラス
+
+    設定（OBSIDIAN_IGNORE_PATTERNS）と保管庫ルートの.syncignoreから除外ルールを読み込み、
+    走査では除外されたディレクトリに降りない。変更イベントのパスも同じルールで判定できる。
+    .syncignoreの変更はrefresh()で反映する。
+    """
+
+    def __init__(self, vault_path: str, patterns: Optional[Iterable[str]] = None, suffix: str = '.md'):
+        self.vault_path = str(Path(vault_path))
+        self.suffix = suffix
+        self.patterns = list(settings.OBSIDIAN_IGNORE_PATTERNS if patterns is None else patterns)
+        self.ignore_file = os.path.join(self.vault_path, SYNCIGNORE_FILE)
+        self._ignore_file_mtime: Optional[int] = None
+        # 相対パス → 除外されるか（ディレクトリの判定のみ。変更イベントの判定で祖先をたどるため）
+        self._directory_cache: Dict[str, bool] = {}
+        self.stats = {
+            'directories_pruned': 0,
+            'files_ignored': 0
+        }
+        self.rules = self._load_rules()
+
+    def _load_rules(self) -> IgnoreRules:
+        lines = list(self.patterns)
+        try:
+            stat = os.stat(self.ignore_file)
+            with open(self.ignore_file, 'r', encoding='utf-8') as f:
+                lines.extend(f.read().splitlines())
+            self._ignore_file_mtime = stat.st_mtime_ns
+        except FileNotFoundError:
+            self._ignore_file_mtime = None
+        except OSError as e:
+            logger.warning(f"Failed to read {self.ignore_file}: {e}")
+            self._ignore_file_mtime = None
+        self._directory_cache = {}
+        return IgnoreRules(lines)
+
+    def refresh(self) -> bool:
+        """.syncignoreが変わっていればルールを読み直す（読み直した場合True）"""
+        try:
+            mtime_ns = os.stat(self.ignore_file).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if mtime_ns == self._ignore_file_mtime:
+            return False
+        self.rules = self._load_rules()
+        logger.info(f"Reloaded ignore rules ({len(self.rules)} rules)")
+        return True
+
+    def signature(self) -> List[str]:
+        """現在のルール（スナップショットに保存し、ルールが変わったかの判定に使う）"""
+        return [rule.pattern for rule in self.rules.rules]
+
+    def relative(self, path: str) -> Optional[str]:
+        """保管庫からの相対パス（/区切り、ルートは空文字列）。保管庫の外はNone"""
+        path = os.path.normpath(path)
+        if path == self.vault_path:
+            return ''
+        prefix = self.vault_path.rstrip(os.sep) + os.sep
+        if not path.startswith(prefix):
+            return None
+        relative_path = path[len(prefix):]
+        return relative_path.replace(os.sep, '/') if os.sep != '/' else relative_path
+
+    def is_ignored_dir(self, relative_path: str) -> bool:
+        """相対パスのディレクトリが除外されるか"""
+        ignored = self._directory_cache.get(relative_path)
+        if ignored is None:
+            ignored = self.rules.match(relative_path, True)
+            self._directory_cache[relative_path] = ignored
+        return ignored
+
+    def is_ignored_file(self, relative_path: str) -> bool:
+        """相対パスのファイルが除外されるか（親ディレクトリは判定しない）"""
+        return self.rules.has_file_rules and self.rules.match(relative_path, False)
+
+    def is_ignored(self, path: str, is_dir: bool = False) -> bool:
+        """絶対パスが除外されるか（祖先のディレクトリが除外されている場合も含む）"""
+        relative_path = self.relative(path)
+        if relative_path is None:
+            return True
+        if not relative_path:
+            return False
+        parts = relative_path.split('/')
+        for depth in range(1, len(parts)):
+            if self.is_ignored_dir('/'.join(parts[:depth])):
+                return True
+        return self.is_ignored_dir(relative_path) if is_dir else self.is_ignored_file(relative_path)
+
+    def walk(self) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """os.walkと同じ形式で走査（除外されたディレクトリには降りず、除外されたファイルは含めない）"""
+        if not os.path.isdir(self.vault_path):
+            return
+        for root, dirs, files in os.walk(self.vault_path):
+            relative_root = self.relative(root)
+            prefix = relative_root + '/' if relative_root else ''
+            kept = [name for name in dirs if not self.is_ignored_dir(prefix + name)]
+            self.stats['directories_pruned'] += len(dirs) - len(kept)
+            dirs[:] = kept
+            if self.rules.has_file_rules:
+                kept_files = [name for name in files if not self.is_ignored_file(prefix + name)]
+                self.stats['files_ignored'] += len(files) - len(kept_files)
+                files = kept_files
+            yield root, dirs, files
+
+    def iter_files(self) -> Iterator[str]:
+        """対象のMarkdownファイルのパスを列挙"""
+        for root, dirs, files in self.walk():
+            for file in files:
+                if file.endswith(self.suffix):
+                    yield os.path.join(root, file)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """走査統計を取得"""
+        return {**self.stats, 'rules': len(self.rules)}
+
+
+def iter_markdown_files(vault_path: str) -> Iterator[str]:
+    """除外ルールを適用して保管庫内のMarkdownファイルを列挙"""
+    return VaultWalker(vault_path).iter_files()
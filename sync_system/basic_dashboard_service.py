@@ -2,12 +2,19 @@
 基本的なダッシュボード機能
 現在の状況を表示するシンプルなダッシュボード
 """
+import asyncio
+import itertools
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from analysis_engine.enhanced_analysis_engine import EnhancedAnalysisEngine
 from notion_integration.notion_client import NotionClient
+from notion_integration.pagination import aclosing
 from obsidian_integration.markdown_parser import ObsidianMarkdownParser
+from obsidian_integration.parse_cache import ParseCache
+from obsidian_integration.property_index import NotePropertyIndex
+from obsidian_integration.search_index import FullTextIndex
+from obsidian_integration.vault_walker import iter_markdown_files
 from config import settings
 import os
 
@@ -20,6 +27,22 @@ class BasicDashboardService:
         self.analysis_engine = EnhancedAnalysisEngine()
         self.notion_client = NotionClient()
         self.markdown_parser = ObsidianMarkdownParser()
+        self.parse_cache = ParseCache(
+            os.path.join(settings.SYNC_STATE_DIR, 'parse_cache.sqlite3'),
+            settings.OBSIDIAN_VAULT_PATH,
+            self.markdown_parser
+        )
+        # 同期コーディネーターが更新するタグ・プロパティインデックス（参照時に保存内容を読み直す）
+        self.property_index = NotePropertyIndex(
+            os.path.join(settings.SYNC_STATE_DIR, 'property_index.json'),
+            self.markdown_parser
+        )
+        # ファイルモニターが更新する全文検索インデックス（未作成の場合は初回の検索時に作成する）
+        self.search_index = FullTextIndex(
+            os.path.join(settings.SYNC_STATE_DIR, 'search_index.sqlite3'),
+            settings.OBSIDIAN_VAULT_PATH,
+            self.markdown_parser
+        )
         
         logger.info("Basic Dashboard Service initialized")
     
@@ -74,7 +97,9 @@ class BasicDashboardService:
                 "obsidian_files": 0,
                 "total_content": 0,
                 "last_analysis": None,
-                "analysis_count": 0
+                "analysis_count": 0,
+                "total_tags": 0,
+                "popular_tags": []
             }
             
             # Notionページ数
@@ -95,12 +120,60 @@ class BasicDashboardService:
             
             stats["total_content"] = stats["notion_pages"] + stats["obsidian_files"]
             
+            # タグ統計
+            try:
+                self.property_index.refresh()
+                stats["total_tags"] = self.property_index.get_stats()["tags"]
+                stats["popular_tags"] = self.property_index.get_tag_counts(10)
+            except Exception as e:
+                logger.warning(f"Failed to get tag stats: {e}")
+            
             return stats
             
         except Exception as e:
             logger.error(f"Basic stats generation failed: {e}")
             return {"error": str(e)}
     
+    def query_notes(self, tags: Optional[List[str]] = None, properties: Optional[Dict[str, Any]] = None,
+                    ranges: Optional[Dict[str, List[Any]]] = None, sort: Optional[str] = "modified",
+                    descending: bool = True, limit: Optional[int] = 50) -> Dict[str, Any]:
+        """タグ・プロパティでノートを絞り込む"""
+        try:
+            self.property_index.refresh()
+            notes = self.property_index.query(
+                tags=tags,
+                properties=properties,
+                ranges={key: tuple(bounds) for key, bounds in (ranges or {}).items()},
+                sort=sort,
+                descending=descending,
+                limit=limit
+            )
+            return {
+                "count": len(notes),
+                "items": notes
+            }
+            
+        except Exception as e:
+            logger.error(f"Note query failed: {e}")
+            return {"error": str(e)}
+    
+    async def search_notes(self, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """ノートを全文検索する"""
+        try:
+            if self.search_index.is_empty() and settings.OBSIDIAN_VAULT_PATH and os.path.exists(settings.OBSIDIAN_VAULT_PATH):
+                await asyncio.to_thread(self.search_index.sync_with_vault)
+            items = await asyncio.to_thread(self.search_index.search, query, limit, offset)
+            return {
+                "query": query,
+                "count": len(items),
+                "items": items,
+                "duration_ms": self.search_index.stats['last_query_duration'] * 1000
+            }
+            
+        except Exception as e:
+            logger.error(f"Note search failed: {e}")
+            return {"error": str(e)}
+    
     async def _get_sync_status(self) -> Dict[str, Any]:
         """同期状況の取得"""
         try:
@@ -238,13 +311,16 @@ class BasicDashboardService:
             
             # Notionコンテンツ
             try:
-                notion_pages = await self.notion_client.get_database_pages()
-                if notion_pages:
-                    for page in notion_pages[:5]:  # 最大5件
+                pages_seen = 0
+                async with aclosing(self.notion_client.iter_database_pages()) as pages:
+                    async for page in pages:
+                        if pages_seen >= 5:  # 最大5件
+                            break
+                        pages_seen += 1
                         page_id = page["id"]
                         blocks = await self.notion_client.get_page_content(page_id)
                         text_content = self._extract_text_from_blocks(blocks)
-                        
+                    
                         if text_content:
                             contents.append({
                                 "id": page_id,
@@ -263,26 +339,11 @@ class BasicDashboardService:
             try:
                 obsidian_files = self._scan_obsidian_files()
                 for file_path in obsidian_files[:5]:  # 最大5件
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                        
-                        parsed_data = self.markdown_parser.parse_file(file_path, content)
-                        if parsed_data and parsed_data.get('content', {}).get('raw_content'):
-                            contents.append({
-                                "id": file_path,
-                                "text": parsed_data['content']['raw_content'],
-                                "metadata": {
-                                    "title": parsed_data.get('file_info', {}).get('name', ''),
-                                    "source": "obsidian",
-                                    "file_path": file_path,
-                                    "last_modified": parsed_data.get('file_info', {}).get('modified_time', ''),
-                                    "word_count": parsed_data.get('metadata', {}).get('word_count', 0)
-                                }
-                            })
-                    except Exception as e:
-                        logger.warning(f"Failed to parse file {file_path}: {e}")
-                        continue
+                    # 変更のないファイルは読み込まずに前回の解析結果を使う
+                    entry = self.parse_cache.get_content_entry(file_path)
+                    if entry:
+                        contents.append(entry)
+                self.parse_cache.flush()
             except Exception as e:
                 logger.warning(f"Failed to get Obsidian content: {e}")
             
@@ -299,14 +360,8 @@ class BasicDashboardService:
             if not vault_path or not os.path.exists(vault_path):
                 return []
             
-            markdown_files = []
-            for root, dirs, files in os.walk(vault_path):
-                for file in files:
-                    if file.endswith('.md'):
-                        file_path = os.path.join(root, file)
-                        markdown_files.append(file_path)
-            
-            return markdown_files[:10]  # 最大10件まで
+            # 除外ルールを適用し、最大10件に達した時点で走査をやめる
+            return list(itertools.islice(iter_markdown_files(vault_path), 10))
             
         except Exception as e:
             logger.error(f"File scanning failed: {e}")
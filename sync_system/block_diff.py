@@ -0,0 +1,191 @@
+"""
+ブロック差分エンジン
+既存のNotionページのブロックと新しいブロック列を比較し、最小限のAPI呼び出しで更新する
+"""
+import logging
+import hashlib
+import json
+from difflib import SequenceMatcher
+from typing import Dict, Any, List, Optional
+
+from notion_integration.pagination import iterate_paginated_api
+
+logger = logging.getLogger(__name__)
+
+# blocks.children.append の1回あたりの最大ブロック数
+MAX_APPEND_CHILDREN = 100
+
+# 差分の対象外とするブロック（削除すると子ページごとアーカイブされるため）
+PRESERVED_BLOCK_TYPES = {'child_page', 'child_database'}
+
+# 内容比較に含めるブロック固有のフィールド
+SIGNATURE_FIELDS = ('language', 'checked')
+
+
+class BlockDiffEngine:
+    """ブロック差分エンジンクラス"""
+
+    def block_signature(self, block: Dict[str, Any]) -> str:
+        """ブロックの内容ハッシュを計算（APIレスポンスと変換結果の両方に対応）"""
+        block_type = block.get('type', '')
+        body = block.get(block_type, {}) or {}
+
+        rich_text = []
+        for item in body.get('rich_text', []):
+            text = item.get('text', {}) or {}
+            content = text.get('content', item.get('plain_text', ''))
+            link = (text.get('link') or {}).get('url')
+            annotations = {
+                key: value for key, value in (item.get('annotations') or {}).items()
+                if value and value != 'default'
+            }
+            rich_text.append([content, link, annotations])
+
+        extras = {field: body[field] for field in SIGNATURE_FIELDS if field in body}
+        if body.get('children'):
+            # ネストしたリストなど子ブロックを含む場合は子の内容も比較する
+            # （APIレスポンスの子ブロックはfetch_childrenで同じ位置に読み込んでおく）
+            extras['children'] = [self.block_signature(child) for child in body['children']]
+        payload = json.dumps([block_type, rich_text, extras], sort_keys=True, ensure_ascii=False)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+    def compute_edit_script(self, existing_blocks: List[Dict[str, Any]],
+                            new_blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """既存ブロックから新しいブロック列への編集スクリプトを計算"""
+        existing = [b for b in existing_blocks if b.get('type') not in PRESERVED_BLOCK_TYPES]
+        old_hashes = [self.block_signature(b) for b in existing]
+        new_hashes = [self.block_signature(b) for b in new_blocks]
+
+        script = {
+            'updates': [],
+            'deletes': [],
+            'inserts': [],
+            'unchanged': 0,
+            'full_rewrite': False
+        }
+
+        matcher = SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+        anchor = None  # 直前に残る既存ブロックのID
+        pending = []
+
+        def flush():
+            if pending:
+                script['inserts'].append({'after': anchor, 'children': list(pending)})
+                pending.clear()
+
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                flush()
+                script['unchanged'] += i2 - i1
+                anchor = existing[i2 - 1]['id']
+            elif tag == 'delete':
+                script['deletes'].extend(b['id'] for b in existing[i1:i2])
+            elif tag == 'insert':
+                pending.extend(new_blocks[j1:j2])
+            else:
+                # replace: 同じタイプ同士はその場で更新し、それ以外は削除＋挿入
+                old_range = existing[i1:i2]
+                new_range = new_blocks[j1:j2]
+                for k in range(max(len(old_range), len(new_range))):
+                    old_block = old_range[k] if k < len(old_range) else None
+                    new_block = new_range[k] if k < len(new_range) else None
+                    # blocks.updateでは子ブロックを変更できないため、子を持つブロックは置き換える
+                    # （新旧どちらかに子があれば、古い子が残ったり新しい子が入らなかったりする）
+                    if (old_block and new_block and old_block.get('type') == new_block.get('type')
+                            and not self._has_children(old_block) and not self._has_children(new_block)):
+                        flush()
+                        script['updates'].append({'block_id': old_block['id'], 'block': new_block})
+                        anchor = old_block['id']
+                        continue
+                    if old_block:
+                        script['deletes'].append(old_block['id'])
+                    if new_block:
+                        pending.append(new_block)
+        flush()
+
+        # Notion APIは先頭への挿入ができないため、残存ブロックの前に挿入が必要な場合は全置換する
+        survivors = script['unchanged'] + len(script['updates'])
+        if survivors and script['inserts'] and script['inserts'][0]['after'] is None:
+            script = {
+                'updates': [],
+                'deletes': [b['id'] for b in existing],
+                'inserts': [{'after': None, 'children': list(new_blocks)}] if new_blocks else [],
+                'unchanged': 0,
+                'full_rewrite': True
+            }
+
+        return script
+
+    @staticmethod
+    def _has_children(block: Dict[str, Any]) -> bool:
+        body = block.get(block.get('type', ''), {}) or {}
+        return bool(block.get('has_children') or body.get('children'))
+
+    async def fetch_children(self, client, page_id: str, stats: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """ページの既存の子ブロックを取得
+
+        has_childrenのブロックは子ブロックも再帰的に取得し、変換結果と同じく本体のchildrenに入れる。
+        statsを渡すと、取得に使ったAPI呼び出しの回数をstats['api_calls']に加算する。
+        """
+        blocks = [block async for block in iterate_paginated_api(client.blocks.children.list, block_id=page_id)]
+        if stats is not None:
+            stats['api_calls'] = stats.get('api_calls', 0) + max(1, -(-len(blocks) // MAX_APPEND_CHILDREN))
+        for block in blocks:
+            block_type = block.get('type')
+            if block.get('has_children') and block_type not in PRESERVED_BLOCK_TYPES:
+                body = block.get(block_type)
+                if not isinstance(body, dict):
+                    body = block[block_type] = {}
+                body['children'] = await self.fetch_children(client, block['id'], stats)
+        return blocks
+
+    async def apply(self, client, page_id: str, new_blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """差分を計算してページに適用"""
+        fetch_stats = {'api_calls': 0}
+        existing_blocks = await self.fetch_children(client, page_id, fetch_stats)
+        script = self.compute_edit_script(existing_blocks, new_blocks)
+        api_calls = fetch_stats['api_calls']  # 取得分
+
+        for update in script['updates']:
+            block = update['block']
+            block_type = block['type']
+            client.blocks.update(block_id=update['block_id'], **{block_type: block[block_type]})
+            api_calls += 1
+
+        for block_id in script['deletes']:
+            client.blocks.delete(block_id=block_id)
+            api_calls += 1
+
+        inserted = 0
+        for insert in script['inserts']:
+            after = insert['after']
+            children = insert['children']
+            for start in range(0, len(children), MAX_APPEND_CHILDREN):
+                chunk = children[start:start + MAX_APPEND_CHILDREN]
+                params = {'block_id': page_id, 'children': chunk}
+                if after:
+                    params['after'] = after
+                response = client.blocks.children.append(**params)
+                api_calls += 1
+                inserted += len(chunk)
+                # 次のチャンクは今回追加した最後のブロックの後ろに続ける
+                after = self._last_result_id(response) or after
+
+        stats = {
+            'unchanged': script['unchanged'],
+            'updated': len(script['updates']),
+            'deleted': len(script['deletes']),
+            'inserted': inserted,
+            'api_calls': api_calls,
+            'full_rewrite': script['full_rewrite']
+        }
+        logger.info(f"Block diff applied to {page_id}: {stats}")
+        return stats
+
+    def _last_result_id(self, response: Any) -> Optional[str]:
+        """append APIのレスポンスから最後に作成されたブロックのIDを取得"""
+        try:
+            results = response.get('results', []) if isinstance(response, dict) else []
+            return results[-1]['id'] if results else None
+        except Exception:
+            return None
@@ -0,0 +1,162 @@
+"""
+gitによる変更検出
+前回分析したコミットからの差分をgitに問い合わせ、変更・削除された保管庫内のノートだけを返す
+"""
+import json
+import logging
+import os
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, NamedTuple, Optional
+from obsidian_integration.vault_walker import SYNCIGNORE_FILE, VaultWalker
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+# 前回分析したコミットを記録するファイル（分析結果のディレクトリに置き、結果と一緒にコミットされる）
+STATE_FILE = 'last_analyzed_commit.json'
+
+# gitコマンドの待ち時間（秒）
+GIT_TIMEOUT = 60
+
+
+class VaultChanges(NamedTuple):
+    """前回分析したコミットからの変更"""
+    base_commit: str
+    head_commit: str
+    changed: List[str]
+    deleted: List[str]
+
+
+class GitChangeDetector:
+    """gitによる変更検出クラス
+
+    前回分析したコミットと作業ツリーの差分（コミット済み・未コミットの変更と未追跡のファイル）から、
+    除外ルールに一致しないMarkdownファイルを変更・削除に分けて返す。
+    履歴を使えない場合（gitがない・リポジトリでない・記録がない・浅いクローンでコミットがない・
+    除外ルールが変わった）はNoneを返し、呼び出し側は保管庫全体の走査に切り替える。
+    """
+
+    def __init__(self, vault_path: str, results_dir: str, walker: Optional[VaultWalker] = None):
+        self.vault_path = os.path.abspath(vault_path)
+        self.state_path = Path(results_dir) / STATE_FILE
+        self.walker = walker or VaultWalker(self.vault_path)
+
+    def _git(self, *args: str) -> Optional[str]:
+        """保管庫のディレクトリでgitを実行し、標準出力を返す（失敗した場合はNone）"""
+        try:
+            result = subprocess.run(
+                ['git', *args], cwd=self.vault_path, capture_output=True, timeout=GIT_TIMEOUT
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.debug(f"git {args[0]} failed: {e}")
+            return None
+        if result.returncode != 0:
+            logger.debug(f"git {args[0]} failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+            return None
+        return result.stdout.decode('utf-8', 'surrogateescape')
+
+    def head_commit(self) -> Optional[str]:
+        """現在のコミットを取得（リポジトリでない場合はNone）"""
+        output = self._git('rev-parse', '--verify', '-q', 'HEAD')
+        return output.strip() if output else None
+
+    def load_state(self) -> Optional[Dict[str, Any]]:
+        """前回分析したコミットの記録を読み込む"""
+        try:
+            if not self.state_path.exists():
+                return None
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') != STATE_VERSION:
+                return None
+            return state
+        except Exception as e:
+            logger.warning(f"Failed to load {self.state_path}: {e}")
+            return None
+
+    def save_state(self, commit: str) -> bool:
+        """分析したコミットを記録"""
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': STATE_VERSION,
+                    'commit': commit,
+                    'ignore_rules': self.walker.signature(),
+                    'analyzed_at': datetime.now().isoformat()
+                }, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.state_path)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save {self.state_path}: {e}")
+            return False
+
+    def _is_target(self, relative_path: str) -> bool:
+        return (relative_path.endswith(self.walker.suffix)
+                and not self.walker.is_ignored(os.path.join(self.vault_path, relative_path)))
+
+    def detect(self) -> Optional[VaultChanges]:
+        """前回分析したコミットからの変更を取得（履歴を使えない場合はNone）"""
+        head = self.head_commit()
+        if head is None:
+            logger.info("Vault is not in a git repository, falling back to a full scan")
+            return None
+        state = self.load_state()
+        if state is None or not state.get('commit'):
+            logger.info("No previously analyzed commit, falling back to a full scan")
+            return None
+        base = state['commit']
+        if self._git('cat-file', '-e', f'{base}^{{commit}}') is None:
+            logger.info(f"Commit {base[:12]} is not in the local history (shallow clone?), "
+                        f"falling back to a full scan")
+            return None
+        if self.walker.refresh() or state.get('ignore_rules') != self.walker.signature():
+            logger.info("Ignore rules changed, falling back to a full scan")
+            return None
+
+        # 作業ツリーと比較する（CI以外で実行した場合の未コミットの変更も含める）
+        diff = self._git('diff', '--name-status', '-z', '-M', '--relative', '--no-ext-diff', base, '--', '.')
+        untracked = self._git('ls-files', '-z', '--others', '--exclude-standard', '--', '.')
+        if diff is None or untracked is None:
+            logger.info("git diff failed, falling back to a full scan")
+            return None
+
+        changed = set()
+        deleted = set()
+        fields = diff.split('\0')
+        i = 0
+        while i < len(fields) and fields[i]:
+            status = fields[i]
+            if status[0] in 'RC':
+                old_path, new_path = fields[i + 1], fields[i + 2]
+                i += 3
+                if status[0] == 'R':
+                    deleted.add(old_path)
+                changed.add(new_path)
+            else:
+                path = fields[i + 1]
+                i += 2
+                (deleted if status[0] == 'D' else changed).add(path)
+        changed.update(path for path in untracked.split('\0') if path)
+
+        if SYNCIGNORE_FILE in changed or SYNCIGNORE_FILE in deleted:
+            logger.info("Ignore rules changed, falling back to a full scan")
+            return None
+
+        changed_paths = []
+        for relative_path in sorted(changed):
+            if not self._is_target(relative_path):
+                continue
+            file_path = os.path.join(self.vault_path, relative_path)
+            if os.path.isfile(file_path):
+                changed_paths.append(file_path)
+            else:
+                deleted.add(relative_path)
+        deleted_paths = [os.path.join(self.vault_path, relative_path)
+                         for relative_path in sorted(deleted) if self._is_target(relative_path)]
+
+        return VaultChanges(base, head, changed_paths, deleted_paths)
@@ -15,8 +15,13 @@ sys.path.insert(0, str(project_root))
 
 from analysis_engine.enhanced_analysis_engine import EnhancedAnalysisEngine
 from notion_integration.notion_client import NotionClient
+from obsidian_integration.content_hash_store import ContentHashStore
 from obsidian_integration.markdown_parser import ObsidianMarkdownParser
+from obsidian_integration.parse_cache import ParseCache
+from obsidian_integration.vault_ingestion import VaultIngestionPipeline
+from obsidian_integration.vault_merkle import VaultMerkleTree
 from sync_system.basic_dashboard_service import BasicDashboardService
+from sync_system.git_change_detector import GitChangeDetector
 from config import settings
 
 # ログ設定
@@ -38,6 +43,33 @@ class GitHubActionsRunner:
         # Obsidian保管庫のパス
         self.vault_path = os.getenv('OBSIDIAN_VAULT_PATH', './obsidian-vault')
         
+        # 分析結果の保存先（CIではSYNC_STATE_DIRが引き継がれないため、実行間で引き継ぐ状態も
+        # ここに置き、分析結果と一緒にコミットする）
+        self.results_dir = Path("analysis-results")
+        
+        # 解析キャッシュ（前回の実行から変わっていないノートは再解析しない）
+        self.parse_cache = ParseCache(
+            str(self.results_dir / 'parse_cache.sqlite3'),
+            self.vault_path,
+            self.markdown_parser
+        )
+        self.ingestion_pipeline = VaultIngestionPipeline(self.vault_path, self.parse_cache)
+        
+        # 内容ハッシュ（前回の実行から内容が変わったノートがなければ分析を省略する）
+        self.content_hashes = ContentHashStore(
+            str(self.results_dir / 'content_hashes.json'),
+            self.vault_path
+        )
+        
+        # 前回分析したコミットからの差分の検出
+        self.change_detector = (
+            GitChangeDetector(self.vault_path, str(self.results_dir))
+            if settings.CI_CHANGE_DETECTION == 'git' else None
+        )
+        
+        # 前回分析した時点の保管庫のMerkleツリー（差分が分からない場合も、根のハッシュで変更の有無を判定する）
+        self.vault_tree = VaultMerkleTree(self.vault_path, str(self.results_dir / 'vault_tree.json'))
+        
         logger.info("GitHub Actions Runner initialized")
     
     async def run_analysis(self):
@@ -45,45 +77,77 @@ class GitHubActionsRunner:
         try:
             logger.info("Starting analysis...")
             
-            # 1. Obsidianファイルをスキャン
-            obsidian_files = self._scan_obsidian_files()
-            logger.info(f"Found {len(obsidian_files)} Obsidian files")
+            # 1-2. Obsidianファイルを走査しながら並行して読み込み・解析
+            if not Path(self.vault_path).exists():
+                logger.warning(f"Vault path does not exist: {self.vault_path}")
+                return
             
-            if not obsidian_files:
+            # 前回分析したコミットからの差分が分かれば、変更されたノートだけを読み込む
+            changes = await asyncio.to_thread(self.change_detector.detect) if self.change_detector else None
+            if changes is not None:
+                logger.info(f"Git diff {changes.base_commit[:12]}..{changes.head_commit[:12]}: "
+                            f"{len(changes.changed)} changed, {len(changes.deleted)} deleted notes")
+                for file_path in changes.deleted:
+                    self.content_hashes.remove(file_path)
+            
+            # 保管庫のツリーを更新する（差分が分かれば変更されたファイルだけ、分からなければstatで走査）
+            tree_loaded = self.vault_tree.loaded
+            if changes is not None and tree_loaded:
+                tree_diff = await asyncio.to_thread(self.vault_tree.apply, changes.changed, changes.deleted)
+            else:
+                tree_diff = await asyncio.to_thread(self.vault_tree.refresh)
+            logger.info(f"Vault tree {self.vault_tree.root_hash[:12]}: {len(tree_diff.added)} added, "
+                        f"{len(tree_diff.modified)} modified, {len(tree_diff.removed)} removed")
+            if changes is not None and not changes.changed and not changes.deleted:
+                # ノート以外のコミットだけの場合も、次回はこのコミットからの差分にする
+                logger.info("No notes changed since the last analyzed commit, skipping analysis")
+                await self._save_state(changes)
+                return
+            if changes is None and tree_loaded and tree_diff.is_empty():
+                logger.info("Vault tree unchanged since the last analysis, skipping analysis")
+                await self._save_state(changes)
+                return
+            
+            contents = await self.ingestion_pipeline.collect(changes.changed if changes else None)
+            ingestion_stats = self.ingestion_pipeline.get_stats()
+            logger.info(f"Found {ingestion_stats['files']} Obsidian files "
+                        f"({ingestion_stats['parsed']} parsed, {ingestion_stats['cached']} cached)")
+            
+            if changes is None and not ingestion_stats['files']:
                 logger.warning("No Obsidian files found")
                 return
             
-            # 2. ファイルを解析
-            contents = []
-            for file_path in obsidian_files:
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    parsed_data = self.markdown_parser.parse_file(file_path, content)
-                    if parsed_data and parsed_data.get('content', {}).get('raw_content'):
-                        contents.append({
-                            "id": file_path,
-                            "text": parsed_data['content']['raw_content'],
-                            "metadata": {
-                                "title": parsed_data.get('file_info', {}).get('name', ''),
-                                "source": "obsidian",
-                                "file_path": file_path,
-                                "last_modified": parsed_data.get('file_info', {}).get('modified_time', ''),
-                                "word_count": parsed_data.get('metadata', {}).get('word_count', 0)
-                            }
-                        })
-                except Exception as e:
-                    logger.warning(f"Failed to parse file {file_path}: {e}")
-                    continue
-            
-            if not contents:
+            if not contents and not (changes and changes.deleted):
                 logger.warning("No valid content found")
                 return
             
+            # 前回の実行から内容が変わったノートを確認
+            file_paths = [content['metadata']['file_path'] for content in contents]
+            changed_paths = await asyncio.to_thread(self.content_hashes.changed_paths, file_paths)
+            if changes is not None:
+                # 差分の検出では変更されたノートだけを分析する（mtimeだけが変わったノートは除く）
+                removed_count = len(changes.deleted)
+                changed_set = set(changed_paths)
+                contents = [content for content in contents if content['metadata']['file_path'] in changed_set]
+            else:
+                removed_count = self.content_hashes.prune(file_paths)
+            hash_stats = self.content_hashes.get_stats()
+            logger.info(f"{len(changed_paths)} changed, {removed_count} removed, "
+                        f"{len(file_paths) - len(changed_paths)} unchanged notes "
+                        f"(suppression rate {hash_stats['suppression_rate']:.1%})")
+            
+            if not changed_paths and not removed_count:
+                logger.info("No notes changed since the last run, skipping analysis")
+                await self._save_state(changes)
+                return
+            
             # 3. 分析を実行
             logger.info(f"Analyzing {len(contents)} contents...")
-            analysis_results = await self.analysis_engine.analyze_content_comprehensive(contents)
+            if contents:
+                analysis_results = await self.analysis_engine.analyze_content_comprehensive(contents)
+            else:
+                analysis_results = {}
+            analysis_results['change_detection'] = self._describe_changes(changes, contents)
             
             # 4. 結果をログに出力
             logger.info("Analysis completed:")
@@ -92,36 +156,58 @@ class GitHubActionsRunner:
             logger.info(f"- Duplicates: {len(analysis_results.get('analysis_results', {}).get('basic_analysis', {}).get('duplicates', []))}")
             
             # 5. 結果をファイルに保存
-            await self._save_results(analysis_results)
+            if await self._save_results(analysis_results) is None:
+                return
+            
+            # 分析が完了した時点の内容とコミットを次回の比較対象にする
+            if 'error' in analysis_results:
+                self.content_hashes.save()
+                self.vault_tree.save()
+            else:
+                await self._save_state(changes)
             
             logger.info("Analysis completed successfully")
             
         except Exception as e:
             logger.error(f"Analysis failed: {e}")
             raise
+        finally:
+            # WALをデータベースに書き戻し、コミットされるファイルを完結した状態にする
+            self.parse_cache.close()
     
-    def _scan_obsidian_files(self):
-        """Obsidianファイルをスキャン"""
-        try:
-            vault_path = Path(self.vault_path)
-            if not vault_path.exists():
-                logger.warning(f"Vault path does not exist: {vault_path}")
-                return []
-            
-            markdown_files = []
-            for md_file in vault_path.rglob("*.md"):
-                markdown_files.append(str(md_file))
-            
-            return markdown_files
-            
-        except Exception as e:
-            logger.error(f"File scanning failed: {e}")
-            return []
+    def _describe_changes(self, changes, contents):
+        """分析の対象範囲（全体か、どのコミットからの差分か）"""
+        if changes is None:
+            return {'mode': 'full', 'vault_tree_hash': self.vault_tree.root_hash, 'analyzed': len(contents)}
+        return {
+            'mode': 'git',
+            'vault_tree_hash': self.vault_tree.root_hash,
+            'base_commit': changes.base_commit,
+            'head_commit': changes.head_commit,
+            'analyzed': len(contents),
+            'changed_files': [os.path.relpath(content['metadata']['file_path'], self.vault_path)
+                              for content in contents],
+            'deleted_files': [os.path.relpath(file_path, self.vault_path) for file_path in changes.deleted]
+        }
+    
+    async def _save_state(self, changes):
+        """内容ハッシュ・保管庫のツリー・分析したコミットを保存（分析を省略した場合も次回の比較対象にする）"""
+        self.content_hashes.save()
+        self.vault_tree.save()
+        await self._save_checkpoint(changes)
+    
+    async def _save_checkpoint(self, changes):
+        """分析したコミットを記録（次回はこのコミットからの差分だけを分析する）"""
+        if self.change_detector is None:
+            return
+        head = changes.head_commit if changes else await asyncio.to_thread(self.change_detector.head_commit)
+        if head is not None:
+            self.change_detector.save_state(head)
     
     async def _save_results(self, analysis_results):
-        """分析結果をファイルに保存"""
+        """分析結果をファイルに保存（保存したファイルのパスを返し、失敗した場合はNone）"""
         try:
-            results_dir = Path("analysis-results")
+            results_dir = self.results_dir
             results_dir.mkdir(exist_ok=True)
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -133,9 +219,11 @@ class GitHubActionsRunner:
                 json.dump(analysis_results, f, ensure_ascii=False, indent=2)
             
             logger.info(f"Results saved to: {results_file}")
+            return results_file
             
         except Exception as e:
             logger.error(f"Failed to save results: {e}")
+            return None
 
 async def main():
     """メイン関数"""
@@ -3,12 +3,18 @@
 ユーザーが即座に使える手動同期機能を実装
 """
 import asyncio
+import itertools
 import logging
+import os
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from analysis_engine.enhanced_analysis_engine import EnhancedAnalysisEngine
 from notion_integration.notion_client import NotionClient
+from notion_integration.pagination import aclosing
 from obsidian_integration.markdown_parser import ObsidianMarkdownParser
+from obsidian_integration.parse_cache import ParseCache
+from obsidian_integration.vault_ingestion import VaultIngestionPipeline
+from obsidian_integration.vault_walker import iter_markdown_files
 from obsidian_integration.dashboard_builder import ObsidianDashboardBuilder
 from notion_integration.dashboard_builder import NotionDashboardBuilder
 from config import settings
@@ -22,6 +28,15 @@ class ManualSyncService:
         self.analysis_engine = EnhancedAnalysisEngine()
         self.notion_client = NotionClient()
         self.markdown_parser = ObsidianMarkdownParser()
+        self.parse_cache = ParseCache(
+            os.path.join(settings.SYNC_STATE_DIR, 'parse_cache.sqlite3'),
+            settings.OBSIDIAN_VAULT_PATH,
+            self.markdown_parser
+        )
+        # 手動同期は少数のファイルのみ扱うため、ワーカープロセスは起動せずスレッドで解析する
+        self.ingestion_pipeline = VaultIngestionPipeline(
+            settings.OBSIDIAN_VAULT_PATH, self.parse_cache, parse_workers=0
+        )
         
         # Obsidianダッシュボードは設定がある場合のみ初期化
         try:
@@ -47,35 +62,38 @@ class ManualSyncService:
             logger.info("Starting manual sync: Notion → Obsidian")
             start_time = datetime.now()
             
-            # 1. Notionからデータを取得
-            notion_pages = await self.notion_client.get_database_pages()
-            if not notion_pages:
+            # 1-2. Notionからページをストリーミング取得し、到着順に内容を取得
+            contents = []
+            pages_seen = 0
+            async with aclosing(self.notion_client.iter_database_pages()) as pages:
+                async for page in pages:
+                    if pages_seen >= 10:  # 最大10件まで
+                        break
+                    pages_seen += 1
+                    page_id = page["id"]
+                    blocks = await self.notion_client.get_page_content(page_id)
+                
+                    # テキスト内容を抽出
+                    text_content = self._extract_text_from_blocks(blocks)
+                    if text_content:
+                        contents.append({
+                            "id": page_id,
+                            "text": text_content,
+                            "metadata": {
+                                "title": self._extract_title_from_page(page),
+                                "source": "notion",
+                                "last_modified": page.get("last_edited_time", ""),
+                                "url": page.get("url", "")
+                            }
+                        })
+            
+            if not pages_seen:
                 return {
                     "success": False,
                     "message": "No pages found in Notion database",
                     "sync_type": "notion_to_obsidian"
                 }
             
-            # 2. ページの内容を取得
-            contents = []
-            for page in notion_pages[:10]:  # 最大10件まで
-                page_id = page["id"]
-                blocks = await self.notion_client.get_page_content(page_id)
-                
-                # テキスト内容を抽出
-                text_content = self._extract_text_from_blocks(blocks)
-                if text_content:
-                    contents.append({
-                        "id": page_id,
-                        "text": text_content,
-                        "metadata": {
-                            "title": self._extract_title_from_page(page),
-                            "source": "notion",
-                            "last_modified": page.get("last_edited_time", ""),
-                            "url": page.get("url", "")
-                        }
-                    })
-            
             # 3. 基本的な分析を実行
             if contents:
                 analysis_results = await self.analysis_engine.analyze_content_comprehensive(contents)
@@ -132,29 +150,8 @@ class ManualSyncService:
                     "sync_type": "obsidian_to_notion"
                 }
             
-            # 2. ファイルの内容を解析
-            contents = []
-            for file_path in obsidian_files[:10]:  # 最大10件まで
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    parsed_data = self.markdown_parser.parse_file(file_path, content)
-                    if parsed_data and parsed_data.get('content', {}).get('raw_content'):
-                        contents.append({
-                            "id": file_path,
-                            "text": parsed_data['content']['raw_content'],
-                            "metadata": {
-                                "title": parsed_data.get('file_info', {}).get('name', ''),
-                                "source": "obsidian",
-                                "file_path": file_path,
-                                "last_modified": parsed_data.get('file_info', {}).get('modified_time', ''),
-                                "word_count": parsed_data.get('metadata', {}).get('word_count', 0)
-                            }
-                        })
-                except Exception as e:
-                    logger.warning(f"Failed to parse file {file_path}: {e}")
-                    continue
+            # 2. ファイルの内容を並行して解析
+            contents = await self.ingestion_pipeline.collect(obsidian_files[:10])  # 最大10件まで
             
             # 3. 基本的な分析を実行
             if contents:
@@ -277,19 +274,12 @@ class ManualSyncService:
     def _scan_obsidian_files(self) -> List[str]:
         """Obsidianファイルをスキャン"""
         try:
-            import os
             vault_path = settings.OBSIDIAN_VAULT_PATH
             if not vault_path or not os.path.exists(vault_path):
                 return []
             
-            markdown_files = []
-            for root, dirs, files in os.walk(vault_path):
-                for file in files:
-                    if file.endswith('.md'):
-                        file_path = os.path.join(root, file)
-                        markdown_files.append(file_path)
-            
-            return markdown_files[:20]  # 最大20件まで
+            # 除外ルールを適用し、最大20件に達した時点で走査をやめる
+            return list(itertools.islice(iter_markdown_files(vault_path), 20))
             
         except Exception as e:
             logger.error(f"File scanning failed: {e}")
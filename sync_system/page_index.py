@@ -0,0 +1,141 @@
+"""
+ページマッピングインデックス
+ObsidianノートIDとNotionページIDの対応を永続化し、双方向にO(1)で引けるようにする
+"""
+import logging
+import json
+import os
+from typing import Dict, Any, Optional
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+
+class PageMappingIndex:
+    """ObsidianノートID ↔ NotionページIDの双方向インデックス"""
+
+    def __init__(self, index_path: str):
+        self.index_path = Path(index_path)
+        self.by_obsidian_id: Dict[str, str] = {}
+        self.by_page_id: Dict[str, str] = {}
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        """インデックスファイルを必要になった時点で読み込む"""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            if not self.index_path.exists():
+                return
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION:
+                logger.warning(f"Page index version mismatch, starting empty: {self.index_path}")
+                return
+            self.by_obsidian_id = dict(data.get('entries', {}))
+            self.by_page_id = {page_id: obsidian_id for obsidian_id, page_id in self.by_obsidian_id.items()}
+            logger.info(f"Loaded page index with {len(self.by_obsidian_id)} entries")
+        except Exception as e:
+            logger.error(f"Page index loading failed: {e}")
+            self.by_obsidian_id = {}
+            self.by_page_id = {}
+
+    def save(self) -> bool:
+        """インデックスをアトミックに保存"""
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'entries': self.by_obsidian_id}, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_path)
+            return True
+        except Exception as e:
+            logger.error(f"Page index saving failed: {e}")
+            return False
+
+    def get_page_id(self, obsidian_id: str) -> Optional[str]:
+        """ObsidianノートIDからNotionページIDを取得"""
+        self._ensure_loaded()
+        return self.by_obsidian_id.get(obsidian_id)
+
+    def get_obsidian_id(self, page_id: str) -> Optional[str]:
+        """NotionページIDからObsidianノートIDを取得"""
+        self._ensure_loaded()
+        return self.by_page_id.get(page_id)
+
+    def set(self, obsidian_id: str, page_id: str):
+        """対応を登録（既存の対応は置き換える）"""
+        self._ensure_loaded()
+        old_page_id = self.by_obsidian_id.get(obsidian_id)
+        if old_page_id == page_id:
+            return
+        if old_page_id:
+            self.by_page_id.pop(old_page_id, None)
+        old_obsidian_id = self.by_page_id.get(page_id)
+        if old_obsidian_id:
+            self.by_obsidian_id.pop(old_obsidian_id, None)
+
+        self.by_obsidian_id[obsidian_id] = page_id
+        self.by_page_id[page_id] = obsidian_id
+        self.save()
+
+    def set_many(self, pairs: Dict[str, str]) -> int:
+        """複数の対応をまとめて登録し、1回だけ保存する（登録した件数を返す）"""
+        self._ensure_loaded()
+        count = 0
+        for obsidian_id, page_id in pairs.items():
+            if self.by_obsidian_id.get(obsidian_id) == page_id:
+                continue
+            old_page_id = self.by_obsidian_id.get(obsidian_id)
+            if old_page_id:
+                self.by_page_id.pop(old_page_id, None)
+            old_obsidian_id = self.by_page_id.get(page_id)
+            if old_obsidian_id:
+                self.by_obsidian_id.pop(old_obsidian_id, None)
+            self.by_obsidian_id[obsidian_id] = page_id
+            self.by_page_id[page_id] = obsidian_id
+            count += 1
+        if count:
+            self.save()
+        return count
+
+    def rename(self, old_obsidian_id: str, new_obsidian_id: str) -> Optional[str]:
+        """ノートの移動・リネームに合わせて対応を付け替える"""
+        self._ensure_loaded()
+        page_id = self.by_obsidian_id.pop(old_obsidian_id, None)
+        if not page_id:
+            return None
+        self.by_obsidian_id[new_obsidian_id] = page_id
+        self.by_page_id[page_id] = new_obsidian_id
+        self.save()
+        logger.info(f"Page index renamed: {old_obsidian_id} -> {new_obsidian_id}")
+        return page_id
+
+    def remove_obsidian_id(self, obsidian_id: str) -> Optional[str]:
+        """ObsidianノートIDの対応を削除"""
+        self._ensure_loaded()
+        page_id = self.by_obsidian_id.pop(obsidian_id, None)
+        if page_id:
+            self.by_page_id.pop(page_id, None)
+            self.save()
+        return page_id
+
+    def remove_page_id(self, page_id: str) -> Optional[str]:
+        """NotionページIDの対応を削除"""
+        self._ensure_loaded()
+        obsidian_id = self.by_page_id.pop(page_id, None)
+        if obsidian_id:
+            self.by_obsidian_id.pop(obsidian_id, None)
+            self.save()
+        return obsidian_id
+
+    def get_stats(self) -> Dict[str, Any]:
+        """インデックス統計を取得"""
+        self._ensure_loaded()
+        return {
+            'entries': len(self.by_obsidian_id),
+            'index_path': str(self.index_path)
+        }
@@ -4,20 +4,51 @@ NotionとObsidian間の同期を管理する
 """
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional
+import os
+from typing import Collection, Dict, Any, List, Optional
+from pathlib import Path
 from datetime import datetime
+from config import settings
+from .block_diff import BlockDiffEngine
+from .page_index import PageMappingIndex
+from notion_integration.block_converter import markdown_block_converter, markdown_to_blocks
+from notion_integration.markdown_renderer import NotionMarkdownRenderer
+from notion_integration.pagination import aclosing
+from notion_integration.render_cache import BlockRenderCache
+from obsidian_integration.frontmatter_reader import FrontmatterReader
+from obsidian_integration.link_graph import LinkGraphIndex
+from obsidian_integration.property_index import NotePropertyIndex
+from obsidian_integration.vault_merkle import VaultMerkleTree, diff_trees
+from obsidian_integration.vault_walker import iter_markdown_files
 
 logger = logging.getLogger(__name__)
 
+
+class MissingPageError(Exception):
+    """更新しようとしたNotionページが存在しない・アーカイブ済み"""
+
 class SyncCoordinator:
     """同期コーディネータークラス"""
     
-    def __init__(self, notion_client, obsidian_monitor, analysis_engine):
+    def __init__(self, notion_client, obsidian_monitor, analysis_engine, page_index: PageMappingIndex = None,
+                 link_graph: LinkGraphIndex = None, property_index: NotePropertyIndex = None,
+                 vault_tree: VaultMerkleTree = None):
         self.notion_client = notion_client
         self.obsidian_monitor = obsidian_monitor
         self.analysis_engine = analysis_engine
         self.running = False
         self.sync_queue = asyncio.Queue()
+        self.block_diff_engine = BlockDiffEngine()
+        self.render_cache = BlockRenderCache()
+        self.markdown_renderer = NotionMarkdownRenderer(cache=self.render_cache)
+        self.page_index = page_index or PageMappingIndex(os.path.join(settings.SYNC_STATE_DIR, 'page_index.json'))
+        self.link_graph = link_graph or LinkGraphIndex(os.path.join(settings.SYNC_STATE_DIR, 'link_graph.json'))
+        self.property_index = property_index or NotePropertyIndex(
+            os.path.join(settings.SYNC_STATE_DIR, 'property_index.json')
+        )
+        self.frontmatter_reader = FrontmatterReader()
+        # Notionに同期済みの時点の保管庫のMerkleツリー（保管庫のパスが分かってから作成する）
+        self._vault_tree = vault_tree
         self.sync_status = {
             'success_count': 0,
             'pending_count': 0,
@@ -33,6 +64,19 @@ class SyncCoordinator:
             # 変更コールバックの設定
             self.obsidian_monitor.set_change_callback(self._handle_obsidian_change)
             
+            # リンクグラフ・プロパティインデックスが未作成の場合のみ保管庫全体から作成し、以降は変更ごとに更新する
+            if self.link_graph.is_empty():
+                await asyncio.to_thread(self.link_graph.rebuild, self.obsidian_monitor.vault_path)
+            if self.property_index.is_empty():
+                await asyncio.to_thread(self.property_index.rebuild, self.obsidian_monitor.vault_path)
+            
+            # マッピングが空の場合は、ノートのフロントマターのnotion_idから復元する
+            if not self.page_index.get_stats()['entries']:
+                await asyncio.to_thread(self._seed_page_index_from_frontmatter)
+            
+            # 前回までに同期できなかった変更を同期済みのツリーとの差分から拾い直す
+            await self.reconcile_vault()
+            
             logger.info("Sync coordinator initialized successfully")
             
         except Exception as e:
@@ -113,20 +157,34 @@ class SyncCoordinator:
                 logger.error("Page ID not provided for Notion to Obsidian sync")
                 return
             
-            # Notionページの内容を取得
-            notion_content = await self.notion_client.get_page_content(page_id)
-            if not notion_content:
+            # Notionページのプロパティを取得
+            page = await self.notion_client.get_page(page_id)
+            if not page:
                 logger.error(f"Failed to get Notion page content: {page_id}")
                 return
             
-            # Obsidianファイルに変換
-            obsidian_content = self._convert_notion_to_obsidian(notion_content)
-            
-            # Obsidianファイルに保存
+            # フロントマターと見出しを作成（本文はブロックを取得しながら描画する）
+            obsidian_content = self._convert_notion_to_obsidian({
+                'title': self._extract_notion_title(page),
+                'content': '',
+                'page': page
+            })
+            
+            async def render_chunks():
+                yield obsidian_content['content']
+                blocks = self.notion_client.iter_page_blocks(page_id)
+                fragments = self.markdown_renderer.aiter_markdown(
+                    blocks, fetch_children=self.notion_client.iter_page_blocks)
+                async with aclosing(fragments):
+                    async for fragment in fragments:
+                        yield fragment
+            
+            # 一時ファイルに逐次書き込み、完了後にObsidianファイルを置き換え
             file_path = self._generate_obsidian_file_path(obsidian_content)
-            success = await self.obsidian_monitor.write_file_content(file_path, obsidian_content['content'])
+            success = await self.obsidian_monitor.write_file_stream(file_path, render_chunks())
             
             if success:
+                self.page_index.set(self._obsidian_id_for(file_path), page_id)
                 logger.info(f"Notion page synced to Obsidian: {file_path}")
             else:
                 logger.error(f"Failed to write Obsidian file: {file_path}")
@@ -143,12 +201,27 @@ class SyncCoordinator:
                 logger.error("File path not provided for Obsidian to Notion sync")
                 return
             
+            # 内容の変わっていない移動・リネームは、既存ページのタイトルとObsidian IDだけを更新する
+            if sync_item.get('action') == 'moved' and not sync_item.get('content_changed'):
+                page_id = self.page_index.get_page_id(self._obsidian_id_for(file_path))
+                if page_id and await self._update_notion_page_location(page_id, file_path):
+                    self._mark_synced(file_path)
+                    logger.info(f"Obsidian move synced to Notion as a property update: {page_id}")
+                    return
+            
             # Obsidianファイルの内容を取得
             obsidian_content = await self.obsidian_monitor.get_file_content(file_path)
             if not obsidian_content:
                 logger.error(f"Failed to get Obsidian file content: {file_path}")
                 return
             
+            # リンクグラフ・プロパティインデックスを更新
+            note_id = self._obsidian_id_for(file_path)
+            self.link_graph.update_from_content(note_id, obsidian_content)
+            self.link_graph.save()
+            self.property_index.update_from_content(note_id, obsidian_content, self._modified_time_of(file_path))
+            self.property_index.save()
+            
             # Notionページに変換
             notion_content = self._convert_obsidian_to_notion(obsidian_content, file_path)
             
@@ -156,6 +229,7 @@ class SyncCoordinator:
             page_id = await self._create_or_update_notion_page(notion_content)
             
             if page_id:
+                self._mark_synced(file_path)
                 logger.info(f"Obsidian file synced to Notion: {page_id}")
             else:
                 logger.error(f"Failed to create/update Notion page")
@@ -180,19 +254,110 @@ class SyncCoordinator:
     def _handle_obsidian_change(self, change_event: Dict[str, Any]):
         """Obsidianの変更を処理"""
         try:
+            file_path = change_event['file_path']
+            
+            # 移動・リネームはマッピングを付け替え、移動先を同期対象にする
+            if change_event['action'] == 'moved' and change_event.get('dest_path'):
+                self.page_index.rename(
+                    self._obsidian_id_for(file_path),
+                    self._obsidian_id_for(change_event['dest_path'])
+                )
+                self.link_graph.rename_note(
+                    self._obsidian_id_for(file_path),
+                    self._obsidian_id_for(change_event['dest_path'])
+                )
+                self.link_graph.save()
+                self.property_index.rename_note(
+                    self._obsidian_id_for(file_path),
+                    self._obsidian_id_for(change_event['dest_path'])
+                )
+                self.property_index.save()
+                if self.vault_tree is not None and self.vault_tree.rename(file_path, change_event['dest_path']):
+                    self.vault_tree.save()
+                file_path = change_event['dest_path']
+            elif change_event['action'] == 'deleted':
+                self.page_index.remove_obsidian_id(self._obsidian_id_for(file_path))
+                self.link_graph.remove_note(self._obsidian_id_for(file_path))
+                self.link_graph.save()
+                self.property_index.remove_note(self._obsidian_id_for(file_path))
+                self.property_index.save()
+                if self.vault_tree is not None and self.vault_tree.remove(file_path):
+                    self.vault_tree.save()
+            
             # 同期タスクをキューに追加
             sync_item = {
                 'type': 'obsidian_to_notion',
-                'file_path': change_event['file_path'],
+                'file_path': file_path,
                 'action': change_event['action'],
+                'content_changed': change_event.get('content_changed', False),
                 'timestamp': change_event['timestamp']
             }
             
-            asyncio.create_task(self._add_to_sync_queue(sync_item))
+            # 変更イベントはイベントループ上で渡されるため、タスクを作らずにそのまま積む
+            self.sync_queue.put_nowait(sync_item)
+            self.sync_status['pending_count'] += 1
             
         except Exception as e:
             logger.error(f"Obsidian change handling failed: {e}")
     
+    @property
+    def vault_tree(self) -> Optional[VaultMerkleTree]:
+        """同期済みの保管庫のMerkleツリー（保管庫のパスが分からない場合はNone）"""
+        if self._vault_tree is None:
+            vault_path = getattr(self.obsidian_monitor, 'vault_path', None)
+            if isinstance(vault_path, (str, os.PathLike)):
+                self._vault_tree = VaultMerkleTree(
+                    vault_path, os.path.join(settings.SYNC_STATE_DIR, 'synced_vault_tree.json')
+                )
+        return self._vault_tree
+    
+    def _mark_synced(self, file_path: str):
+        """Notionへの同期が完了したノートの内容を同期済みのツリーと変更抑制の記録に反映"""
+        if self.vault_tree is not None and self.vault_tree.update(file_path):
+            self.vault_tree.save()
+        try:
+            self.obsidian_monitor.confirm_synced(file_path)
+        except Exception as e:
+            logger.warning(f"Failed to record synced content of {file_path}: {e}")
+    
+    async def reconcile_vault(self) -> Dict[str, int]:
+        """同期済みのツリーと現在の保管庫の差分を取り、Notionに反映されていない変更を同期キューに積む
+
+        同期に失敗した変更や、監視していない間の変更を拾い直すために使う。
+        同期済みのツリーがまだない場合は、現在の保管庫を同期済みとして記録するだけにする。
+        """
+        counts = {'created': 0, 'modified': 0, 'deleted': 0}
+        try:
+            tree = self.vault_tree
+            if tree is None:
+                return counts
+            current = await asyncio.to_thread(tree.build)
+            if not tree.loaded:
+                tree.root = current
+                tree.loaded = True
+                tree.save()
+                logger.info(f"Synced vault tree initialized: {current.hash[:12]}")
+                return counts
+            
+            diff = diff_trees(tree.root, current)
+            timestamp = datetime.now().isoformat()
+            for action, relative_paths in (('created', diff.added), ('modified', diff.modified),
+                                           ('deleted', diff.removed)):
+                for relative_path in relative_paths:
+                    self._handle_obsidian_change({
+                        'file_path': os.path.join(tree.vault_path, *relative_path.split('/')),
+                        'action': action,
+                        'content_changed': True,
+                        'timestamp': timestamp
+                    })
+                    counts[action] += 1
+            logger.info(f"Vault reconciled against synced tree: {counts}")
+            return counts
+            
+        except Exception as e:
+            logger.error(f"Vault reconciliation failed: {e}")
+            return counts
+    
     async def _add_to_sync_queue(self, sync_item: Dict[str, Any]):
         """同期キューにアイテムを追加"""
         try:
@@ -234,11 +399,20 @@ source: notion
             logger.error(f"Notion to Obsidian conversion failed: {e}")
             return {}
     
+    def _extract_notion_title(self, page: Dict[str, Any]) -> str:
+        """Notionページのタイトルプロパティからタイトルを取得"""
+        for prop in page.get('properties', {}).values():
+            if prop.get('type') == 'title':
+                title = ''.join(item.get('plain_text', '') for item in prop.get('title', []))
+                return title or 'Untitled'
+        return 'Untitled'
+    
     def _convert_obsidian_to_notion(self, obsidian_content: str, file_path: str) -> Dict[str, Any]:
         """ObsidianからNotionへの変換"""
         try:
             # ファイル名からタイトルを抽出
             file_name = Path(file_path).stem
+            obsidian_id = self._obsidian_id_for(file_path)
             
             # フロントマターを除去
             content_lines = obsidian_content.split('\n')
@@ -259,7 +433,8 @@ source: notion
                 'content': content_without_title,
                 'properties': {
                     'title': {'title': [{'text': {'content': file_name}}]},
-                    'obsidian_id': file_path,
+                    'Obsidian ID': {'rich_text': [{'text': {'content': obsidian_id}}]},
+                    'obsidian_id': obsidian_id,
                     'source': 'obsidian'
                 }
             }
@@ -268,6 +443,50 @@ source: notion
             logger.error(f"Obsidian to Notion conversion failed: {e}")
             return {}
     
+    def _obsidian_id_for(self, file_path: str) -> str:
+        """ファイルパスからObsidianノートID（ボルト相対パス）を生成"""
+        try:
+            vault_path = Path(self.obsidian_monitor.vault_path).resolve()
+            return Path(file_path).resolve().relative_to(vault_path).as_posix()
+        except Exception:
+            return str(file_path)
+
+    def _notion_id_from_frontmatter(self, obsidian_id: str) -> Optional[str]:
+        """ノートのフロントマターからnotion_idを取得"""
+        try:
+            file_path = Path(self.obsidian_monitor.vault_path) / obsidian_id
+            if not file_path.is_file():
+                return None
+            notion_id = self.frontmatter_reader.read(str(file_path)).get('notion_id')
+            return str(notion_id) if notion_id else None
+        except Exception as e:
+            logger.warning(f"Frontmatter lookup failed for {obsidian_id}: {e}")
+            return None
+    
+    def _seed_page_index_from_frontmatter(self) -> int:
+        """保管庫全体のフロントマターのnotion_idからマッピングを登録"""
+        try:
+            vault_path = self.obsidian_monitor.vault_path
+            file_paths = list(iter_markdown_files(vault_path))
+            pairs = {
+                self._obsidian_id_for(file_path): str(frontmatter['notion_id'])
+                for file_path, frontmatter in self.frontmatter_reader.read_many(file_paths).items()
+                if frontmatter.get('notion_id')
+            }
+            count = self.page_index.set_many(pairs)
+            logger.info(f"Page index seeded with {count} entries from frontmatter")
+            return count
+        except Exception as e:
+            logger.error(f"Page index seeding failed: {e}")
+            return 0
+    
+    def _modified_time_of(self, file_path: str) -> float:
+        """ファイルの更新日時（取得できない場合は現在時刻）"""
+        try:
+            return os.path.getmtime(file_path)
+        except OSError:
+            return datetime.now().timestamp()
+
     def _generate_obsidian_file_path(self, obsidian_content: Dict[str, Any]) -> str:
         """Obsidianファイルパスを生成"""
         try:
@@ -290,13 +509,26 @@ source: notion
         try:
             # 既存のページを検索
             existing_page = await self._find_existing_notion_page(notion_content)
+            stale_page_ids = set()
             
-            if existing_page:
+            while existing_page:
                 # 既存ページを更新
-                page_id = await self._update_notion_page(existing_page['id'], notion_content)
-            else:
-                # 新しいページを作成
-                page_id = await self._create_notion_page(notion_content)
+                try:
+                    return await self._update_notion_page(existing_page['id'], notion_content)
+                except Exception as e:
+                    if not self._is_missing_page_error(e):
+                        raise
+                # 削除・アーカイブされたページへの対応は捨て、インデックス以外から探し直す
+                logger.warning(f"Notion page {existing_page['id']} is missing or archived, dropping its mapping")
+                stale_page_ids.add(existing_page['id'])
+                self.page_index.remove_page_id(existing_page['id'])
+                existing_page = await self._find_existing_notion_page(notion_content, exclude=stale_page_ids)
+            
+            # 新しいページを作成し、マッピングを登録
+            page_id = await self._create_notion_page(notion_content)
+            obsidian_id = notion_content.get('properties', {}).get('obsidian_id')
+            if page_id and obsidian_id:
+                self.page_index.set(obsidian_id, page_id)
             
             return page_id
             
@@ -304,21 +536,33 @@ source: notion
             logger.error(f"Notion page creation/update failed: {e}")
             return None
     
-    async def _find_existing_notion_page(self, notion_content: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """既存のNotionページを検索"""
+    async def _find_existing_notion_page(self, notion_content: Dict[str, Any],
+                                         exclude: Collection[str] = ()) -> Optional[Dict[str, Any]]:
+        """既存のNotionページを検索（excludeのページIDは削除・アーカイブ済みとして候補にしない）"""
         try:
             obsidian_id = notion_content.get('properties', {}).get('obsidian_id')
             if not obsidian_id:
                 return None
             
-            # Obsidian IDでページを検索
-            pages = await self.notion_client.get_pages()
-            for page in pages:
-                properties = page.get('properties', {})
-                page_obsidian_id = properties.get('Obsidian ID', {}).get('rich_text', [{}])[0].get('text', {}).get('content')
-                
-                if page_obsidian_id == obsidian_id:
-                    return page
+            # ローカルのマッピングインデックスを参照
+            page_id = self.page_index.get_page_id(obsidian_id)
+            if page_id and page_id not in exclude:
+                return {'id': page_id}
+            
+            # インデックスにない場合はノートのフロントマターを参照（本文は読まない）
+            page_id = await asyncio.to_thread(self._notion_id_from_frontmatter, obsidian_id)
+            if page_id and page_id not in exclude:
+                self.page_index.set(obsidian_id, page_id)
+                return {'id': page_id}
+            
+            # フロントマターにもない場合はObsidian IDでフィルタ検索して修復
+            pages = await self.notion_client.query_database(
+                filter={'property': 'Obsidian ID', 'rich_text': {'equals': obsidian_id}},
+                page_size=1
+            )
+            if pages and pages[0]['id'] not in exclude:
+                self.page_index.set(obsidian_id, pages[0]['id'])
+                return pages[0]
             
             return None
             
@@ -329,15 +573,18 @@ source: notion
     async def _create_notion_page(self, notion_content: Dict[str, Any]) -> Optional[str]:
         """新しいNotionページを作成"""
         try:
-            # ページデータを準備
+            # ページデータを準備（子ブロックは1リクエストの上限ごとに分けて送る）
+            chunks = markdown_block_converter.iter_chunks(notion_content.get('content', ''))
             page_data = {
                 'parent': {'type': 'page_id', 'page_id': 'parent_page_id'},  # 実際の親ページIDに置き換え
                 'properties': notion_content.get('properties', {}),
-                'children': self._convert_content_to_blocks(notion_content.get('content', ''))
+                'children': next(chunks, [])
             }
             
             # ページを作成
             result = self.notion_client.client.pages.create(**page_data)
+            for blocks in chunks:
+                self.notion_client.client.blocks.children.append(block_id=result['id'], children=blocks)
             return result['id']
             
         except Exception as e:
@@ -345,69 +592,68 @@ source: notion
             return None
     
     async def _update_notion_page(self, page_id: str, notion_content: Dict[str, Any]) -> Optional[str]:
-        """既存のNotionページを更新"""
+        """既存のNotionページを更新
+
+        ページ自体が存在しない・アーカイブ済みの場合だけ例外を送出し、呼び出し側でマッピングを捨てて探し直す。
+        ページの存在はページのプロパティ更新の結果だけで判断し、本文の差分更新でのエラー（途中で削除されたブロックなど）は
+        この同期の失敗として扱い、マッピングは残す。
+        """
         try:
             # ページのプロパティを更新
             page_data = {
                 'properties': notion_content.get('properties', {})
             }
             
-            self.notion_client.client.pages.update(page_id=page_id, **page_data)
+            result = self.notion_client.client.pages.update(page_id=page_id, **page_data)
             
-            # ページの内容を更新
+        except Exception as e:
+            if self._is_missing_page_error(e):
+                raise
+            logger.error(f"Notion page update failed: {e}")
+            return None
+        
+        if isinstance(result, dict) and (result.get('archived') or result.get('in_trash')):
+            raise MissingPageError(f"Notion page {page_id} is archived")
+        
+        try:
+            # ページの内容を差分更新
             blocks = self._convert_content_to_blocks(notion_content.get('content', ''))
-            self.notion_client.client.blocks.children.append(
-                block_id=page_id,
-                children=blocks
-            )
+            await self.block_diff_engine.apply(self.notion_client.client, page_id, blocks)
             
             return page_id
             
         except Exception as e:
-            logger.error(f"Notion page update failed: {e}")
+            logger.error(f"Notion page content update failed: {e}")
             return None
     
-    def _convert_content_to_blocks(self, content: str) -> List[Dict[str, Any]]:
-        """コンテンツをNotionブロックに変換"""
+    @staticmethod
+    def _is_missing_page_error(error: Exception) -> bool:
+        """ページのプロパティ更新が、ページが存在しない・アーカイブ済みのために失敗したか"""
+        if isinstance(error, MissingPageError):
+            return True
+        code = getattr(error, 'code', None)
+        if code == 'object_not_found' or getattr(error, 'status', None) == 404:
+            return True
+        # アーカイブ済みのページの更新は「Can't edit block that is archived.」のvalidation_errorになる
+        return code == 'validation_error' and 'that is archived' in str(error)
+    
+    async def _update_notion_page_location(self, page_id: str, file_path: str) -> bool:
+        """移動先のファイル名とObsidian IDで既存ページのプロパティだけを更新（本文は送らない）"""
         try:
-            blocks = []
-            lines = content.split('\n')
-            
-            for line in lines:
-                if not line.strip():
-                    continue
-                
-                if line.startswith('# '):
-                    blocks.append({
-                        'type': 'heading_1',
-                        'heading_1': {'rich_text': [{'text': {'content': line[2:]}}]}
-                    })
-                elif line.startswith('## '):
-                    blocks.append({
-                        'type': 'heading_2',
-                        'heading_2': {'rich_text': [{'text': {'content': line[3:]}}]}
-                    })
-                elif line.startswith('### '):
-                    blocks.append({
-                        'type': 'heading_3',
-                        'heading_3': {'rich_text': [{'text': {'content': line[4:]}}]}
-                    })
-                elif line.startswith('- '):
-                    blocks.append({
-                        'type': 'bulleted_list_item',
-                        'bulleted_list_item': {'rich_text': [{'text': {'content': line[2:]}}]}
-                    })
-                else:
-                    blocks.append({
-                        'type': 'paragraph',
-                        'paragraph': {'rich_text': [{'text': {'content': line}}]}
-                    })
-            
-            return blocks
+            file_name = Path(file_path).stem
+            self.notion_client.client.pages.update(page_id=page_id, properties={
+                'title': {'title': [{'text': {'content': file_name}}]},
+                'Obsidian ID': {'rich_text': [{'text': {'content': self._obsidian_id_for(file_path)}}]}
+            })
+            return True
             
         except Exception as e:
-            logger.error(f"Content to blocks conversion failed: {e}")
-            return []
+            logger.error(f"Notion page location update failed: {e}")
+            return False
+    
+    def _convert_content_to_blocks(self, content: str) -> List[Dict[str, Any]]:
+        """コンテンツをNotionブロックに変換"""
+        return markdown_to_blocks(content)
     
     async def trigger_sync(self, sync_type: str, sync_data: Dict[str, Any]) -> bool:
         """手動同期の実行"""
@@ -427,7 +673,13 @@ source: notion
     
     def get_sync_status(self) -> Dict[str, Any]:
         """同期ステータスを取得"""
-        return self.sync_status.copy()
+        status = self.sync_status.copy()
+        status['render_cache'] = self.render_cache.get_stats()
+        status['link_graph'] = self.link_graph.get_stats()
+        status['property_index'] = self.property_index.get_stats()
+        if hasattr(self.obsidian_monitor, 'get_event_stats'):
+            status['file_events'] = self.obsidian_monitor.get_event_stats()
+        return status
     
     async def get_sync_history(self, limit: int = 10) -> List[Dict[str, Any]]:
         """同期履歴を取得"""
@@ -50,6 +50,8 @@ async def test_multiple_databases():
     except Exception as e:
         print(f"   ❌ データベース状況の確認に失敗: {e}")
         return False
+    finally:
+        await client.close()
     
     # 4. 設定の推奨事項
     print("\n4️⃣ 設定の推奨事項")
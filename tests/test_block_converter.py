@@ -0,0 +1,110 @@
+"""
+MarkdownBlockConverterのテスト
+"""
+import unittest
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notion_integration.block_converter import (
+    MarkdownBlockConverter, MAX_RICH_TEXT_LENGTH, MAX_CHILDREN_PER_REQUEST
+)
+
+
+def plain_text(block):
+    """ブロックのrich_textを連結したテキスト"""
+    body = block[block['type']]
+    return ''.join(item['text']['content'] for item in body['rich_text'])
+
+
+class TestMarkdownBlockConverter(unittest.TestCase):
+    """MarkdownBlockConverterのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.converter = MarkdownBlockConverter()
+
+    def test_headings_and_divider(self):
+        """見出しと区切り線の変換テスト"""
+        blocks = self.converter.convert("# One\n## Two\n#### Four\n---")
+
+        self.assertEqual([b['type'] for b in blocks], ['heading_1', 'heading_2', 'heading_3', 'divider'])
+        self.assertEqual(plain_text(blocks[2]), 'Four')
+
+    def test_paragraph_lines_are_merged(self):
+        """連続する行が1つの段落にまとめられるテスト"""
+        blocks = self.converter.convert("line one\nline two\n\nnext paragraph")
+
+        self.assertEqual(len(blocks), 2)
+        self.assertEqual(plain_text(blocks[0]), 'line one\nline two')
+
+    def test_nested_lists(self):
+        """インデントされたリストが子ブロックになるテスト"""
+        blocks = self.converter.convert("- parent\n  - child\n    continued\n1. first\n- [x] done")
+
+        self.assertEqual([b['type'] for b in blocks], ['bulleted_list_item', 'numbered_list_item', 'to_do'])
+        children = blocks[0]['bulleted_list_item']['children']
+        self.assertEqual(plain_text(children[0]), 'child\ncontinued')
+        self.assertTrue(blocks[2]['to_do']['checked'])
+
+    def test_nesting_is_capped(self):
+        """ネストの深さがNotionの上限で打ち切られるテスト"""
+        blocks = self.converter.convert("- a\n  - b\n    - c\n      - d")
+
+        level_2 = blocks[0]['bulleted_list_item']['children'][0]['bulleted_list_item']['children']
+        self.assertEqual([plain_text(b) for b in level_2], ['c', 'd'])
+        self.assertNotIn('children', level_2[0]['bulleted_list_item'])
+
+    def test_fenced_code_is_not_parsed(self):
+        """コードブロックの中身が解析されないテスト"""
+        blocks = self.converter.convert("```py\n# comment\n- not a list\n```")
+
+        self.assertEqual(len(blocks), 1)
+        self.assertEqual(blocks[0]['code']['language'], 'python')
+        self.assertEqual(plain_text(blocks[0]), '# comment\n- not a list')
+
+    def test_quote_and_callout(self):
+        """引用とコールアウトの変換テスト"""
+        blocks = self.converter.convert("> a\n> b\n\n> [!warning] Title\n> body")
+
+        self.assertEqual(blocks[0]['type'], 'quote')
+        self.assertEqual(plain_text(blocks[0]), 'a\nb')
+        self.assertEqual(blocks[1]['type'], 'callout')
+        self.assertEqual(plain_text(blocks[1]), 'Title\nbody')
+        self.assertEqual(blocks[1]['callout']['icon']['emoji'], '⚠️')
+
+    def test_inline_annotations(self):
+        """インライン装飾の変換テスト"""
+        blocks = self.converter.convert("a **b** *c* `d` ~~e~~ [f](https://example.com) snake_case")
+        items = blocks[0]['paragraph']['rich_text']
+        by_text = {item['text']['content']: item for item in items}
+
+        self.assertTrue(by_text['b']['annotations']['bold'])
+        self.assertTrue(by_text['c']['annotations']['italic'])
+        self.assertTrue(by_text['d']['annotations']['code'])
+        self.assertTrue(by_text['e']['annotations']['strikethrough'])
+        self.assertEqual(by_text['f']['text']['link']['url'], 'https://example.com')
+        self.assertEqual(plain_text(blocks[0]), 'a b c d e f snake_case')
+
+    def test_long_text_is_split(self):
+        """長いテキストが2000文字ごとに分割されるテスト"""
+        blocks = self.converter.convert('x' * 4500)
+        items = blocks[0]['paragraph']['rich_text']
+
+        self.assertEqual([len(i['text']['content']) for i in items], [2000, 2000, 500])
+
+        # サロゲートペアの文字はUTF-16で2単位として数える
+        parts = self.converter._split_text('😀' * MAX_RICH_TEXT_LENGTH)
+        self.assertTrue(all(len(part) * 2 <= MAX_RICH_TEXT_LENGTH for part in parts))
+
+    def test_iter_chunks(self):
+        """ブロックが100件ごとのチャンクで返されるテスト"""
+        chunks = list(self.converter.iter_chunks("\n\n".join(f"p{i}" for i in range(250))))
+
+        self.assertEqual([len(c) for c in chunks], [MAX_CHILDREN_PER_REQUEST, MAX_CHILDREN_PER_REQUEST, 50])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+"""
+BlockDiffEngineのテスト
+"""
+import unittest
+import sys
+import os
+import asyncio
+from unittest.mock import Mock
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notion_integration.block_converter import markdown_to_blocks
+from sync_system.block_diff import BlockDiffEngine
+
+
+def new_block(block_type: str, text: str) -> dict:
+    """変換結果の形式のブロック"""
+    return {'type': block_type, block_type: {'rich_text': [{'text': {'content': text}}]}}
+
+
+def api_block(block_id: str, block_type: str, text: str) -> dict:
+    """Notion APIレスポンスの形式のブロック"""
+    return {
+        'object': 'block',
+        'id': block_id,
+        'type': block_type,
+        block_type: {
+            'rich_text': [{
+                'type': 'text',
+                'text': {'content': text, 'link': None},
+                'plain_text': text,
+                'annotations': {'bold': False, 'italic': False, 'code': False, 'color': 'default'}
+            }]
+        }
+    }
+
+
+def make_client(existing: list) -> Mock:
+    client = Mock()
+    client.blocks.children.list.return_value = {'results': existing, 'has_more': False, 'next_cursor': None}
+    client.blocks.children.append.side_effect = lambda **kwargs: {
+        'results': [{'id': f"new-{i}"} for i, _ in enumerate(kwargs['children'])]
+    }
+    return client
+
+
+def make_tree_client(children_by_id: dict) -> Mock:
+    """ブロックIDごとに子ブロックを返すクライアント"""
+    client = make_client([])
+    client.blocks.children.list.side_effect = lambda block_id, **kwargs: {
+        'results': children_by_id.get(block_id, []), 'has_more': False, 'next_cursor': None
+    }
+    return client
+
+
+def with_children(block: dict) -> dict:
+    """子ブロックを持つAPIレスポンスのブロック"""
+    return {**block, 'has_children': True}
+
+
+class TestBlockDiffEngine(unittest.TestCase):
+    """BlockDiffEngineのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.engine = BlockDiffEngine()
+
+    def test_signature_matches_api_and_converted_blocks(self):
+        """APIレスポンスと変換結果のブロックが同じハッシュになるテスト"""
+        self.assertEqual(
+            self.engine.block_signature(api_block('a', 'paragraph', 'Hello')),
+            self.engine.block_signature(new_block('paragraph', 'Hello'))
+        )
+        self.assertNotEqual(
+            self.engine.block_signature(new_block('paragraph', 'Hello')),
+            self.engine.block_signature(new_block('heading_1', 'Hello'))
+        )
+
+    def test_unchanged_content_makes_no_writes(self):
+        """内容が同じ場合は書き込みが発生しないテスト"""
+        existing = [api_block('a', 'heading_1', 'Title'), api_block('b', 'paragraph', 'Body')]
+        script = self.engine.compute_edit_script(existing, [new_block('heading_1', 'Title'), new_block('paragraph', 'Body')])
+
+        self.assertEqual(script['unchanged'], 2)
+        self.assertEqual(script['updates'], [])
+        self.assertEqual(script['deletes'], [])
+        self.assertEqual(script['inserts'], [])
+
+    def test_changed_block_is_updated_in_place(self):
+        """同じタイプのブロックの変更はその場で更新されるテスト"""
+        existing = [api_block('a', 'paragraph', 'One'), api_block('b', 'paragraph', 'Two'), api_block('c', 'paragraph', 'Three')]
+        script = self.engine.compute_edit_script(existing, [
+            new_block('paragraph', 'One'), new_block('paragraph', 'Two!'), new_block('paragraph', 'Three')
+        ])
+
+        self.assertEqual([u['block_id'] for u in script['updates']], ['b'])
+        self.assertEqual(script['deletes'], [])
+        self.assertEqual(script['inserts'], [])
+
+    def test_insert_and_delete_positions(self):
+        """挿入位置と削除対象が正しく計算されるテスト"""
+        existing = [api_block('a', 'paragraph', 'One'), api_block('b', 'paragraph', 'Two'), api_block('c', 'paragraph', 'Three')]
+        script = self.engine.compute_edit_script(existing, [
+            new_block('paragraph', 'One'), new_block('bulleted_list_item', 'New'), new_block('paragraph', 'Three')
+        ])
+
+        self.assertEqual(script['deletes'], ['b'])
+        self.assertEqual(len(script['inserts']), 1)
+        self.assertEqual(script['inserts'][0]['after'], 'a')
+        self.assertFalse(script['full_rewrite'])
+
+    def test_insert_at_head_falls_back_to_rewrite(self):
+        """先頭への挿入が必要な場合は全置換になるテスト"""
+        existing = [api_block('a', 'paragraph', 'One')]
+        script = self.engine.compute_edit_script(existing, [new_block('heading_1', 'Head'), new_block('paragraph', 'One')])
+
+        self.assertTrue(script['full_rewrite'])
+        self.assertEqual(script['deletes'], ['a'])
+        self.assertEqual(len(script['inserts'][0]['children']), 2)
+
+    def test_child_pages_are_preserved(self):
+        """子ページブロックが削除されないテスト"""
+        existing = [api_block('a', 'paragraph', 'One'), {'id': 'child', 'type': 'child_page', 'child_page': {'title': 'Sub'}}]
+        script = self.engine.compute_edit_script(existing, [new_block('paragraph', 'One')])
+
+        self.assertNotIn('child', script['deletes'])
+
+    def test_apply_small_edit_uses_few_calls(self):
+        """小さな編集が少数のAPI呼び出しで適用されるテスト"""
+        existing = [api_block(f"b{i}", 'paragraph', f"Line {i}") for i in range(300)]
+        blocks = [new_block('paragraph', f"Line {i}") for i in range(300)]
+        blocks[150] = new_block('paragraph', 'Edited')
+        client = make_client(existing)
+
+        stats = asyncio.run(self.engine.apply(client, 'page', blocks))
+
+        self.assertEqual(stats['updated'], 1)
+        self.assertEqual(stats['inserted'], 0)
+        client.blocks.update.assert_called_once()
+        client.blocks.children.append.assert_not_called()
+        self.assertLessEqual(stats['api_calls'], 5)
+
+    def test_apply_batches_inserts(self):
+        """挿入が100件ずつのバッチで連続して適用されるテスト"""
+        client = make_client([])
+        blocks = [new_block('paragraph', f"Line {i}") for i in range(250)]
+
+        stats = asyncio.run(self.engine.apply(client, 'page', blocks))
+
+        calls = client.blocks.children.append.call_args_list
+        self.assertEqual([len(c.kwargs['children']) for c in calls], [100, 100, 50])
+        self.assertNotIn('after', calls[0].kwargs)
+        self.assertEqual(calls[1].kwargs['after'], 'new-99')
+        self.assertEqual(stats['inserted'], 250)
+
+    def test_nested_list_is_unchanged(self):
+        """ネストしたリストで始まるノートが、子ブロックを取得して比較され書き込みが発生しないテスト"""
+        client = make_tree_client({
+            'page': [with_children(api_block('a', 'bulleted_list_item', 'a')),
+                     api_block('p1', 'paragraph', 'para one'), api_block('p2', 'paragraph', 'para two')],
+            'a': [api_block('b', 'bulleted_list_item', 'b')]
+        })
+
+        stats = asyncio.run(self.engine.apply(client, 'page', markdown_to_blocks("- a\n  - b\n\npara one\n\npara two")))
+
+        self.assertEqual(stats['unchanged'], 3)
+        self.assertEqual((stats['updated'], stats['deleted'], stats['inserted']), (0, 0, 0))
+        self.assertFalse(stats['full_rewrite'])
+        self.assertEqual(stats['api_calls'], 2)
+
+    def test_nested_child_change_replaces_parent(self):
+        """ネストした子ブロックの変更は親ブロックの置き換えになるテスト"""
+        client = make_tree_client({
+            'page': [api_block('p0', 'paragraph', 'intro'), with_children(api_block('a', 'bulleted_list_item', 'a'))],
+            'a': [api_block('b', 'bulleted_list_item', 'b')]
+        })
+
+        stats = asyncio.run(self.engine.apply(client, 'page', markdown_to_blocks("intro\n\n- a\n  - c")))
+
+        self.assertEqual((stats['unchanged'], stats['updated'], stats['deleted'], stats['inserted']), (1, 0, 1, 1))
+        client.blocks.delete.assert_called_once_with(block_id='a')
+        client.blocks.update.assert_not_called()
+
+    def test_toggle_children_added(self):
+        """子のなかったトグルに子を追加すると、その場の更新ではなく置き換えになるテスト"""
+        existing = [api_block('p0', 'paragraph', 'intro'), api_block('t', 'toggle', 'Details')]
+        toggle = new_block('toggle', 'Details')
+        toggle['toggle']['children'] = [new_block('paragraph', 'hidden')]
+        script = self.engine.compute_edit_script(existing, [new_block('paragraph', 'intro'), toggle])
+
+        self.assertEqual(script['updates'], [])
+        self.assertEqual(script['deletes'], ['t'])
+        self.assertEqual(script['inserts'], [{'after': 'p0', 'children': [toggle]}])
+
+    def test_toggle_children_removed(self):
+        """子を持つトグルから子を取り除くと、古い子を残さず置き換えられるテスト"""
+        client = make_tree_client({
+            'page': [api_block('p0', 'paragraph', 'intro'), with_children(api_block('t', 'toggle', 'Details'))],
+            't': [api_block('h', 'paragraph', 'hidden')]
+        })
+
+        stats = asyncio.run(self.engine.apply(client, 'page', [new_block('paragraph', 'intro'), new_block('toggle', 'Details')]))
+
+        self.assertEqual((stats['unchanged'], stats['updated'], stats['deleted'], stats['inserted']), (1, 0, 1, 1))
+        client.blocks.delete.assert_called_once_with(block_id='t')
+        client.blocks.update.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,253 @@
+"""
+ContentHashStoreのテスト
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration.content_hash_store import ContentHashStore, LineSketch, hash_file, sketch_similarity
+from obsidian_integration.file_monitor import ObsidianFileMonitor
+
+
+class TestHashFile(unittest.TestCase):
+    """hash_fileのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def _hash(self, data, chunk_size=4):
+        path = os.path.join(self.temp_dir, 'note.md')
+        with open(path, 'wb') as f:
+            f.write(data)
+        return hash_file(path, chunk_size)[0]
+
+    def test_normalization(self):
+        """BOM・改行コード・末尾の空白の違いが同じハッシュになるテスト"""
+        expected = self._hash(b'# Title\n\nbody  text\n')
+        for variant in (b'# Title\r\n\r\nbody  text\r\n', b'\xef\xbb\xbf# Title\n\nbody  text',
+                        b'# Title\r\rbody  text\n\n \n', b'# Title\n\nbody  text'):
+            with self.subTest(variant=variant):
+                self.assertEqual(self._hash(variant), expected)
+                self.assertEqual(self._hash(variant, chunk_size=1024), expected)
+
+    def test_content_differences(self):
+        """本文の違いは異なるハッシュになるテスト"""
+        self.assertNotEqual(self._hash(b'a\nb'), self._hash(b'a\n\nb'))
+        self.assertNotEqual(self._hash(b'a b'), self._hash(b'a  b'))
+        self.assertNotEqual(self._hash(b' a'), self._hash(b'a'))
+
+    def _sketch(self, data, chunk_size=4):
+        path = os.path.join(self.temp_dir, 'note.md')
+        with open(path, 'wb') as f:
+            f.write(data)
+        sketch = LineSketch()
+        hash_file(path, chunk_size, sketch=sketch)
+        return sketch.hexdigest()
+
+    def test_sketch_similarity(self):
+        """行スケッチが分割の大きさによらず同じになり、編集の量に応じた類似度になるテスト"""
+        lines = [f'line {i}'.encode() for i in range(20)]
+        original = self._sketch(b'\n'.join(lines))
+        self.assertEqual(self._sketch(b'\r\n'.join(lines), chunk_size=1024), original)
+        self.assertEqual(sketch_similarity(original, original), 1.0)
+
+        edited = self._sketch(b'\n'.join(lines[:19] + [b'changed']))
+        unrelated = self._sketch(b'\n'.join(f'other {i}'.encode() for i in range(20)))
+        self.assertGreater(sketch_similarity(original, edited), 0.6)
+        self.assertEqual(sketch_similarity(original, unrelated), 0.0)
+        self.assertEqual(sketch_similarity(original, None), 0.0)
+
+
+class TestContentHashStore(unittest.TestCase):
+    """ContentHashStoreのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.vault_path = os.path.join(self.temp_dir, 'vault')
+        os.makedirs(self.vault_path)
+        self.store_path = os.path.join(self.temp_dir, 'content_hashes.json')
+        self.store = ContentHashStore(self.store_path, self.vault_path)
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, content, mtime_ns=None):
+        path = os.path.join(self.vault_path, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def test_touch_without_content_change_is_suppressed(self):
+        """内容が同じままmtimeだけ変わった場合は変更なしになるテスト"""
+        path = self._write('a.md', '# A', mtime_ns=1_000_000_000)
+        self.assertTrue(self.store.has_changed(path))
+
+        os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+        self.assertFalse(self.store.has_changed(path))
+
+        self._write('a.md', '# A changed', mtime_ns=3_000_000_000)
+        self.assertTrue(self.store.has_changed(path))
+
+        stats = self.store.get_stats()
+        self.assertEqual(stats['checked'], 3)
+        self.assertEqual(stats['suppressed'], 1)
+        self.assertAlmostEqual(stats['suppression_rate'], 1 / 3)
+
+    def test_unconfirmed_change_is_recorded_only_after_confirm(self):
+        """record=Falseで判定した変更は、confirm()するまで変更ありのままになるテスト"""
+        path = self._write('a.md', '# A', mtime_ns=1_000_000_000)
+        self.assertTrue(self.store.has_changed(path))
+
+        # 同期に失敗した（confirmされなかった）変更は、mtimeだけの変更でも拾い直される
+        self._write('a.md', '# A edited', mtime_ns=2_000_000_000)
+        self.assertTrue(self.store.has_changed(path, record=False))
+        os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+        self.assertTrue(self.store.has_changed(path, record=False))
+
+        self.assertTrue(self.store.confirm(path))
+        os.utime(path, ns=(4_000_000_000, 4_000_000_000))
+        self.assertFalse(self.store.has_changed(path, record=False))
+
+        # 判定の後に書き換えられた内容は、同期されていないため記録しない
+        self._write('a.md', '# A edited twice', mtime_ns=5_000_000_000)
+        self.assertTrue(self.store.has_changed(path, record=False))
+        self._write('a.md', '# A edited three times', mtime_ns=6_000_000_000)
+        self.assertFalse(self.store.confirm(path))
+        self.assertTrue(self.store.has_changed(path, record=False))
+
+    def test_unchanged_stat_is_not_read(self):
+        """stat結果が記録と同じ場合は内容を読まないテスト"""
+        path = self._write('a.md', '# A')
+        self.store.has_changed(path)
+        hashed = self.store.get_stats()['hashed']
+
+        self.assertFalse(self.store.has_changed(path))
+        self.assertEqual(self.store.get_stats()['hashed'], hashed)
+
+    def test_persistence(self):
+        """保存した記録を読み込んで比較できるテスト"""
+        path = self._write('a.md', '# A', mtime_ns=1_000_000_000)
+        self.store.has_changed(path)
+        self.assertTrue(self.store.save())
+
+        os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+        reloaded = ContentHashStore(self.store_path, self.vault_path)
+        self.assertFalse(reloaded.has_changed(path))
+        self.assertEqual(reloaded.get_hash(path), self.store.get_hash(path))
+
+    def test_algorithm_mismatch_starts_empty(self):
+        """アルゴリズムが異なるストアは読み込まないテスト"""
+        with open(self.store_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'algorithm': 'unknown', 'entries': {'a.md': [0, 0, 'x']}}, f)
+
+        self.assertIsNone(ContentHashStore(self.store_path, self.vault_path).get_hash(
+            os.path.join(self.vault_path, 'a.md')
+        ))
+
+    def test_record_only_fills_missing_entries(self):
+        """recordは記録のないファイルだけを、走査時から変わっていない場合に記録するテスト"""
+        path = self._write('a.md', '# A', mtime_ns=1_000_000_000)
+        stat = os.stat(path)
+
+        self.assertFalse(self.store.record(path, stat.st_mtime_ns + 1, stat.st_size))
+        self.assertIsNone(self.store.get_hash(path))
+        self.assertTrue(self.store.record(path, stat.st_mtime_ns, stat.st_size))
+        self.assertIsNotNone(self.store.get_sketch(path))
+        self.assertFalse(self.store.record(path, stat.st_mtime_ns, stat.st_size))
+        self.assertFalse(self.store.has_changed(path))
+
+    def test_rename_remove_and_prune(self):
+        """移動・削除・不要な記録の削除のテスト"""
+        a_path = self._write('a.md', '# A')
+        b_path = self._write('b.md', '# B')
+        self.store.changed_paths([a_path, b_path])
+        digest = self.store.get_hash(a_path)
+
+        renamed = os.path.join(self.vault_path, 'renamed.md')
+        os.rename(a_path, renamed)
+        self.store.rename(a_path, renamed)
+        self.assertEqual(self.store.get_hash(renamed), digest)
+        self.assertFalse(self.store.has_changed(renamed))
+
+        self.store.remove(b_path)
+        self.assertIsNone(self.store.get_hash(b_path))
+        self.assertEqual(self.store.prune([]), 1)
+        self.assertEqual(self.store.get_stats()['entries'], 0)
+
+
+class TestFileMonitorSuppression(unittest.TestCase):
+    """ObsidianFileMonitorの変更抑制のテストクラス"""
+
+    def test_unchanged_content_is_not_notified(self):
+        """内容が同じ変更はコールバックに渡さず、キャッシュは更新するテスト"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            store = ContentHashStore(os.path.join(temp_dir, 'hashes.json'), temp_dir)
+            monitor = ObsidianFileMonitor(temp_dir, content_hashes=store)
+            events = []
+
+            def sync(change_event):
+                # 同期が完了したら内容を記録する（SyncCoordinatorと同じ）
+                events.append(change_event)
+                monitor.confirm_synced(change_event['file_path'])
+
+            monitor.set_change_callback(sync)
+            path = os.path.join(temp_dir, 'a.md')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('# A')
+
+            for mtime_ns in (1_000_000_000, 2_000_000_000):
+                os.utime(path, ns=(mtime_ns, mtime_ns))
+                batch = [{'type': 'obsidian_change', 'file_path': path, 'action': 'modified',
+                          'dest_path': None, 'timestamp': '2024-01-01T00:00:00'}]
+                monitor._mark_unchanged_content(batch)
+                monitor._handle_file_change(batch[0])
+
+            self.assertEqual(len(events), 1)
+            self.assertIn(path, monitor.file_cache)
+            self.assertEqual(monitor.get_event_stats()['content_hashes']['suppressed'], 1)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_failed_sync_is_not_suppressed(self):
+        """同期が完了しなかった変更は、次の内容が同じ変更でもコールバックに渡すテスト"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            store = ContentHashStore(os.path.join(temp_dir, 'hashes.json'), temp_dir)
+            monitor = ObsidianFileMonitor(temp_dir, content_hashes=store)
+            events = []
+            monitor.set_change_callback(events.append)
+            path = os.path.join(temp_dir, 'a.md')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('# A')
+
+            for mtime_ns in (1_000_000_000, 2_000_000_000):
+                os.utime(path, ns=(mtime_ns, mtime_ns))
+                batch = [{'type': 'obsidian_change', 'file_path': path, 'action': 'modified',
+                          'dest_path': None, 'timestamp': '2024-01-01T00:00:00'}]
+                monitor._mark_unchanged_content(batch)
+                monitor._handle_file_change(batch[0])
+
+            self.assertEqual(len(events), 2)
+            self.assertIsNone(store.get_hash(path))
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
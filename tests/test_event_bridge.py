@@ -0,0 +1,193 @@
+"""
+EventBridgeのテスト
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration.event_bridge import EventBridge
+from obsidian_integration.file_monitor import ObsidianFileMonitor
+
+
+def _event(file_path, action='modified', dest_path=None):
+    return {
+        'type': 'obsidian_change',
+        'file_path': file_path,
+        'action': action,
+        'dest_path': dest_path,
+        'timestamp': '2024-01-01T00:00:00',
+        'observed_at': time.time()
+    }
+
+
+class TestEventBridge(unittest.TestCase):
+    """EventBridgeのテストクラス"""
+
+    def test_events_from_thread_reach_loop(self):
+        """別スレッドから積んだイベントがループ側で順番通りに取り出せるテスト"""
+        bridge = EventBridge(maxsize=100)
+
+        async def run():
+            bridge.bind()
+            producer = threading.Thread(
+                target=lambda: [bridge.put(_event(f'{i}.md')) for i in range(50)]
+            )
+            producer.start()
+            received = []
+            while len(received) < 50:
+                received.extend(await asyncio.wait_for(bridge.get_batch(), 2))
+            producer.join()
+            return received
+
+        received = asyncio.run(run())
+
+        self.assertEqual([event['file_path'] for event in received], [f'{i}.md' for i in range(50)])
+        stats = bridge.get_stats()
+        self.assertEqual(stats['delivered'], 50)
+        self.assertEqual(stats['lag_samples'], 50)
+        self.assertGreaterEqual(stats['lag_max'], 0.0)
+
+    def test_repeated_modifications_merge(self):
+        """キューに残っている同じパスの変更がまとめられるテスト"""
+        bridge = EventBridge()
+        bridge.put(_event('a.md', 'created'))
+        bridge.put(_event('a.md'))
+        bridge.put(_event('b.md'))
+
+        batch = bridge.drain()
+
+        self.assertEqual([(event['action'], event['file_path']) for event in batch],
+                         [('created', 'a.md'), ('modified', 'b.md')])
+        self.assertEqual(batch[0]['coalesced_events'], 2)
+        self.assertEqual(bridge.get_stats()['merged'], 1)
+
+    def test_modification_after_delete_is_not_merged(self):
+        """削除より後の変更が、削除より前の変更にまとめられないテスト"""
+        bridge = EventBridge()
+        bridge.put(_event('a.md'))
+        bridge.put(_event('a.md', 'deleted'))
+        bridge.put(_event('a.md', 'created'))
+
+        self.assertEqual([event['action'] for event in bridge.drain()], ['modified', 'deleted', 'created'])
+
+    def test_coalesce_overflow_requests_rescan(self):
+        """coalesceではあふれたイベントが1件の再走査イベントになるテスト"""
+        bridge = EventBridge(maxsize=3, overflow_policy='coalesce')
+        results = [bridge.put(_event(f'{i}.md')) for i in range(10)]
+
+        batch = bridge.drain()
+
+        self.assertEqual(results, [True] * 3 + [False] * 7)
+        self.assertEqual([event['file_path'] for event in batch[:3]], ['0.md', '1.md', '2.md'])
+        self.assertEqual(batch[3]['type'], 'obsidian_rescan')
+        self.assertEqual(bridge.get_stats()['rescans'], 1)
+        self.assertEqual(bridge.drain(), [])
+
+    def test_drop_oldest_overflow(self):
+        """drop_oldestでは古いイベントが捨てられ、再走査イベントも渡されるテスト"""
+        bridge = EventBridge(maxsize=3, overflow_policy='drop_oldest')
+        for i in range(5):
+            bridge.put(_event(f'{i}.md'))
+
+        batch = bridge.drain()
+
+        self.assertEqual([event.get('file_path') for event in batch[:3]], ['2.md', '3.md', '4.md'])
+        self.assertEqual(batch[3]['type'], 'obsidian_rescan')
+        self.assertEqual(bridge.get_stats()['dropped'], 2)
+
+    def test_block_overflow_waits_for_consumer(self):
+        """blockでは取り出されるまで別スレッドの呼び出しが待たされ、イベントを失わないテスト"""
+        bridge = EventBridge(maxsize=10, overflow_policy='block')
+
+        async def run():
+            bridge.bind()
+            producer = threading.Thread(
+                target=lambda: [bridge.put(_event(f'{i}.md')) for i in range(100)]
+            )
+            producer.start()
+            received = []
+            while len(received) < 100:
+                batch = await asyncio.wait_for(bridge.get_batch(), 2)
+                self.assertLessEqual(len(batch), 10)
+                received.extend(batch)
+                await asyncio.sleep(0.001)
+            await asyncio.to_thread(producer.join)
+            return received
+
+        received = asyncio.run(run())
+
+        self.assertEqual(len(received), 100)
+        self.assertNotIn('obsidian_rescan', [event['type'] for event in received])
+        self.assertGreater(bridge.get_stats()['blocked'], 0)
+
+    def test_close_releases_waiters(self):
+        """closeで待っているループ側が空のバッチで戻るテスト"""
+        bridge = EventBridge()
+
+        async def run():
+            bridge.bind()
+            asyncio.get_running_loop().call_later(0.05, bridge.close)
+            return await asyncio.wait_for(bridge.get_batch(), 2)
+
+        self.assertEqual(asyncio.run(run()), [])
+        self.assertFalse(bridge.put(_event('a.md')))
+
+    def test_invalid_policy(self):
+        """不明な方針でValueErrorになるテスト"""
+        with self.assertRaises(ValueError):
+            EventBridge(overflow_policy='unknown')
+
+
+class TestFileMonitorDispatch(unittest.TestCase):
+    """ObsidianFileMonitorの変更イベント処理のテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.monitor = ObsidianFileMonitor(self.temp_dir)
+        self.monitor.bridge = EventBridge(maxsize=2)
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_overflow_is_recovered_by_rescan(self):
+        """あふれたイベントのファイルが再走査で通知されるテスト"""
+        events = []
+        self.monitor.set_change_callback(events.append)
+        paths = []
+        for i in range(5):
+            path = os.path.join(self.temp_dir, f'{i}.md')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f'# {i}')
+            paths.append(path)
+
+        async def run():
+            self.monitor.running = True
+            self.monitor.bridge.bind()
+            dispatch_task = asyncio.create_task(self.monitor._dispatch_loop())
+            await asyncio.to_thread(lambda: [self.monitor.bridge.put(_event(path, 'created')) for path in paths])
+            deadline = time.monotonic() + 2
+            while len(self.monitor.file_cache) < 5 and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            self.monitor.running = False
+            self.monitor.bridge.close()
+            await dispatch_task
+
+        asyncio.run(run())
+
+        self.assertEqual(sorted(self.monitor.file_cache), sorted(paths))
+        self.assertEqual(sorted({event['file_path'] for event in events}), sorted(paths))
+        self.assertEqual(self.monitor.get_event_stats()['queue']['rescans'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
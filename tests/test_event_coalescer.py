@@ -0,0 +1,205 @@
+"""
+EventCoalescerのテスト
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration.event_coalescer import EventCoalescer
+from obsidian_integration.file_monitor import ObsidianFileHandler
+
+
+class TestEventCoalescer(unittest.TestCase):
+    """EventCoalescerのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        # タイマーで渡されないよう十分長い静止期間にする
+        self.coalescer = EventCoalescer(quiet_period=60)
+
+    def tearDown(self):
+        """テストの後処理"""
+        self.coalescer.close()
+
+    def _add(self, action, file_path, dest_path=None):
+        self.coalescer.add({
+            'type': 'obsidian_change',
+            'file_path': file_path,
+            'action': action,
+            'dest_path': dest_path
+        })
+
+    def _flush(self):
+        return sorted(
+            (event['action'], event['file_path'], event['dest_path'])
+            for event in self.coalescer.flush()
+        )
+
+    def test_repeated_modifications_collapse(self):
+        """同じファイルへの連続した変更が1件になるテスト"""
+        for _ in range(5):
+            self._add('modified', 'a.md')
+
+        self.assertEqual(self._flush(), [('modified', 'a.md', None)])
+        stats = self.coalescer.get_stats()
+        self.assertEqual(stats['raw_events'], 5)
+        self.assertEqual(stats['collapsed_events'], 4)
+
+    def test_created_then_deleted_is_dropped(self):
+        """作成後に削除されたファイルは通知しないテスト"""
+        self._add('created', 'tmp.md')
+        self._add('modified', 'tmp.md')
+        self._add('deleted', 'tmp.md')
+
+        self.assertEqual(self._flush(), [])
+
+    def test_created_then_modified_is_created(self):
+        """作成後の変更が作成として通知されるテスト"""
+        self._add('created', 'a.md')
+        self._add('modified', 'a.md')
+
+        self.assertEqual(self._flush(), [('created', 'a.md', None)])
+
+    def test_deleted_then_created_is_modified(self):
+        """削除後の再作成が変更として通知されるテスト"""
+        self._add('deleted', 'a.md')
+        self._add('created', 'a.md')
+
+        self.assertEqual(self._flush(), [('modified', 'a.md', None)])
+
+    def test_atomic_save_is_modified(self):
+        """一時ファイルへの書き込みと置き換えによる保存で、一時ファイルが通知されないテスト"""
+        self._add('created', '.a.md.tmp')
+        self._add('modified', '.a.md.tmp')
+        self._add('moved', '.a.md.tmp', 'a.md')
+
+        # 置き換え前のa.mdの有無はイベントからは分からないため作成になる
+        self.assertEqual(self._flush(), [('created', 'a.md', None)])
+
+    def test_move_chain_and_modification(self):
+        """連続した移動と変更が最初の移動元からの移動として通知されるテスト"""
+        self._add('moved', 'a.md', 'b.md')
+        self._add('moved', 'b.md', 'c.md')
+        self._add('modified', 'c.md')
+
+        self.assertEqual(self._flush(), [('moved', 'a.md', 'c.md')])
+
+    def test_moved_content_changed_flag(self):
+        """移動の前後に変更がある場合だけcontent_changedが付くテスト"""
+        self._add('moved', 'a.md', 'b.md')
+        self.assertFalse(self.coalescer.flush()[0]['content_changed'])
+
+        self._add('modified', 'c.md')
+        self._add('moved', 'c.md', 'd.md')
+        self.assertTrue(self.coalescer.flush()[0]['content_changed'])
+
+    def test_moved_target_deleted(self):
+        """移動先が削除された場合は移動元の削除として通知されるテスト"""
+        self._add('moved', 'a.md', 'b.md')
+        self._add('deleted', 'b.md')
+
+        self.assertEqual(self._flush(), [('deleted', 'a.md', None)])
+
+    def test_quiet_period_flushes_once(self):
+        """静止期間の経過後にまとめて1回だけ渡されるテスト"""
+        batches = []
+        delivered = threading.Event()
+
+        def callback(batch):
+            batches.append(batch)
+            delivered.set()
+
+        coalescer = EventCoalescer(callback, quiet_period=0.05)
+        for name in ('a.md', 'b.md', 'a.md'):
+            coalescer.add({'file_path': name, 'action': 'modified'})
+
+        self.assertTrue(delivered.wait(2))
+        time.sleep(0.1)
+        self.assertEqual(len(batches), 1)
+        self.assertEqual([event['file_path'] for event in batches[0]], ['a.md', 'b.md'])
+        self.assertEqual(batches[0][0]['coalesced_events'], 2)
+        self.assertEqual(coalescer.pending_count(), 0)
+
+    def test_max_delay_flushes_continuous_events(self):
+        """イベントが途切れなくてもmax_delayで渡されるテスト"""
+        delivered = threading.Event()
+        coalescer = EventCoalescer(lambda batch: delivered.set(), quiet_period=0.2, max_delay=0.3)
+        deadline = time.monotonic() + 2
+        while not delivered.is_set() and time.monotonic() < deadline:
+            coalescer.add({'file_path': 'a.md', 'action': 'modified'})
+            time.sleep(0.02)
+
+        self.assertTrue(delivered.is_set())
+        coalescer.close()
+
+    def test_pending_paths_are_capped(self):
+        """集約中のパスが上限に達すると静止期間を待たずに渡されるテスト"""
+        batches = []
+        coalescer = EventCoalescer(batches.append, quiet_period=60, max_pending=3)
+        for i in range(10):
+            coalescer.add({'file_path': f'{i}.md', 'action': 'modified'})
+            self.assertLessEqual(coalescer.pending_count(), 3)
+        coalescer.close()
+
+        self.assertEqual([event['file_path'] for batch in batches for event in batch],
+                         [f'{i}.md' for i in range(10)])
+        self.assertEqual(coalescer.get_stats()['forced_flushes'], 3)
+
+    def test_blocked_delivery_blocks_caller(self):
+        """受け渡し先が詰まっている間は、上限に達したadd()の呼び出し元が待たされるテスト"""
+        release = threading.Event()
+        delivering = threading.Event()
+        batches = []
+
+        def callback(batch):
+            delivering.set()
+            release.wait(2)
+            batches.append(batch)
+
+        coalescer = EventCoalescer(callback, quiet_period=0.01, max_pending=2)
+        coalescer.add({'file_path': 'a.md', 'action': 'modified'})
+        self.assertTrue(delivering.wait(2))
+
+        # タイマーのスレッドが受け渡し中の間、上限を超えるadd()は戻らない
+        producer = threading.Thread(
+            target=lambda: [coalescer.add({'file_path': f'{i}.md', 'action': 'modified'}) for i in range(5)]
+        )
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())
+        self.assertLessEqual(coalescer.pending_count(), 2)
+
+        release.set()
+        producer.join(2)
+        self.assertFalse(producer.is_alive())
+        coalescer.close()
+        self.assertEqual([event['file_path'] for batch in batches for event in batch],
+                         ['a.md'] + [f'{i}.md' for i in range(5)])
+
+
+class TestFileHandlerCoalescing(unittest.TestCase):
+    """ObsidianFileHandlerのイベント集約のテストクラス"""
+
+    def test_burst_is_delivered_as_one_change(self):
+        """保存時の連続したイベントが1件の変更としてコールバックに渡されるテスト"""
+        events = []
+        handler = ObsidianFileHandler('/vault', events.append, quiet_period=60)
+        for action in ('modified', 'modified', 'modified'):
+            handler._handle_file_change('/vault/a.md', action)
+
+        self.assertEqual(events, [])
+        handler.coalescer.close()
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['action'], 'modified')
+        self.assertEqual(events[0]['file_path'], '/vault/a.md')
+        self.assertEqual(events[0]['coalesced_events'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
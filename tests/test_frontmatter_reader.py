@@ -0,0 +1,182 @@
+"""
+FrontmatterReaderのテスト
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date
+
+import yaml
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration.frontmatter_reader import (
+    CHUNK_SIZE, FrontmatterReader, load_frontmatter, read_frontmatter_text
+)
+from obsidian_integration.markdown_tokenizer import markdown_tokenizer
+from sync_system.page_index import PageMappingIndex
+
+
+class TestLoadFrontmatter(unittest.TestCase):
+    """load_frontmatterのテストクラス"""
+
+    def test_simple_values(self):
+        """単純な「キー: 値」が型付きで変換されるテスト"""
+        frontmatter = load_frontmatter(
+            "title: Weekly Review\nrating: 4\ncreated: 2024-03-01\nnotion_id: 'abc-123'\nempty:\n"
+        )
+
+        self.assertEqual(frontmatter, {
+            'title': 'Weekly Review',
+            'rating': 4,
+            'created': date(2024, 3, 1),
+            'notion_id': 'abc-123',
+            'empty': None
+        })
+
+    def test_matches_safe_load(self):
+        """高速パスとYAMLローダーの結果がyaml.safe_loadと一致するテスト"""
+        samples = [
+            "title: Note",
+            "title: ノート",
+            "draft: yes\npublished: False",
+            "count: 007\nneg: -3\nzero: 0\nsigned: +5",
+            "ratio: 1.5\nexp: 1e3",
+            "time: 12:30",
+            "url: https://example.com/a#b",
+            "title: A # comment",
+            "title: 'quoted: value'\nother: \"double\"",
+            "title: \"escaped \\\" quote\"",
+            "tags: [a, b]",
+            "tags:\n  - a\n  - b",
+            "nested:\n  key: value",
+            "invalid: 2024-13-01",
+            "stamp: 2024-03-01 10:00:00",
+            "null_value: ~\nnothing: null",
+            "on: off",
+            "# comment\ntitle: Note",
+            "key:value",
+            "title: Note   \n\n",
+            "title: Note: with colon",
+        ]
+        for sample in samples:
+            with self.subTest(sample=sample):
+                try:
+                    expected = yaml.safe_load(sample)
+                except Exception as e:
+                    # YAMLとして不正な場合は同じ種類の例外になる
+                    with self.assertRaises(type(e)):
+                        load_frontmatter(sample)
+                    continue
+                self.assertEqual(load_frontmatter(sample), expected if isinstance(expected, dict) else {})
+
+    def test_empty_and_non_mapping(self):
+        """空やマッピング以外のフロントマターが空の辞書になるテスト"""
+        self.assertEqual(load_frontmatter(None), {})
+        self.assertEqual(load_frontmatter(''), {})
+        self.assertEqual(load_frontmatter('- a\n- b'), {})
+
+
+class TestFrontmatterReader(unittest.TestCase):
+    """FrontmatterReaderのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.reader = FrontmatterReader()
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, content, newline=None):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w', encoding='utf-8', newline=newline) as f:
+            f.write(content)
+        return path
+
+    def test_reads_only_prefix(self):
+        """本文を読まずにフロントマターだけを読むテスト"""
+        path = self._write('large.md', "---\ntitle: Large\n---\n" + "body text\n" * 100000)
+
+        self.assertEqual(self.reader.read(path), {'title': 'Large'})
+        self.assertLessEqual(self.reader.get_stats()['bytes_read'], CHUNK_SIZE)
+
+    def test_matches_tokenizer_split(self):
+        """切り出したフロントマターがトークナイザーの結果と一致するテスト"""
+        samples = [
+            "---\ntitle: A\n---\nbody",
+            "---\ntitle: A\n...\nbody",
+            "---\ntitle: A\n---",
+            "---\n---\nbody",
+            "---\ntitle: A\nno closing delimiter",
+            "--- \ntitle: A\n---  \nbody",
+            "# No frontmatter\n---\n",
+            "---",
+            "",
+            "---\ntitle: " + "x" * (CHUNK_SIZE * 2) + "\n---\nbody",
+        ]
+        for index, sample in enumerate(samples):
+            with self.subTest(sample=sample[:40]):
+                path = self._write(f'sample_{index}.md', sample)
+                text, _ = read_frontmatter_text(path)
+                self.assertEqual(text, markdown_tokenizer.split_frontmatter(sample)[0])
+
+    def test_crlf_newlines(self):
+        """CRLFのファイルでもフロントマターを読めるテスト"""
+        path = self._write('crlf.md', "---\ntitle: Windows\ntags: [a]\n---\nbody\n", newline='\r\n')
+
+        self.assertEqual(self.reader.read(path), {'title': 'Windows', 'tags': ['a']})
+
+    def test_oversized_frontmatter_reads_whole_file(self):
+        """上限を超えるフロントマターでもファイル全体を読んで取得するテスト"""
+        reader = FrontmatterReader(max_bytes=CHUNK_SIZE)
+        lines = ''.join(f"key_{i}: value {i}\n" for i in range(2000))
+        path = self._write('oversized.md', "---\n" + lines + "---\nbody")
+
+        self.assertEqual(len(reader.read(path)), 2000)
+
+    def test_read_many_and_title(self):
+        """複数ファイルの一括読み込みとタイトル取得のテスト"""
+        paths = [self._write(f'note_{i}.md', f"---\ntitle: Note {i}\n---\nbody") for i in range(20)]
+        plain = self._write('plain.md', "# Plain\n")
+
+        results = self.reader.read_many(paths + [plain])
+
+        self.assertEqual(len(results), 21)
+        self.assertEqual(results[paths[3]], {'title': 'Note 3'})
+        self.assertEqual(results[plain], {})
+        self.assertEqual(self.reader.read_title(paths[5]), 'Note 5')
+        self.assertEqual(self.reader.read_title(plain), 'plain')
+
+    def test_missing_file(self):
+        """存在しないファイルで空の辞書を返すテスト"""
+        self.assertEqual(self.reader.read(os.path.join(self.temp_dir, 'missing.md')), {})
+        self.assertEqual(self.reader.get_stats()['errors'], 1)
+
+
+class TestPageMappingIndexSetMany(unittest.TestCase):
+    """PageMappingIndex.set_manyのテストクラス"""
+
+    def test_set_many(self):
+        """複数の対応をまとめて登録するテスト"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            index = PageMappingIndex(os.path.join(temp_dir, 'page_index.json'))
+            index.set('a.md', 'page-a')
+
+            count = index.set_many({'a.md': 'page-a', 'b.md': 'page-b', 'c.md': 'page-a'})
+
+            self.assertEqual(count, 2)
+            self.assertIsNone(index.get_page_id('a.md'))
+            self.assertEqual(index.get_obsidian_id('page-a'), 'c.md')
+            self.assertEqual(PageMappingIndex(index.index_path).get_page_id('b.md'), 'page-b')
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+GitChangeDetectorのテスト
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration.vault_walker import VaultWalker
+from sync_system.git_change_detector import STATE_FILE, GitChangeDetector
+
+
+@unittest.skipUnless(shutil.which('git'), 'git is not installed')
+class TestGitChangeDetector(unittest.TestCase):
+    """GitChangeDetectorのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.vault_path = os.path.join(self.temp_dir, 'vault')
+        self.results_dir = os.path.join(self.temp_dir, 'analysis-results')
+        self._git('init', '-q')
+        for relative_path in ('a.md', 'notes/b.md', 'notes/c.md', '.obsidian/workspace.md'):
+            self._write(relative_path, f'# {relative_path}\n\nbody\n')
+        self._write('README.md', 'outside the vault', root=True)
+        self._commit('initial')
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def _git(self, *args):
+        subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+                       cwd=self.temp_dir, check=True, capture_output=True)
+
+    def _commit(self, message):
+        self._git('add', '-A')
+        self._git('commit', '-q', '-m', message)
+
+    def _path(self, relative_path, root=False):
+        return os.path.join(self.temp_dir if root else self.vault_path, *relative_path.split('/'))
+
+    def _write(self, relative_path, content='x', root=False):
+        path = self._path(relative_path, root)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def _detector(self):
+        return GitChangeDetector(self.vault_path, self.results_dir,
+                                 VaultWalker(self.vault_path, ['.obsidian/']))
+
+    def _relative(self, file_paths):
+        return [os.path.relpath(file_path, self.vault_path).replace(os.sep, '/') for file_path in file_paths]
+
+    def test_falls_back_without_previous_commit(self):
+        """記録がない場合・記録したコミットが履歴にない場合はNoneを返すテスト"""
+        detector = self._detector()
+        self.assertIsNone(detector.detect())
+
+        detector.save_state('0' * 40)
+        self.assertIsNone(detector.detect())
+
+    def test_falls_back_outside_repository(self):
+        """gitリポジトリでない場合はNoneを返すテスト"""
+        shutil.rmtree(os.path.join(self.temp_dir, '.git'))
+        detector = self._detector()
+
+        self.assertIsNone(detector.head_commit())
+        self.assertIsNone(detector.detect())
+
+    def test_detects_changes_since_saved_commit(self):
+        """記録したコミットからの変更・追加・削除・移動と未コミットの変更を返すテスト"""
+        detector = self._detector()
+        base = detector.head_commit()
+        self.assertTrue(detector.save_state(base))
+        with open(os.path.join(self.results_dir, STATE_FILE), 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['commit'], base)
+
+        self._write('a.md', '# a\n\nedited\n')
+        self._write('new.md', 'new note')
+        os.remove(self._path('notes/b.md'))
+        self._git('mv', 'vault/notes/c.md', 'vault/moved.md')
+        self._write('.obsidian/workspace.md', 'ignored')
+        self._write('notes/image.png', 'not a note')
+        self._write('README.md', 'changed outside the vault', root=True)
+        self._commit('edit')
+        self._write('draft.md', 'untracked')
+
+        changes = detector.detect()
+
+        self.assertEqual(changes.base_commit, base)
+        self.assertEqual(changes.head_commit, detector.head_commit())
+        self.assertEqual(self._relative(changes.changed), ['a.md', 'draft.md', 'moved.md', 'new.md'])
+        self.assertEqual(self._relative(changes.deleted), ['notes/b.md', 'notes/c.md'])
+
+        detector.save_state(detector.head_commit())
+        os.remove(self._path('draft.md'))
+        changes = detector.detect()
+        self.assertEqual((changes.changed, changes.deleted), ([], []))
+
+    def test_falls_back_when_ignore_rules_change(self):
+        """.syncignoreが変わった場合はNoneを返すテスト"""
+        detector = self._detector()
+        detector.save_state(detector.head_commit())
+
+        self._write('.syncignore', 'notes/\n')
+        self._commit('ignore notes')
+
+        self.assertIsNone(detector.detect())
+        self.assertIsNone(self._detector().detect())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+"""
+LinkGraphIndexのテスト
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis_engine.enhanced_analysis_engine import EnhancedAnalysisEngine
+from obsidian_integration.dashboard_builder import ObsidianDashboardBuilder
+from obsidian_integration.link_graph import LinkGraphIndex
+
+
+class TestLinkGraphIndex(unittest.TestCase):
+    """LinkGraphIndexのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.temp_dir, 'link_graph.json')
+        self.graph = LinkGraphIndex(self.index_path)
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_forward_links_and_backlinks(self):
+        """順方向リンクとバックリンクが登録されるテスト"""
+        self.graph.update_note('A.md', ['B', 'folder/C'])
+        self.graph.update_note('B.md', ['A'])
+        self.graph.update_note('folder/C.md', [])
+
+        self.assertEqual(self.graph.get_links('A.md'), ['B.md', 'folder/C.md'])
+        self.assertEqual(self.graph.get_backlinks('A.md'), ['B.md'])
+        self.assertEqual(self.graph.get_backlinks('folder/C.md'), ['A.md'])
+        self.assertEqual(self.graph.get_backlink_count('B.md'), 1)
+
+    def test_unresolved_links_resolve_when_note_is_created(self):
+        """未解決リンクが、リンク先ノートの作成で解決されるテスト"""
+        self.graph.update_note('A.md', ['Future Note', 'image.png'])
+
+        self.assertEqual(self.graph.get_unresolved_links(), {'future note': ['A.md']})
+
+        self.graph.update_note('notes/Future Note.md', [])
+
+        self.assertEqual(self.graph.get_unresolved_links(), {})
+        self.assertEqual(self.graph.get_backlinks('notes/Future Note.md'), ['A.md'])
+
+    def test_alias_resolution(self):
+        """別名でのリンクが解決され、別名の変更に追従するテスト"""
+        self.graph.update_note('A.md', ['Nick'])
+        self.graph.update_from_content('Real Name.md', "---\naliases: [Nick]\n---\nbody")
+
+        self.assertEqual(self.graph.get_links('A.md'), ['Real Name.md'])
+
+        self.graph.update_from_content('Real Name.md', "---\naliases: [Other]\n---\nbody")
+
+        self.assertEqual(self.graph.get_links('A.md'), [])
+        self.assertIn('nick', self.graph.get_unresolved_links())
+
+    def test_remove_and_rename(self):
+        """削除でリンクが未解決になり、リネームでバックリンクが付け替わるテスト"""
+        self.graph.update_note('A.md', ['B'])
+        self.graph.update_note('B.md', ['A'])
+
+        self.graph.rename_note('A.md', 'archive/A.md')
+
+        self.assertEqual(self.graph.get_backlinks('archive/A.md'), ['B.md'])
+        self.assertEqual(self.graph.get_backlinks('B.md'), ['archive/A.md'])
+
+        self.graph.remove_note('B.md')
+
+        self.assertEqual(self.graph.get_links('archive/A.md'), [])
+        self.assertEqual(self.graph.get_unresolved_links(), {'b': ['archive/A.md']})
+
+    def test_update_from_content_uses_wikilinks_only(self):
+        """ウィキリンクだけがグラフに登録されるテスト"""
+        self.graph.update_note('B.md', [])
+        self.graph.update_from_content('A.md', "[[B#Heading|alias]] [web](https://example.com) ![[B]]")
+
+        self.assertEqual(self.graph.get_links('A.md'), ['B.md'])
+
+    def test_metrics(self):
+        """孤立ノート・ハブ・連結成分の統計テスト"""
+        self.graph.update_note('hub.md', [])
+        for name in ('a', 'b', 'c'):
+            self.graph.update_note(f'{name}.md', ['hub'])
+        self.graph.update_note('x.md', ['y'])
+        self.graph.update_note('y.md', [])
+        self.graph.update_note('lonely.md', ['missing'])
+
+        metrics = self.graph.get_metrics(hub_count=1)
+
+        self.assertEqual(metrics['total_notes'], 7)
+        self.assertEqual(metrics['total_links'], 4)
+        self.assertEqual(metrics['orphans'], ['lonely.md'])
+        self.assertEqual(metrics['hubs'], [{'note_id': 'hub.md', 'backlinks': 3}])
+        self.assertEqual(metrics['component_count'], 3)
+        self.assertEqual(metrics['largest_component'], 4)
+        self.assertEqual(metrics['unresolved_links'], 1)
+
+    def test_related_notes(self):
+        """リンクと共起で関連ノートが順位付けされるテスト"""
+        self.graph.update_note('topic.md', [])
+        self.graph.update_note('a.md', ['topic', 'b'])
+        self.graph.update_note('b.md', ['a'])
+        self.graph.update_note('c.md', ['topic'])
+
+        related = [item['note_id'] for item in self.graph.get_related_notes('a.md')]
+
+        self.assertEqual(related, ['b.md', 'topic.md', 'c.md'])
+
+    def test_persistence_and_rebuild(self):
+        """保存したインデックスから復元でき、保管庫から再構築できるテスト"""
+        self.graph.update_note('A.md', ['B'])
+        self.graph.update_note('B.md', [])
+        self.graph.save()
+
+        restored = LinkGraphIndex(self.index_path)
+        self.assertEqual(restored.get_backlinks('B.md'), ['A.md'])
+
+        vault = os.path.join(self.temp_dir, 'vault')
+        os.makedirs(os.path.join(vault, 'sub'))
+        with open(os.path.join(vault, 'sub', 'X.md'), 'w', encoding='utf-8') as f:
+            f.write("links to [[Y]]")
+        with open(os.path.join(vault, 'Y.md'), 'w', encoding='utf-8') as f:
+            f.write("no links")
+
+        self.assertEqual(restored.rebuild(vault), 2)
+        self.assertEqual(restored.get_backlinks('Y.md'), ['sub/X.md'])
+        self.assertFalse(restored.get_backlinks('B.md'))
+
+    def test_rebuild_skips_unreadable_notes(self):
+        """UTF-8で読めないノートがあっても、残りのノートで作り直されるテスト"""
+        vault = os.path.join(self.temp_dir, 'vault')
+        os.makedirs(vault)
+        with open(os.path.join(vault, 'A.md'), 'w', encoding='utf-8') as f:
+            f.write("links to [[C]]")
+        with open(os.path.join(vault, 'B.md'), 'wb') as f:
+            f.write(b'\xff\xfe broken [[C]]')
+        with open(os.path.join(vault, 'C.md'), 'w', encoding='utf-8') as f:
+            f.write("no links")
+
+        self.assertEqual(self.graph.rebuild(vault), 2)
+        self.assertEqual(self.graph.get_backlinks('C.md'), ['A.md'])
+        self.assertEqual(LinkGraphIndex(self.index_path).get_backlinks('C.md'), ['A.md'])
+
+
+class TestLinkGraphConsumers(unittest.TestCase):
+    """リンクグラフを読むダッシュボードと推奨事項のテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.graph = LinkGraphIndex(os.path.join(self.temp_dir, 'link_graph.json'))
+        self.graph.update_note('Hub.md', [])
+        self.graph.update_note('a.md', ['Hub'])
+        self.graph.update_note('b.md', ['Hub', 'Missing'])
+        self.graph.update_note('lonely.md', [])
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_dashboard_reads_graph_metrics(self):
+        """ダッシュボードがリンクグラフの統計を表示するテスト"""
+        builder = ObsidianDashboardBuilder(self.temp_dir, link_graph=self.graph)
+
+        stats = asyncio.run(builder.get_dashboard_stats())
+        content = builder._generate_dashboard_content(stats)
+
+        self.assertEqual(stats['total_links'], 2)
+        self.assertEqual(stats['orphan_count'], 1)
+        self.assertIn('- **総リンク数**: 2', content)
+        self.assertIn('- **未解決リンク数**: 1', content)
+        self.assertIn('- [[Hub]] (2 backlinks)', content)
+
+    def test_recommendations_read_graph(self):
+        """推奨事項に孤立ノートと未解決リンクが含まれるテスト"""
+        engine = EnhancedAnalysisEngine(link_graph=self.graph)
+
+        recommendations = engine._generate_link_graph_recommendations()
+
+        by_type = {recommendation['type']: recommendation for recommendation in recommendations}
+        self.assertEqual(by_type['connect_orphans']['target_notes'], ['lonely.md'])
+        self.assertEqual(by_type['resolve_links']['target_links'], ['missing'])
+
+
+if __name__ == '__main__':
+    unittest.main()
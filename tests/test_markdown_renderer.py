@@ -0,0 +1,91 @@
+"""
+NotionMarkdownRendererのテスト
+"""
+import unittest
+import sys
+import os
+import asyncio
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notion_integration.block_converter import MarkdownBlockConverter
+from notion_integration.markdown_renderer import NotionMarkdownRenderer
+
+
+def api_block(block_id, block_type, text='', has_children=False, **extra):
+    """APIレスポンス形式のブロックを作成"""
+    body = {'rich_text': [{'type': 'text', 'plain_text': text, 'text': {'content': text}}] if text else []}
+    body.update(extra)
+    return {'id': block_id, 'type': block_type, 'has_children': has_children, block_type: body}
+
+
+class TestNotionMarkdownRenderer(unittest.TestCase):
+    """NotionMarkdownRendererのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.renderer = NotionMarkdownRenderer()
+        self.converter = MarkdownBlockConverter()
+
+    def test_round_trip(self):
+        """変換器の出力を描画すると元のMarkdownに戻るテスト"""
+        markdown = (
+            "# Title\n\n"
+            "Text with **bold**, *italic*, `code` and [link](https://example.com)\nsecond line\n\n"
+            "- parent\n  - child\n- sibling\n1. one\n2. two\n- [x] done\n\n"
+            "> [!warning] Careful\n> body\n\n"
+            "```python\nprint('hi')\n```\n\n"
+            "---\n"
+        )
+
+        rendered = self.renderer.render(self.converter.convert(markdown))
+
+        self.assertEqual(rendered, markdown)
+
+    def test_numbered_list_restarts_after_other_blocks(self):
+        """番号付きリストの番号が他のブロックを挟むとリセットされるテスト"""
+        blocks = [
+            api_block('1', 'numbered_list_item', 'a'),
+            api_block('2', 'numbered_list_item', 'b'),
+            api_block('3', 'paragraph', 'break'),
+            api_block('4', 'numbered_list_item', 'c')
+        ]
+
+        self.assertEqual(self.renderer.render(blocks), "1. a\n2. b\n\nbreak\n\n1. c\n")
+
+    def test_code_fence_is_extended(self):
+        """コード内にバッククォートがある場合にフェンスが長くなるテスト"""
+        block = api_block('1', 'code', "```inner```", language='plain text')
+
+        self.assertEqual(self.renderer.render_block(block), "````\n```inner```\n````")
+
+    def test_unsupported_blocks_are_skipped(self):
+        """未対応のブロックが出力されないテスト"""
+        blocks = [api_block('1', 'paragraph', 'a'), {'id': '2', 'type': 'unsupported'}]
+
+        self.assertEqual(self.renderer.render(blocks), "a\n")
+
+    def test_aiter_markdown_fetches_children(self):
+        """非同期描画で子ブロックを取得して描画するテスト"""
+        children = {'1': [api_block('1a', 'bulleted_list_item', 'child')]}
+
+        async def blocks():
+            yield api_block('1', 'bulleted_list_item', 'parent', has_children=True)
+            yield api_block('2', 'paragraph', 'after')
+
+        async def fetch_children(block_id):
+            for child in children.get(block_id, []):
+                yield child
+
+        async def run():
+            return [f async for f in self.renderer.aiter_markdown(blocks(), fetch_children=fetch_children)]
+
+        fragments = asyncio.run(run())
+
+        self.assertEqual(''.join(fragments), "- parent\n  - child\n\nafter\n")
+        self.assertEqual(len(fragments), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+MarkdownTokenizerのテスト
+"""
+import unittest
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration.markdown_tokenizer import MarkdownTokenizer
+
+
+NOTE = """---
+title: Sample
+---
+# Heading #topic
+
+Intro with [[Target#Section|alias]] and ![[diagram.png]].
+Second line with [site](https://example.com) and `#not-a-tag`.
+
+- item #one
+- item two
+1. first
+
+> quoted [[Quote Link]]
+
+```python
+# not a heading #nope
+print("[[not a link]]")
+```
+
+![alt](img.png) issue #123 done"""
+
+
+class TestMarkdownTokenizer(unittest.TestCase):
+    """MarkdownTokenizerのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.tokens = MarkdownTokenizer().tokenize(NOTE)
+
+    def test_frontmatter_is_separated(self):
+        """フロントマターが本文と分離されるテスト"""
+        self.assertEqual(self.tokens['frontmatter_text'], 'title: Sample')
+        self.assertTrue(NOTE[self.tokens['body_start']:].startswith('# Heading'))
+
+    def test_line_numbers_are_file_based(self):
+        """行番号がフロントマターを含むファイル基準になるテスト"""
+        self.assertEqual(self.tokens['headings'][0]['line_number'], 4)
+        self.assertEqual(self.tokens['paragraphs'][0]['line_number'], 6)
+        self.assertEqual(self.tokens['lists'][0]['line_number'], 9)
+        self.assertEqual(self.tokens['quotes'][0]['line_number'], 13)
+        self.assertEqual(self.tokens['code_blocks'][0]['line_number'], 15)
+        self.assertEqual(self.tokens['line_count'], len(NOTE.split('\n')))
+
+    def test_positions_point_into_content(self):
+        """位置がファイル内の文字オフセットになるテスト"""
+        for tag in self.tokens['tags']:
+            self.assertEqual(NOTE[tag['position']:tag['position'] + len(tag['tag']) + 1], '#' + tag['tag'])
+        code_block = self.tokens['code_blocks'][0]
+        self.assertTrue(NOTE[code_block['position']:].startswith('```python'))
+
+    def test_code_is_excluded_from_inline_scans(self):
+        """コードブロックとインラインコード内の要素が無視されるテスト"""
+        self.assertEqual([h['text'] for h in self.tokens['headings']], ['Heading #topic'])
+        self.assertEqual([t['tag'] for t in self.tokens['tags']], ['topic', 'one'])
+        targets = [link['target'] for link in self.tokens['links']]
+        self.assertNotIn('not a link', targets)
+
+    def test_wikilink_parts(self):
+        """ウィキリンクの見出し・別名・埋め込みが分解されるテスト"""
+        wikilinks = [link for link in self.tokens['links'] if link['type'] == 'obsidian_link']
+
+        self.assertEqual(wikilinks[0]['target'], 'Target')
+        self.assertEqual(wikilinks[0]['heading'], 'Section')
+        self.assertEqual(wikilinks[0]['display_text'], 'alias')
+        self.assertTrue(wikilinks[1]['embed'])
+        self.assertEqual(wikilinks[2]['target'], 'Quote Link')
+
+    def test_lists_and_images(self):
+        """リストと画像の抽出テスト"""
+        self.assertEqual([lst['type'] for lst in self.tokens['lists']], ['unordered', 'ordered'])
+        self.assertEqual(len(self.tokens['lists'][0]['items']), 2)
+        self.assertEqual(self.tokens['images'][0]['path'], 'img.png')
+        markdown_links = [link for link in self.tokens['links'] if link['type'] == 'markdown_link']
+        self.assertEqual([link['target'] for link in markdown_links], ['https://example.com'])
+
+    def test_word_count_excludes_code_and_frontmatter(self):
+        """単語数にコードブロックとフロントマターが含まれないテスト"""
+        tokens = MarkdownTokenizer().tokenize("---\ntitle: x\n---\none two\n```\nthree four\n```\nfive")
+
+        self.assertEqual(tokens['word_count'], 3)
+
+    def test_unclosed_fence(self):
+        """閉じられていないコードブロックが末尾までになるテスト"""
+        tokens = MarkdownTokenizer().tokenize("text\n```\ncode\n# not heading")
+
+        self.assertEqual(tokens['code_blocks'][0]['code'], 'code\n# not heading')
+        self.assertEqual(tokens['headings'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+MoveDetectorのテスト
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration import vault_scanner
+from obsidian_integration.content_hash_store import ContentHashStore
+from obsidian_integration.file_monitor import ObsidianFileMonitor
+from obsidian_integration.move_detector import MoveDetector
+from obsidian_integration.search_index import FullTextIndex
+from obsidian_integration.vault_scanner import VaultScanner
+
+BODY = '\n'.join(f'line {i} of the note' for i in range(20))
+
+
+class TestMoveDetector(unittest.TestCase):
+    """MoveDetectorのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.vault_path = os.path.join(self.temp_dir, 'vault')
+        os.makedirs(os.path.join(self.vault_path, 'archive'))
+        self.store = ContentHashStore(os.path.join(self.temp_dir, 'hashes.json'), self.vault_path)
+        self.scanner = VaultScanner(self.vault_path)
+        self.detector = MoveDetector(self.store, self.scanner)
+        self._racy_window = vault_scanner.RACY_WINDOW_NS
+        vault_scanner.RACY_WINDOW_NS = -10 ** 18
+
+    def tearDown(self):
+        """テストの後処理"""
+        vault_scanner.RACY_WINDOW_NS = self._racy_window
+        shutil.rmtree(self.temp_dir)
+
+    def _path(self, relative_path):
+        return os.path.join(self.vault_path, *relative_path.split('/'))
+
+    def _write(self, relative_path, content):
+        with open(self._path(relative_path), 'w', encoding='utf-8') as f:
+            f.write(content)
+        return self._path(relative_path)
+
+    def _record(self):
+        # 移動前の状態を記録しておく（監視中の走査と同じ）
+        for change in self.scanner.scan():
+            self.store.has_changed(change['file_path'])
+
+    def _detect(self):
+        return sorted(
+            (change['action'], os.path.relpath(change['file_path'], self.vault_path),
+             change.get('dest_path') and os.path.relpath(change['dest_path'], self.vault_path),
+             change.get('content_changed'))
+            for change in self.detector.detect(self.scanner.scan())
+        )
+
+    def test_copy_and_delete_is_detected_by_content(self):
+        """inodeが変わっても内容が同じなら移動として検出されるテスト"""
+        self._write('a.md', BODY)
+        self._record()
+        self._write('archive/renamed.md', BODY)
+        os.remove(self._path('a.md'))
+
+        self.assertEqual(self._detect(), [('moved', 'a.md', 'archive/renamed.md', False)])
+        self.assertEqual(self.detector.get_stats()['moves_by_content'], 1)
+        self.assertIsNotNone(self.store.get_hash(self._path('archive/renamed.md')))
+        self.assertIsNone(self.store.get_hash(self._path('a.md')))
+
+    def test_rename_then_edit_is_detected_by_inode(self):
+        """リネーム後に編集されたファイルがinodeで移動として検出されるテスト"""
+        self._write('a.md', BODY)
+        self._record()
+        os.rename(self._path('a.md'), self._path('archive/a.md'))
+        with open(self._path('archive/a.md'), 'a', encoding='utf-8') as f:
+            f.write('\nappended line')
+
+        self.assertEqual(self._detect(), [('moved', 'a.md', 'archive/a.md', True)])
+        self.assertEqual(self.detector.get_stats()['moves_by_inode'], 1)
+        # 移動先の現在の内容は、同期が完了して記録されるまで変更ありのまま
+        self.assertTrue(self.store.has_changed(self._path('archive/a.md'), record=False))
+        self.assertTrue(self.store.confirm(self._path('archive/a.md')))
+        self.assertFalse(self.store.has_changed(self._path('archive/a.md')))
+
+    def test_edited_copy_is_detected_by_similarity(self):
+        """内容の一部が変わった別ファイルへの置き換えが類似度で移動として検出されるテスト"""
+        self._write('a.md', BODY)
+        self._write('b.md', 'unrelated note')
+        self._record()
+        self._write('archive/moved.md', BODY.replace('line 3 of', 'line three of'))
+        os.remove(self._path('a.md'))
+
+        self.assertEqual(self._detect(), [('moved', 'a.md', 'archive/moved.md', True)])
+        self.assertEqual(self.detector.get_stats()['moves_by_similarity'], 1)
+
+    def test_unrelated_files_are_not_paired(self):
+        """内容の異なる削除と作成は移動にしないテスト"""
+        self._write('a.md', BODY)
+        self._record()
+        os.remove(self._path('a.md'))
+        self._write('new.md', 'a completely different note')
+
+        self.assertEqual(self._detect(), [('created', 'new.md', None, None), ('deleted', 'a.md', None, None)])
+
+    def test_reused_inode_with_different_content_is_not_a_move(self):
+        """削除後に再利用されたinodeの別ファイルは移動にしないテスト"""
+        self._write('a.md', BODY)
+        self._record()
+        self._write('new.md', 'a completely different note')
+        stat = os.stat(self._path('new.md'))
+        changes = [
+            {'action': 'deleted', 'file_path': self._path('a.md'), 'device': stat.st_dev, 'inode': stat.st_ino},
+            {'action': 'created', 'file_path': self._path('new.md')}
+        ]
+
+        self.assertEqual([change['action'] for change in self.detector.detect(changes)], ['deleted', 'created'])
+
+    def test_identical_notes_are_paired_by_name(self):
+        """同じ内容の削除が複数ある場合はファイル名が同じものと組にするテスト"""
+        self._write('a.md', 'template')
+        self._write('b.md', 'template')
+        self._record()
+        self._write('archive/b.md', 'template')
+        os.remove(self._path('a.md'))
+        os.remove(self._path('b.md'))
+
+        self.assertEqual(self._detect(), [('deleted', 'a.md', None, None), ('moved', 'b.md', 'archive/b.md', False)])
+
+    def test_watchdog_events_use_scanner_records(self):
+        """inodeの付いていない削除イベントはスキャナーの記録からinodeを引くテスト"""
+        self._write('a.md', BODY)
+        self._record()
+        os.rename(self._path('a.md'), self._path('b.md'))
+        with open(self._path('b.md'), 'a', encoding='utf-8') as f:
+            f.write('\nappended line')
+        changes = [
+            {'type': 'obsidian_change', 'action': 'deleted', 'file_path': self._path('a.md')},
+            {'type': 'obsidian_change', 'action': 'created', 'file_path': self._path('b.md')}
+        ]
+
+        moved = self.detector.detect(changes)
+
+        self.assertEqual(len(moved), 1)
+        self.assertEqual(moved[0]['action'], 'moved')
+        self.assertEqual(moved[0]['type'], 'obsidian_change')
+        self.assertEqual(moved[0]['dest_path'], self._path('b.md'))
+
+
+
+class TestFileMonitorMoveDetection(unittest.TestCase):
+    """ObsidianFileMonitorの走査での移動検出のテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.vault_path = os.path.join(self.temp_dir, 'vault')
+        os.makedirs(self.vault_path)
+        with open(os.path.join(self.vault_path, 'a.md'), 'w', encoding='utf-8') as f:
+            f.write(BODY)
+        self.monitor = ObsidianFileMonitor(
+            self.vault_path,
+            content_hashes=ContentHashStore(os.path.join(self.temp_dir, 'hashes.json'), self.vault_path),
+            search_index=FullTextIndex(os.path.join(self.temp_dir, 'search.sqlite3'), self.vault_path),
+            snapshot_path=os.path.join(self.temp_dir, 'snapshot.json.gz')
+        )
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_offline_rename_is_notified_as_move(self):
+        """監視の外でのリネームと編集が1つの移動として通知されるテスト"""
+        events = []
+        self.monitor.set_change_callback(events.append)
+        old_path = os.path.join(self.vault_path, 'a.md')
+        new_path = os.path.join(self.vault_path, 'renamed.md')
+
+        async def run():
+            await self.monitor.initialize()
+            # 起動後のバックグラウンド処理で内容ハッシュが記録される
+            await self.monitor._reconcile_task
+            os.remove(old_path)
+            with open(new_path, 'w', encoding='utf-8') as f:
+                f.write(BODY + '\nappended line')
+            return await self.monitor._update_file_cache()
+
+        asyncio.run(run())
+
+        self.assertEqual([(event['action'], event['file_path'], event['dest_path'], event['content_changed'])
+                          for event in events], [('moved', old_path, new_path, True)])
+        self.assertEqual(list(self.monitor.file_cache), [new_path])
+
+
+if __name__ == '__main__':
+    unittest.main()
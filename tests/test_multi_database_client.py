@@ -0,0 +1,234 @@
+"""
+MultiDatabaseNotionClientのテスト
+"""
+import unittest
+import sys
+import os
+import asyncio
+import tempfile
+import shutil
+import threading
+import time
+from unittest.mock import Mock
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notion_integration.multi_database_client import MultiDatabaseNotionClient
+from notion_integration.rate_limiter import RateLimiter
+import notion_integration.multi_database_client as multi_database_client
+
+
+class FakeDatabase:
+    """created_timeフィルタとページネーションに対応したダミーのdatabases.query"""
+
+    def __init__(self, sizes: dict, delay: float = 0.0):
+        self.pages = {
+            db_id: [{'id': f"{db_id}-{i}", 'created_time': f"2024-01-01T00:{i // 60:02d}:00.000Z"} for i in range(size)]
+            for db_id, size in sizes.items()
+        }
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def query(self, database_id, page_size=100, start_cursor=None, filter=None):
+        with self.lock:
+            self.calls.append({'database_id': database_id, 'page_size': page_size, 'filter': filter})
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            pages = self.pages[database_id]
+            if filter:
+                pages = [p for p in pages if p['created_time'] >= filter['created_time']['on_or_after']]
+            start = int(start_cursor or 0)
+            end = min(start + page_size, len(pages))
+            return {
+                'results': pages[start:end],
+                'has_more': end < len(pages),
+                'next_cursor': str(end) if end < len(pages) else None
+            }
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class TestMultiDatabaseStatus(unittest.TestCase):
+    """get_all_database_statusのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.original_limiter = multi_database_client.notion_rate_limiter
+        multi_database_client.notion_rate_limiter = RateLimiter(rate=1000.0, burst=1000)
+
+        self.client = self._new_client()
+
+    def _new_client(self):
+        client = MultiDatabaseNotionClient(
+            auth_token='test_token',
+            journal_path=os.path.join(self.temp_dir, 'journal.jsonl'),
+            page_count_path=os.path.join(self.temp_dir, 'page_counts.json')
+        )
+        for db_type in client.database_configs:
+            client.database_configs[db_type]['database_id'] = f"db-{db_type}"
+            client.database_configs[db_type]['data_source_id'] = f"ds-{db_type}"
+        return client
+
+    def tearDown(self):
+        """テストの後処理"""
+        multi_database_client.notion_rate_limiter = self.original_limiter
+        shutil.rmtree(self.temp_dir)
+
+    def install(self, fake: FakeDatabase):
+        self.client.client = Mock()
+        self.client.client.databases.query.side_effect = fake.query
+
+    def test_probes_run_concurrently_with_page_size_one(self):
+        """4つのデータベースが並列にpage_size=1で問い合わせられるテスト"""
+        fake = FakeDatabase({'db-main': 0, 'db-analysis': 1, 'db-recommendations': 0, 'db-sync_log': 1}, delay=0.2)
+        self.install(fake)
+
+        start = time.monotonic()
+        status = asyncio.run(self.client.get_all_database_status())
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(fake.max_active, 4)
+        self.assertTrue(all(call['page_size'] == 1 for call in fake.calls))
+        self.assertEqual(status['analysis']['page_count'], 1)
+        self.assertEqual(status['main']['page_count_source'], 'probe')
+
+    def test_large_database_uses_cached_count(self):
+        """大きなデータベースは初回だけ数え終わるまで待ち、以降はキャッシュ済みの件数を返すテスト"""
+        fake = FakeDatabase({'db-main': 250, 'db-analysis': 0, 'db-recommendations': 0, 'db-sync_log': 0})
+        self.install(fake)
+
+        async def run():
+            first = await self.client.get_all_database_status()
+            second = await self.client.get_all_database_status()
+            await self.client.close()
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        self.assertEqual(first['main']['page_count'], 250)
+        self.assertEqual(first['main']['page_count_source'], 'count')
+        self.assertEqual(second['main']['page_count'], 250)
+        self.assertEqual(second['main']['page_count_source'], 'cache')
+
+    def test_page_counts_persist_across_clients(self):
+        """保存したページ数を次のクライアントがキャッシュとして使い、データベースIDが変われば使わないテスト"""
+        fake = FakeDatabase({'db-main': 250, 'db-analysis': 0, 'db-recommendations': 0, 'db-sync_log': 0,
+                             'db-other': 150})
+        self.install(fake)
+        asyncio.run(self.client.refresh_page_counts())
+
+        client = self._new_client()
+        client.client = self.client.client
+
+        async def run():
+            status = await client.get_all_database_status()
+            await client.close()
+            return status
+
+        status = asyncio.run(run())
+        self.assertEqual((status['main']['page_count'], status['main']['page_count_source']), (250, 'cache'))
+
+        client = self._new_client()
+        client.client = self.client.client
+        client.database_configs['main']['database_id'] = 'db-other'
+        status = asyncio.run(client.get_all_database_status())
+        self.assertEqual((status['main']['page_count'], status['main']['page_count_source']), (150, 'count'))
+
+    def test_close_cancels_page_count_refresh(self):
+        """closeでバックグラウンドのページ数の更新が止められるテスト"""
+        fake = FakeDatabase({'db-main': 250, 'db-analysis': 0, 'db-recommendations': 0, 'db-sync_log': 0})
+        self.install(fake)
+
+        async def run():
+            await self.client.refresh_page_counts()
+            started = asyncio.Event()
+            original = self.client._refresh_page_count
+
+            async def slow_refresh(db_type):
+                started.set()
+                await asyncio.sleep(60)
+                await original(db_type)
+
+            self.client._refresh_page_count = slow_refresh
+            await self.client.get_all_database_status()
+            task = self.client._page_count_tasks['main']
+            await started.wait()
+            await asyncio.wait_for(self.client.close(), 2)
+            return task
+
+        task = asyncio.run(run())
+        self.assertTrue(task.cancelled())
+        self.assertEqual(self.client._page_count_tasks, {})
+
+    def test_incremental_refresh_counts_only_new_pages(self):
+        """キャッシュ更新は前回以降に作成されたページのみを取得するテスト"""
+        fake = FakeDatabase({'db-main': 250, 'db-analysis': 0, 'db-recommendations': 0, 'db-sync_log': 0})
+        self.install(fake)
+        asyncio.run(self.client.refresh_page_counts())
+
+        # 新しいページを2件追加（1件は境界と同じ作成日時）
+        pages = fake.pages['db-main']
+        pages.append({'id': 'new-1', 'created_time': pages[-1]['created_time']})
+        pages.append({'id': 'new-2', 'created_time': '2024-01-02T00:00:00.000Z'})
+        fake.calls.clear()
+
+        counts = asyncio.run(self.client.refresh_page_counts())
+
+        self.assertEqual(counts['main'], 252)
+        main_calls = [c for c in fake.calls if c['database_id'] == 'db-main']
+        self.assertEqual(len(main_calls), 1)
+        self.assertIsNotNone(main_calls[0]['filter'])
+
+    def test_probes_go_through_shared_rate_limiter(self):
+        """プローブが共有のレートリミッターの枠を取得してから問い合わせるテスト"""
+        fake = FakeDatabase({'db-main': 0, 'db-analysis': 1, 'db-recommendations': 0, 'db-sync_log': 1})
+        self.install(fake)
+        limiter = RateLimiter(rate=1000.0, burst=1000)
+        acquired = []
+        original_acquire = limiter.acquire
+
+        async def acquire():
+            acquired.append(True)
+            await original_acquire()
+
+        limiter.acquire = acquire
+        multi_database_client.notion_rate_limiter = limiter
+
+        asyncio.run(self.client.get_all_database_status())
+
+        self.assertEqual(len(acquired), 4)
+        self.assertEqual(len(fake.calls), 4)
+
+    def test_error_is_reported_per_database(self):
+        """問い合わせエラーがデータベース単位で報告されるテスト"""
+        self.client.client = Mock()
+        self.client.client.databases.query.side_effect = RuntimeError("unauthorized")
+
+        status = asyncio.run(self.client.get_all_database_status())
+
+        self.assertEqual(status['main']['status'], 'error')
+        self.assertIn('unauthorized', status['main']['error'])
+
+    def test_get_database_pages_raises_on_mid_stream_error(self):
+        """ページ取得途中のエラーで、途中までのページ一覧を全件として返さないテスト"""
+        self.client.client = Mock()
+        self.client.client.databases.query.side_effect = [
+            {'results': [{'id': 'p1'}], 'has_more': True, 'next_cursor': 'c1'},
+            RuntimeError("429 Too Many Requests")
+        ]
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(self.client.get_database_pages('main'))
+
+
+if __name__ == '__main__':
+    unittest.main()
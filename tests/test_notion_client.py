@@ -271,6 +271,58 @@ class TestNotionClient(unittest.TestCase):
         finally:
             loop.close()
     
+    def test_iter_page_blocks_raises_on_mid_stream_error(self):
+        """ページ途中の取得エラーが呼び出し側に伝わり、途中までの内容で終わらないテスト"""
+        self.client.client = Mock()
+        self.client.client.blocks.children.list.side_effect = [
+            {'results': [{'id': 'a'}], 'has_more': True, 'next_cursor': 'c1'},
+            RuntimeError('429 Too Many Requests')
+        ]
+        
+        async def collect():
+            return [block async for block in self.client.iter_page_blocks("test_page_id")]
+        
+        with self.assertRaises(RuntimeError):
+            asyncio.run(collect())
+        
+        self.client.client.blocks.children.list.side_effect = RuntimeError('network error')
+        self.assertEqual(asyncio.run(self.client.get_page_content("test_page_id")), [])
+    
+    def test_iter_database_pages_raises_on_mid_stream_error(self):
+        """データベース取得途中のエラーが呼び出し側に伝わり、途中までのページ一覧で終わらないテスト"""
+        self.client.client = Mock()
+        self.client.client.databases.query.side_effect = [
+            {'results': [{'id': 'p1'}], 'has_more': True, 'next_cursor': 'c1'},
+            RuntimeError('429 Too Many Requests')
+        ]
+        
+        with self.assertRaises(RuntimeError):
+            asyncio.run(self.client.get_database_pages("test_db_id"))
+    
+    def test_iter_page_blocks_closes_pagination_on_break(self):
+        """iter_page_blocksを途中で閉じると、内側のページネーションもその場で閉じられるテスト"""
+        closed = []
+        
+        async def paginate(*args, **kwargs):
+            try:
+                for i in range(10):
+                    yield {'id': str(i)}
+            finally:
+                closed.append(True)
+        
+        async def first_block():
+            blocks = self.client.iter_page_blocks("test_page_id")
+            async for block in blocks:
+                await blocks.aclose()
+                # GCやループの終了を待たずに閉じられている
+                return block, list(closed)
+        
+        with patch('notion_integration.notion_client.iterate_paginated_api', paginate):
+            block, closed_on_aclose = asyncio.run(first_block())
+        
+        self.assertEqual(block['id'], '0')
+        self.assertEqual(closed_on_aclose, [True])
+    
     def test_create_insight_page(self):
         """インサイトページの作成テスト"""
         insight_data = {
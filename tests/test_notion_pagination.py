@@ -0,0 +1,148 @@
+"""
+Notionページネーションヘルパーのテスト
+"""
+import unittest
+import sys
+import os
+import asyncio
+import threading
+from unittest.mock import Mock
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notion_integration.pagination import aclosing, iterate_paginated_api
+
+
+def make_paginated_function(total: int, page_size_seen: list = None):
+    """total件の結果をカーソルで返すダミーAPI"""
+    calls = []
+
+    def query(**kwargs):
+        calls.append(kwargs)
+        if page_size_seen is not None:
+            page_size_seen.append(kwargs.get('page_size'))
+        start = int(kwargs.get('start_cursor') or 0)
+        size = kwargs.get('page_size', 100)
+        end = min(start + size, total)
+        return {
+            'results': [{'id': str(i)} for i in range(start, end)],
+            'has_more': end < total,
+            'next_cursor': str(end) if end < total else None
+        }
+
+    query.calls = calls
+    return query
+
+
+class TestIteratePaginatedApi(unittest.TestCase):
+    """iterate_paginated_apiのテストクラス"""
+
+    def _collect(self, agen):
+        async def run():
+            return [item async for item in agen]
+        return asyncio.run(run())
+
+    def test_yields_all_results_in_order(self):
+        """全件が順番通りに返されるテスト"""
+        query = make_paginated_function(250)
+        results = self._collect(iterate_paginated_api(query, database_id='db'))
+
+        self.assertEqual([r['id'] for r in results], [str(i) for i in range(250)])
+        self.assertEqual(len(query.calls), 3)
+        self.assertTrue(all(call['database_id'] == 'db' for call in query.calls))
+
+    def test_page_size_is_clamped(self):
+        """page_sizeがNotionの上限に丸められるテスト"""
+        seen = []
+        query = make_paginated_function(10, seen)
+        self._collect(iterate_paginated_api(query, page_size=500))
+
+        self.assertEqual(seen, [100])
+
+    def test_empty_response(self):
+        """結果が空の場合のテスト"""
+        query = Mock(return_value={'results': [], 'has_more': False, 'next_cursor': None})
+        results = self._collect(iterate_paginated_api(query))
+
+        self.assertEqual(results, [])
+        query.assert_called_once()
+
+    def test_prefetches_next_page_while_consuming(self):
+        """現在のバッチ処理中に次ページが先読みされるテスト"""
+        second_page_requested = threading.Event()
+        base = make_paginated_function(200)
+
+        def query(**kwargs):
+            if kwargs.get('start_cursor'):
+                second_page_requested.set()
+            return base(**kwargs)
+
+        async def run():
+            agen = iterate_paginated_api(query)
+            first = await agen.__anext__()
+            # 1件目を受け取った時点で2ページ目のリクエストが発行されている
+            requested = await asyncio.to_thread(second_page_requested.wait, 1.0)
+            rest = [item async for item in agen]
+            return first, requested, rest
+
+        first, requested, rest = asyncio.run(run())
+
+        self.assertEqual(first['id'], '0')
+        self.assertTrue(requested)
+        self.assertEqual(len(rest), 199)
+
+    def test_early_break_stops_fetching(self):
+        """途中で打ち切った場合に残りのページを取得しないテスト"""
+        query = make_paginated_function(1000)
+
+        async def run():
+            seen = []
+            agen = iterate_paginated_api(query)
+            async for item in agen:
+                seen.append(item)
+                if len(seen) == 5:
+                    break
+            await agen.aclose()
+            return seen
+
+        seen = asyncio.run(run())
+
+        self.assertEqual(len(seen), 5)
+        # 1ページ目と先読みの2ページ目まで
+        self.assertLessEqual(len(query.calls), 2)
+
+    def test_aclosing_cancels_prefetch_on_break(self):
+        """aclosingで囲んだ場合、breakで抜けた時点で先読み中のリクエストが取り消されるテスト"""
+        query = make_paginated_function(1000)
+        cancelled = []
+
+        class BlockingLimiter:
+            """2回目以降の枠の取得で待ち続けるレートリミッター"""
+            calls = 0
+
+            async def acquire(self):
+                self.calls += 1
+                if self.calls > 1:
+                    try:
+                        await asyncio.Event().wait()
+                    except asyncio.CancelledError:
+                        cancelled.append(self.calls)
+                        raise
+
+        async def run():
+            async with aclosing(iterate_paginated_api(query, rate_limiter=BlockingLimiter())) as items:
+                async for item in items:
+                    # 先読みのリクエストが枠の取得で待つまで進める
+                    await asyncio.sleep(0)
+                    break
+            for _ in range(3):
+                await asyncio.sleep(0)
+            return list(cancelled)
+
+        self.assertEqual(asyncio.run(run()), [2])
+        self.assertEqual(len(query.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -198,6 +198,72 @@ class TestObsidianFileMonitor(unittest.TestCase):
         finally:
             loop.close()
     
+    def test_write_file_stream(self):
+        """逐次書き込みとアトミックな置き換えのテスト"""
+        test_file = os.path.join(self.temp_dir, 'stream.md')
+        with open(test_file, 'w', encoding='utf-8') as f:
+            f.write('old content')
+        
+        async def chunks():
+            for i in range(3):
+                yield f"chunk {i}\n"
+        
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        
+        try:
+            result = loop.run_until_complete(self.monitor.write_file_stream(test_file, chunks()))
+            
+            self.assertTrue(result)
+            with open(test_file, 'r', encoding='utf-8') as f:
+                self.assertEqual(f.read(), 'chunk 0\nchunk 1\nchunk 2\n')
+            self.assertEqual(os.listdir(self.temp_dir), ['stream.md'])
+            
+        finally:
+            loop.close()
+    
+    def test_write_file_stream_failure_keeps_original(self):
+        """書き込み途中の失敗で既存ファイルが残るテスト"""
+        test_file = os.path.join(self.temp_dir, 'stream.md')
+        with open(test_file, 'w', encoding='utf-8') as f:
+            f.write('old content')
+        
+        async def failing_chunks():
+            yield 'partial'
+            raise RuntimeError('Notion API error')
+        
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        
+        try:
+            result = loop.run_until_complete(self.monitor.write_file_stream(test_file, failing_chunks()))
+            
+            self.assertFalse(result)
+            with open(test_file, 'r', encoding='utf-8') as f:
+                self.assertEqual(f.read(), 'old content')
+            self.assertEqual(os.listdir(self.temp_dir), ['stream.md'])
+            
+        finally:
+            loop.close()
+    
+    def test_write_file_stream_keeps_permissions(self):
+        """置き換え後も既存ファイルの権限が保たれ、新規ファイルはumaskに従うテスト"""
+        test_file = os.path.join(self.temp_dir, 'stream.md')
+        with open(test_file, 'w', encoding='utf-8') as f:
+            f.write('old content')
+        os.chmod(test_file, 0o640)
+        new_file = os.path.join(self.temp_dir, 'new.md')
+        umask = os.umask(0o022)
+        
+        try:
+            self.assertTrue(asyncio.run(self.monitor.write_file_stream(test_file, iter(['new content']))))
+            self.assertTrue(asyncio.run(self.monitor.write_file_stream(new_file, iter(['new note']))))
+        finally:
+            os.umask(umask)
+        
+        self.assertEqual(os.stat(test_file).st_mode & 0o777, 0o640)
+        self.assertEqual(os.stat(new_file).st_mode & 0o777, 0o644)
+    
     def test_get_all_markdown_files(self):
         """すべてのMarkdownファイルの取得テスト"""
         # テストファイルを作成
@@ -0,0 +1,87 @@
+"""
+PageMappingIndexのテスト
+"""
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sync_system.page_index import PageMappingIndex
+
+
+class TestPageMappingIndex(unittest.TestCase):
+    """PageMappingIndexのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.temp_dir, 'state', 'page_index.json')
+        self.index = PageMappingIndex(self.index_path)
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_bidirectional_lookup(self):
+        """双方向の参照テスト"""
+        self.index.set('notes/a.md', 'page-a')
+
+        self.assertEqual(self.index.get_page_id('notes/a.md'), 'page-a')
+        self.assertEqual(self.index.get_obsidian_id('page-a'), 'notes/a.md')
+        self.assertIsNone(self.index.get_page_id('notes/missing.md'))
+
+    def test_persists_across_instances(self):
+        """再起動後もマッピングが保持されるテスト"""
+        self.index.set('notes/a.md', 'page-a')
+
+        reloaded = PageMappingIndex(self.index_path)
+        self.assertEqual(reloaded.get_page_id('notes/a.md'), 'page-a')
+        self.assertEqual(reloaded.get_obsidian_id('page-a'), 'notes/a.md')
+
+    def test_rename_keeps_page(self):
+        """リネーム後も同じページに対応するテスト"""
+        self.index.set('notes/a.md', 'page-a')
+        page_id = self.index.rename('notes/a.md', 'archive/a.md')
+
+        self.assertEqual(page_id, 'page-a')
+        self.assertIsNone(self.index.get_page_id('notes/a.md'))
+        self.assertEqual(self.index.get_page_id('archive/a.md'), 'page-a')
+        self.assertEqual(PageMappingIndex(self.index_path).get_obsidian_id('page-a'), 'archive/a.md')
+
+    def test_rename_unknown_is_noop(self):
+        """未登録のノートのリネームは何もしないテスト"""
+        self.assertIsNone(self.index.rename('missing.md', 'other.md'))
+        self.assertEqual(self.index.get_stats()['entries'], 0)
+
+    def test_set_replaces_stale_reverse_entry(self):
+        """再登録時に古い逆引きが残らないテスト"""
+        self.index.set('a.md', 'page-1')
+        self.index.set('a.md', 'page-2')
+
+        self.assertIsNone(self.index.get_obsidian_id('page-1'))
+        self.assertEqual(self.index.get_obsidian_id('page-2'), 'a.md')
+
+    def test_remove(self):
+        """対応の削除テスト"""
+        self.index.set('a.md', 'page-a')
+        self.index.set('b.md', 'page-b')
+
+        self.assertEqual(self.index.remove_obsidian_id('a.md'), 'page-a')
+        self.assertEqual(self.index.remove_page_id('page-b'), 'b.md')
+        self.assertEqual(self.index.get_stats()['entries'], 0)
+
+    def test_corrupt_file_starts_empty(self):
+        """壊れたインデックスファイルは空として扱うテスト"""
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        with open(self.index_path, 'w') as f:
+            f.write('{not json')
+
+        self.assertIsNone(PageMappingIndex(self.index_path).get_page_id('a.md'))
+
+
+if __name__ == '__main__':
+    unittest.main()
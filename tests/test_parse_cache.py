@@ -0,0 +1,123 @@
+"""
+ParseCacheのテスト
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration.parse_cache import ParseCache
+
+
+class TestParseCache(unittest.TestCase):
+    """ParseCacheのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.vault = os.path.join(self.temp_dir, 'vault')
+        os.makedirs(self.vault)
+        self.db_path = os.path.join(self.temp_dir, 'state', 'parse_cache.sqlite3')
+        self.note_path = self.write_note('note.md', "---\ntitle: x\n---\n# Title\n\nSome body text")
+        self.cache = ParseCache(self.db_path, self.vault)
+
+    def tearDown(self):
+        """テストの後処理"""
+        self.cache.close()
+        shutil.rmtree(self.temp_dir)
+
+    def write_note(self, name, content, mtime_ns=None):
+        """ノートを作成"""
+        path = os.path.join(self.vault, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def test_content_entry_shape(self):
+        """分析エンジン向けの形式で返すテスト"""
+        entry = self.cache.get_content_entry(self.note_path)
+
+        self.assertEqual(entry['id'], self.note_path)
+        self.assertEqual(entry['text'], "# Title\n\nSome body text")
+        self.assertEqual(entry['metadata']['title'], 'note.md')
+        self.assertEqual(entry['metadata']['source'], 'obsidian')
+        self.assertEqual(entry['metadata']['word_count'], 4)
+        self.assertTrue(entry['metadata']['last_modified'])
+
+    def test_unchanged_file_is_not_read(self):
+        """変更のないファイルは別インスタンスからも読み込まずに返すテスト"""
+        first = self.cache.get_content_entry(self.note_path)
+        self.cache.close()
+
+        cache = ParseCache(self.db_path, self.vault)
+        with patch('builtins.open', side_effect=AssertionError('file was read')):
+            second = cache.get_content_entry(self.note_path)
+        cache.close()
+
+        self.assertEqual(first, second)
+        self.assertEqual(cache.stats['hits'], 1)
+
+    def test_touched_file_uses_content_hash(self):
+        """mtimeだけが変わったファイルはハッシュ比較で再解析しないテスト"""
+        self.cache.get_note(self.note_path)
+        self.cache.flush()
+        os.utime(self.note_path, ns=(10 ** 18, 10 ** 18))
+
+        with patch.object(self.cache.parser, 'parse_file') as parse_file:
+            note = self.cache.get_note(self.note_path)
+            again = self.cache.get_note(self.note_path)
+
+        parse_file.assert_not_called()
+        self.assertEqual(note['raw_content'], "# Title\n\nSome body text")
+        self.assertEqual(again, note)
+        self.assertEqual(self.cache.stats['hash_hits'], 1)
+        self.assertEqual(self.cache.stats['hits'], 1)
+
+    def test_modified_file_is_reparsed(self):
+        """同じサイズでも内容が変わったファイルは再解析するテスト"""
+        self.cache.get_note(self.note_path)
+        self.write_note('note.md', "---\ntitle: x\n---\n# Title\n\nSome body TEXT", mtime_ns=10 ** 18)
+
+        note = self.cache.get_note(self.note_path)
+
+        self.assertEqual(note['raw_content'], "# Title\n\nSome body TEXT")
+        self.assertEqual(self.cache.stats['misses'], 2)
+
+    def test_parser_version_change_invalidates(self):
+        """パーサーバージョンが変わると再解析するテスト"""
+        self.cache.get_note(self.note_path)
+        self.cache.flush()
+
+        with patch('obsidian_integration.parse_cache.PARSER_VERSION', 2):
+            self.cache.get_note(self.note_path)
+
+        self.assertEqual(self.cache.stats['misses'], 2)
+
+    def test_empty_body_and_missing_file(self):
+        """本文が空のノートと存在しないファイルはNoneになるテスト"""
+        empty_path = self.write_note('empty.md', "---\ntitle: x\n---\n")
+
+        self.assertIsNone(self.cache.get_content_entry(empty_path))
+        self.assertIsNone(self.cache.get_content_entry(os.path.join(self.vault, 'missing.md')))
+        self.assertEqual(self.cache.stats['errors'], 1)
+
+    def test_prune_removes_deleted_notes(self):
+        """削除されたノートのエントリが削除されるテスト"""
+        other_path = self.write_note('other.md', "other")
+        self.cache.get_note(self.note_path)
+        self.cache.get_note(other_path)
+
+        removed = self.cache.prune([self.note_path])
+
+        self.assertEqual(removed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+ParsedNoteのテスト
+"""
+import json
+import tempfile
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration.markdown_parser import ObsidianMarkdownParser
+from obsidian_integration.parsed_note import ParsedNote
+
+
+NOTE = """---
+title: Sample
+tags: [a, b]
+---
+# Heading #topic
+
+Body with [[Link]] and words.
+
+```python
+ignored code words
+```
+"""
+
+
+class TestParsedNote(unittest.TestCase):
+    """ParsedNoteのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.parser = ObsidianMarkdownParser()
+
+    def test_cheap_fields_do_not_tokenize(self):
+        """本文・ファイル情報・単語数の参照ではトークナイズしないテスト"""
+        with tempfile.TemporaryDirectory() as vault:
+            file_path = os.path.join(vault, 'note.md')
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(NOTE)
+
+            with patch.object(self.parser.tokenizer, 'tokenize') as tokenize:
+                note = self.parser.parse_file(file_path, NOTE)
+
+                self.assertTrue(note.get('content', {}).get('raw_content').startswith('# Heading'))
+                self.assertEqual(note.get('file_info', {}).get('name'), 'note.md')
+                self.assertEqual(note.get('metadata', {}).get('word_count'), 7)
+                self.assertEqual(note['frontmatter']['title'], 'Sample')
+
+        tokenize.assert_not_called()
+
+    def test_structural_facets_tokenize_once(self):
+        """構造系の項目は1回だけトークナイズして共有するテスト"""
+        note = self.parser.parse_file("/vault/note.md", NOTE)
+
+        with patch.object(self.parser.tokenizer, 'tokenize', wraps=self.parser.tokenizer.tokenize) as tokenize:
+            self.assertEqual([link['target'] for link in note['links']], ['Link'])
+            self.assertEqual(note['content']['headings'][0]['text'], 'Heading #topic')
+            self.assertEqual(len(note['code_blocks']), 1)
+            self.assertIs(note['links'], note['links'])
+
+        self.assertEqual(tokenize.call_count, 1)
+
+    def test_word_count_matches_tokenizer(self):
+        """遅延計算した単語数がトークナイズ結果と一致するテスト"""
+        samples = [NOTE, "plain words only", "~~~\ncode\n~~~\nafter fence", "```\nunclosed\nfence"]
+        for sample in samples:
+            lazy = self.parser.parse_file("/vault/note.md", sample)['metadata']['word_count']
+            self.assertEqual(lazy, self.parser.tokenizer.tokenize(sample)['word_count'], sample)
+
+    def test_dict_compatibility(self):
+        """辞書と同じように参照・変換できるテスト"""
+        note = self.parser.parse_file("/vault/note.md", NOTE)
+
+        self.assertIsInstance(note, ParsedNote)
+        self.assertTrue(note)
+        self.assertIn('links', note)
+        self.assertNotIn('unknown', note)
+        self.assertIsNone(note.get('unknown'))
+        with self.assertRaises(KeyError):
+            note['unknown']
+        self.assertEqual(
+            set(note.keys()),
+            {'file_info', 'frontmatter', 'content', 'links', 'tags', 'images', 'code_blocks', 'metadata'}
+        )
+
+        data = note.to_dict()
+        self.assertIsInstance(data['content'], dict)
+        self.assertEqual(data['metadata']['line_count'], NOTE.count('\n') + 1)
+        json.dumps(data)
+
+    def test_facets_are_computed_on_demand(self):
+        """アクセスした項目だけが計算済みになるテスト"""
+        note = self.parser.parse_file("/vault/note.md", NOTE)
+        note['content']['raw_content']
+
+        self.assertTrue(note.is_computed('content'))
+        self.assertFalse(note.is_computed('links'))
+        self.assertFalse(note['content'].is_computed('headings'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+NotePropertyIndexのテスト
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration.dashboard_builder import ObsidianDashboardBuilder
+from obsidian_integration.property_index import NotePropertyIndex
+
+
+class TestNotePropertyIndex(unittest.TestCase):
+    """NotePropertyIndexのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.temp_dir, 'property_index.json')
+        self.index = NotePropertyIndex(self.index_path)
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def _note_ids(self, **kwargs):
+        return [note['note_id'] for note in self.index.query(**kwargs)]
+
+    def test_tag_query_intersects_tags(self):
+        """複数タグの指定がすべてを持つノートに絞り込まれるテスト"""
+        self.index.update_note('a.md', ['#Project', 'idea'], {}, 1.0)
+        self.index.update_note('b.md', ['project'], {}, 2.0)
+        self.index.update_note('c.md', ['idea'], {}, 3.0)
+
+        self.assertEqual(self._note_ids(tags=['project']), ['b.md', 'a.md'])
+        self.assertEqual(self._note_ids(tags=['project', '#IDEA']), ['a.md'])
+        self.assertEqual(self._note_ids(tags=['missing']), [])
+
+    def test_nested_tags_match_parent(self):
+        """入れ子のタグが親タグでも検索できるテスト"""
+        self.index.update_note('a.md', ['project/alpha'], {}, 1.0)
+        self.index.update_note('b.md', ['project/beta'], {}, 2.0)
+
+        self.assertEqual(self._note_ids(tags=['project'], sort='name', descending=False), ['a.md', 'b.md'])
+        self.assertEqual(self._note_ids(tags=['project/alpha']), ['a.md'])
+
+    def test_property_equality_and_range(self):
+        """プロパティの一致検索と範囲検索のテスト"""
+        self.index.update_note('a.md', [], {'status': 'Done', 'priority': 1, 'due': '2024-01-10'}, 1.0)
+        self.index.update_note('b.md', [], {'status': 'todo', 'priority': 3, 'due': '2024-02-01'}, 2.0)
+        self.index.update_note('c.md', [], {'status': ['todo', 'blocked'], 'priority': 5}, 3.0)
+
+        self.assertEqual(self._note_ids(properties={'status': 'TODO'}), ['c.md', 'b.md'])
+        self.assertEqual(self._note_ids(properties={'status': ['done', 'blocked']}), ['c.md', 'a.md'])
+        self.assertEqual(self._note_ids(ranges={'priority': (2, 5)}), ['c.md', 'b.md'])
+        self.assertEqual(self._note_ids(ranges={'priority': (None, 3)}), ['b.md', 'a.md'])
+        self.assertEqual(self._note_ids(ranges={'due': ('2024-01-01', '2024-01-31')}), ['a.md'])
+        self.assertEqual(
+            self._note_ids(properties={'status': 'todo'}, ranges={'priority': (4, None)}), ['c.md']
+        )
+
+    def test_sort_and_limit(self):
+        """更新日時順の並べ替えと件数制限のテスト"""
+        for i in range(10):
+            self.index.update_note(f'note_{i}.md', ['daily'], {}, float(i))
+
+        self.assertEqual(self._note_ids(tags=['daily'], limit=3), ['note_9.md', 'note_8.md', 'note_7.md'])
+        self.assertEqual(self._note_ids(tags=['daily'], descending=False, limit=2), ['note_0.md', 'note_1.md'])
+
+    def test_update_replaces_previous_entries(self):
+        """ノートの更新で古いタグ・プロパティが取り除かれるテスト"""
+        self.index.update_note('a.md', ['old'], {'status': 'todo', 'priority': 1}, 1.0)
+        self.index.update_note('a.md', ['new'], {'status': 'done'}, 2.0)
+
+        self.assertEqual(self._note_ids(tags=['old']), [])
+        self.assertEqual(self._note_ids(tags=['new']), ['a.md'])
+        self.assertEqual(self._note_ids(properties={'status': 'todo'}), [])
+        self.assertEqual(self._note_ids(ranges={'priority': (0, 10)}), [])
+        self.assertNotIn('priority', self.index.properties)
+
+    def test_update_from_content_reads_frontmatter_and_inline_tags(self):
+        """フロントマターと本文のタグ・プロパティが登録されるテスト"""
+        content = (
+            "---\ntags: [meeting, Project/Alpha]\nstatus: Draft\nrating: 4\ncreated: 2024-03-01\n---\n"
+            "# Notes\n\nDiscussed #roadmap items.\n"
+        )
+        self.index.update_from_content('notes/meeting.md', content, 5.0)
+
+        note = self.index.notes['notes/meeting.md']
+        self.assertEqual(note['tags'], ['meeting', 'project/alpha', 'roadmap'])
+        self.assertEqual(note['properties'], {'status': ['draft'], 'rating': [4], 'created': ['2024-03-01']})
+        self.assertEqual(self._note_ids(tags=['project'], properties={'status': 'draft'}), ['notes/meeting.md'])
+
+    def test_rename_and_remove(self):
+        """リネームと削除がインデックスに反映されるテスト"""
+        self.index.update_note('a.md', ['tag'], {'status': 'todo'}, 1.0)
+        self.index.rename_note('a.md', 'archive/a.md')
+
+        self.assertEqual(self._note_ids(tags=['tag']), ['archive/a.md'])
+        self.assertEqual(self._note_ids(properties={'status': 'todo'}), ['archive/a.md'])
+
+        self.index.remove_note('archive/a.md')
+        self.assertEqual(self._note_ids(tags=['tag']), [])
+        self.assertTrue(self.index.is_empty())
+
+    def test_tag_counts(self):
+        """人気タグがノート数の多い順に返されるテスト"""
+        self.index.update_note('a.md', ['x', 'y'], {}, 1.0)
+        self.index.update_note('b.md', ['x'], {}, 2.0)
+
+        self.assertEqual(self.index.get_tag_counts(1), [{'tag': 'x', 'count': 2}])
+
+    def test_save_load_and_refresh(self):
+        """保存したインデックスの読み込みと、別インスタンスの保存の反映のテスト"""
+        self.index.update_note('a.md', ['tag'], {'priority': 2}, 1.0)
+        self.assertTrue(self.index.save())
+
+        reader = NotePropertyIndex(self.index_path)
+        self.assertEqual([note['note_id'] for note in reader.query(ranges={'priority': (1, 3)})], ['a.md'])
+
+        self.index.update_note('b.md', ['tag'], {}, 2.0)
+        self.index.save()
+        os.utime(self.index_path, ns=(0, os.stat(self.index_path).st_mtime_ns + 1))
+
+        self.assertTrue(reader.refresh())
+        self.assertEqual([note['note_id'] for note in reader.query(tags=['tag'])], ['b.md', 'a.md'])
+
+    def test_rebuild_from_vault(self):
+        """保管庫全体からの再作成のテスト"""
+        vault = os.path.join(self.temp_dir, 'vault')
+        os.makedirs(os.path.join(vault, 'sub'))
+        with open(os.path.join(vault, 'one.md'), 'w', encoding='utf-8') as f:
+            f.write("---\nstatus: todo\n---\n# One #alpha\n")
+        with open(os.path.join(vault, 'sub', 'two.md'), 'w', encoding='utf-8') as f:
+            f.write("# Two\n\n#alpha #beta\n")
+
+        self.assertEqual(self.index.rebuild(vault), 2)
+        self.assertEqual(self._note_ids(tags=['alpha'], sort='name', descending=False), ['one.md', 'sub/two.md'])
+        self.assertEqual(self._note_ids(properties={'status': 'todo'}), ['one.md'])
+
+    def test_rebuild_skips_unreadable_notes(self):
+        """UTF-8で読めないノートがあっても、残りのノートで作り直されるテスト"""
+        vault = os.path.join(self.temp_dir, 'vault')
+        os.makedirs(vault)
+        with open(os.path.join(vault, 'one.md'), 'w', encoding='utf-8') as f:
+            f.write("# One #alpha\n")
+        with open(os.path.join(vault, 'broken.md'), 'wb') as f:
+            f.write(b'\xff\xfe #alpha')
+        with open(os.path.join(vault, 'two.md'), 'w', encoding='utf-8') as f:
+            f.write("# Two #alpha\n")
+
+        self.assertEqual(self.index.rebuild(vault), 2)
+        self.assertEqual(self._note_ids(tags=['alpha'], sort='name', descending=False), ['one.md', 'two.md'])
+
+    def test_dashboard_reads_tag_stats(self):
+        """ダッシュボードがプロパティインデックスのタグ統計を表示するテスト"""
+        self.index.update_note('a.md', ['x', 'y'], {}, 1.0)
+        self.index.update_note('b.md', ['x'], {}, 2.0)
+        builder = ObsidianDashboardBuilder(self.temp_dir, property_index=self.index)
+
+        stats = asyncio.run(builder.get_dashboard_stats())
+        content = builder._generate_dashboard_content(stats)
+
+        self.assertEqual(stats['total_tags'], 2)
+        self.assertEqual(stats['popular_tags'][0], {'tag': 'x', 'count': 2})
+        self.assertIn('- #x (2 notes)', content)
+        self.assertIn('- **総タグ数**: 2', content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+BlockRenderCacheのテスト
+"""
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notion_integration.markdown_renderer import NotionMarkdownRenderer
+from notion_integration.render_cache import BlockRenderCache, MISSING
+
+
+def api_block(block_id, block_type, text, edited='2024-01-01T00:00:00.000Z', children=None):
+    """APIレスポンス形式のブロックを作成"""
+    body = {'rich_text': [{'plain_text': text}]}
+    if children:
+        body['children'] = children
+    return {'id': block_id, 'type': block_type, 'last_edited_time': edited, block_type: body}
+
+
+class TestBlockRenderCache(unittest.TestCase):
+    """BlockRenderCacheのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.cache = BlockRenderCache(max_entries=3)
+        self.renderer = NotionMarkdownRenderer(cache=self.cache)
+
+    def test_unchanged_blocks_are_not_rerendered(self):
+        """未変更のブロックは再描画されないテスト"""
+        blocks = [api_block(f'b{i}', 'paragraph', f'text {i}') for i in range(3)]
+        first = self.renderer.render(blocks)
+
+        with patch.object(self.renderer, '_render_block', wraps=self.renderer._render_block) as render:
+            second = self.renderer.render(blocks)
+
+        self.assertEqual(first, second)
+        render.assert_not_called()
+        self.assertEqual(self.cache.get_stats()['hit_rate'], 0.5)
+
+    def test_edited_block_is_rerendered(self):
+        """最終編集日時が変わったブロックだけが再描画されるテスト"""
+        self.renderer.render([api_block('b1', 'paragraph', 'old'), api_block('b2', 'paragraph', 'same')])
+
+        rendered = self.renderer.render([
+            api_block('b1', 'paragraph', 'new', edited='2024-01-02T00:00:00.000Z'),
+            api_block('b2', 'paragraph', 'same')
+        ])
+
+        self.assertEqual(rendered, "new\n\nsame\n")
+        self.assertEqual(self.cache.stats['hits'], 1)
+        self.assertEqual(len(self.cache.entries), 2)
+
+    def test_edit_within_same_minute_is_rerendered(self):
+        """最終編集日時が同じ分のままでも、本文が変わったブロックは再描画されるテスト"""
+        self.renderer.render([api_block('b1', 'paragraph', 'old')])
+
+        rendered = self.renderer.render([api_block('b1', 'paragraph', 'new')])
+
+        self.assertEqual(rendered, "new\n")
+        self.assertEqual(self.cache.stats['hits'], 0)
+
+    def test_child_edit_invalidates_parent(self):
+        """子ブロックの編集で親の描画結果が更新されるテスト"""
+        parent = api_block('p', 'bulleted_list_item', 'parent', children=[api_block('c', 'bulleted_list_item', 'old')])
+        self.renderer.render([parent])
+
+        parent['bulleted_list_item']['children'] = [
+            api_block('c', 'bulleted_list_item', 'new', edited='2024-01-02T00:00:00.000Z')
+        ]
+
+        self.assertEqual(self.renderer.render([parent]), "- parent\n  - new\n")
+
+    def test_numbered_items_are_keyed_by_number(self):
+        """番号付きリストの番号が変わると再描画されるテスト"""
+        item = api_block('n', 'numbered_list_item', 'item')
+        self.renderer.render([item])
+
+        rendered = self.renderer.render([api_block('m', 'numbered_list_item', 'first'), item])
+
+        self.assertEqual(rendered, "1. first\n2. item\n")
+
+    def test_blocks_without_edit_time_are_not_cached(self):
+        """最終編集日時のないブロックはキャッシュされないテスト"""
+        self.renderer.render([{'type': 'paragraph', 'paragraph': {'rich_text': [{'plain_text': 'x'}]}}])
+
+        self.assertEqual(self.cache.stats['uncacheable'], 1)
+        self.assertEqual(len(self.cache.entries), 0)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """上限を超えると最も古く使われたエントリが破棄されるテスト"""
+        for i in range(4):
+            self.cache.put(f'b{i}', 'v', f'fragment {i}')
+
+        self.assertIs(self.cache.get('b0', 'v'), MISSING)
+        self.assertEqual(self.cache.get('b3', 'v'), 'fragment 3')
+        self.assertEqual(self.cache.stats['evictions'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+"""
+FullTextIndexのテスト
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration.content_hash_store import ContentHashStore
+from obsidian_integration.file_monitor import ObsidianFileMonitor
+from obsidian_integration.search_index import FullTextIndex, build_match_expression, tokenize_text
+
+
+class TestTokenizer(unittest.TestCase):
+    """トークナイザーと検索式のテストクラス"""
+
+    def test_tokenize_mixed_text(self):
+        """英単語は小文字の単語、CJKは2文字のN-gramになるテスト"""
+        self.assertEqual(tokenize_text('Weekly Review 東京都'), ['weekly', 'review', '東京', '京都', '都'])
+        self.assertEqual(tokenize_text('東京都', for_query=True), ['東京', '京都'])
+        # 全角英数字・半角カナは正規化される
+        self.assertEqual(tokenize_text('ＡＢＣ ｶﾅ'), ['abc', 'カナ', 'ナ'])
+
+    def test_match_expression(self):
+        """フレーズ・前方一致・除外の検索式のテスト"""
+        self.assertEqual(build_match_expression('alpha beta'), '"alpha" AND "beta"')
+        self.assertEqual(build_match_expression('"weekly review"'), '"weekly review"')
+        self.assertEqual(build_match_expression('proj*'), '"proj" *')
+        self.assertEqual(build_match_expression('会議 -下書き'), '("会議") NOT ("下書 書き")')
+        self.assertEqual(build_match_expression('都'), '"都" *')
+        self.assertIsNone(build_match_expression('  '))
+        self.assertIsNone(build_match_expression('-only'))
+
+
+class TestFullTextIndex(unittest.TestCase):
+    """FullTextIndexのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.vault_path = os.path.join(self.temp_dir, 'vault')
+        os.makedirs(os.path.join(self.vault_path, 'projects'))
+        self.index = FullTextIndex(os.path.join(self.temp_dir, 'search.sqlite3'), self.vault_path)
+        self._write('projects/alpha.md', "---\ntitle: Alpha Plan\ntags: [work]\n---\n"
+                                         "# Roadmap\nThe alpha project ships next quarter. #planning\n")
+        self._write('meeting.md', "# 東京都庁での会議\n予算について議論した。alpha も話題に出た。\n")
+        self._write('draft.md', "# Draft\nA rough draft mentioning alphabet soup.\n")
+        self.index.sync_with_vault()
+
+    def tearDown(self):
+        """テストの後処理"""
+        self.index.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, relative_path, content):
+        path = os.path.join(self.vault_path, *relative_path.split('/'))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def _ids(self, query):
+        return [result['note_id'] for result in self.index.search(query)]
+
+    def test_bm25_ranks_title_matches_first(self):
+        """タイトルに含むノートが本文だけに含むノートより上位になるテスト"""
+        results = self.index.search('alpha')
+
+        self.assertEqual([result['note_id'] for result in results], ['projects/alpha.md', 'meeting.md'])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        self.assertEqual(results[0]['title'], 'Alpha Plan')
+        self.assertEqual(results[0]['path'], os.path.join(self.vault_path, 'projects', 'alpha.md'))
+
+    def test_headings_and_tags(self):
+        """見出しとタグ（フロントマター・本文）で検索できるテスト"""
+        self.assertEqual(self._ids('roadmap'), ['projects/alpha.md'])
+        self.assertEqual(self._ids('work'), ['projects/alpha.md'])
+        self.assertEqual(self._ids('planning'), ['projects/alpha.md'])
+
+    def test_phrase_prefix_and_exclusion(self):
+        """フレーズ・前方一致・除外のテスト"""
+        self.assertEqual(self._ids('"next quarter"'), ['projects/alpha.md'])
+        self.assertEqual(self._ids('"quarter next"'), [])
+        self.assertEqual(sorted(self._ids('alph*')), ['draft.md', 'meeting.md', 'projects/alpha.md'])
+        self.assertEqual(self._ids('alph* -soup -予算'), ['projects/alpha.md'])
+
+    def test_japanese_queries(self):
+        """日本語の語・1文字・フレーズで検索できるテスト"""
+        self.assertEqual(self._ids('会議'), ['meeting.md'])
+        self.assertEqual(self._ids('東京都庁'), ['meeting.md'])
+        self.assertEqual(self._ids('庁'), ['meeting.md'])
+        self.assertEqual(self._ids('京都会議'), [])
+
+    def test_incremental_updates(self):
+        """変更・削除・移動が反映され、変更のないファイルは読み直さないテスト"""
+        path = self._write('draft.md', "# Draft\nNow about gardening.\n")
+        self.index.update_file(path)
+        self.assertEqual(self._ids('gardening'), ['draft.md'])
+        self.assertEqual(self._ids('soup'), [])
+
+        new_path = os.path.join(self.vault_path, 'garden.md')
+        os.rename(path, new_path)
+        self.index.rename_file(path, new_path)
+        self.assertEqual(self._ids('gardening'), ['garden.md'])
+
+        os.remove(os.path.join(self.vault_path, 'meeting.md'))
+        result = self.index.sync_with_vault()
+        self.assertEqual(result, {'updated': 0, 'unchanged': 2, 'removed': 1})
+        self.assertEqual(self._ids('会議'), [])
+
+    def test_persistence(self):
+        """保存した索引を別のインスタンスで検索できるテスト"""
+        reopened = FullTextIndex(self.index.db_path, self.vault_path)
+        try:
+            self.assertEqual(len(reopened), 3)
+            self.assertEqual([result['note_id'] for result in reopened.search('roadmap')], ['projects/alpha.md'])
+        finally:
+            reopened.close()
+
+
+class TestFileMonitorSearch(unittest.TestCase):
+    """ObsidianFileMonitor.search_filesのテストクラス"""
+
+    def test_search_files_uses_index(self):
+        """初期化後は本文の全文検索になり、変更イベントで索引が更新されるテスト"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            vault_path = os.path.join(temp_dir, 'vault')
+            os.makedirs(vault_path)
+            with open(os.path.join(vault_path, 'a.md'), 'w', encoding='utf-8') as f:
+                f.write('# A\nkeyword in body\n')
+            monitor = ObsidianFileMonitor(
+                vault_path,
+                content_hashes=ContentHashStore(os.path.join(temp_dir, 'hashes.json'), vault_path),
+                search_index=FullTextIndex(os.path.join(temp_dir, 'search.sqlite3'), vault_path)
+            )
+
+            async def run():
+                await monitor._initialize_file_cache()
+                monitor._sync_search_index()
+                first = await monitor.search_files('keyword')
+                new_path = os.path.join(vault_path, 'b.md')
+                with open(new_path, 'w', encoding='utf-8') as f:
+                    f.write('# B\nanother keyword\n')
+                monitor._update_search_index([{'action': 'created', 'file_path': new_path}])
+                return first, await monitor.search_files('keyword')
+
+            first, second = asyncio.run(run())
+
+            self.assertEqual([result['name'] for result in first], ['a.md'])
+            self.assertEqual(sorted(result['name'] for result in second), ['a.md', 'b.md'])
+            monitor.search_index.close()
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,12 +5,18 @@ import unittest
 import sys
 import os
 import asyncio
+import tempfile
+import shutil
 from unittest.mock import Mock, AsyncMock
 
 # プロジェクトルートをパスに追加
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sync_system.sync_coordinator import SyncCoordinator
+from sync_system.page_index import PageMappingIndex
+from obsidian_integration.link_graph import LinkGraphIndex
+from obsidian_integration.property_index import NotePropertyIndex
+from obsidian_integration.file_monitor import ObsidianFileMonitor
 
 class TestSyncCoordinator(unittest.TestCase):
     """SyncCoordinatorのテストクラス"""
@@ -299,5 +305,334 @@ This is a paragraph.
         finally:
             loop.close()
 
+class TestSyncCoordinatorPageIndex(unittest.TestCase):
+    """ページマッピングインデックスを使ったページ検索のテストクラス"""
+    
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.vault_path = os.path.join(self.temp_dir, 'vault')
+        os.makedirs(self.vault_path)
+        
+        self.mock_notion_client = Mock()
+        self.mock_notion_client.query_database = AsyncMock(return_value=[])
+        self.mock_obsidian_monitor = Mock()
+        self.mock_obsidian_monitor.vault_path = self.vault_path
+        self.page_index = PageMappingIndex(os.path.join(self.temp_dir, 'page_index.json'))
+        self.link_graph = LinkGraphIndex(os.path.join(self.temp_dir, 'link_graph.json'))
+        self.property_index = NotePropertyIndex(os.path.join(self.temp_dir, 'property_index.json'))
+        
+        self.coordinator = SyncCoordinator(
+            self.mock_notion_client,
+            self.mock_obsidian_monitor,
+            Mock(),
+            page_index=self.page_index,
+            link_graph=self.link_graph,
+            property_index=self.property_index
+        )
+    
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_obsidian_id_is_vault_relative(self):
+        """ObsidianノートIDがボルト相対パスになるテスト"""
+        file_path = os.path.join(self.vault_path, 'notes', 'a.md')
+        
+        self.assertEqual(self.coordinator._obsidian_id_for(file_path), 'notes/a.md')
+    
+    def test_find_existing_page_uses_index(self):
+        """インデックスに登録済みのページはAPIを呼ばずに見つかるテスト"""
+        self.page_index.set('notes/a.md', 'page-a')
+        notion_content = {'properties': {'obsidian_id': 'notes/a.md'}}
+        
+        page = asyncio.run(self.coordinator._find_existing_notion_page(notion_content))
+        
+        self.assertEqual(page['id'], 'page-a')
+        self.mock_notion_client.query_database.assert_not_called()
+    
+    def test_find_existing_page_repairs_index_on_miss(self):
+        """インデックスにない場合はフィルタ検索で修復されるテスト"""
+        self.mock_notion_client.query_database = AsyncMock(return_value=[{'id': 'page-b'}])
+        notion_content = {'properties': {'obsidian_id': 'notes/b.md'}}
+        
+        page = asyncio.run(self.coordinator._find_existing_notion_page(notion_content))
+        
+        self.assertEqual(page['id'], 'page-b')
+        self.assertEqual(self.page_index.get_page_id('notes/b.md'), 'page-b')
+        filter_arg = self.mock_notion_client.query_database.call_args.kwargs['filter']
+        self.assertEqual(filter_arg['rich_text']['equals'], 'notes/b.md')
+    
+    def test_find_existing_page_reads_frontmatter_on_miss(self):
+        """インデックスにない場合はフロントマターのnotion_idから見つかるテスト"""
+        os.makedirs(os.path.join(self.vault_path, 'notes'))
+        with open(os.path.join(self.vault_path, 'notes', 'c.md'), 'w', encoding='utf-8') as f:
+            f.write("---\nnotion_id: page-c\nsource: notion\n---\n# C\n")
+        notion_content = {'properties': {'obsidian_id': 'notes/c.md'}}
+        
+        page = asyncio.run(self.coordinator._find_existing_notion_page(notion_content))
+        
+        self.assertEqual(page['id'], 'page-c')
+        self.assertEqual(self.page_index.get_page_id('notes/c.md'), 'page-c')
+        self.mock_notion_client.query_database.assert_not_called()
+    
+    def test_update_of_missing_page_falls_back_to_lookup(self):
+        """インデックスのページが削除・アーカイブ済みの場合は対応を捨てて検索し直すテスト"""
+        self.page_index.set('notes/d.md', 'page-deleted')
+        self.mock_notion_client.query_database = AsyncMock(return_value=[{'id': 'page-d'}])
+        self.coordinator.block_diff_engine = Mock(apply=AsyncMock())
+        
+        class NotFound(Exception):
+            code = 'object_not_found'
+        
+        def update(page_id, **kwargs):
+            if page_id == 'page-deleted':
+                raise NotFound('Could not find page')
+        
+        self.mock_notion_client.client.pages.update.side_effect = update
+        notion_content = {'properties': {'obsidian_id': 'notes/d.md'}, 'content': '# D'}
+        
+        page_id = asyncio.run(self.coordinator._create_or_update_notion_page(notion_content))
+        
+        self.assertEqual(page_id, 'page-d')
+        self.assertEqual(self.page_index.get_page_id('notes/d.md'), 'page-d')
+        self.assertIsNone(self.page_index.get_obsidian_id('page-deleted'))
+        self.mock_notion_client.client.pages.create.assert_not_called()
+    
+    def test_update_of_archived_page_creates_new_page(self):
+        """アーカイブ済みのページしか見つからない場合は新しいページを作成するテスト"""
+        os.makedirs(os.path.join(self.vault_path, 'notes'))
+        with open(os.path.join(self.vault_path, 'notes', 'e.md'), 'w', encoding='utf-8') as f:
+            f.write("---\nnotion_id: page-archived\n---\n# E\n")
+        self.page_index.set('notes/e.md', 'page-archived')
+        
+        class ValidationError(Exception):
+            code = 'validation_error'
+        
+        self.mock_notion_client.client.pages.update.side_effect = ValidationError(
+            "Can't edit block that is archived. You must unarchive the block before editing.")
+        self.mock_notion_client.client.pages.create.return_value = {'id': 'page-new'}
+        notion_content = {'properties': {'obsidian_id': 'notes/e.md'}, 'content': '# E'}
+        
+        page_id = asyncio.run(self.coordinator._create_or_update_notion_page(notion_content))
+        
+        self.assertEqual(page_id, 'page-new')
+        self.assertEqual(self.page_index.get_page_id('notes/e.md'), 'page-new')
+        self.mock_notion_client.client.pages.update.assert_called_once()
+    
+    def test_block_error_during_update_keeps_mapping(self):
+        """本文の差分更新でブロックが見つからなくても、ページは存在するものとしてマッピングを残すテスト"""
+        self.page_index.set('notes/f.md', 'page-f')
+        
+        class NotFound(Exception):
+            code = 'object_not_found'
+        
+        self.coordinator.block_diff_engine = Mock(apply=AsyncMock(side_effect=NotFound('Could not find block')))
+        self.mock_notion_client.client.pages.update.return_value = {'id': 'page-f', 'archived': False}
+        notion_content = {'properties': {'obsidian_id': 'notes/f.md'}, 'content': '# F'}
+        
+        page_id = asyncio.run(self.coordinator._create_or_update_notion_page(notion_content))
+        
+        self.assertIsNone(page_id)
+        self.assertEqual(self.page_index.get_page_id('notes/f.md'), 'page-f')
+        self.mock_notion_client.query_database.assert_not_called()
+        self.mock_notion_client.client.pages.create.assert_not_called()
+        
+        # 検証エラーの本文に「archived」を含むだけでは、ページがないとは判断しない
+        self.assertFalse(self.coordinator._is_missing_page_error(Exception('property archived_at is invalid')))
+    
+    def test_deleted_event_removes_mapping(self):
+        """削除イベントでマッピングが削除されるテスト"""
+        self.page_index.set('gone.md', 'page-a')
+        
+        self.coordinator._handle_obsidian_change({
+            'type': 'obsidian_change',
+            'file_path': os.path.join(self.vault_path, 'gone.md'),
+            'action': 'deleted',
+            'timestamp': '2024-01-01T00:00:00Z'
+        })
+        
+        self.assertIsNone(self.page_index.get_page_id('gone.md'))
+        self.assertIsNone(self.page_index.get_obsidian_id('page-a'))
+    
+    def test_seed_page_index_from_frontmatter(self):
+        """保管庫のフロントマターからマッピングが復元されるテスト"""
+        for name, header in [('a.md', 'notion_id: page-a\n'), ('b.md', 'title: B\n'), ('c.md', '')]:
+            with open(os.path.join(self.vault_path, name), 'w', encoding='utf-8') as f:
+                f.write(f"---\n{header}---\n# {name}\n" if header else "# plain\n")
+        
+        count = self.coordinator._seed_page_index_from_frontmatter()
+        
+        self.assertEqual(count, 1)
+        self.assertEqual(self.page_index.get_page_id('a.md'), 'page-a')
+    
+    def test_moved_event_renames_mapping(self):
+        """移動イベントでマッピングが付け替えられるテスト"""
+        self.page_index.set('old.md', 'page-a')
+        change_event = {
+            'type': 'obsidian_change',
+            'file_path': os.path.join(self.vault_path, 'old.md'),
+            'action': 'moved',
+            'dest_path': os.path.join(self.vault_path, 'new.md'),
+            'timestamp': '2024-01-01T00:00:00Z'
+        }
+        
+        async def run():
+            self.coordinator._handle_obsidian_change(change_event)
+            await asyncio.sleep(0)
+            return await self.coordinator.sync_queue.get()
+        
+        sync_item = asyncio.run(run())
+        
+        self.assertEqual(self.page_index.get_page_id('new.md'), 'page-a')
+        self.assertEqual(sync_item['file_path'], change_event['dest_path'])
+    
+    def test_moved_event_saves_link_graph(self):
+        """移動イベントで付け替えたリンクグラフが保存され、再起動後も新しいパスになるテスト"""
+        self.link_graph.update_note('old.md', ['other'])
+        self.link_graph.update_note('other.md', [])
+        self.link_graph.save()
+        
+        self.coordinator._handle_obsidian_change({
+            'type': 'obsidian_change',
+            'file_path': os.path.join(self.vault_path, 'old.md'),
+            'action': 'moved',
+            'dest_path': os.path.join(self.vault_path, 'new.md'),
+            'timestamp': '2024-01-01T00:00:00Z'
+        })
+        
+        reloaded = LinkGraphIndex(os.path.join(self.temp_dir, 'link_graph.json'))
+        self.assertEqual(reloaded.get_backlinks('other.md'), ['new.md'])
+    
+    def test_moved_event_saves_property_index(self):
+        """移動イベントで付け替えたプロパティインデックスが保存されるテスト"""
+        self.property_index.update_note('old.md', ['tag'], {}, 1.0)
+        self.property_index.save()
+        
+        self.coordinator._handle_obsidian_change({
+            'type': 'obsidian_change',
+            'file_path': os.path.join(self.vault_path, 'old.md'),
+            'action': 'moved',
+            'dest_path': os.path.join(self.vault_path, 'new.md'),
+            'timestamp': '2024-01-01T00:00:00Z'
+        })
+        
+        reloaded = NotePropertyIndex(os.path.join(self.temp_dir, 'property_index.json'))
+        self.assertEqual([note['note_id'] for note in reloaded.query(tags=['tag'])], ['new.md'])
+    
+    def test_pure_move_updates_only_properties(self):
+        """内容の変わっていない移動は既存ページのプロパティだけを更新するテスト"""
+        self.page_index.set('archive/new.md', 'page-a')
+        self.mock_obsidian_monitor.get_file_content = AsyncMock(return_value='# New')
+        sync_item = {
+            'type': 'obsidian_to_notion',
+            'file_path': os.path.join(self.vault_path, 'archive', 'new.md'),
+            'action': 'moved',
+            'content_changed': False
+        }
+        
+        asyncio.run(self.coordinator._sync_obsidian_to_notion(sync_item))
+        
+        update = self.mock_notion_client.client.pages.update
+        update.assert_called_once()
+        properties = update.call_args.kwargs['properties']
+        self.assertEqual(update.call_args.kwargs['page_id'], 'page-a')
+        self.assertEqual(properties['Obsidian ID']['rich_text'][0]['text']['content'], 'archive/new.md')
+        self.assertEqual(properties['title']['title'][0]['text']['content'], 'new')
+        self.mock_obsidian_monitor.get_file_content.assert_not_called()
+        self.mock_notion_client.client.pages.create.assert_not_called()
+    
+    def test_moved_with_content_change_syncs_content(self):
+        """内容も変わった移動は本文を読んで既存ページを更新するテスト"""
+        self.page_index.set('new.md', 'page-a')
+        self.mock_obsidian_monitor.get_file_content = AsyncMock(return_value=None)
+        sync_item = {
+            'type': 'obsidian_to_notion',
+            'file_path': os.path.join(self.vault_path, 'new.md'),
+            'action': 'moved',
+            'content_changed': True
+        }
+        
+        asyncio.run(self.coordinator._sync_obsidian_to_notion(sync_item))
+        
+        self.mock_obsidian_monitor.get_file_content.assert_called_once()
+        self.mock_notion_client.client.pages.update.assert_not_called()
+    
+    def test_change_events_update_link_graph(self):
+        """移動・削除イベントでリンクグラフが更新されるテスト"""
+        self.link_graph.update_note('old.md', ['target'])
+        self.link_graph.update_note('target.md', [])
+        
+        async def run(change_event):
+            self.coordinator._handle_obsidian_change(change_event)
+            await asyncio.sleep(0)
+        
+        asyncio.run(run({
+            'file_path': os.path.join(self.vault_path, 'old.md'),
+            'action': 'moved',
+            'dest_path': os.path.join(self.vault_path, 'new.md'),
+            'timestamp': '2024-01-01T00:00:00Z'
+        }))
+        self.assertEqual(self.link_graph.get_backlinks('target.md'), ['new.md'])
+        
+        asyncio.run(run({
+            'file_path': os.path.join(self.vault_path, 'new.md'),
+            'action': 'deleted',
+            'timestamp': '2024-01-01T00:00:00Z'
+        }))
+        self.assertEqual(self.link_graph.get_backlinks('target.md'), [])
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, 'link_graph.json')))
+
+
+class TestSyncCoordinatorNotionToObsidian(unittest.TestCase):
+    """NotionからObsidianへのストリーミング同期のテストクラス"""
+    
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.vault_path = os.path.join(self.temp_dir, 'vault')
+        os.makedirs(self.vault_path)
+        
+        blocks = [
+            {'id': f'b{i}', 'type': 'paragraph', 'has_children': False,
+             'paragraph': {'rich_text': [{'plain_text': f'line {i}'}]}}
+            for i in range(3)
+        ]
+        
+        async def iter_page_blocks(block_id):
+            for block in blocks:
+                yield block
+        
+        self.mock_notion_client = Mock()
+        self.mock_notion_client.get_page = AsyncMock(return_value={
+            'id': 'page-1',
+            'created_time': '2024-01-01T00:00:00Z',
+            'last_edited_time': '2024-01-02T00:00:00Z',
+            'properties': {'Name': {'type': 'title', 'title': [{'plain_text': 'Streamed'}]}}
+        })
+        self.mock_notion_client.iter_page_blocks = iter_page_blocks
+        
+        self.coordinator = SyncCoordinator(
+            self.mock_notion_client,
+            ObsidianFileMonitor(self.vault_path),
+            Mock(),
+            page_index=PageMappingIndex(os.path.join(self.temp_dir, 'page_index.json'))
+        )
+    
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_page_is_streamed_into_vault(self):
+        """ページの本文がブロックから描画されてボルトに書き込まれるテスト"""
+        asyncio.run(self.coordinator._sync_notion_to_obsidian({'page_id': 'page-1'}))
+        
+        with open(os.path.join(self.vault_path, 'Streamed.md'), 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        self.assertIn('notion_id: page-1', content)
+        self.assertTrue(content.endswith('# Streamed\n\nline 0\n\nline 1\n\nline 2\n'))
+        self.assertEqual(self.coordinator.page_index.get_page_id('Streamed.md'), 'page-1')
+
 if __name__ == '__main__':
     unittest.main()
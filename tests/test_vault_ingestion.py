@@ -0,0 +1,116 @@
+"""
+VaultIngestionPipelineのテスト
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration.parse_cache import ParseCache
+from obsidian_integration.vault_ingestion import VaultIngestionPipeline
+
+
+class TestVaultIngestionPipeline(unittest.TestCase):
+    """VaultIngestionPipelineのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.vault = os.path.join(self.temp_dir, 'vault')
+        os.makedirs(os.path.join(self.vault, 'sub'))
+        self.paths = []
+        for i in range(12):
+            folder = self.vault if i % 2 else os.path.join(self.vault, 'sub')
+            self.paths.append(self.write_note(folder, f'note_{i}.md', f"---\ntitle: {i}\n---\n# Note {i}\n\nbody text"))
+        self.write_note(self.vault, 'empty.md', "---\ntitle: empty\n---\n")
+        self.write_note(self.vault, 'image.png', "not markdown")
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def write_note(self, folder, name, content):
+        """ノートを作成"""
+        path = os.path.join(folder, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_walks_vault_and_yields_content_entries(self):
+        """保管庫を走査して分析エンジン向けの形式で返すテスト"""
+        pipeline = VaultIngestionPipeline(self.vault, parse_workers=0, max_in_flight=3)
+
+        entries = asyncio.run(pipeline.collect())
+
+        self.assertEqual(sorted(entry['id'] for entry in entries), sorted(self.paths))
+        entry = next(entry for entry in entries if entry['id'] == self.paths[0])
+        self.assertEqual(entry['text'], "# Note 0\n\nbody text")
+        self.assertEqual(entry['metadata']['title'], 'note_0.md')
+        self.assertEqual(entry['metadata']['word_count'], 4)
+        self.assertEqual(pipeline.get_stats()['files'], 13)
+        self.assertEqual(pipeline.get_stats()['entries'], 12)
+
+    def test_process_pool_matches_inline_parsing(self):
+        """プロセスプールでの解析結果がスレッドでの解析と一致するテスト"""
+        inline = asyncio.run(VaultIngestionPipeline(self.vault, parse_workers=0).collect(self.paths))
+        pooled = asyncio.run(VaultIngestionPipeline(self.vault, parse_workers=2).collect(self.paths))
+
+        key = lambda entry: entry['id']
+        self.assertEqual(sorted(inline, key=key), sorted(pooled, key=key))
+
+    def test_cache_hits_skip_parsing(self):
+        """2回目はキャッシュから返し、解析しないテスト"""
+        cache = ParseCache(os.path.join(self.temp_dir, 'cache.sqlite3'), self.vault)
+        pipeline = VaultIngestionPipeline(self.vault, cache, parse_workers=0)
+
+        first = asyncio.run(pipeline.collect())
+        self.assertEqual(pipeline.get_stats()['parsed'], 13)
+        second = asyncio.run(pipeline.collect())
+        cache.close()
+
+        self.assertEqual(len(first), len(second))
+        self.assertEqual(pipeline.get_stats()['parsed'], 0)
+        self.assertEqual(pipeline.get_stats()['cached'], 13)
+
+    def test_in_flight_work_is_bounded(self):
+        """処理中のファイル数が上限を超えず、早期終了で走査が止まるテスト"""
+        pulled = []
+
+        def paths():
+            for path in self.paths:
+                pulled.append(path)
+                yield path
+
+        async def take_two():
+            pipeline = VaultIngestionPipeline(self.vault, parse_workers=0, max_in_flight=2)
+            entries = []
+            agen = pipeline.aiter_entries(paths())
+            async for entry in agen:
+                entries.append(entry)
+                if len(entries) == 2:
+                    break
+            await agen.aclose()
+            return entries
+
+        entries = asyncio.run(take_two())
+
+        self.assertEqual(len(entries), 2)
+        self.assertLessEqual(len(pulled), 4)
+
+    def test_missing_files_are_skipped(self):
+        """存在しないファイルはエラーとして数えて読み飛ばすテスト"""
+        pipeline = VaultIngestionPipeline(self.vault, parse_workers=0)
+
+        entries = asyncio.run(pipeline.collect([self.paths[0], os.path.join(self.vault, 'missing.md')]))
+
+        self.assertEqual([entry['id'] for entry in entries], [self.paths[0]])
+        self.assertEqual(pipeline.get_stats()['errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,264 @@
+"""
+VaultMerkleTreeのテスト
+"""
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration.vault_merkle import EMPTY_TREE, VaultMerkleTree, diff_trees, load_tree
+from obsidian_integration.vault_walker import VaultWalker
+from sync_system.sync_coordinator import SyncCoordinator
+
+
+class TestVaultMerkleTree(unittest.TestCase):
+    """VaultMerkleTreeのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.vault_path = os.path.join(self.temp_dir, 'vault')
+        self.tree_path = os.path.join(self.temp_dir, 'state', 'vault_tree.json')
+        for relative_path in ('a.md', 'notes/b.md', 'notes/deep/c.md', 'archive/d.md',
+                              '.obsidian/workspace.md', 'notes/image.png'):
+            self._write(relative_path, f'# {relative_path}\n')
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def _path(self, relative_path):
+        return os.path.join(self.vault_path, *relative_path.split('/'))
+
+    def _write(self, relative_path, content):
+        os.makedirs(os.path.dirname(self._path(relative_path)), exist_ok=True)
+        with open(self._path(relative_path), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def _tree(self, tree_path=None):
+        return VaultMerkleTree(self.vault_path, tree_path, VaultWalker(self.vault_path, ['.obsidian/']))
+
+    def test_refresh_builds_tree_of_notes(self):
+        """除外されたパスとMarkdown以外を含まないツリーを作り、内容が同じなら根のハッシュも同じになるテスト"""
+        tree = self._tree()
+        diff = tree.refresh()
+
+        self.assertEqual(sorted(diff.added), ['a.md', 'archive/d.md', 'notes/b.md', 'notes/deep/c.md'])
+        self.assertEqual((diff.removed, diff.modified), ([], []))
+        self.assertIsNotNone(tree.get_hash('notes/deep'))
+        self.assertIsNone(tree.get_hash('.obsidian'))
+        self.assertEqual(tree.get_hash(self._path('a.md')), tree.get_hash('a.md'))
+
+        # 改行コードだけの違いは同じハッシュ
+        with open(self._path('a.md'), 'w', encoding='utf-8', newline='\r\n') as f:
+            f.write('# a.md\n')
+        other = self._tree()
+        other.refresh()
+        self.assertEqual(other.root_hash, tree.root_hash)
+
+    def test_refresh_reuses_unchanged_files_and_subtrees(self):
+        """stat結果が同じファイルは読まず、変わっていない部分木は前のノードを共有するテスト"""
+        tree = self._tree()
+        tree.refresh()
+        before = tree.root
+        hashed = tree.stats['files_hashed']
+
+        self.assertTrue(tree.refresh().is_empty())
+        self.assertIs(tree.root, before)
+        self.assertEqual(tree.stats['files_hashed'], hashed)
+
+        self._write('notes/deep/c.md', '# edited\n')
+        self._write('notes/new.md', 'new')
+        os.remove(self._path('archive/d.md'))
+        diff = tree.refresh()
+
+        self.assertEqual(diff.added, ['notes/new.md'])
+        self.assertEqual(diff.removed, ['archive/d.md'])
+        self.assertEqual(diff.modified, ['notes/deep/c.md'])
+        self.assertEqual(tree.stats['files_hashed'], hashed + 2)
+        self.assertIs(tree.root.children['a.md'], before.children['a.md'])
+        self.assertNotIn('archive', tree.root.children)
+
+    def test_incremental_updates_match_full_rebuild(self):
+        """update/remove/renameで反映したツリーが、走査し直したツリーと同じ根のハッシュになるテスト"""
+        tree = self._tree()
+        tree.refresh()
+        snapshot = tree.root
+
+        self._write('notes/b.md', '# b edited\n')
+        os.remove(self._path('a.md'))
+        os.makedirs(self._path('moved'))
+        os.rename(self._path('notes/deep/c.md'), self._path('moved/c.md'))
+        self._write('.obsidian/plugins.md', 'ignored')
+
+        self.assertTrue(tree.update(self._path('notes/b.md')))
+        self.assertFalse(tree.update(self._path('notes/b.md')))
+        self.assertTrue(tree.remove(self._path('a.md')))
+        self.assertTrue(tree.rename(self._path('notes/deep/c.md'), self._path('moved/c.md')))
+        self.assertFalse(tree.update(self._path('.obsidian/plugins.md')))
+
+        rebuilt = self._tree()
+        rebuilt.refresh()
+        self.assertEqual(tree.root_hash, rebuilt.root_hash)
+        self.assertNotIn('deep', tree.root.children['notes'].children)
+
+        # 更新前に保持した根はスナップショットとしてそのまま残る
+        diff = diff_trees(snapshot, tree.root)
+        self.assertEqual(diff.added, ['moved/c.md'])
+        self.assertEqual(sorted(diff.removed), ['a.md', 'notes/deep/c.md'])
+        self.assertEqual(diff.modified, ['notes/b.md'])
+        self.assertEqual(tree.diff(snapshot), diff)
+
+    def test_diff_skips_identical_subtrees(self):
+        """ハッシュの同じ部分木には降りないテスト"""
+        tree = self._tree()
+        tree.refresh()
+        old_root = tree.root
+        self._write('a.md', 'changed')
+        tree.update(self._path('a.md'))
+
+        visited = []
+        original = dict.keys
+
+        class CountingDict(dict):
+            def keys(self):
+                visited.append(sorted(original(self)))
+                return original(self)
+
+        def wrap(node):
+            if not node.is_dir:
+                return node
+            return node._replace(children=CountingDict({name: wrap(child) for name, child in node.children.items()}))
+
+        diff = diff_trees(wrap(old_root), wrap(tree.root))
+
+        self.assertEqual(diff.modified, ['a.md'])
+        # 根だけを比較し、notes・archiveの部分木には降りていない
+        self.assertEqual(len(visited), 2)
+
+    def test_save_and_load(self):
+        """保存したツリーを読み込むと同じ根になり、別の保管庫のものは読み込まないテスト"""
+        tree = self._tree(self.tree_path)
+        self.assertFalse(tree.loaded)
+        tree.refresh()
+        self.assertTrue(tree.loaded)
+        self.assertTrue(tree.save())
+
+        loaded = self._tree(self.tree_path)
+        self.assertTrue(loaded.loaded)
+        self.assertEqual(loaded.root_hash, tree.root_hash)
+        self.assertTrue(loaded.refresh().is_empty())
+        self.assertEqual(loaded.stats['files_hashed'], 0)
+
+        self.assertIsNone(load_tree(self.tree_path, os.path.join(self.temp_dir, 'other')))
+        with open(self.tree_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        data['version'] = 0
+        with open(self.tree_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        self.assertIsNone(load_tree(self.tree_path))
+        self.assertEqual(diff_trees(None, EMPTY_TREE), diff_trees(EMPTY_TREE, None))
+
+    def test_matches(self):
+        """ファイルの現在の内容が記録と同じかを判定するテスト"""
+        tree = self._tree()
+        tree.refresh()
+
+        self.assertTrue(tree.matches(self._path('a.md')))
+        os.utime(self._path('a.md'), ns=(1, 1))
+        self.assertTrue(tree.matches(self._path('a.md')))
+        self._write('a.md', 'changed')
+        self.assertFalse(tree.matches(self._path('a.md')))
+        self.assertFalse(tree.matches(self._path('missing.md')))
+
+
+class TestVaultTreeIntegration(unittest.TestCase):
+    """同期コーディネーターからの利用のテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.vault_path = os.path.join(self.temp_dir, 'vault')
+        os.makedirs(self.vault_path)
+        for name in ('a.md', 'b.md'):
+            self._write(name, f'# {name}\n')
+        self.tree = VaultMerkleTree(self.vault_path, os.path.join(self.temp_dir, 'synced_vault_tree.json'))
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, content):
+        with open(os.path.join(self.vault_path, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_reconcile_vault_queues_unsynced_changes(self):
+        """同期済みのツリーとの差分だけが同期キューに積まれるテスト"""
+        monitor = Mock()
+        monitor.vault_path = self.vault_path
+        coordinator = SyncCoordinator(Mock(), monitor, Mock(), vault_tree=self.tree)
+
+        # 初回は現在の保管庫を同期済みとして記録するだけ
+        self.assertEqual(asyncio.run(coordinator.reconcile_vault()), {'created': 0, 'modified': 0, 'deleted': 0})
+        self.assertTrue(self.tree.loaded)
+        self.assertTrue(os.path.exists(self.tree.tree_path))
+
+        self._write('a.md', '# edited\n')
+        self._write('c.md', '# new\n')
+        coordinator.link_graph = Mock()
+        coordinator.property_index = Mock()
+        os.remove(os.path.join(self.vault_path, 'b.md'))
+
+        counts = asyncio.run(coordinator.reconcile_vault())
+
+        self.assertEqual(counts, {'created': 1, 'modified': 1, 'deleted': 1})
+        queued = sorted((item['action'], os.path.basename(item['file_path']))
+                        for item in [coordinator.sync_queue.get_nowait() for _ in range(3)])
+        self.assertEqual(queued, [('created', 'c.md'), ('deleted', 'b.md'), ('modified', 'a.md')])
+
+        # 同期が完了したノートは同期済みのツリーに反映される
+        coordinator._mark_synced(os.path.join(self.vault_path, 'a.md'))
+        coordinator._mark_synced(os.path.join(self.vault_path, 'c.md'))
+        self.assertTrue(diff_trees(self.tree.root, self.tree.build()).is_empty())
+        # 変更抑制の記録も同期の完了後に更新される
+        monitor.confirm_synced.assert_any_call(os.path.join(self.vault_path, 'a.md'))
+
+
+    def test_initialize_reconciles_and_moves_are_saved(self):
+        """初期化で同期済みのツリーとの差分が拾い直され、移動が保存されたツリーに残るテスト"""
+        self.tree.refresh()
+        self.tree.save()
+        self._write('a.md', '# edited while stopped\n')
+        monitor = Mock()
+        monitor.vault_path = self.vault_path
+        coordinator = SyncCoordinator(Mock(), monitor, Mock(), link_graph=Mock(), property_index=Mock(),
+                                      vault_tree=self.tree)
+        coordinator.page_index = Mock()
+        coordinator.page_index.get_stats.return_value = {'entries': 1}
+
+        asyncio.run(coordinator.initialize())
+
+        item = coordinator.sync_queue.get_nowait()
+        self.assertEqual((item['action'], os.path.basename(item['file_path'])), ('modified', 'a.md'))
+
+        os.rename(os.path.join(self.vault_path, 'b.md'), os.path.join(self.vault_path, 'renamed.md'))
+        coordinator._handle_obsidian_change({
+            'file_path': os.path.join(self.vault_path, 'b.md'),
+            'action': 'moved',
+            'dest_path': os.path.join(self.vault_path, 'renamed.md'),
+            'timestamp': '2024-01-01T00:00:00Z'
+        })
+        reloaded = VaultMerkleTree(self.vault_path, str(self.tree.tree_path))
+        self.assertIsNotNone(reloaded.get_hash('renamed.md'))
+        self.assertIsNone(reloaded.get_hash('b.md'))
+
+
+if __name__ == '__main__':
+    unittest.main()
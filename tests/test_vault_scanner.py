@@ -0,0 +1,256 @@
+"""
+VaultScannerのテスト
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration import vault_scanner
+from obsidian_integration.content_hash_store import ContentHashStore
+from obsidian_integration.file_monitor import ObsidianFileMonitor
+from obsidian_integration.search_index import FullTextIndex
+from obsidian_integration.vault_scanner import VaultScanner
+
+
+class TestVaultScanner(unittest.TestCase):
+    """VaultScannerのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, 'notes', 'deep'))
+        self._write('a.md', 'a')
+        self._write('notes/b.md', 'b')
+        self._write('notes/deep/c.md', 'c')
+        self._write('notes/image.png', 'png')
+        # 作成直後のディレクトリも確定済みとして扱う
+        self._racy_window = vault_scanner.RACY_WINDOW_NS
+        vault_scanner.RACY_WINDOW_NS = -10 ** 18
+        self.scanner = VaultScanner(self.temp_dir)
+
+    def tearDown(self):
+        """テストの後処理"""
+        vault_scanner.RACY_WINDOW_NS = self._racy_window
+        shutil.rmtree(self.temp_dir)
+
+    def _path(self, relative_path):
+        return os.path.join(self.temp_dir, *relative_path.split('/'))
+
+    def _write(self, relative_path, content, mtime_ns=None):
+        path = self._path(relative_path)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def _changes(self, **kwargs):
+        return sorted(
+            (change['action'], os.path.relpath(change['file_path'], self.temp_dir), change.get('dest_path'))
+            for change in self.scanner.scan(**kwargs)
+        )
+
+    def test_initial_scan_reports_markdown_files(self):
+        """初回の走査でMarkdownファイルだけが作成として返されるテスト"""
+        changes = self._changes()
+
+        self.assertEqual([(action, path) for action, path, _ in changes], [
+            ('created', 'a.md'),
+            ('created', os.path.join('notes', 'b.md')),
+            ('created', os.path.join('notes', 'deep', 'c.md'))
+        ])
+        self.assertEqual(len(self.scanner), 3)
+        self.assertEqual(self.scanner.get(self._path('a.md'))['size'], 1)
+
+    def test_unchanged_vault_has_no_changes(self):
+        """変更がない場合は差分がなく、ディレクトリの一覧を取得し直さないテスト"""
+        self.scanner.scan()
+        listed = self.scanner.get_stats()['directories_listed']
+
+        self.assertEqual(self._changes(), [])
+        self.assertEqual(self.scanner.get_stats()['directories_listed'], listed)
+        self.assertEqual(self.scanner.get_stats()['directories_reused'], 3)
+
+    def test_modified_and_deleted(self):
+        """変更と削除が検出されるテスト"""
+        self.scanner.scan()
+        self._write('notes/b.md', 'changed', mtime_ns=2_000_000_000_000_000_000)
+        os.remove(self._path('notes/deep/c.md'))
+
+        self.assertEqual(self._changes(), [
+            ('deleted', os.path.join('notes', 'deep', 'c.md'), None),
+            ('modified', os.path.join('notes', 'b.md'), None)
+        ])
+        self.assertNotIn(self._path('notes/deep/c.md'), self.scanner)
+
+    def test_move_is_detected(self):
+        """別ディレクトリへの移動が削除と作成ではなく移動として検出されるテスト"""
+        self.scanner.scan()
+        os.rename(self._path('notes/deep/c.md'), self._path('moved.md'))
+
+        self.assertEqual(self._changes(), [
+            ('moved', os.path.join('notes', 'deep', 'c.md'), self._path('moved.md'))
+        ])
+
+    def test_removed_directory_deletes_files(self):
+        """ディレクトリごと削除されたファイルが削除として検出されるテスト"""
+        self.scanner.scan()
+        shutil.rmtree(self._path('notes'))
+
+        self.assertEqual([(action, path) for action, path, _ in self._changes()], [
+            ('deleted', os.path.join('notes', 'b.md')),
+            ('deleted', os.path.join('notes', 'deep', 'c.md'))
+        ])
+        self.assertEqual(self.scanner.get_stats()['directories'], 1)
+
+    def test_check_files_false_skips_content_changes(self):
+        """check_files=Falseでは一覧が変わらないディレクトリのファイルをstatしないテスト"""
+        self.scanner.scan()
+        self._write('notes/b.md', 'changed', mtime_ns=2_000_000_000_000_000_000)
+        checked = self.scanner.get_stats()['files_checked']
+
+        self.assertEqual(self._changes(check_files=False), [])
+        self.assertEqual(self.scanner.get_stats()['files_checked'], checked)
+        self.assertEqual(self._changes(), [('modified', os.path.join('notes', 'b.md'), None)])
+
+    def test_racy_directory_is_listed_again(self):
+        """走査直前に更新されたディレクトリは次回も一覧を取得するテスト"""
+        vault_scanner.RACY_WINDOW_NS = 10 ** 18
+        self.scanner.scan()
+        listed = self.scanner.get_stats()['directories_listed']
+
+        self.scanner.scan()
+
+        self.assertEqual(self.scanner.get_stats()['directories_listed'], listed * 2)
+
+    def test_external_updates_are_not_reported(self):
+        """変更イベントで反映済みのファイルは走査の差分にならないテスト"""
+        self.scanner.scan()
+        path = self._write('notes/b.md', 'changed', mtime_ns=2_000_000_000_000_000_000)
+        self.scanner.update_file(path)
+        os.rename(self._path('a.md'), self._path('renamed.md'))
+        self.scanner.move_file(self._path('a.md'), self._path('renamed.md'))
+
+        self.assertEqual(self._changes(), [])
+
+    def test_snapshot_round_trip(self):
+        """スナップショットから復元した記録で走査すると、停止中の変更だけが差分になるテスト"""
+        self.scanner.scan()
+        snapshot_path = os.path.join(self.temp_dir, 'state', 'snapshot.json.gz')
+        self.assertTrue(self.scanner.save_snapshot(snapshot_path))
+        self._write('notes/b.md', 'changed', mtime_ns=2_000_000_000_000_000_000)
+        self._write('new.md', 'new')
+
+        self.scanner = VaultScanner(self.temp_dir)
+        self.assertTrue(self.scanner.load_snapshot(snapshot_path))
+        self.assertEqual(len(self.scanner), 3)
+        self.assertEqual(self._changes(), [
+            ('created', 'new.md', None),
+            ('modified', os.path.join('notes', 'b.md'), None)
+        ])
+
+    def test_snapshot_for_other_vault_is_ignored(self):
+        """別の保管庫のスナップショットや壊れたスナップショットは読み込まないテスト"""
+        self.scanner.scan()
+        snapshot_path = os.path.join(self.temp_dir, 'snapshot.json.gz')
+        self.scanner.save_snapshot(snapshot_path)
+
+        other = VaultScanner(os.path.join(self.temp_dir, 'notes'))
+        self.assertFalse(other.load_snapshot(snapshot_path))
+        with open(snapshot_path, 'wb') as f:
+            f.write(b'broken')
+        self.assertFalse(VaultScanner(self.temp_dir).load_snapshot(snapshot_path))
+        self.assertFalse(VaultScanner(self.temp_dir).load_snapshot(snapshot_path + '.missing'))
+
+    def test_snapshot_is_saved_only_when_changed(self):
+        """記録が変わっていなければスナップショットを書き直さないテスト"""
+        self.scanner.scan()
+        snapshot_path = os.path.join(self.temp_dir, 'snapshot.json.gz')
+        self.scanner.save_snapshot(snapshot_path)
+        os.utime(snapshot_path, ns=(0, 0))
+
+        self.scanner.scan()
+        self.scanner.save_snapshot(snapshot_path)
+        self.assertEqual(os.stat(snapshot_path).st_mtime_ns, 0)
+
+        self._write('new.md', 'new')
+        self.scanner.scan()
+        self.scanner.save_snapshot(snapshot_path)
+        self.assertNotEqual(os.stat(snapshot_path).st_mtime_ns, 0)
+
+
+class TestFileMonitorScan(unittest.TestCase):
+    """ObsidianFileMonitorの定期走査のテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.temp_dir, 'a.md'), 'w', encoding='utf-8') as f:
+            f.write('# A')
+        self.monitor = ObsidianFileMonitor(self.temp_dir)
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_scan_updates_cache_and_notifies(self):
+        """走査で見つかった変更がキャッシュに反映され、コールバックに通知されるテスト"""
+        events = []
+        self.monitor.set_change_callback(events.append)
+        asyncio.run(self.monitor._initialize_file_cache())
+        new_file = os.path.join(self.temp_dir, 'b.md')
+        with open(new_file, 'w', encoding='utf-8') as f:
+            f.write('# B')
+
+        changes = asyncio.run(self.monitor._update_file_cache())
+
+        self.assertEqual(changes, [{'action': 'created', 'file_path': new_file}])
+        self.assertEqual(self.monitor.file_cache[new_file]['name'], 'b.md')
+        self.assertEqual(events[0]['action'], 'created')
+        self.assertEqual(events[0]['file_path'], new_file)
+
+    def test_warm_start_from_snapshot(self):
+        """2回目の起動はスナップショットから始まり、停止中の変更を突き合わせで通知するテスト"""
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir)
+        snapshot_path = os.path.join(state_dir, 'snapshot.json.gz')
+        search_index = FullTextIndex(os.path.join(state_dir, 'search.sqlite3'), self.temp_dir)
+        content_hashes = ContentHashStore(os.path.join(state_dir, 'hashes.json'), self.temp_dir)
+
+        async def run():
+            first = ObsidianFileMonitor(self.temp_dir, search_index=search_index,
+                                        content_hashes=content_hashes, snapshot_path=snapshot_path)
+            # 初回の起動では走査後にスナップショットが保存される
+            await first.initialize()
+            new_file = os.path.join(self.temp_dir, 'b.md')
+            with open(new_file, 'w', encoding='utf-8') as f:
+                f.write('# B')
+
+            events = []
+            second = ObsidianFileMonitor(self.temp_dir, search_index=search_index,
+                                         content_hashes=content_hashes, snapshot_path=snapshot_path)
+            second.set_change_callback(events.append)
+            await second.initialize()
+            warm_cache = dict(second.file_cache)
+            await second._reconcile_task
+            return first, second, warm_cache, events, new_file
+
+        first, second, warm_cache, events, new_file = asyncio.run(run())
+
+        self.assertEqual(first.startup_stats['source'], 'scan')
+        self.assertEqual(second.startup_stats['source'], 'snapshot')
+        self.assertEqual(list(warm_cache), [os.path.join(self.temp_dir, 'a.md')])
+        self.assertIn(new_file, second.file_cache)
+        self.assertEqual([(event['action'], event['file_path']) for event in events], [('created', new_file)])
+        self.assertEqual(second.startup_stats['reconciled_changes'], 1)
+        self.assertTrue(second.search_ready)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+VaultWalkerのテスト
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obsidian_integration import vault_scanner
+from obsidian_integration.file_monitor import ObsidianFileHandler
+from obsidian_integration.vault_scanner import VaultScanner
+from obsidian_integration.vault_walker import IgnoreRules, VaultWalker
+
+
+class TestIgnoreRules(unittest.TestCase):
+    """IgnoreRulesのテストクラス"""
+
+    def test_gitignore_semantics(self):
+        """gitignore形式のパターンが相対パスに一致するテスト"""
+        rules = IgnoreRules([
+            '# comment',
+            '',
+            '.obsidian/',
+            '*.tmp.md',
+            '!keep.tmp.md',
+            '/Root.md',
+            'docs/**/draft*.md',
+            'archive/2020'
+        ])
+        cases = [
+            ('.obsidian', True, True),
+            ('notes/.obsidian', True, True),
+            ('.obsidian', False, False),
+            ('notes/a.tmp.md', False, True),
+            ('keep.tmp.md', False, False),
+            ('Root.md', False, True),
+            ('notes/Root.md', False, False),
+            ('docs/draft1.md', False, True),
+            ('docs/a/b/draft2.md', False, True),
+            ('other/docs/draft.md', False, False),
+            ('archive/2020', True, True),
+            ('old/archive/2020', True, False)
+        ]
+        for path, is_dir, expected in cases:
+            with self.subTest(path=path, is_dir=is_dir):
+                self.assertEqual(rules.match(path, is_dir), expected)
+        self.assertEqual(len(rules), 6)
+        self.assertTrue(rules.has_file_rules)
+        self.assertFalse(IgnoreRules(['.git/']).has_file_rules)
+
+
+class TestVaultWalker(unittest.TestCase):
+    """VaultWalkerのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        for relative_path in ('a.md', 'notes/b.md', '.obsidian/plugins/x.md', '.trash/old.md',
+                              '02_Analysis/report.md', 'notes/draft.tmp.md', 'notes/image.png'):
+            self._write(relative_path)
+        self._racy_window = vault_scanner.RACY_WINDOW_NS
+        vault_scanner.RACY_WINDOW_NS = -10 ** 18
+
+    def tearDown(self):
+        """テストの後処理"""
+        vault_scanner.RACY_WINDOW_NS = self._racy_window
+        shutil.rmtree(self.temp_dir)
+
+    def _path(self, relative_path):
+        return os.path.join(self.temp_dir, *relative_path.split('/'))
+
+    def _write(self, relative_path, content='x'):
+        os.makedirs(os.path.dirname(self._path(relative_path)), exist_ok=True)
+        with open(self._path(relative_path), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def _walker(self):
+        return VaultWalker(self.temp_dir, ['.obsidian/', '.trash/', '02_Analysis/'])
+
+    def _files(self, walker):
+        return sorted(os.path.relpath(path, self.temp_dir).replace(os.sep, '/') for path in walker.iter_files())
+
+    def test_walk_prunes_ignored_directories(self):
+        """除外されたディレクトリには降りないテスト"""
+        walker = self._walker()
+
+        self.assertEqual(self._files(walker), ['a.md', 'notes/b.md', 'notes/draft.tmp.md'])
+        self.assertEqual(walker.get_stats()['directories_pruned'], 3)
+
+    def test_syncignore_is_loaded_and_refreshed(self):
+        """.syncignoreのルールが読み込まれ、変更がrefresh()で反映されるテスト"""
+        self._write('.syncignore', '*.tmp.md\n')
+        walker = self._walker()
+        self.assertEqual(self._files(walker), ['a.md', 'notes/b.md'])
+        self.assertFalse(walker.refresh())
+
+        with open(self._path('.syncignore'), 'w', encoding='utf-8') as f:
+            f.write('notes/\n!02_Analysis/\n')
+        os.utime(self._path('.syncignore'), ns=(1, 1))
+
+        self.assertTrue(walker.refresh())
+        self.assertEqual(self._files(walker), ['02_Analysis/report.md', 'a.md'])
+
+    def test_is_ignored_checks_ancestors(self):
+        """変更イベントのパスは祖先のディレクトリも含めて判定されるテスト"""
+        walker = self._walker()
+
+        self.assertTrue(walker.is_ignored(self._path('.obsidian/plugins/x.md')))
+        self.assertTrue(walker.is_ignored(self._path('.trash'), is_dir=True))
+        self.assertFalse(walker.is_ignored(self._path('.trash')))
+        self.assertFalse(walker.is_ignored(self._path('notes/b.md')))
+        self.assertTrue(walker.is_ignored(os.path.join(os.path.dirname(self.temp_dir), 'outside.md')))
+
+    def test_scanner_uses_ignore_rules(self):
+        """スキャナーが除外ルールを適用し、ルールの変更で除外されたファイルを削除として返すテスト"""
+        scanner = VaultScanner(self.temp_dir, walker=self._walker())
+        created = sorted(os.path.relpath(change['file_path'], self.temp_dir).replace(os.sep, '/')
+                         for change in scanner.scan())
+        self.assertEqual(created, ['a.md', 'notes/b.md', 'notes/draft.tmp.md'])
+
+        self._write('.syncignore', 'notes/\n')
+        changes = scanner.scan()
+
+        self.assertEqual(sorted((change['action'], os.path.relpath(change['file_path'], self.temp_dir))
+                                for change in changes), [
+            ('deleted', os.path.join('notes', 'b.md')),
+            ('deleted', os.path.join('notes', 'draft.tmp.md'))
+        ])
+        self.assertEqual(scanner.scan(), [])
+
+    def test_file_handler_filters_ignored_events(self):
+        """除外されたパスの変更イベントが集約に渡されないテスト"""
+        handler = ObsidianFileHandler(self.temp_dir, quiet_period=60, walker=self._walker())
+
+        def event(src_path, dest_path=None):
+            return SimpleNamespace(is_directory=False, src_path=self._path(src_path),
+                                   dest_path=dest_path and self._path(dest_path))
+
+        handler.on_modified(event('.obsidian/workspace.md'))
+        handler.on_created(event('notes/new.md'))
+        handler.on_moved(event('a.md', '.trash/a.md'))
+        handler.on_moved(event('.trash/old.md', 'restored.md'))
+        changes = handler.coalescer.flush()
+
+        self.assertEqual(sorted((change['action'], os.path.relpath(change['file_path'], self.temp_dir))
+                                for change in changes), [
+            ('created', os.path.join('notes', 'new.md')),
+            ('created', 'restored.md'),
+            ('deleted', 'a.md')
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+WriteBehindQueueのテスト
+"""
+import unittest
+import sys
+import os
+import asyncio
+import tempfile
+import shutil
+from unittest.mock import Mock
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notion_integration.rate_limiter import RateLimiter
+from notion_integration.write_behind import WriteBehindQueue
+from notion_integration.multi_database_client import MultiDatabaseNotionClient
+
+
+class RecordingWriter:
+    """書き込み内容を記録するダミーのwrite_fn"""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    async def __call__(self, record):
+        self.calls.append(record)
+        if self.fail:
+            raise RuntimeError("API unavailable")
+        return record.get('page_id') or f"page-{len(self.calls)}"
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+    """WriteBehindQueueのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.journal_path = os.path.join(self.temp_dir, 'journal.jsonl')
+        self.limiter = RateLimiter(rate=1000.0, burst=1000)
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def make_queue(self, writer):
+        return WriteBehindQueue(self.journal_path, writer, rate_limiter=self.limiter)
+
+    def test_enqueue_does_not_write(self):
+        """受け付け時にはAPIが呼ばれないテスト"""
+        writer = RecordingWriter()
+        queue = self.make_queue(writer)
+
+        queue.enqueue('sync_log', {'Status': 'Running'})
+
+        self.assertEqual(writer.calls, [])
+        self.assertEqual(queue.backlog_depth, 1)
+
+    def test_flush_writes_and_clears_backlog(self):
+        """フラッシュで書き込まれ、バックログが空になるテスト"""
+        writer = RecordingWriter()
+        queue = self.make_queue(writer)
+        queue.enqueue('sync_log', {'Status': 'Running'})
+        queue.enqueue('analysis', {'Score': 1})
+
+        written = asyncio.run(queue.flush())
+
+        self.assertEqual(written, 2)
+        self.assertEqual(queue.backlog_depth, 0)
+        self.assertEqual([c['database_type'] for c in writer.calls], ['sync_log', 'analysis'])
+
+    def test_repeated_updates_are_coalesced(self):
+        """同じ行への繰り返しの更新がまとめられるテスト"""
+        writer = RecordingWriter()
+        queue = self.make_queue(writer)
+        for count in range(5):
+            queue.enqueue('sync_log', {'Status': 'Running', 'Items Processed': count}, key='run-1')
+
+        asyncio.run(queue.flush())
+
+        self.assertEqual(len(writer.calls), 1)
+        self.assertEqual(writer.calls[0]['properties']['Items Processed'], 4)
+        self.assertEqual(queue.get_stats()['coalesced'], 4)
+
+    def test_update_after_flush_targets_same_page(self):
+        """書き込み済みの行への更新は同じページの更新になるテスト"""
+        writer = RecordingWriter()
+        queue = self.make_queue(writer)
+        queue.enqueue('sync_log', {'Status': 'Running'}, key='run-1')
+        asyncio.run(queue.flush())
+        queue.enqueue('sync_log', {'Status': 'Completed'}, key='run-1')
+        asyncio.run(queue.flush())
+
+        self.assertIsNone(writer.calls[0]['page_id'])
+        self.assertEqual(writer.calls[1]['page_id'], 'page-1')
+
+    def test_journal_survives_restart(self):
+        """未反映のレコードが再起動後に復元されるテスト"""
+        queue = self.make_queue(RecordingWriter())
+        queue.enqueue('recommendations', {'Priority': 'high'}, key='rec-1')
+
+        writer = RecordingWriter()
+        restored = self.make_queue(writer)
+        self.assertEqual(restored.backlog_depth, 1)
+
+        asyncio.run(restored.flush())
+        self.assertEqual(writer.calls[0]['properties'], {'Priority': 'high'})
+        self.assertEqual(self.make_queue(RecordingWriter()).backlog_depth, 0)
+
+    def test_failed_writes_are_retried_then_dropped(self):
+        """失敗した書き込みは再試行され、上限で破棄されるテスト"""
+        writer = RecordingWriter(fail=True)
+        queue = WriteBehindQueue(self.journal_path, writer, rate_limiter=self.limiter, max_attempts=2)
+        queue.enqueue('sync_log', {'Status': 'Failed'})
+
+        asyncio.run(queue.flush())
+        self.assertEqual(queue.backlog_depth, 1)
+        asyncio.run(queue.flush())
+        self.assertEqual(queue.backlog_depth, 0)
+        self.assertEqual(queue.get_stats()['dropped'], 1)
+
+    def test_background_flush(self):
+        """イベントループ内で受け付けた場合はバックグラウンドで反映されるテスト"""
+        writer = RecordingWriter()
+        queue = WriteBehindQueue(self.journal_path, writer, rate_limiter=self.limiter, flush_interval=0.01)
+
+        async def run():
+            queue.enqueue('sync_log', {'Status': 'Running'})
+            for _ in range(100):
+                if not queue.backlog_depth:
+                    break
+                await asyncio.sleep(0.01)
+            await queue.stop()
+
+        asyncio.run(run())
+
+        self.assertEqual(len(writer.calls), 1)
+
+
+class TestMultiDatabaseWriteBehind(unittest.TestCase):
+    """MultiDatabaseNotionClientのライトビハインド書き込みのテストクラス"""
+
+    def setUp(self):
+        """テストの前処理"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.client = MultiDatabaseNotionClient(
+            auth_token='test_token',
+            journal_path=os.path.join(self.temp_dir, 'journal.jsonl')
+        )
+        self.client.write_queue.rate_limiter = RateLimiter(rate=1000.0, burst=1000)
+        self.client.client = Mock()
+        self.client.client.pages.create.return_value = {'id': 'page-1'}
+        self.client.database_configs['sync_log']['data_source_id'] = 'ds-sync'
+
+    def tearDown(self):
+        """テストの後処理"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_sync_log_is_queued_and_flushed(self):
+        """同期ログが即座にキューに積まれ、フラッシュで作成されるテスト"""
+        async def run():
+            result = await self.client.create_sync_log('Manual', 'Completed', 10)
+            self.assertTrue(result['queued'])
+            self.client.client.pages.create.assert_not_called()
+            await self.client.flush_pending_writes()
+
+        asyncio.run(run())
+
+        parent = self.client.client.pages.create.call_args.kwargs['parent']
+        self.assertEqual(parent['data_source_id'], 'ds-sync')
+        self.assertEqual(self.client.get_write_backlog()['backlog_depth'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()